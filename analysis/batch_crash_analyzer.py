@@ -9,14 +9,14 @@ Author: G-Code Database Manager
 Date: 2026-02-08
 """
 
-import sqlite3
-import random
+import argparse
 import os
-from pathlib import Path
 from collections import defaultdict, Counter
 import json
 from datetime import datetime
 from improved_gcode_parser import ImprovedGCodeParser
+from utils.analysis_runner import (STORED_ISSUE_FIELDS, add_runner_arguments, parse_or_reuse,
+                                   run_analyzer, select_programs)
 
 
 class BatchCrashAnalyzer:
@@ -26,9 +26,12 @@ class BatchCrashAnalyzer:
         self.db_path = db_path
         self.repository_path = repository_path
         self.parser = ImprovedGCodeParser()
+        # Use the issues stored in the database for files unchanged since they were parsed
+        self.reuse_stored = True
         self.results = {
             'total_files': 0,
             'successful_parses': 0,
+            'reused_parses': 0,
             'failed_parses': 0,
             'files_with_critical': 0,
             'files_with_warnings': 0,
@@ -49,30 +52,28 @@ class BatchCrashAnalyzer:
             'files_analyzed': []
         }
 
-    def select_all_files(self):
+    def select_all_files(self, sample_size: int = None):
         """Select ALL files with dimensions from database for comprehensive analysis"""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-
-        # Get ALL files with valid dimensions (no sampling, no limit)
-        query = """
-        SELECT program_number, file_path, outer_diameter, thickness, hub_height, tools_used
-        FROM programs
-        WHERE file_path IS NOT NULL
-          AND outer_diameter IS NOT NULL
-          AND thickness IS NOT NULL
-        ORDER BY program_number
-        """
-
-        cursor.execute(query)
-        files = cursor.fetchall()
-        conn.close()
-
-        print(f"Selected ALL {len(files)} files from database for comprehensive analysis")
+        # Get ALL files with valid dimensions (no sampling, no limit) unless a sample is asked for
+        rows = select_programs(
+            self.db_path,
+            ['program_number', 'file_path', 'outer_diameter', 'thickness', 'hub_height',
+             'tools_used', 'content_hash', *STORED_ISSUE_FIELDS],
+            where="file_path IS NOT NULL AND outer_diameter IS NOT NULL AND thickness IS NOT NULL",
+            sample_size=sample_size)
+
+        # Stored issue columns travel as one dict (parse cache for unchanged files)
+        files = [(*row[:7], dict(zip(STORED_ISSUE_FIELDS, row[7:]))) for row in rows]
+
+        if sample_size:
+            print(f"Selected {len(files)} random files from database")
+        else:
+            print(f"Selected ALL {len(files)} files from database for comprehensive analysis")
         return files
 
     def analyze_file(self, program_number: str, file_path: str,
-                    outer_diameter: float, thickness: float, hub_height: float, tools_used: str):
+                    outer_diameter: float, thickness: float, hub_height: float, tools_used: str,
+                    content_hash: str = None, stored_issues: dict = None):
         """Analyze single G-code file for crash patterns"""
 
         self.results['total_files'] += 1
@@ -99,10 +100,14 @@ class BatchCrashAnalyzer:
             self.results['failed_parses'] += 1
             return
 
-        # Parse file
+        # Parse file (or reuse stored issues if unchanged since last parse)
         try:
-            parse_result = self.parser.parse_file(file_path)
+            parse_result, reused = parse_or_reuse(
+                self.parser, file_path, content_hash,
+                stored_issues if self.reuse_stored else None)
             self.results['successful_parses'] += 1
+            if reused:
+                self.results['reused_parses'] += 1
 
             # Store file info
             file_info = {
@@ -198,21 +203,20 @@ class BatchCrashAnalyzer:
             self.results['failed_parses'] += 1
             print(f"Error parsing {program_number}: {str(e)}")
 
-    def run_batch_analysis(self):
-        """Run comprehensive batch analysis on ALL files in database"""
+    def run_batch_analysis(self, sample_size: int = None, max_workers: int = None):
+        """Run comprehensive batch analysis on ALL files in database (parallel)"""
         print(f"\n{'='*80}")
         print("COMPREHENSIVE CRASH ANALYSIS - ALL FILES IN DATABASE")
         print(f"{'='*80}\n")
 
-        files = self.select_all_files()
-
-        for i, (program_number, file_path, round_size, thickness, hub_height, tools) in enumerate(files, 1):
-            if i % 100 == 0:  # Progress every 100 files for large datasets
-                print(f"Progress: {i}/{len(files)} files analyzed...")
+        files = self.select_all_files(sample_size)
 
-            self.analyze_file(program_number, file_path, round_size, thickness, hub_height, tools)
+        run_analyzer(self, files, options={'reuse_stored': self.reuse_stored},
+                     max_workers=max_workers,
+                     progress=lambda done, total: print(f"Progress: {done}/{total} files analyzed..."))
 
-        print(f"\nAnalysis complete: {self.results['successful_parses']}/{self.results['total_files']} files parsed successfully")
+        print(f"\nAnalysis complete: {self.results['successful_parses']}/{self.results['total_files']} files parsed successfully "
+              f"({self.results['reused_parses']} unchanged files reused stored results)")
 
     def generate_report(self, output_file: str = None):
         """Generate comprehensive crash analysis report"""
@@ -236,6 +240,7 @@ class BatchCrashAnalyzer:
         report_lines.append("-"*80)
         report_lines.append(f"Total Files Analyzed: {self.results['total_files']}")
         report_lines.append(f"Successfully Parsed: {self.results['successful_parses']}")
+        report_lines.append(f"  Reused Stored Results (unchanged files): {self.results['reused_parses']}")
         report_lines.append(f"Failed to Parse: {self.results['failed_parses']}")
         report_lines.append(f"Files with Critical Issues: {self.results['files_with_critical']} ({self.results['files_with_critical']/max(1, self.results['total_files'])*100:.1f}%)")
         report_lines.append(f"Files with Warnings: {self.results['files_with_warnings']} ({self.results['files_with_warnings']/max(1, self.results['total_files'])*100:.1f}%)")
@@ -370,6 +375,7 @@ class BatchCrashAnalyzer:
             'summary': {
                 'total_files': self.results['total_files'],
                 'successful_parses': self.results['successful_parses'],
+                'reused_parses': self.results['reused_parses'],
                 'failed_parses': self.results['failed_parses'],
                 'files_with_critical': self.results['files_with_critical'],
                 'files_with_warnings': self.results['files_with_warnings'],
@@ -395,16 +401,22 @@ class BatchCrashAnalyzer:
 
 def main():
     """Main entry point for batch crash analysis"""
+    parser = argparse.ArgumentParser(description="Crash pattern analysis over the repository")
+    add_runner_arguments(parser)
+    parser.add_argument('--reparse', action='store_true',
+                        help="Parse every file, even unchanged ones with stored results")
+    args = parser.parse_args()
 
     # Configuration
-    db_path = r"l:\My Drive\Home\File organizer\gcode_database.db"
-    repository_path = r"l:\My Drive\Home\File organizer\repository"
+    db_path = args.db or r"l:\My Drive\Home\File organizer\gcode_database.db"
+    repository_path = args.repository or r"l:\My Drive\Home\File organizer\repository"
 
     # Create analyzer
     analyzer = BatchCrashAnalyzer(db_path, repository_path)
+    analyzer.reuse_stored = not args.reparse
 
     # Run comprehensive analysis on ALL files in database
-    analyzer.run_batch_analysis()
+    analyzer.run_batch_analysis(sample_size=args.sample, max_workers=args.workers)
 
     # Generate report
     report_text = analyzer.generate_report()
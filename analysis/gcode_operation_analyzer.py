@@ -12,12 +12,14 @@ Author: G-Code Database Manager
 Date: 2026-02-08
 """
 
-import sqlite3
+import argparse
 import re
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from collections import defaultdict
 
+from utils.analysis_runner import add_runner_arguments, run_analyzer, select_programs
+
 
 @dataclass
 class BoreFeature:
@@ -327,31 +329,17 @@ class GCodeOperationAnalyzer:
         except Exception as e:
             print(f"Error analyzing {program_number}: {e}")
 
-    def run_analysis(self, sample_size: int = 500):
-        """Run analysis on sample of files"""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-
-        query = """
-        SELECT program_number, file_path, thickness, hub_height
-        FROM programs
-        WHERE file_path IS NOT NULL
-          AND thickness IS NOT NULL
-        ORDER BY RANDOM()
-        LIMIT ?
-        """
-
-        cursor.execute(query, (sample_size,))
-        files = cursor.fetchall()
-        conn.close()
+    def run_analysis(self, sample_size: int = None, max_workers: int = None):
+        """Run analysis on all files (or a random sample) in parallel"""
+        files = select_programs(
+            self.db_path, ['program_number', 'file_path', 'thickness', 'hub_height'],
+            where="file_path IS NOT NULL AND thickness IS NOT NULL",
+            sample_size=sample_size)
 
         print(f"Analyzing {len(files)} files for operation patterns...")
 
-        for i, (program_number, file_path, thickness, hub_height) in enumerate(files, 1):
-            if i % 50 == 0:
-                print(f"Progress: {i}/{len(files)}...")
-
-            self.analyze_file(program_number, file_path, thickness, hub_height)
+        run_analyzer(self, files, max_workers=max_workers,
+                     progress=lambda done, total: print(f"Progress: {done}/{total}..."))
 
         print(f"\nAnalysis complete!")
 
@@ -465,13 +453,17 @@ class GCodeOperationAnalyzer:
 
 def main():
     """Main entry point"""
-    db_path = r"l:\My Drive\Home\File organizer\gcode_database.db"
-    repository_path = r"l:\My Drive\Home\File organizer\repository"
+    parser = argparse.ArgumentParser(description="Operation pattern analysis over the repository")
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    db_path = args.db or r"l:\My Drive\Home\File organizer\gcode_database.db"
+    repository_path = args.repository or r"l:\My Drive\Home\File organizer\repository"
 
     analyzer = GCodeOperationAnalyzer(db_path, repository_path)
 
-    # Analyze 500 random files
-    analyzer.run_analysis(sample_size=500)
+    # Analyze every file (--sample N for a random sample)
+    analyzer.run_analysis(sample_size=args.sample, max_workers=args.workers)
 
     # Generate and save report
     report = analyzer.generate_report()
@@ -16,7 +16,7 @@ Author: G-Code Database Manager
 Date: 2026-02-08
 """
 
-import sqlite3
+import argparse
 import os
 import re
 from collections import defaultdict, Counter
@@ -24,6 +24,8 @@ from typing import Dict, List, Tuple, Optional
 import json
 from datetime import datetime
 
+from utils.analysis_runner import add_runner_arguments, run_analyzer, select_programs
+
 
 class ManufacturingProcessAnalyzer:
     """Analyzes G-code files to discover manufacturing patterns"""
@@ -287,108 +289,96 @@ class ManufacturingProcessAnalyzer:
             'operations_match': Counter(side1_ops) == Counter(side2_ops)
         }
 
-    def analyze_files(self, sample_size: int = 500):
-        """Analyze sample of files for patterns"""
+    def analyze_file(self, program_number: str, file_path: str, od: float,
+                     thickness: float, hub_height: Optional[float]):
+        """Analyze a single file for patterns"""
+        if not os.path.exists(file_path):
+            return
+
+        try:
+            # Read G-code
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                gcode_content = f.read()
+
+            # Categorize by dimensions
+            od_cat, thick_cat, hub_cat = self.categorize_by_dimensions(od, thickness, hub_height)
+
+            # Store in categories
+            part_info = {
+                'program': program_number,
+                'od': od,
+                'thickness': thickness,
+                'hub_height': hub_height
+            }
+
+            self.patterns['od_categories'][od_cat].append(part_info)
+            self.patterns['thickness_categories'][thick_cat].append(part_info)
+            self.patterns['hub_height_categories'][hub_cat].append(part_info)
+
+            # Extract operation sequence
+            operations = self.extract_operation_sequence(gcode_content)
+            if operations:
+                op_sequence = ' → '.join(operations)
+                self.patterns['operation_sequences'][op_sequence] += 1
+
+            # Extract tool sequence
+            tools = self.extract_tool_sequence(gcode_content)
+            if tools:
+                tool_sequence = ' → '.join(tools)
+                self.patterns['tool_sequences'][tool_sequence] += 1
+
+            # Detect special features
+            features = self.detect_special_features(gcode_content)
+            for feature in features:
+                self.patterns['special_features'][feature] += 1
+
+            # Analyze side patterns
+            side_analysis = self.analyze_side_patterns(gcode_content)
+            if side_analysis['has_side1'] and side_analysis['has_side2']:
+                if side_analysis['operations_match']:
+                    self.patterns['side1_vs_side2_patterns']['Operations Match'] += 1
+                else:
+                    self.patterns['side1_vs_side2_patterns']['Operations Differ'] += 1
+
+                # Track specific patterns
+                side1_str = ', '.join(side_analysis['side1_ops'])
+                side2_str = ', '.join(side_analysis['side2_ops'])
+                pattern = f"S1:[{side1_str}] vs S2:[{side2_str}]"
+                self.patterns['side1_vs_side2_patterns'][pattern] += 1
+
+            # Extract feed/speed data
+            feed_speed_data = self.extract_feed_speed_data(gcode_content)
+            for data in feed_speed_data:
+                self.patterns['feed_speeds_by_op'][data['operation']].append(data)
+                if data['spindle_speed'] and data['tool']:
+                    self.patterns['spindle_speeds_by_tool'][data['tool']].append(data['spindle_speed'])
+
+            # Detect ring parts
+            ring_info = self.detect_ring_part(gcode_content, od)
+            if ring_info:
+                ring_info['program'] = program_number
+                ring_info['thickness'] = thickness
+                self.patterns['ring_parts'].append(ring_info)
+
+        except Exception as e:
+            print(f"Error analyzing {program_number}: {e}")
+
+    def analyze_files(self, sample_size: int = None, max_workers: int = None):
+        """Analyze all files (or a random sample) for patterns, in parallel"""
         print(f"\n{'='*80}")
         print(f"MANUFACTURING PROCESS PATTERN ANALYSIS")
-        print(f"Analyzing {sample_size} random files from database")
+        print(f"Analyzing {f'{sample_size} random' if sample_size else 'all'} files from database")
         print(f"{'='*80}\n")
 
-        # Get random sample of files
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-
-        query = """
-        SELECT program_number, file_path, outer_diameter, thickness, hub_height
-        FROM programs
-        WHERE file_path IS NOT NULL
-          AND outer_diameter IS NOT NULL
-          AND thickness IS NOT NULL
-        ORDER BY RANDOM()
-        LIMIT ?
-        """
-
-        cursor.execute(query, (sample_size,))
-        files = cursor.fetchall()
-        conn.close()
+        files = select_programs(
+            self.db_path, ['program_number', 'file_path', 'outer_diameter', 'thickness', 'hub_height'],
+            where="file_path IS NOT NULL AND outer_diameter IS NOT NULL AND thickness IS NOT NULL",
+            sample_size=sample_size)
 
         print(f"Selected {len(files)} files for analysis\n")
 
-        # Analyze each file
-        for i, (program_number, file_path, od, thickness, hub_height) in enumerate(files, 1):
-            if i % 50 == 0:
-                print(f"Progress: {i}/{len(files)} files analyzed...")
-
-            if not os.path.exists(file_path):
-                continue
-
-            try:
-                # Read G-code
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    gcode_content = f.read()
-
-                # Categorize by dimensions
-                od_cat, thick_cat, hub_cat = self.categorize_by_dimensions(od, thickness, hub_height)
-
-                # Store in categories
-                part_info = {
-                    'program': program_number,
-                    'od': od,
-                    'thickness': thickness,
-                    'hub_height': hub_height
-                }
-
-                self.patterns['od_categories'][od_cat].append(part_info)
-                self.patterns['thickness_categories'][thick_cat].append(part_info)
-                self.patterns['hub_height_categories'][hub_cat].append(part_info)
-
-                # Extract operation sequence
-                operations = self.extract_operation_sequence(gcode_content)
-                if operations:
-                    op_sequence = ' → '.join(operations)
-                    self.patterns['operation_sequences'][op_sequence] += 1
-
-                # Extract tool sequence
-                tools = self.extract_tool_sequence(gcode_content)
-                if tools:
-                    tool_sequence = ' → '.join(tools)
-                    self.patterns['tool_sequences'][tool_sequence] += 1
-
-                # Detect special features
-                features = self.detect_special_features(gcode_content)
-                for feature in features:
-                    self.patterns['special_features'][feature] += 1
-
-                # Analyze side patterns
-                side_analysis = self.analyze_side_patterns(gcode_content)
-                if side_analysis['has_side1'] and side_analysis['has_side2']:
-                    if side_analysis['operations_match']:
-                        self.patterns['side1_vs_side2_patterns']['Operations Match'] += 1
-                    else:
-                        self.patterns['side1_vs_side2_patterns']['Operations Differ'] += 1
-
-                    # Track specific patterns
-                    side1_str = ', '.join(side_analysis['side1_ops'])
-                    side2_str = ', '.join(side_analysis['side2_ops'])
-                    pattern = f"S1:[{side1_str}] vs S2:[{side2_str}]"
-                    self.patterns['side1_vs_side2_patterns'][pattern] += 1
-
-                # Extract feed/speed data
-                feed_speed_data = self.extract_feed_speed_data(gcode_content)
-                for data in feed_speed_data:
-                    self.patterns['feed_speeds_by_op'][data['operation']].append(data)
-                    if data['spindle_speed'] and data['tool']:
-                        self.patterns['spindle_speeds_by_tool'][data['tool']].append(data['spindle_speed'])
-
-                # Detect ring parts
-                ring_info = self.detect_ring_part(gcode_content, od)
-                if ring_info:
-                    ring_info['program'] = program_number
-                    ring_info['thickness'] = thickness
-                    self.patterns['ring_parts'].append(ring_info)
-
-            except Exception as e:
-                print(f"Error analyzing {program_number}: {e}")
+        run_analyzer(self, files, state='patterns', max_workers=max_workers,
+                     progress=lambda done, total: print(f"Progress: {done}/{total} files analyzed..."))
 
         print(f"\nAnalysis complete!\n")
 
@@ -547,13 +537,17 @@ class ManufacturingProcessAnalyzer:
 
 def main():
     """Main entry point"""
-    db_path = r"l:\My Drive\Home\File organizer\gcode_database.db"
-    repository_path = r"l:\My Drive\Home\File organizer\repository"
+    parser = argparse.ArgumentParser(description="Manufacturing process pattern analysis over the repository")
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    db_path = args.db or r"l:\My Drive\Home\File organizer\gcode_database.db"
+    repository_path = args.repository or r"l:\My Drive\Home\File organizer\repository"
 
     analyzer = ManufacturingProcessAnalyzer(db_path, repository_path)
 
-    # Analyze 1000 random files for comprehensive insights
-    analyzer.analyze_files(sample_size=1000)
+    # Analyze every file for comprehensive insights (--sample N for a random sample)
+    analyzer.analyze_files(sample_size=args.sample, max_workers=args.workers)
 
     # Generate report
     report = analyzer.generate_report()
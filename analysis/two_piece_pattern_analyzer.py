@@ -17,7 +17,7 @@ Author: G-Code Database Manager
 Date: 2026-02-08
 """
 
-import sqlite3
+import argparse
 import os
 import re
 from collections import defaultdict, Counter
@@ -25,6 +25,8 @@ from typing import Dict, List, Tuple, Optional
 import json
 from datetime import datetime
 
+from utils.analysis_runner import add_runner_arguments, run_analyzer, select_programs
+
 
 class TwoPiecePatternAnalyzer:
     """Analyzes two-piece part patterns and process variations"""
@@ -124,89 +126,77 @@ class TwoPiecePatternAnalyzer:
 
         return list(operations)
 
-    def analyze_files(self, sample_size: int = 1000):
-        """Analyze files for two-piece patterns"""
-        print(f"\n{'='*80}")
-        print(f"TWO-PIECE PART PATTERN ANALYSIS")
-        print(f"Analyzing {sample_size} random files from database")
-        print(f"{'='*80}\n")
-
-        # Get random sample
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-
-        query = """
-        SELECT program_number, file_path, outer_diameter, thickness, hub_height
-        FROM programs
-        WHERE file_path IS NOT NULL
-          AND outer_diameter IS NOT NULL
-          AND thickness IS NOT NULL
-        ORDER BY RANDOM()
-        LIMIT ?
-        """
-
-        cursor.execute(query, (sample_size,))
-        files = cursor.fetchall()
-        conn.close()
-
-        print(f"Selected {len(files)} files for analysis\n")
-
-        # Analyze each file
-        for i, (program_number, file_path, od, thickness, hub_height) in enumerate(files, 1):
-            if i % 100 == 0:
-                print(f"Progress: {i}/{len(files)} files analyzed...")
-
-            if not os.path.exists(file_path):
-                continue
-
-            try:
-                # Read G-code
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    gcode_content = f.read()
-
-                # Extract operations present
-                operations = self.extract_operations_present(gcode_content)
-                for op in operations:
-                    self.patterns['operation_presence'][op] += 1
+    def analyze_file(self, program_number: str, file_path: str, od: float,
+                     thickness: float, hub_height: Optional[float]):
+        """Analyze a single file for two-piece patterns"""
+        if not os.path.exists(file_path):
+            return
+
+        try:
+            # Read G-code
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                gcode_content = f.read()
+
+            # Extract operations present
+            operations = self.extract_operations_present(gcode_content)
+            for op in operations:
+                self.patterns['operation_presence'][op] += 1
+
+            # Group by OD for matching
+            od_key = round(od * 4) / 4  # Round to nearest 0.25"
+            self.patterns['od_groups'][od_key].append({
+                'program': program_number,
+                'od': od,
+                'thickness': thickness,
+                'hub_height': hub_height,
+                'operations': operations
+            })
+
+            # Check for hub
+            hub_info = self.extract_hub_info(gcode_content, thickness, hub_height)
+            if hub_info:
+                self.patterns['hub_parts'].append({
+                    'program': program_number,
+                    'od': od,
+                    'thickness': thickness,
+                    'hub_info': hub_info,
+                    'operations': operations
+                })
 
-                # Group by OD for matching
-                od_key = round(od * 4) / 4  # Round to nearest 0.25"
-                self.patterns['od_groups'][od_key].append({
+            # Check for counterbore
+            cbore_info = self.extract_counterbore_info(gcode_content)
+            if cbore_info:
+                self.patterns['counterbore_parts'].append({
                     'program': program_number,
                     'od': od,
                     'thickness': thickness,
-                    'hub_height': hub_height,
+                    'cbore_info': cbore_info,
                     'operations': operations
                 })
 
-                # Check for hub
-                hub_info = self.extract_hub_info(gcode_content, thickness, hub_height)
-                if hub_info:
-                    self.patterns['hub_parts'].append({
-                        'program': program_number,
-                        'od': od,
-                        'thickness': thickness,
-                        'hub_info': hub_info,
-                        'operations': operations
-                    })
-
-                # Check for counterbore
-                cbore_info = self.extract_counterbore_info(gcode_content)
-                if cbore_info:
-                    self.patterns['counterbore_parts'].append({
-                        'program': program_number,
-                        'od': od,
-                        'thickness': thickness,
-                        'cbore_info': cbore_info,
-                        'operations': operations
-                    })
-
-            except Exception as e:
-                print(f"Error analyzing {program_number}: {e}")
+        except Exception as e:
+            print(f"Error analyzing {program_number}: {e}")
+
+    def analyze_files(self, sample_size: int = None, max_workers: int = None):
+        """Analyze all files (or a random sample) for two-piece patterns, in parallel"""
+        print(f"\n{'='*80}")
+        print(f"TWO-PIECE PART PATTERN ANALYSIS")
+        print(f"Analyzing {f'{sample_size} random' if sample_size else 'all'} files from database")
+        print(f"{'='*80}\n")
+
+        files = select_programs(
+            self.db_path, ['program_number', 'file_path', 'outer_diameter', 'thickness', 'hub_height'],
+            where="file_path IS NOT NULL AND outer_diameter IS NOT NULL AND thickness IS NOT NULL",
+            sample_size=sample_size)
+
+        print(f"Selected {len(files)} files for analysis\n")
+
+        run_analyzer(self, files, state='patterns', max_workers=max_workers,
+                     progress=lambda done, total: print(f"Progress: {done}/{total} files analyzed..."))
 
         print(f"\nAnalysis complete!\n")
 
-        # Find two-piece candidates
+        # Find two-piece candidates (over the merged results)
         self._find_two_piece_matches()
 
     def _find_two_piece_matches(self):
@@ -439,13 +429,17 @@ class TwoPiecePatternAnalyzer:
 
 def main():
     """Main entry point"""
-    db_path = r"l:\My Drive\Home\File organizer\gcode_database.db"
-    repository_path = r"l:\My Drive\Home\File organizer\repository"
+    parser = argparse.ArgumentParser(description="Two-piece pattern analysis over the repository")
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    db_path = args.db or r"l:\My Drive\Home\File organizer\gcode_database.db"
+    repository_path = args.repository or r"l:\My Drive\Home\File organizer\repository"
 
     analyzer = TwoPiecePatternAnalyzer(db_path, repository_path)
 
-    # Analyze 1000 files
-    analyzer.analyze_files(sample_size=1000)
+    # Analyze every file (--sample N for a random sample)
+    analyzer.analyze_files(sample_size=args.sample, max_workers=args.workers)
 
     # Generate report
     report = analyzer.generate_report()
@@ -0,0 +1,149 @@
+"""
+Benchmark Corpus
+
+Builds a reproducible synthetic program corpus with gcode_generator: every
+spacer type on every lathe / round size, with CB, OB and thickness varied
+from a fixed seed. The same size and seed always give the same files, so
+benchmark runs on different commits time the same input.
+
+Usage:
+    python benchmarks/corpus.py OUT_DIR --size 500
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from typing import Dict, Iterator, List, Optional
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _root_dir not in sys.path:
+    sys.path.insert(0, _root_dir)
+
+from gcode_generator.generator import GCodeGenerator, SpacerType
+from gcode_generator.rules.lathe_config import LatheConfig
+from gcode_generator.rules.depths import DepthTable
+from gcode_generator.rules.pcodes import PCodeManager
+
+
+MANIFEST_NAME = 'corpus.json'
+CORPUS_VERSION = 1
+FIRST_PROGRAM_NUMBER = 10000
+
+
+def corpus_specs(size: int, seed: int = 0) -> Iterator[Dict]:
+    """
+    Generator keyword arguments for `size` programs.
+
+    Cycles through every (lathe, round size, spacer type) combination so even
+    a small corpus covers all of them, then varies the dimensions per pass.
+    """
+    rng = random.Random(seed)
+    # Thicknesses the lathe has P-codes for and the depth table covers
+    thicknesses = {lathe: sorted(set(PCodeManager.get_available_thicknesses(lathe)) & set(DepthTable.DEPTH_TABLE))
+                   for lathe in LatheConfig.LATHE_ASSIGNMENTS}
+    combos = [(lathe, round_size, spacer_type)
+              for lathe, sizes in sorted(LatheConfig.LATHE_ASSIGNMENTS.items())
+              for round_size in sizes
+              for spacer_type in SpacerType]
+
+    for index in range(size):
+        lathe, round_size, spacer_type = combos[index % len(combos)]
+        # CB well inside the round, leaving room for the OB/counterbore
+        max_cb = min(round_size * 25.4 * 0.6, 170.0)
+        cb_mm = round(rng.uniform(54.0, max_cb), 1)
+        choices = thicknesses[lathe]
+        if spacer_type in (SpacerType.HUB_CENTRIC, SpacerType.THIN_LIP):
+            # Thickness plus hub must stay inside the depth table
+            choices = [t for t in choices if t.endswith('MM') or float(t) <= 3.0]
+        spec = {
+            'spacer_type': spacer_type,
+            'program_number': f"o{FIRST_PROGRAM_NUMBER + index}",
+            'round_size': round_size,
+            'thickness': rng.choice(choices),
+            'cb_mm': cb_mm,
+            'lathe': lathe,
+        }
+        if spacer_type in (SpacerType.HUB_CENTRIC, SpacerType.THIN_LIP):
+            wall = rng.uniform(2.0, 4.5) if spacer_type == SpacerType.THIN_LIP else rng.uniform(6.0, 15.0)
+            spec['ob_mm'] = round(cb_mm + wall, 1)
+            spec['hub_height'] = rng.choice([0.25, 0.50, 0.75])
+        elif spacer_type == SpacerType.STEP:
+            spec['counterbore_mm'] = round(cb_mm + rng.uniform(8.0, 20.0), 1)
+            spec['step_depth'] = rng.choice([0.25, 0.30, 0.50])
+        elif spacer_type == SpacerType.TWO_PIECE:
+            spec['is_male_piece'] = index % 2 == 0
+        yield spec
+
+
+def build_corpus(output_dir: str, size: int = 500, seed: int = 0) -> Dict:
+    """
+    Generate the corpus into output_dir (flat, one o#####.nc per program).
+
+    Reuses an existing corpus when its manifest matches size and seed.
+
+    Returns:
+        Manifest dict (files, failures, fingerprint)
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if (manifest.get('version'), manifest.get('size'), manifest.get('seed')) == (CORPUS_VERSION, size, seed):
+            return manifest
+
+    os.makedirs(output_dir, exist_ok=True)
+    generator = GCodeGenerator(use_templates=False)
+    digest = hashlib.sha256()
+    files: List[str] = []
+    failures: List[Dict] = []
+
+    for spec in corpus_specs(size, seed):
+        try:
+            gcode = generator.generate(**spec)
+        except Exception as e:
+            failures.append({'program_number': spec['program_number'],
+                             'spacer_type': spec['spacer_type'].value, 'error': str(e)})
+            continue
+        filename = f"{spec['program_number']}.nc"
+        GCodeGenerator.save_gcode(gcode, os.path.join(output_dir, filename))
+        digest.update(gcode.encode('ascii', errors='replace'))
+        files.append(filename)
+
+    manifest = {
+        'version': CORPUS_VERSION,
+        'size': size,
+        'seed': seed,
+        'files': files,
+        'failures': failures,
+        'fingerprint': digest.hexdigest(),
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def corpus_files(corpus_dir: str, manifest: Optional[Dict] = None) -> List[str]:
+    """Absolute paths of the corpus programs"""
+    if manifest is None:
+        with open(os.path.join(corpus_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    return [os.path.join(corpus_dir, name) for name in manifest['files']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the synthetic benchmark corpus")
+    parser.add_argument('output_dir', help="Folder for the generated programs")
+    parser.add_argument('--size', type=int, default=500, help="Number of programs (default 500)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default 0)")
+    args = parser.parse_args()
+
+    manifest = build_corpus(args.output_dir, args.size, args.seed)
+    print(f"{len(manifest['files'])} programs in {args.output_dir} "
+          f"({len(manifest['failures'])} failed), fingerprint {manifest['fingerprint'][:12]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""
+Benchmark Suite
+
+Times the database manager's hot paths on the synthetic corpus
+(benchmarks/corpus.py) and saves the results as JSON so runs on different
+commits can be compared:
+
+- parse_file: ImprovedGCodeParser.parse_file over the corpus
+- stage.<name> / validator.<name>: each parse stage and validation step,
+  from one extra parse of the corpus with parser profiling enabled
+- toolpath: GCodeToolpathParser.parse (cold cache)
+- bulk_import: _import_files into an empty database
+- filter_query.<scenario>: build_filter_query plus the query refresh_results runs
+- fuzzy_search: FuzzySearchManager.search_programs (needs thefuzz)
+- usb_scan: USBSyncManager.scan_drive of the corpus against the imported database
+
+Every benchmark reports the best and median of --repeat runs; the best run
+is the one compared, being the least affected by other load on the machine.
+
+Usage:
+    python benchmarks/run_benchmarks.py --size 500
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/BEFORE.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+_bench_dir = os.path.dirname(os.path.abspath(__file__))
+_root_dir = os.path.dirname(_bench_dir)
+for _path in (_root_dir, _bench_dir):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from corpus import build_corpus, corpus_files
+from improved_gcode_parser import ImprovedGCodeParser
+from utils.program_issues import sync_program_issues
+from utils.toolpath_engine import GCodeToolpathParser, clear_toolpath_cache
+from utils.usb_sync_manager import USBSyncManager
+
+
+RESULTS_DIR = os.path.join(_bench_dir, 'results')
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), 'gcode_benchmark_corpus')
+
+# A benchmark this much slower than the baseline is reported as a regression
+DEFAULT_THRESHOLD = 1.5
+
+FUZZY_QUERIES = ['hub centric 6in', 'o1005', '74.1MM', 'STEP 8.5']
+
+
+class _Var:
+    """Stand-in for a Tk variable / Entry in the filter panel"""
+
+    def __init__(self, value=''):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class _MultiSelect:
+    """Stand-in for MultiSelectCombobox"""
+
+    def __init__(self, values, selected=None):
+        self.values = list(values)
+        self.selected = list(values if selected is None else selected)
+
+    def get_selected(self):
+        return list(self.selected)
+
+
+def _headless_manager(db_path: str, repository_path: str):
+    """GCodeDatabaseGUI with only the state its database methods use (no window)"""
+    from gcode_database_manager import GCodeDatabaseGUI
+
+    app = GCodeDatabaseGUI.__new__(GCodeDatabaseGUI)
+    app.db_path = db_path
+    app.repository_path = repository_path
+    app.config = {}
+    app.init_database()
+    app.parser = ImprovedGCodeParser()
+    return app
+
+
+def _set_filters(app, **filters) -> None:
+    """Reset the filter panel stand-ins, then apply the given filters"""
+    for name in ('filter_title', 'filter_program', 'filter_od_min', 'filter_od_max',
+                 'filter_thickness_min', 'filter_thickness_max', 'filter_cb_min', 'filter_cb_max',
+                 'filter_hub_dia_min', 'filter_hub_dia_max', 'filter_hub_h_min', 'filter_hub_h_max',
+                 'filter_step_d_min', 'filter_step_d_max', 'filter_error_text',
+                 'filter_date_from', 'filter_date_to'):
+        setattr(app, name, _Var(filters.get(name, '')))
+    app.filter_missing_file_path = _Var(False)
+    app.fuzzy_search_enabled = _Var(False)
+
+    conn = sqlite3.connect(app.db_path)
+    try:
+        def distinct(column):
+            return [row[0] for row in conn.execute(
+                f"SELECT DISTINCT {column} FROM programs WHERE {column} IS NOT NULL ORDER BY 1")]
+        app.filter_type = _MultiSelect(distinct('spacer_type'), filters.get('filter_type'))
+        app.filter_material = _MultiSelect(distinct('material'), filters.get('filter_material'))
+        app.filter_status = _MultiSelect(distinct('validation_status'), filters.get('filter_status'))
+    finally:
+        conn.close()
+    app.filter_dup_type = _MultiSelect(['None'])
+    app.filter_crash_type = _MultiSelect(["All Crashes", "G00 Rapid to Z", "Diagonal Rapid",
+                                          "Z Before Tool Home", "Jaw Clearance"])
+
+
+FILTER_SCENARIOS = {
+    'all': {},
+    'title': {'filter_title': 'HC'},
+    'dimensions': {'filter_od_min': '6.0', 'filter_od_max': '8.5',
+                   'filter_cb_min': '60', 'filter_cb_max': '110',
+                   'filter_thickness_max': '2.0'},
+    'type': {'filter_type': ['hub_centric', 'step']},
+    'issue_text': {'filter_error_text': 'CB'},
+}
+
+
+def _measure(run: Callable, repeat: int, items: int, setup: Optional[Callable] = None) -> Dict:
+    """Time run() `repeat` times (setup() output is passed in, untimed)"""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        run(state) if setup else run()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        'items': items,
+        'repeat': repeat,
+        'times': [round(t, 6) for t in times],
+        'best': round(best, 6),
+        'median': round(statistics.median(times), 6),
+        'per_item_ms': round(best / items * 1000, 4) if items else None,
+    }
+
+
+def run_suite(corpus_dir: str, size: int, seed: int = 0, repeat: int = 3,
+              only: Optional[List[str]] = None) -> Dict:
+    """
+    Build (or reuse) the corpus and run the benchmarks.
+
+    Args:
+        only: Benchmark name prefixes to run (all if None)
+
+    Returns:
+        Results dict (metadata plus one entry per benchmark)
+    """
+    manifest = build_corpus(corpus_dir, size, seed)
+    files = corpus_files(corpus_dir, manifest)
+    benchmarks: Dict[str, Dict] = {}
+    skipped: Dict[str, str] = {}
+
+    def wanted(name):
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    if wanted('parse_file'):
+        def parse_corpus():
+            parser = ImprovedGCodeParser()
+            for path in files:
+                parser.parse_file(path)
+
+        benchmarks['parse_file'] = _measure(parse_corpus, repeat, len(files))
+
+    if wanted('stage') or wanted('validator'):
+        parser = ImprovedGCodeParser()
+        profile = parser.enable_profiling()
+        for path in files:
+            parser.parse_file(path)
+        for row in profile.rows():
+            name = row['stage'] if row['stage'].startswith('validator.') else f"stage.{row['stage']}"
+            benchmarks[name] = {
+                'items': row['calls'],
+                'repeat': 1,
+                'best': row['seconds'],
+                'median': row['seconds'],
+                'per_item_ms': row['ms_per_call'],
+            }
+
+    if wanted('toolpath'):
+        def parse_toolpaths(_):
+            for path in files:
+                GCodeToolpathParser(path).parse()
+
+        benchmarks['toolpath'] = _measure(parse_toolpaths, repeat, len(files), setup=clear_toolpath_cache)
+
+    work_dir = tempfile.mkdtemp(prefix='gcode_benchmark_')
+    try:
+        db_path = os.path.join(work_dir, 'benchmark.db')
+        repository_path = os.path.join(work_dir, 'repository')
+
+        def fresh_database():
+            for path in (db_path, db_path + '-wal', db_path + '-shm'):
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(repository_path, ignore_errors=True)
+            os.makedirs(repository_path)
+            return _headless_manager(db_path, repository_path)
+
+        def import_corpus(app):
+            app._import_files([(path, os.path.basename(path), None) for path in files], [])
+
+        # Later benchmarks query the database the last import left behind
+        if wanted('bulk_import'):
+            benchmarks['bulk_import'] = _measure(import_corpus, repeat, len(files), setup=fresh_database)
+        else:
+            import_corpus(fresh_database())
+        app = _headless_manager(db_path, repository_path)
+
+        for scenario, filters in FILTER_SCENARIOS.items():
+            name = f'filter_query.{scenario}'
+            if not wanted(name):
+                continue
+            _set_filters(app, **filters)
+            rows = []
+
+            def refresh_query():
+                where, params = app.build_filter_query('all')
+                conn = sqlite3.connect(app.db_path, timeout=30.0)
+                try:
+                    sync_program_issues(conn)
+                    rows[:] = conn.execute(
+                        f"SELECT * FROM programs WHERE {where} ORDER BY program_number", params).fetchall()
+                finally:
+                    conn.close()
+
+            benchmarks[name] = _measure(refresh_query, repeat, len(files))
+            benchmarks[name]['rows'] = len(rows)
+
+        if wanted('fuzzy_search'):
+            try:
+                from modules.fuzzy_search import FuzzySearchManager
+            except ImportError as e:
+                skipped['fuzzy_search'] = str(e)
+            else:
+                conn = sqlite3.connect(db_path)
+                programs = conn.execute(
+                    "SELECT program_number, title FROM programs WHERE title IS NOT NULL").fetchall()
+                conn.close()
+                fuzzy = FuzzySearchManager(threshold=70)
+
+                def fuzzy_search():
+                    for query in FUZZY_QUERIES:
+                        fuzzy.search_programs(query, programs, limit=len(programs))
+
+                benchmarks['fuzzy_search'] = _measure(fuzzy_search, repeat, len(programs) * len(FUZZY_QUERIES))
+
+        if wanted('usb_scan'):
+            usb = USBSyncManager(db_path, repository_path)
+
+            def usb_scan():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    usb.scan_drive('BENCHMARK', corpus_dir)
+
+            benchmarks['usb_scan'] = _measure(usb_scan, repeat, len(files))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': {
+            'size': size,
+            'seed': seed,
+            'programs': len(files),
+            'generation_failures': len(manifest['failures']),
+            'fingerprint': manifest['fingerprint'],
+        },
+        'benchmarks': benchmarks,
+        'skipped': skipped,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=_root_dir,
+                              capture_output=True, text=True, timeout=30).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare_results(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Compare best times benchmark by benchmark.
+
+    Returns:
+        One dict per common benchmark (name, baseline, current, ratio, regression)
+    """
+    rows = []
+    for name, result in current['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if not before or not before.get('best'):
+            continue
+        ratio = result['best'] / before['best']
+        rows.append({
+            'name': name,
+            'baseline': before['best'],
+            'current': result['best'],
+            'ratio': round(ratio, 3),
+            'regression': ratio >= threshold,
+        })
+    return rows
+
+
+def print_results(results: Dict, comparison: Optional[List[Dict]] = None) -> None:
+    corpus = results['corpus']
+    print(f"Commit {results['commit'] or '?'} - {corpus['programs']} programs "
+          f"(corpus {corpus['fingerprint'][:12]})")
+    print(f"{'Benchmark':<34} {'Best (s)':>10} {'Median (s)':>11} {'ms/item':>9}")
+    for name, result in results['benchmarks'].items():
+        per_item = f"{result['per_item_ms']:.3f}" if result['per_item_ms'] is not None else '-'
+        print(f"{name:<34} {result['best']:>10.4f} {result['median']:>11.4f} {per_item:>9}")
+    for name, reason in results['skipped'].items():
+        print(f"{name:<34} skipped: {reason}")
+
+    if comparison:
+        print(f"\n{'Benchmark':<34} {'Baseline':>10} {'Current':>10} {'Ratio':>7}")
+        for row in comparison:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['name']:<34} {row['baseline']:>10.4f} {row['current']:>10.4f} {row['ratio']:>6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the G-code database benchmark suite")
+    parser.add_argument('--size', type=int, default=500, help="Corpus size (default 500)")
+    parser.add_argument('--seed', type=int, default=0, help="Corpus seed (default 0)")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS_DIR, help="Corpus folder (built if missing)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark (default 3)")
+    parser.add_argument('--only', nargs='+', help="Only run benchmarks starting with these names")
+    parser.add_argument('--output', help="Results JSON (default benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument('--compare', help="Baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Slowdown ratio reported as a regression (default {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    results = run_suite(args.corpus, args.size, args.seed, args.repeat, args.only)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{results['commit'] or 'nocommit'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    comparison = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare_results(results, baseline, args.threshold)
+        if baseline['corpus']['fingerprint'] != results['corpus']['fingerprint']:
+            print("Warning: baseline was run on a different corpus - ratios are not comparable")
+
+    print_results(results, comparison)
+    print(f"\nResults saved to {output}")
+
+    # Non-zero exit lets a nightly job fail on a regression
+    if comparison and any(row['regression'] for row in comparison):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,7 @@ import hashlib
 import secrets
 import threading
 import queue
+import contextlib
 
 # Import the improved parser
 from improved_gcode_parser import ImprovedGCodeParser, GCodeParseResult
@@ -23,9 +24,30 @@ from improved_gcode_parser import ImprovedGCodeParser, GCodeParseResult
 from validators.twopc_ring_size_validator import TWOPC_RING_TABLE
 
 # Import Phase 1 modules
-from utils.gcode_file_scanner import FileScanner
+from utils.gcode_file_scanner import FileScanner, scan_files, scan_severity
+from utils.file_content import FileContent, file_sha256, read_file_content
+from utils.dimension_fallback import load_fallback_extractor, needs_fallback, predict_missing_dimensions
 from utils.gcode_auto_fixer import AutoFixer
-from utils.database_safety import DatabaseSafetyChecker
+from utils.write_lease import WriteLease, create_lease_tables, describe_lease
+from utils.activity_log import ActivityLogger, create_activity_indexes
+from utils.replica_sync import ReplicaSync, create_replica
+from utils.twopc_matching import TwoPCCatalog, check_2pc_compatibility, filter_parts, match_pairs
+from utils.repository_audit import (EXACT_DUPLICATE, INTERNAL_DUPLICATE, INTERNAL_MISMATCH, MISSING_FILE,
+                                     MISSING_M30, REGISTRY_STALE, STALE_RECORD, UNTRACKED_FILE, ZERO_BYTE,
+                                     RepositoryAudit, create_audit_change_tracking, create_audit_tables)
+from utils.program_splitter import iter_programs
+from utils.rename_planner import (STATUS_READY, STATUS_SKIPPED, RenamePlanner, execute_rename_plan,
+                                  recover_rename_journal)
+# Structured validation issues (program_issues table)
+from utils.program_issues import (ISSUE_LABELS, code_for_label, create_issue_tables,
+                                  issue_counts, store_program_issues, sync_program_issues)
+# Materialized statistics aggregates (stats summary tables)
+from utils.program_stats import (OD_RANGES, PROGRAM_STATS, ROUND_SIZE_STATS, REGISTRY_STATS,
+                                 TOOL_SUMMARY_STATS, create_stats_tables, cube_rows, json_available,
+                                 od_range_sql, rollup, tool_rows)
+# Streaming Excel/CSV exports
+from utils.excel_export import (HAS_OPENPYXL, ExportCancelled, export_google_workbook,
+                                export_program_numbers, export_programs_by_od, export_rows)
 try:
     from utils.database_watcher import DatabaseWatcher, WATCHDOG_AVAILABLE
 except ImportError:
@@ -258,6 +280,80 @@ def commit_with_retry(connection, max_retries=5, initial_delay=0.1):
     return False
 
 
+# ============================================================================
+# SCHEMA VERSIONING - PRAGMA user_version
+# ============================================================================
+#
+# Version 1 is the baseline schema built by init_database() (idempotent
+# CREATE/ALTER statements). Databases already at SCHEMA_VERSION skip all
+# schema work on startup. Later schema changes go in SCHEMA_MIGRATIONS as
+# (version, function(cursor)) and SCHEMA_VERSION is bumped to match - do NOT
+# add them to the baseline, it only runs on databases below version 1.
+
+def _migrate_stats_tables(cursor):
+    """Version 2: materialized statistics aggregates (utils.program_stats)"""
+    create_stats_tables(cursor)
+
+
+def _migrate_activity_indexes(cursor):
+    """Version 3: activity history indexes (utils.activity_log)"""
+    create_activity_indexes(cursor)
+
+
+def _migrate_write_lease(cursor):
+    """Version 4: writer lease table and edit_locks expiry (utils.write_lease)"""
+    create_lease_tables(cursor)
+
+
+def _migrate_repository_audit(cursor):
+    """Version 5: repository audit findings and file cache (utils.repository_audit)"""
+    create_audit_tables(cursor)
+
+
+def _migrate_audit_change_tracking(cursor):
+    """Version 6: programs / registry change counter for audit freshness (utils.repository_audit)"""
+    create_audit_change_tracking(cursor)
+
+
+SCHEMA_VERSION = 6
+SCHEMA_MIGRATIONS = [
+    (2, _migrate_stats_tables),
+    (3, _migrate_activity_indexes),
+    (4, _migrate_write_lease),
+    (5, _migrate_repository_audit),
+    (6, _migrate_audit_change_tracking),
+]
+
+
+def apply_schema_migrations(cursor, from_version):
+    """
+    Run schema migrations newer than from_version, in version order.
+
+    Args:
+        cursor: SQLite cursor (caller commits)
+        from_version: Current PRAGMA user_version of the database
+
+    Returns:
+        List of versions applied
+    """
+    applied = []
+    for version, migrate in sorted(SCHEMA_MIGRATIONS, key=lambda m: m[0]):
+        if version > from_version:
+            logger.info(f"Applying schema migration {version}: {migrate.__name__}")
+            migrate(cursor)
+            applied.append(version)
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return applied
+
+
+# Startup phase spent waiting on the user (excluded from the startup total)
+STARTUP_LOGIN_PHASE = "Login (user input)"
+
+# Base filter for normal views (soft-deleted records hidden) - the clause
+# build_filter_query() returns when no other filter is set
+ACTIVE_PROGRAMS_WHERE = "(is_deleted IS NULL OR is_deleted = 0)"
+
+
 class MultiSelectCombobox(ttk.Frame):
     """Custom multi-select combobox widget"""
     def __init__(self, parent, values, bg_color, fg_color, input_bg, button_bg, width=15):
@@ -442,6 +538,9 @@ class ProgramRecord:
     tool_sequence: Optional[List[str]] = None
     # Import tracking
     date_imported: Optional[str] = None  # ISO timestamp when file was imported to database
+    # Cycle time estimate (utils/cycle_time_estimator.py)
+    cycle_time_seconds: Optional[float] = None
+    air_cut_seconds: Optional[float] = None  # Feed moves cutting air
 
 class GCodeDatabaseGUI:
     def __init__(self, root):
@@ -453,6 +552,10 @@ class GCodeDatabaseGUI:
         logger.info("APPLICATION STARTUP")
         logger.info("=" * 60)
 
+        # Per-phase startup timing (see show_startup_timings)
+        self.startup_timings = []  # (phase, seconds)
+        self._startup_phase_start = time.perf_counter()
+
         try:
             # Theme system - load preference or default to dark
             logger.debug("Initializing colors and theme...")
@@ -465,13 +568,22 @@ class GCodeDatabaseGUI:
             logger.debug("Loading configuration...")
             self.config_file = "gcode_manager_config.json"
             self.load_config()
+            self._mark_startup_phase("Theme and configuration")
 
             # Database setup — use path from config if set, otherwise default
             logger.info("Initializing database...")
             config_db_path = self.config.get("db_path", "").strip()
             self.db_path = config_db_path if config_db_path else "gcode_database.db"
+            # Local replica mode: work on a local copy, exchange changesets via the sync folder
+            self.replica_sync = None
+            self.shared_db_path = None
+            if self.config.get("replica_enabled") and self.config.get("replica_sync_folder"):
+                self._open_local_replica()
             self.init_database()
+            if self.shared_db_path:
+                self.replica_sync = ReplicaSync(self.db_path, self.config["replica_sync_folder"])
             logger.info("Database initialized successfully")
+            self._mark_startup_phase("Database schema")
 
             # User session - will be set after login
             self.current_user = None
@@ -484,6 +596,7 @@ class GCodeDatabaseGUI:
             logger.info("Initializing repository system...")
             self.init_repository()
             logger.info("Repository system initialized")
+            self._mark_startup_phase("Repository")
 
             # Initialize improved parser
             logger.debug("Initializing G-code parser...")
@@ -492,9 +605,10 @@ class GCodeDatabaseGUI:
             # Initialize Phase 1 modules
             logger.debug("Initializing Phase 1 safety features...")
             self.file_scanner = FileScanner()
-            self.safety_checker = DatabaseSafetyChecker(self.db_path)
-            self.safety_checker.record_access()
+            self.write_lease = WriteLease(self.db_path)
+            self._recover_rename_batch()
             logger.debug("Phase 1 modules initialized")
+            self._mark_startup_phase("Parser and safety modules")
 
             # Initialize enhanced modules (commented out - modules not yet implemented)
             # logger.debug("Initializing enhanced modules...")
@@ -511,6 +625,7 @@ class GCodeDatabaseGUI:
                 style = ttk.Style()
                 style.theme_use('clam')
             self._update_ttk_styles()
+            self._mark_startup_phase("ttk theme")
 
             # Show login dialog - must succeed before continuing
             logger.info("Showing login dialog...")
@@ -519,25 +634,27 @@ class GCodeDatabaseGUI:
                 self.root.destroy()
                 return
             logger.info(f"Login successful for user: {self.current_username}")
+            self._mark_startup_phase(STARTUP_LOGIN_PHASE)
 
-            # Get available values from database for filters
-            logger.debug("Loading filter values...")
-            self.available_types = self.get_available_values("spacer_type")
-            self.available_materials = self.get_available_values("material")
-            self.available_statuses = self.get_available_values("validation_status")
+            # Filter values are loaded after the window is shown
+            # (_load_initial_data) - filters start with the config defaults
+            self.available_types = []
+            self.available_materials = []
+            self.available_statuses = []
 
             # Build GUI
             logger.info("Building GUI...")
             self.setup_gui()
             logger.info("GUI built successfully")
+            self._mark_startup_phase("Build GUI")
 
             # Enable drag and drop
             logger.debug("Setting up drag and drop...")
             self.setup_drag_drop()
+            self._mark_startup_phase("Drag and drop")
 
-            logger.info("Refreshing results...")
-            self.refresh_results()
-            logger.info("Results refreshed")
+            # Filter values and the first results page load once the window is up
+            self.root.after_idle(self._load_initial_data)
 
             # Update error filter dropdown with DB hit counts
             self.root.after(200, self._update_error_filter_counts)
@@ -550,6 +667,10 @@ class GCodeDatabaseGUI:
             self.root.after(500, self._run_startup_integrity_check_background)
             logger.info("Startup complete - integrity check running in background")
 
+            # Background changeset merge with the other workstations
+            if self.replica_sync:
+                self._start_replica_sync()
+
             # Initialize database monitoring (Phase 1.2) if enabled and available
             if WATCHDOG_AVAILABLE and self.config.get('db_monitor_enabled', False):
                 logger.info("Starting database file monitor...")
@@ -561,10 +682,204 @@ class GCodeDatabaseGUI:
             traceback.print_exc()
             raise
 
+    def _mark_startup_phase(self, phase):
+        """Record the time since the previous startup phase ended"""
+        now = time.perf_counter()
+        self.startup_timings.append((phase, now - self._startup_phase_start))
+        self._startup_phase_start = now
+
+    def _load_initial_data(self):
+        """Load filter values in the background, then the first results page"""
+        self._mark_startup_phase("Show window")
+        self.results_label.config(text="Loading programs...")
+        result_queue = queue.Queue()
+
+        def load_values():
+            result_queue.put((self.get_available_values("spacer_type"),
+                              self.get_available_values("material"),
+                              self.get_available_values("validation_status")))
+
+        threading.Thread(target=load_values, daemon=True).start()
+
+        def apply_values():
+            try:
+                values = result_queue.get_nowait()
+            except queue.Empty:
+                self.root.after(50, apply_values)
+                return
+            self._mark_startup_phase("Filter values (background)")
+            self._apply_filter_values(*values)
+
+            logger.info("Refreshing results...")
+            self.refresh_results()
+            logger.info("Results refreshed")
+            self._mark_startup_phase("First results page")
+            self._log_startup_report()
+
+        self.root.after(50, apply_values)
+
+    def _log_startup_report(self):
+        """Log the per-phase startup timings"""
+        total = sum(seconds for phase, seconds in self.startup_timings
+                    if phase != STARTUP_LOGIN_PHASE)
+        logger.info(f"Startup timing ({total:.2f}s excluding login):")
+        for phase, seconds in self.startup_timings:
+            logger.info(f"  {phase:<30} {seconds:7.3f}s")
+
+    def show_startup_timings(self):
+        """Show the per-phase startup timing report"""
+        window = tk.Toplevel(self.root)
+        window.title("Startup Timing")
+        window.geometry("500x420")
+        window.configure(bg=self.bg_color)
+
+        tk.Label(window, text="⏱️ Startup Timing", bg=self.bg_color, fg=self.fg_color,
+                 font=("Arial", 14, "bold")).pack(pady=10)
+
+        tree = ttk.Treeview(window, columns=('phase', 'seconds', 'share'), show='headings', height=12)
+        tree.heading('phase', text='Phase')
+        tree.heading('seconds', text='Seconds')
+        tree.heading('share', text='% of Startup')
+        tree.column('phase', width=250)
+        tree.column('seconds', width=90, anchor='e')
+        tree.column('share', width=100, anchor='e')
+        tree.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        total = sum(seconds for phase, seconds in self.startup_timings
+                    if phase != STARTUP_LOGIN_PHASE)
+        for phase, seconds in self.startup_timings:
+            share = '-' if phase == STARTUP_LOGIN_PHASE or not total else f"{seconds / total * 100:.1f}%"
+            tree.insert('', tk.END, values=(phase, f"{seconds:.3f}", share))
+
+        tk.Label(window, text=f"Total (excluding login): {total:.2f}s", bg=self.bg_color,
+                 fg=self.fg_color, font=("Arial", 10, "bold")).pack(pady=5)
+        tk.Button(window, text="Close", command=window.destroy,
+                  bg=self.button_bg, fg=self.fg_color, width=12).pack(pady=(0, 10))
+
+    # ========================================================================
+    # LOCAL REPLICA SYNC
+    # ========================================================================
+
+    def _open_local_replica(self):
+        """Switch db_path to the local replica, seeding it from the shared database"""
+        replica_path = self.config.get("replica_db_path", "").strip() or os.path.join(
+            os.path.expanduser("~"), ".gcode_manager", "gcode_database_replica.db")
+        if not os.path.exists(replica_path):
+            if os.path.exists(self.db_path):
+                create_replica(self.db_path, replica_path)
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(replica_path)), exist_ok=True)
+        self.shared_db_path = self.db_path
+        self.db_path = replica_path
+        logger.info(f"Using local replica {replica_path} (shared: {self.shared_db_path})")
+
+    def _start_replica_sync(self):
+        """Export/merge changesets in a background thread every replica_sync_interval seconds"""
+        self._replica_stop = threading.Event()
+        interval = max(5, int(self.config.get("replica_sync_interval", 30)))
+
+        def run():
+            while not self._replica_stop.is_set():
+                self._run_replica_sync()
+                self._replica_stop.wait(interval)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _run_replica_sync(self):
+        """One export + merge pass; refreshes the view when rows arrived"""
+        try:
+            stats = self.replica_sync.sync()
+        except Exception as e:
+            logger.error(f"Replica sync failed: {e}", exc_info=True)
+            return None
+        if stats.get('applied'):
+            self.root.after(0, self.refresh_results)
+        return stats
+
+    def show_replica_sync_status(self):
+        """Show replica sync state with a Sync Now button"""
+        window = tk.Toplevel(self.root)
+        window.title("Replica Sync")
+        window.geometry("600x420")
+        window.configure(bg=self.bg_color)
+
+        tk.Label(window, text="🔄 Replica Sync", bg=self.bg_color, fg=self.fg_color,
+                 font=("Arial", 14, "bold")).pack(pady=10)
+
+        text = scrolledtext.ScrolledText(window, bg=self.input_bg, fg=self.fg_color,
+                                         font=("Courier", 9), width=70, height=16)
+        text.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+        def show(stats=None):
+            text.delete('1.0', tk.END)
+            if not self.replica_sync:
+                text.insert(tk.END, "Local replica mode is off.\n\n"
+                                    "Set replica_enabled, replica_sync_folder (shared folder) and\n"
+                                    "optionally replica_db_path in gcode_manager_config.json.\n"
+                                    "db_path stays the shared database used to seed the replica.\n")
+                return
+            status = self.replica_sync.status()
+            text.insert(tk.END, f"Node:           {status['node_id']}\n")
+            text.insert(tk.END, f"Local replica:  {self.db_path}\n")
+            text.insert(tk.END, f"Shared folder:  {self.replica_sync.sync_folder}\n")
+            text.insert(tk.END, f"Pending rows:   {status['pending_changes']}\n")
+            text.insert(tk.END, f"Last batch:     {status['last_batch']}\n")
+            text.insert(tk.END, f"Conflicts:      {status['conflicts']} (resolved, kept in replica_conflicts)\n\n")
+            text.insert(tk.END, "Peers (last applied batch):\n")
+            for node_id, last_batch, last_sync in status['peers']:
+                text.insert(tk.END, f"  {node_id:<30} {last_batch:>6}  {last_sync}\n")
+            if stats:
+                text.insert(tk.END, f"\nLast sync: exported {stats.get('exported', 0)}, applied {stats['applied']}, "
+                                    f"skipped {stats['skipped']}, conflicts {stats['conflicts']}\n")
+
+        def sync_now():
+            sync_button.config(state=tk.DISABLED)
+            result_queue = queue.Queue()
+            threading.Thread(target=lambda: result_queue.put(self._run_replica_sync()), daemon=True).start()
+
+            def poll():
+                try:
+                    stats = result_queue.get_nowait()
+                except queue.Empty:
+                    window.after(100, poll)
+                    return
+                sync_button.config(state=tk.NORMAL)
+                show(stats)
+            poll()
+
+        button_frame = tk.Frame(window, bg=self.bg_color)
+        button_frame.pack(pady=(0, 10))
+        sync_button = tk.Button(button_frame, text="Sync Now", command=sync_now,
+                                state=tk.NORMAL if self.replica_sync else tk.DISABLED,
+                                bg=self.button_bg, fg=self.fg_color, width=12)
+        sync_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Close", command=window.destroy,
+                  bg=self.button_bg, fg=self.fg_color, width=12).pack(side=tk.LEFT, padx=5)
+        show()
+
     def _on_closing(self):
         """Handle window close - ensure clean shutdown"""
         logger.info("Application closing...")
 
+        # Release the write lease and our edit locks
+        if getattr(self, 'write_lease', None):
+            try:
+                self.write_lease.close()
+            except Exception as e:
+                logger.error(f"Failed to release write lease: {e}")
+
+        # Write buffered activity log entries
+        if getattr(self, 'activity_logger', None):
+            self.activity_logger.close()
+
+        # Stop replica sync and publish any local changes not exported yet
+        if getattr(self, 'replica_sync', None):
+            self._replica_stop.set()
+            try:
+                self.replica_sync.export_changes()
+            except Exception as e:
+                logger.error(f"Final replica export failed: {e}")
+
         # Stop database monitoring if active (Phase 1.2)
         if hasattr(self, 'db_observer') and self.db_observer:
             try:
@@ -1515,7 +1830,7 @@ class GCodeDatabaseGUI:
         """Initialize SQLite database with schema
 
         ================================================================================
-        PROGRAMS TABLE COLUMN REFERENCE (57 columns total)
+        PROGRAMS TABLE COLUMN REFERENCE (62 columns total)
         ================================================================================
         ⚠️  CRITICAL: Before adding new columns, read docs/DATABASE_SCHEMA_MAINTENANCE.md
 
@@ -1526,11 +1841,12 @@ class GCodeDatabaseGUI:
         When adding new columns, you MUST update ALL of the following locations:
 
         1. CREATE TABLE statement (below) - add column definition
-        2. ALTER TABLE section (below) - add migration for existing databases
+        2. SCHEMA_MIGRATIONS - add a versioned migration and bump SCHEMA_VERSION
+           (the ALTER TABLE section below only runs on pre-versioning databases)
         3. ProgramRecord dataclass (around line 300) - add field
         4. Documentation comment column list (below) - update count and list
 
-        INSERT statements using VALUES (positional - MUST have all 57 values):
+        INSERT statements using VALUES (positional - MUST have all 62 values):
         5. Line ~8676: scan_folder() -> scan_thread() INSERT
         6. Line ~9026: process_new_files_workflow() -> import thread INSERT
         7. Line ~24480: ManualEntryDialog.save_entry() INSERT
@@ -1563,6 +1879,8 @@ class GCodeDatabaseGUI:
         49. tool_home_issues       50. hub_height_display     51. counter_bore_depth_display
         52. feasibility_status     53. feasibility_issues     54. feasibility_warnings
         55. crash_issues           56. crash_warnings         57. date_imported
+        58. is_deleted             59. deleted_date           60. cycle_time_seconds
+        61. air_cut_seconds        62. cycle_time_hash
         ================================================================================
         """
         from datetime import datetime
@@ -1573,6 +1891,20 @@ class GCodeDatabaseGUI:
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.execute("PRAGMA busy_timeout=30000")
 
+        # Schema already current - skip the baseline CREATE/ALTER/index work
+        schema_version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version >= SCHEMA_VERSION:
+            logger.debug(f"Database schema is current (version {schema_version})")
+            conn.close()
+            return
+        if schema_version >= 1:
+            apply_schema_migrations(cursor, schema_version)
+            commit_with_retry(conn)
+            conn.close()
+            logger.info(f"Database schema migrated from version {schema_version} to {SCHEMA_VERSION}")
+            return
+
+        logger.info("Building baseline database schema (one-time)...")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS programs (
                 program_number TEXT PRIMARY KEY,
@@ -1788,6 +2120,18 @@ class GCodeDatabaseGUI:
             cursor.execute("ALTER TABLE programs ADD COLUMN deleted_date TEXT")  # ISO timestamp when record was soft-deleted
         except:
             pass
+        try:
+            cursor.execute("ALTER TABLE programs ADD COLUMN cycle_time_seconds REAL")  # Estimated cycle time (utils/cycle_time_estimator.py)
+        except:
+            pass
+        try:
+            cursor.execute("ALTER TABLE programs ADD COLUMN air_cut_seconds REAL")  # Estimated time spent feeding through air
+        except:
+            pass
+        try:
+            cursor.execute("ALTER TABLE programs ADD COLUMN cycle_time_hash TEXT")  # SHA256 of the file the estimate was computed from
+        except:
+            pass
 
         # Create users table
         cursor.execute('''
@@ -2088,7 +2432,16 @@ class GCodeDatabaseGUI:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_sync_history_drive ON sync_history(drive_label, sync_date DESC)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_sync_history_program ON sync_history(program_number, sync_date DESC)')
 
+        # Structured validation issues (indexed issue code/severity per program)
+        # Maintained by import/rescan paths and by triggers on programs
+        create_issue_tables(cursor)
+
+        # Baseline done - apply any newer migrations and record the version
+        apply_schema_migrations(cursor, 1)
         conn.commit()
+
+        # Classify issues for programs queued by the triggers (all programs on first run)
+        sync_program_issues(conn)
         conn.close()
 
     @staticmethod
@@ -2427,101 +2780,263 @@ class GCodeDatabaseGUI:
         conn.close()
         return stats
 
-    def log_activity(self, action_type, program_number=None, details=None):
-        """Log user activity to the activity_log table"""
-        try:
-            # Use timeout to prevent database locked errors
-            conn = sqlite3.connect(self.db_path, timeout=10.0)
-            cursor = conn.cursor()
-
-            from datetime import datetime
-            timestamp = datetime.now().isoformat()
-
-            # Convert details to JSON if it's a dict
-            if isinstance(details, dict):
-                import json
-                details = json.dumps(details)
+    def _get_activity_logger(self):
+        """Buffered activity logger for the current database (started on first use)"""
+        activity_logger = getattr(self, 'activity_logger', None)
+        if activity_logger is None or activity_logger.db_path != self.db_path:
+            if activity_logger is not None:
+                activity_logger.close()
+            activity_logger = self.activity_logger = ActivityLogger(self.db_path)
+            activity_logger.start()
+        return activity_logger
+
+    def _flush_activity_log(self):
+        """Write queued activity entries now (end of a batch operation)"""
+        activity_logger = getattr(self, 'activity_logger', None)
+        if activity_logger is not None:
+            activity_logger.flush()
 
-            cursor.execute("""
-                INSERT INTO activity_log (user_id, username, action_type, program_number, details, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (self.current_user_id, self.current_username, action_type, program_number, details, timestamp))
+    def log_activity(self, action_type, program_number=None, details=None):
+        """
+        Log user activity to the activity_log table.
 
-            conn.commit()
-            conn.close()
-        except sqlite3.OperationalError as e:
-            if "locked" in str(e).lower():
-                logger.debug(f"Database temporarily locked, activity not logged: {action_type}")
-            else:
-                logger.warning(f"Database error logging activity: {e}")
+        Entries are buffered and written in batches by utils.activity_log
+        (on a timer, when the buffer fills and on shutdown).
+        """
+        try:
+            self._get_activity_logger().log(getattr(self, 'current_user_id', None),
+                                            getattr(self, 'current_username', None),
+                                            action_type, program_number, details)
         except Exception as e:
             logger.warning(f"Error logging activity: {e}")
 
+    def get_activity_history(self, program_number=None, action_type=None, username=None,
+                             since=None, until=None, limit=200):
+        """
+        Activity history, newest first (includes entries not yet flushed).
+
+        Returns:
+            list: dicts with log_id, user_id, username, action_type,
+                  program_number, details, timestamp
+        """
+        try:
+            return self._get_activity_logger().query(program_number, action_type, username,
+                                                     since, until, limit)
+        except sqlite3.Error as e:
+            logger.error(f"Database error reading activity history: {e}")
+            return []
+
     def _check_database_safety_before_write(self, operation_name="operation"):
         """
-        Check database safety before performing write operation (Phase 1 Safety Checker)
+        Take the database write lease before a write operation.
+
+        If another workstation holds an unexpired lease the user decides
+        whether to write anyway.
 
         Returns:
             tuple: (safe_to_proceed: bool, warning_level: str, message: str)
         """
-        if not hasattr(self, 'safety_checker'):
+        if not hasattr(self, 'write_lease'):
             return (True, 'none', '')
 
         if not self.config.get('safety_checks_enabled', True):
             return (True, 'none', '')
 
+        if getattr(self, '_lease_overridden', False):
+            # Inside a batch the user already chose to run without the lease
+            return (True, 'high', '')
+
         try:
-            # Check for conflicts
-            conflict_check = self.safety_checker.check_for_conflicts()
-            level = conflict_check['warning_level']
-
-            if level in ['none', 'low']:
-                return (True, level, conflict_check.get('message', ''))
-
-            elif level == 'medium':
-                # Show warning, allow user to proceed or cancel
-                response = messagebox.askyesno(
-                    "Database Safety Warning",
-                    f"{conflict_check.get('message', 'Database may have been modified')}\n\n"
-                    f"A backup will be created automatically.\n\n"
-                    f"Do you want to proceed with this operation?",
-                    icon='warning'
-                )
-                return (response, level, conflict_check.get('message', ''))
-
-            elif level == 'high':
-                # Strong warning with explicit confirmation
-                response = messagebox.askyesno(
-                    "⚠️ HIGH RISK: Database Conflict Detected",
-                    f"{conflict_check.get('message', 'Database conflict detected!')}\n\n"
-                    f"⚠️ WARNING: This operation may cause data loss!\n\n"
-                    f"Recommendations:\n"
-                    f"1. Create a manual backup first\n"
-                    f"2. Coordinate with other users\n"
-                    f"3. Consider canceling and investigating\n\n"
-                    f"Continue anyway? (NOT RECOMMENDED)",
-                    icon='error'
-                )
-                return (response, level, conflict_check.get('message', ''))
+            self.write_lease.username = getattr(self, 'current_username', None)
+            if self.write_lease.acquire(operation_name):
+                return (True, 'none', '')
+
+            lease = self.write_lease.other_writer()
+            if not lease:
+                # Released between the two reads
+                return (self.write_lease.acquire(operation_name), 'low', '')
 
-            return (False, 'critical', 'Unknown error')
+            message = f"Database is being written by {describe_lease(lease)}"
+            return (self._confirm_write_over_lease(message), 'high', message)
 
         except Exception as e:
             logger.error(f"Safety check failed: {e}")
             # On error, allow operation to proceed (fail-safe)
             return (True, 'none', '')
 
+    def _confirm_write_over_lease(self, message):
+        """Ask whether to write although another workstation holds the write lease"""
+        return messagebox.askyesno(
+            "⚠️ Database In Use",
+            f"{message}\n\n"
+            f"Writing at the same time may overwrite their changes.\n\n"
+            f"Recommendations:\n"
+            f"1. Wait for their operation to finish\n"
+            f"2. Coordinate with the other user\n\n"
+            f"Continue anyway? (NOT RECOMMENDED)",
+            icon='warning'
+        )
+
     def _record_database_write(self, operation_name):
-        """Record successful database write (Phase 1 Safety Checker)"""
-        if hasattr(self, 'safety_checker') and self.config.get('safety_checks_enabled', True):
+        """Record a finished database write in the activity log"""
+        if hasattr(self, 'write_lease') and self.config.get('safety_checks_enabled', True):
             try:
-                self.safety_checker.record_write()
-                # Also update access time to prevent false positives from our own writes
-                self.safety_checker.record_access()
                 self.log_activity('database_write', details={'operation': operation_name})
             except Exception as e:
                 logger.warning(f"Failed to record database write: {e}")
 
+    def _release_write_lease(self):
+        """
+        Release the write lease taken by _check_database_safety_before_write.
+
+        Call in a finally block after the write, so a failed write does not
+        leave other workstations waiting for the lease to expire. Inside a
+        batch (_write_lease_batch) the lease is kept until the batch ends.
+        """
+        if not hasattr(self, 'write_lease'):
+            return
+        try:
+            self.write_lease.release()
+        except Exception as e:
+            logger.warning(f"Could not release write lease (expires on its own): {e}")
+
+    def _lock_program_for_edit(self, program_number):
+        """
+        Take the per-program edit lock before a program is opened for editing.
+
+        If another workstation holds an unexpired lock on the program the
+        user decides whether to edit anyway (without the lock).
+
+        Returns:
+            bool: True to open the program for editing
+        """
+        if not hasattr(self, 'write_lease') or not self.config.get('safety_checks_enabled', True):
+            return True
+        try:
+            self.write_lease.username = getattr(self, 'current_username', None)
+            if self.write_lease.lock_program(program_number, getattr(self, 'current_user_id', None)):
+                return True
+            lock = self.write_lease.program_lock(program_number)
+        except sqlite3.Error as e:
+            logger.error(f"Edit lock check failed for {program_number}: {e}")
+            return True
+        if not lock:
+            # Released between the two reads - the save check takes it if still free
+            return True
+
+        return messagebox.askyesno(
+            "⚠️ Program Being Edited",
+            f"{program_number} is being edited by {lock['username'] or 'another user'} "
+            f"(since {(lock['locked_at'] or '')[:16].replace('T', ' ')}).\n\n"
+            f"Saving may overwrite their changes.\n\n"
+            f"Edit anyway? (NOT RECOMMENDED)",
+            icon='warning'
+        )
+
+    def _check_program_lock_before_save(self, program_number):
+        """
+        Renew this workstation's edit lock before an edited program is saved.
+
+        Returns:
+            bool: True to save - the lock is ours, or the user chose to save
+            over another user's lock
+        """
+        if not hasattr(self, 'write_lease') or not self.config.get('safety_checks_enabled', True):
+            return True
+        try:
+            if self.write_lease.lock_program(program_number, getattr(self, 'current_user_id', None)):
+                return True
+            lock = self.write_lease.program_lock(program_number)
+        except sqlite3.Error as e:
+            logger.error(f"Edit lock check failed for {program_number}: {e}")
+            return True
+        if not lock:
+            return True
+
+        return messagebox.askyesno(
+            "⚠️ Program Being Edited",
+            f"{program_number} is now being edited by {lock['username'] or 'another user'}.\n\n"
+            f"Saving will overwrite any changes they save.\n\n"
+            f"Save anyway? (NOT RECOMMENDED)",
+            icon='warning'
+        )
+
+    def _unlock_program(self, program_number):
+        """Release this workstation's edit lock on a program (no-op if not held)"""
+        if not hasattr(self, 'write_lease'):
+            return
+        try:
+            self.write_lease.unlock_program(program_number)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not release edit lock on {program_number} (expires on its own): {e}")
+
+    def _confirm_batch_write(self, operation_name):
+        """
+        Ask whether to start a batch while another workstation holds the
+        write lease (main thread only - it may show a dialog).
+
+        Returns:
+            bool: True if the lease is free or the user chose to write anyway
+        """
+        if not hasattr(self, 'write_lease') or not self.config.get('safety_checks_enabled', True):
+            return True
+        try:
+            lease = self.write_lease.other_writer()
+        except sqlite3.Error as e:
+            logger.error(f"Write lease check failed: {e}")
+            return True
+        if lease is None:
+            return True
+        if self._confirm_write_over_lease(f"Database is being written by {describe_lease(lease)}"):
+            return True
+        logger.info(f"{operation_name} cancelled: database in use by {describe_lease(lease)}")
+        return False
+
+    @contextlib.contextmanager
+    def _write_lease_batch(self, operation_name, confirmed=False):
+        """
+        Context manager holding the write lease across a batch of writes.
+
+        If another workstation holds the lease the user decides whether to
+        write anyway (_confirm_batch_write); the per-write checks inside the
+        batch then do not ask again. The activity entries logged during the
+        batch are written when it ends.
+
+        Args:
+            confirmed: The user was already asked with _confirm_batch_write -
+                for batches on a background thread, which cannot show the
+                dialog; the lease is held if it is free, the batch runs either way
+
+        Yields:
+            bool: True to run the batch, False if the user declined - the
+            caller must not write
+        """
+        if not hasattr(self, 'write_lease') or not self.config.get('safety_checks_enabled', True):
+            try:
+                yield True
+            finally:
+                self._flush_activity_log()
+            return
+
+        self.write_lease.username = getattr(self, 'current_username', None)
+        with self.write_lease.hold(operation_name) as held:
+            try:
+                if confirmed:
+                    yield True
+                    return
+
+                proceed = held or self._confirm_batch_write(operation_name)
+                overridden = getattr(self, '_lease_overridden', False)
+                self._lease_overridden = overridden or (proceed and not held)
+                try:
+                    yield proceed
+                finally:
+                    self._lease_overridden = overridden
+            finally:
+                # Batch boundary - write the batch's activity entries while
+                # the lease is still held
+                self._flush_activity_log()
+
     def create_version(self, program_number, change_summary=None):
         """Create a new version of a program"""
         try:
@@ -3581,14 +4096,11 @@ class GCodeDatabaseGUI:
                 'by_range': {}
             }
 
-            # Get overall statistics
-            cursor.execute("""
-                SELECT status, COUNT(*) as count
-                FROM program_number_registry
-                GROUP BY status
-            """)
+            # Counts from the registry_stats summary (kept current by triggers)
+            rows = cube_rows(cursor, REGISTRY_STATS)
 
-            for status, count in cursor.fetchall():
+            # Get overall statistics
+            for status, count in rollup(rows, 'status').items():
                 stats['total_numbers'] += count
                 if status == 'IN_USE':
                     stats['in_use'] = count
@@ -3598,34 +4110,24 @@ class GCodeDatabaseGUI:
                     stats['reserved'] = count
 
             # Get duplicate count
-            cursor.execute("""
-                SELECT COUNT(*) FROM program_number_registry
-                WHERE duplicate_count > 0
-            """)
-            stats['duplicates'] = cursor.fetchone()[0]
+            stats['duplicates'] = rollup(rows, 'has_duplicates').get(1, 0)
 
             # Get statistics by range
+            size_totals = rollup(rows, 'round_size')
+            size_status = rollup(rows, 'round_size', 'status')
+            size_duplicates = rollup(rows, 'round_size', 'has_duplicates')
             ranges = self.get_round_size_ranges()
             for round_size, (range_start, range_end, range_name) in ranges.items():
-                cursor.execute("""
-                    SELECT
-                        COUNT(*) as total,
-                        SUM(CASE WHEN status = 'IN_USE' THEN 1 ELSE 0 END) as in_use,
-                        SUM(CASE WHEN status = 'AVAILABLE' THEN 1 ELSE 0 END) as available,
-                        SUM(CASE WHEN duplicate_count > 0 THEN 1 ELSE 0 END) as duplicates
-                    FROM program_number_registry
-                    WHERE round_size = ?
-                """, (round_size,))
-
-                row = cursor.fetchone()
+                total = size_totals.get(round_size, 0)
+                in_use = size_status.get((round_size, 'IN_USE'), 0)
                 stats['by_range'][range_name] = {
                     'round_size': round_size,
                     'range': f"o{range_start}-o{range_end}",
-                    'total': row[0] or 0,
-                    'in_use': row[1] or 0,
-                    'available': row[2] or 0,
-                    'duplicates': row[3] or 0,
-                    'usage_percent': (row[1] or 0) / (row[0] or 1) * 100
+                    'total': total,
+                    'in_use': in_use,
+                    'available': size_status.get((round_size, 'AVAILABLE'), 0),
+                    'duplicates': size_duplicates.get((round_size, 1), 0),
+                    'usage_percent': in_use / (total or 1) * 100
                 }
 
             conn.close()
@@ -3639,23 +4141,21 @@ class GCodeDatabaseGUI:
     # UNIFIED FILE HANDLING SYSTEM
     # ===========================================================================================
 
-    def compute_file_hash(self, file_path):
+    def compute_file_hash(self, file_path, content=None):
         """
         Compute SHA256 hash of a file for duplicate detection.
 
         Args:
             file_path: Path to the file
+            content: FileContent already read for file_path (optional)
 
         Returns:
             str: SHA256 hex digest or None if error
         """
-        import hashlib
+        if content is not None:
+            return content.sha256
         try:
-            sha256 = hashlib.sha256()
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b''):
-                    sha256.update(chunk)
-            return sha256.hexdigest()
+            return FileContent.read(file_path).sha256
         except OSError as e:
             logger.error(f"File read error computing hash for {file_path}: {e}")
             return None
@@ -3663,27 +4163,22 @@ class GCodeDatabaseGUI:
             logger.error(f"Error computing hash for {file_path}: {e}", exc_info=True)
             return None
 
-    def extract_internal_program_number(self, file_path):
+    def extract_internal_program_number(self, file_path, content=None):
         """
         Extract the internal O-number from a G-code file.
         Reads first 10 lines to find the O-number (may be after % delimiter).
 
         Args:
             file_path: Path to the G-code file
+            content: FileContent already read for file_path (optional)
 
         Returns:
             str: Program number (e.g., 'o96002') or None if not found
         """
-        import re
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for _ in range(10):
-                    line = f.readline().strip()
-                    if not line:
-                        continue
-                    match = re.match(r'^[oO](\d{4,})', line)
-                    if match:
-                        return f"o{match.group(1)}"
+            if content is None:
+                content = FileContent.read(file_path)
+            return content.internal_program_number()
         except OSError as e:
             logger.error(f"File read error extracting program number from {file_path}: {e}")
         except Exception as e:
@@ -3931,7 +4426,7 @@ class GCodeDatabaseGUI:
             logger.error(f"Error finding similar files: {e}", exc_info=True)
             return similar
 
-    def compare_file_contents(self, file1_path, file2_path):
+    def compare_file_contents(self, file1_path, file2_path, content1=None):
         """
         Compare two G-code files focusing on DIMENSIONAL differences.
         This is the key comparison - same OD but different CB, thickness, hub, etc.
@@ -3940,6 +4435,7 @@ class GCodeDatabaseGUI:
         Args:
             file1_path: Path to first file
             file2_path: Path to second file
+            content1: FileContent for file1 (optional; file1 need not exist on disk)
 
         Returns:
             dict: Comparison results with dimensional analysis
@@ -3963,15 +4459,14 @@ class GCodeDatabaseGUI:
         }
 
         try:
-            # Get file sizes
-            result['file1_size'] = os.path.getsize(file1_path)
-            result['file2_size'] = os.path.getsize(file2_path)
-
-            # Read files for line comparison
-            with open(file1_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines1 = [l.strip() for l in f.readlines() if l.strip()]
-            with open(file2_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines2 = [l.strip() for l in f.readlines() if l.strip()]
+            # Read each file once - line comparison and parsing share the content
+            if content1 is None:
+                content1 = FileContent.read(file1_path)
+            content2 = FileContent.read(file2_path)
+            result['file1_size'] = content1.size
+            result['file2_size'] = content2.size
+            lines1 = [l.strip() for l in content1.lines if l.strip()]
+            lines2 = [l.strip() for l in content2.lines if l.strip()]
 
             result['file1_lines'] = len(lines1)
             result['file2_lines'] = len(lines2)
@@ -3993,8 +4488,8 @@ class GCodeDatabaseGUI:
 
             # Parse both files to get dimensions
             try:
-                parse1 = self.parser.parse_file(file1_path)
-                parse2 = self.parser.parse_file(file2_path)
+                parse1 = self.parser.parse_file(file1_path, content=content1)
+                parse2 = self.parser.parse_file(file2_path, content=content2)
 
                 # Store dimensions
                 result['file1_dimensions'] = {
@@ -4237,10 +4732,20 @@ class GCodeDatabaseGUI:
             logger.error(f"Error finding dimensional variations: {e}", exc_info=True)
             return variations
 
+    def _get_twopc_catalog(self):
+        """Cached 2PC catalog for the current database"""
+        catalog = getattr(self, '_twopc_catalog', None)
+        if catalog is None or catalog.db_path != self.db_path:
+            if catalog is not None:
+                catalog.close()
+            catalog = self._twopc_catalog = TwoPCCatalog(self.db_path)
+        return catalog
+
     def find_compatible_2pc_parts(self, program_number=None, spacer_type=None,
                                   stud_thickness_min=None, stud_thickness_max=None,
                                   lug_thickness_min=None, lug_thickness_max=None,
-                                  cb_min=None, cb_max=None, od_min=None, od_max=None):
+                                  cb_min=None, cb_max=None, od_min=None, od_max=None,
+                                  max_clearance_mm=None):
         """
         Find compatible 2PC part pairings (STUD + LUG).
 
@@ -4254,6 +4759,10 @@ class GCodeDatabaseGUI:
         This allows matching parts where hub_diameter ≠ CB, enabling custom
         hub configurations.
 
+        Candidates come from utils.twopc_matching: LUGs bucketed by round size
+        and sorted by step diameter, so each STUD only checks LUGs whose step
+        clears its hub instead of every LUG.
+
         Args:
             program_number: Optional - find matches for this specific program
             spacer_type: Optional - '2PC STUD' or '2PC LUG'
@@ -4265,168 +4774,48 @@ class GCodeDatabaseGUI:
             cb_max: Optional - maximum center bore (mm)
             od_min: Optional - minimum outer diameter (inches)
             od_max: Optional - maximum outer diameter (inches)
+            max_clearance_mm: Optional - maximum hub/step clearance (mm)
 
         Returns:
             list: Compatible pairings with match quality scores
         """
-        matches = []
-
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
+            catalog = self._get_twopc_catalog()
+            parts = [p for p in catalog.parts() if p['outer_diameter'] is not None]
 
             # Get the reference part if program_number specified
             reference_part = None
             if program_number:
-                cursor.execute("""
-                    SELECT program_number, title, outer_diameter, center_bore,
-                           thickness, hub_height, hub_diameter, counter_bore_depth,
-                           counter_bore_diameter, spacer_type, file_path
-                    FROM programs
-                    WHERE program_number = ?
-                """, (program_number,))
-                row = cursor.fetchone()
-                if row:
-                    reference_part = {
-                        'program_number': row[0], 'title': row[1], 'outer_diameter': row[2],
-                        'center_bore': row[3], 'thickness': row[4], 'hub_height': row[5],
-                        'hub_diameter': row[6], 'counter_bore_depth': row[7],
-                        'counter_bore_diameter': row[8], 'spacer_type': row[9],
-                        'file_path': row[10]
-                    }
-                    # Determine which type we're looking for
-                    if '2PC STUD' in reference_part['spacer_type']:
-                        spacer_type = '2PC LUG'  # Find LUGs for this STUD
-                    elif '2PC LUG' in reference_part['spacer_type']:
-                        spacer_type = '2PC STUD'  # Find STUDs for this LUG
-                    else:
-                        conn.close()
-                        return matches  # Not a 2PC part
-
-            # Get all 2PC parts
-            cursor.execute("""
-                SELECT program_number, title, outer_diameter, center_bore,
-                       thickness, hub_height, hub_diameter, counter_bore_depth,
-                       counter_bore_diameter, spacer_type, file_path
-                FROM programs
-                WHERE spacer_type LIKE '%2PC%'
-                AND outer_diameter IS NOT NULL
-                ORDER BY outer_diameter, program_number
-            """)
-
-            all_2pc_parts = []
-            for row in cursor.fetchall():
-                all_2pc_parts.append({
-                    'program_number': row[0], 'title': row[1], 'outer_diameter': row[2],
-                    'center_bore': row[3], 'thickness': row[4], 'hub_height': row[5],
-                    'hub_diameter': row[6], 'counter_bore_depth': row[7],
-                    'counter_bore_diameter': row[8], 'spacer_type': row[9],
-                    'file_path': row[10]
-                })
-
-            conn.close()
+                reference_part = catalog.part(program_number)
+                if not reference_part or reference_part['outer_diameter'] is None:
+                    return []  # Not a 2PC part (or no round size to match on)
+                if '2PC STUD' not in reference_part['spacer_type'] and '2PC LUG' not in reference_part['spacer_type']:
+                    return []
 
             # Separate into STUDs and LUGs, with optional filtering
-            studs = [p for p in all_2pc_parts if '2PC STUD' in p['spacer_type']]
-            lugs = [p for p in all_2pc_parts if '2PC LUG' in p['spacer_type']]
-
-            # Apply thickness filters
-            if stud_thickness_min is not None or stud_thickness_max is not None:
-                filtered_studs = []
-                for stud in studs:
-                    thickness = stud.get('thickness')
-                    if thickness is None:
-                        continue
-                    if stud_thickness_min is not None and thickness < stud_thickness_min:
-                        continue
-                    if stud_thickness_max is not None and thickness > stud_thickness_max:
-                        continue
-                    filtered_studs.append(stud)
-                studs = filtered_studs
-
-            if lug_thickness_min is not None or lug_thickness_max is not None:
-                filtered_lugs = []
-                for lug in lugs:
-                    thickness = lug.get('thickness')
-                    if thickness is None:
-                        continue
-                    if lug_thickness_min is not None and thickness < lug_thickness_min:
-                        continue
-                    if lug_thickness_max is not None and thickness > lug_thickness_max:
-                        continue
-                    filtered_lugs.append(lug)
-                lugs = filtered_lugs
-
-            # Apply CB filter (affects both STUD and LUG)
-            if cb_min is not None or cb_max is not None:
-                if cb_min is not None:
-                    studs = [s for s in studs if s.get('center_bore') and s['center_bore'] >= cb_min]
-                    lugs = [l for l in lugs if l.get('center_bore') and l['center_bore'] >= cb_min]
-                if cb_max is not None:
-                    studs = [s for s in studs if s.get('center_bore') and s['center_bore'] <= cb_max]
-                    lugs = [l for l in lugs if l.get('center_bore') and l['center_bore'] <= cb_max]
-
-            # Apply OD filter (affects both STUD and LUG)
-            if od_min is not None or od_max is not None:
-                if od_min is not None:
-                    studs = [s for s in studs if s.get('outer_diameter') and s['outer_diameter'] >= od_min]
-                    lugs = [l for l in lugs if l.get('outer_diameter') and l['outer_diameter'] >= od_min]
-                if od_max is not None:
-                    studs = [s for s in studs if s.get('outer_diameter') and s['outer_diameter'] <= od_max]
-                    lugs = [l for l in lugs if l.get('outer_diameter') and l['outer_diameter'] <= od_max]
+            studs = [p for p in parts if '2PC STUD' in p['spacer_type']]
+            lugs = [p for p in parts if '2PC LUG' in p['spacer_type']]
+
+            studs = filter_parts(studs, stud_thickness_min, stud_thickness_max, cb_min, cb_max, od_min, od_max)
+            lugs = filter_parts(lugs, lug_thickness_min, lug_thickness_max, cb_min, cb_max, od_min, od_max)
 
             # If we have a reference part, only match against it
             if reference_part:
                 if '2PC STUD' in reference_part['spacer_type']:
-                    # Reference is STUD, find compatible LUGs
                     logger.info(f"[2PC MATCH] Reference {reference_part['program_number']} is STUD, checking against {len(lugs)} LUGs")
-                    for lug in lugs:
-                        match_result = self._check_2pc_compatibility(reference_part, lug)
-                        if match_result['compatible']:
-                            matches.append({
-                                'stud': reference_part,
-                                'lug': lug,
-                                'score': match_result['score'],
-                                'notes': match_result['notes'],
-                                'clearance_mm': match_result.get('clearance_mm', 999)
-                            })
+                    studs = [reference_part]
                 else:
-                    # Reference is LUG, find compatible STUDs
-                    for stud in studs:
-                        match_result = self._check_2pc_compatibility(stud, reference_part)
-                        if match_result['compatible']:
-                            matches.append({
-                                'stud': stud,
-                                'lug': reference_part,
-                                'score': match_result['score'],
-                                'notes': match_result['notes'],
-                                'clearance_mm': match_result.get('clearance_mm', 999)
-                            })
-            else:
-                # No reference - find all compatible pairings
-                for stud in studs:
-                    for lug in lugs:
-                        match_result = self._check_2pc_compatibility(stud, lug)
-                        if match_result['compatible']:
-                            matches.append({
-                                'stud': stud,
-                                'lug': lug,
-                                'score': match_result['score'],
-                                'notes': match_result['notes'],
-                                'clearance_mm': match_result.get('clearance_mm', 999)
-                            })
-
-            # Sort by clearance (tightest fit first), then by score
-            matches.sort(key=lambda x: (x['clearance_mm'], -x['score']))
-
-            return matches
+                    lugs = [reference_part]
+
+            # Sorted by clearance (tightest fit first), then by score
+            return match_pairs(studs, lugs, max_clearance_mm)
 
         except sqlite3.Error as e:
             logger.error(f"Database error finding compatible 2PC parts: {e}")
-            return matches
+            return []
         except Exception as e:
             logger.error(f"Error finding compatible 2PC parts: {e}", exc_info=True)
-            return matches
+            return []
 
     def _check_2pc_compatibility(self, stud, lug):
         """
@@ -4435,168 +4824,31 @@ class GCodeDatabaseGUI:
         Returns:
             dict: {'compatible': bool, 'score': int (0-100), 'notes': list}
         """
-        result = {'compatible': False, 'score': 0, 'notes': []}
-
-        # Rule 0: CRITICAL - Verify proper 2PC mating features
-        # 2PC mating uses:
-        #   - Small hub (~0.25" / 0.20-0.30") for mating
-        #   - Recess (~0.3-0.35" / 0.25-0.40" deep) for receiving the small hub
-        # Non-2PC features (ignore these):
-        #   - Large hub (~0.50" / 0.45-0.60") for mounting/handling (not for 2PC mating)
-
-        stud_hub_dia = stud.get('hub_diameter')
-        stud_hub_height = stud.get('hub_height')
-        lug_step_dia = lug.get('counter_bore_diameter')
-        lug_step_depth = lug.get('counter_bore_depth')
-
-        # Check STUD has a small hub for 2PC mating (0.20-0.30")
-        if not stud_hub_dia or not stud_hub_height:
-            result['notes'].append('❌ STUD missing hub dimensions')
-            return result
-        if stud_hub_dia <= 0 or stud_hub_height <= 0:
-            result['notes'].append('❌ STUD has invalid hub dimensions')
-            return result
+        return check_2pc_compatibility(stud, lug)
 
-        # Identify if this is a 2PC mating hub (small ~0.25") or other hub (large ~0.50")
-        is_stud_small_hub = 0.20 <= stud_hub_height <= 0.30
-        is_stud_large_hub = 0.45 <= stud_hub_height <= 0.60
+    def find_suffix_programs(self):
+        """
+        Find all programs that have temporary suffix placeholders like (1), (2), _1, _2.
+        These need to be resolved to proper unique numbers.
 
-        if not is_stud_small_hub:
-            if is_stud_large_hub:
-                result['notes'].append('❌ STUD has large hub (0.50" - not for 2PC mating)')
-            else:
-                result['notes'].append(f'❌ STUD hub height {stud_hub_height:.2f}" is not a 2PC mating hub (expected 0.20-0.30")')
-            return result
+        Returns:
+            list: List of dicts with program info and detected suffix
+        """
+        import re
+        suffix_programs = []
 
-        # Check LUG dimensions
-        lug_hub_dia = lug.get('hub_diameter')
-        lug_hub_height = lug.get('hub_height')
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            cursor = conn.cursor()
 
-        # Identify LUG features
-        has_lug_recess = lug_step_dia and lug_step_depth and lug_step_dia > 0 and lug_step_depth > 0
-        has_lug_small_hub = lug_hub_dia and lug_hub_height and lug_hub_dia > 0 and 0.20 <= lug_hub_height <= 0.30
-        has_lug_large_hub = lug_hub_height and 0.45 <= lug_hub_height <= 0.60
+            cursor.execute("""
+                SELECT program_number, title, file_path, outer_diameter, round_size
+                FROM programs
+                WHERE file_path IS NOT NULL
+            """)
 
-        # LUG must have a proper 2PC recess (0.25-0.40" deep) to receive the STUD's small hub
-        is_lug_proper_recess = has_lug_recess and 0.25 <= lug_step_depth <= 0.40
-
-        # REJECT: Both parts have only small hubs (0.25") - can't mate together
-        if has_lug_small_hub and not is_lug_proper_recess:
-            result['notes'].append('❌ Both parts have 0.25" hubs - cannot mate (no recess)')
-            return result
-
-        # REJECT: LUG has no proper recess for 2PC mating
-        if not is_lug_proper_recess:
-            if has_lug_large_hub:
-                result['notes'].append('❌ LUG has only large hub (0.50") - no recess for 2PC mating')
-            else:
-                result['notes'].append('❌ LUG missing proper recess (expected 0.25-0.40" deep)')
-            return result
-
-        # ALLOW: LUG has proper recess + optional large hub (0.50" hub is for other purposes)
-        # This is valid - the 0.50" hub on LUG is not for 2PC mating with this STUD
-
-        # Rule 1: Round size (OD) must match within tolerance
-        stud_od = stud.get('outer_diameter')
-        lug_od = lug.get('outer_diameter')
-
-        if not stud_od or not lug_od:
-            result['notes'].append('Missing OD data')
-            return result
-
-        od_diff_inches = abs(stud_od - lug_od)
-        od_diff_mm = od_diff_inches * 25.4
-
-        # Tolerance: ±1mm (0.04") for OD match
-        if od_diff_mm > 1.0:
-            result['notes'].append(f'OD mismatch: {od_diff_mm:.1f}mm difference')
-            return result
-
-        # OD matches - good start
-        result['score'] += 40
-        result['notes'].append(f'✓ OD match: {stud_od:.2f}" (Δ={od_diff_mm:.1f}mm)')
-
-        # Rule 2: Hub diameter must fit inside step diameter
-        clearance_mm = lug_step_dia - stud_hub_dia
-
-        # Minimum clearance: 0.001" = 0.0254mm (parts must have positive clearance)
-        if clearance_mm < 0.025:
-            result['notes'].append(f'❌ Hub too large: {stud_hub_dia:.1f}mm hub vs {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm)')
-            return result
-
-        # Score based on tightness of fit (tighter = better)
-        # 0.025-0.5mm clearance = excellent fit (30 points)
-        # 0.5-2.0mm clearance = good fit (25 points)
-        # 2.0-5.0mm clearance = acceptable fit (20 points)
-        # >5.0mm clearance = loose fit (10 points)
-        if clearance_mm <= 0.5:
-            result['score'] += 30
-            result['notes'].append(f'✓ Hub fit: {stud_hub_dia:.1f}mm hub → {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm - TIGHT FIT)')
-        elif clearance_mm <= 2.0:
-            result['score'] += 25
-            result['notes'].append(f'✓ Hub fit: {stud_hub_dia:.1f}mm hub → {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm)')
-        elif clearance_mm <= 5.0:
-            result['score'] += 20
-            result['notes'].append(f'✓ Hub fit: {stud_hub_dia:.1f}mm hub → {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm)')
-        else:
-            result['score'] += 10
-            result['notes'].append(f'⚠ Hub fit: {stud_hub_dia:.1f}mm hub → {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm - LOOSE FIT)')
-
-        # Store clearance for sorting
-        result['clearance_mm'] = clearance_mm
-
-        # Rule 3: Hub height must fit inside step depth
-        depth_clearance = lug_step_depth - stud_hub_height
-
-        # Need at least 0.02" clearance
-        if depth_clearance < 0.02:
-            result['notes'].append(f'❌ Hub too tall: {stud_hub_height:.2f}" hub vs {lug_step_depth:.2f}" recess depth (clearance: {depth_clearance:.3f}")')
-            return result
-
-        # Good depth clearance
-        result['score'] += 20
-        result['notes'].append(f'✓ Hub depth: {stud_hub_height:.2f}" hub → {lug_step_depth:.2f}" recess (clearance: {depth_clearance:.3f}")')
-
-        # Rule 4: CB match is a bonus (not required)
-        stud_cb = stud.get('center_bore')
-        lug_cb = lug.get('center_bore')
-
-        if stud_cb and lug_cb:
-            cb_diff_mm = abs(stud_cb - lug_cb)
-            if cb_diff_mm < 1.0:
-                result['score'] += 10
-                result['notes'].append(f'CB match: {stud_cb:.1f}mm (bonus!)')
-            else:
-                result['notes'].append(f'CB different: STUD={stud_cb:.1f}mm, LUG={lug_cb:.1f}mm (OK - not required)')
-
-        # Compatible if we got here
-        result['compatible'] = True
-
-        return result
-
-    def find_suffix_programs(self):
-        """
-        Find all programs that have temporary suffix placeholders like (1), (2), _1, _2.
-        These need to be resolved to proper unique numbers.
-
-        Returns:
-            list: List of dicts with program info and detected suffix
-        """
-        import re
-        suffix_programs = []
-
-        try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT program_number, title, file_path, outer_diameter, round_size
-                FROM programs
-                WHERE file_path IS NOT NULL
-            """)
-
-            # Pattern to match suffixes: (1), (2), _1, _2, etc.
-            suffix_pattern = re.compile(r'^(o\d+)([(_]\d+[)]?)$', re.IGNORECASE)
+            # Pattern to match suffixes: (1), (2), _1, _2, etc.
+            suffix_pattern = re.compile(r'^(o\d+)([(_]\d+[)]?)$', re.IGNORECASE)
 
             for row in cursor.fetchall():
                 prog_num, title, file_path, od, round_size = row
@@ -4641,9 +4893,6 @@ class GCodeDatabaseGUI:
         Returns:
             dict: Result with old_number, new_number, success, error
         """
-        import re
-        from datetime import datetime
-
         result = {
             'success': False,
             'old_number': program_number,
@@ -4654,144 +4903,20 @@ class GCodeDatabaseGUI:
         }
 
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            # Get program info
-            cursor.execute("""
-                SELECT title, file_path, outer_diameter, round_size
-                FROM programs
-                WHERE program_number = ?
-            """, (program_number,))
-
-            row = cursor.fetchone()
-            if not row:
+            plan = [item for item in self._rename_planner().plan_suffix_renames()
+                    if item['old_number'] == program_number]
+            if not plan:
                 result['error'] = f"Program {program_number} not found"
-                conn.close()
-                return result
-
-            title, file_path, od, round_size = row
-            result['old_file_path'] = file_path
-
-            # Determine round size for finding new number
-            effective_round_size = round_size or od
-            if not effective_round_size:
-                # Try to parse from file
-                if file_path and os.path.exists(file_path):
-                    try:
-                        parse_result = self.parser.parse_file(file_path)
-                        effective_round_size = parse_result.outer_diameter
-                    except:
-                        pass
-
-            if not effective_round_size:
-                result['error'] = f"Cannot determine round size for {program_number}"
-                conn.close()
-                return result
-
-            # Find next available number in correct range
-            new_number = self.find_next_available_number(effective_round_size)
-            if not new_number:
-                result['error'] = f"No available numbers in range for round size {effective_round_size}"
-                conn.close()
                 return result
 
-            result['new_number'] = new_number
-
-            if dry_run:
-                conn.close()
-                result['success'] = True
-                return result
-
-            # Perform the rename
-            if file_path and os.path.exists(file_path):
-                # Generate new file path in repository
-                old_dir = os.path.dirname(file_path)
-                new_filename = f"{new_number}.nc"
-                new_file_path = os.path.join(old_dir, new_filename)
-                result['new_file_path'] = new_file_path
-
-                # Check if destination already exists
-                if os.path.exists(new_file_path):
-                    result['error'] = f"Destination file already exists: {new_file_path}"
-                    conn.close()
-                    return result
+            item = plan[0]
+            if item['status'] == STATUS_READY and not dry_run:
+                renamed = self._execute_rename_plan(plan, "resolve_suffix")['renamed']
+                item = renamed[0] if renamed else item
 
-                # Read file content
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-
-                # Extract base number without suffix for replacement
-                # The DB program number might be o80001(1), but file content has O80001
-                suffix_pattern = re.compile(r'^(o?)(\d+)([(_]\d+[)]?)$', re.IGNORECASE)
-                match = suffix_pattern.match(program_number)
-                if match:
-                    old_num_base = match.group(2)
-                else:
-                    old_num_base = program_number.replace('o', '').replace('O', '')
-
-                new_num_plain = new_number.replace('o', '').replace('O', '')
-
-                # Also try to find the actual O-number in the file (might be different)
-                internal_number = self.extract_internal_program_number(file_path)
-                if internal_number:
-                    internal_num_plain = internal_number.replace('o', '').replace('O', '')
-                else:
-                    internal_num_plain = old_num_base
-
-                # Replace program number in file content - try both the base number and internal number
-                updated_content = content
-
-                # First try the internal number from the file
-                updated_content = re.sub(
-                    rf'^[oO]{internal_num_plain}\b',
-                    f'O{new_num_plain}',
-                    updated_content,
-                    flags=re.MULTILINE
-                )
-
-                # Also replace if base number is different from internal
-                if internal_num_plain != old_num_base:
-                    updated_content = re.sub(
-                        rf'^[oO]{old_num_base}\b',
-                        f'O{new_num_plain}',
-                        updated_content,
-                        flags=re.MULTILINE
-                    )
-
-                # Write to new file
-                with open(new_file_path, 'w', encoding='utf-8') as f:
-                    f.write(updated_content)
-
-                # Delete old file if different path and new file was created successfully
-                if os.path.exists(new_file_path):
-                    if file_path.lower() != new_file_path.lower() and os.path.exists(file_path):
-                        os.remove(file_path)
-                else:
-                    result['error'] = f"Failed to create new file: {new_file_path}"
-                    conn.close()
-                    return result
-
-            else:
-                new_file_path = None
-                result['new_file_path'] = None
-
-            # Update database
-            cursor.execute("""
-                UPDATE programs
-                SET program_number = ?,
-                    file_path = ?,
-                    last_modified = ?
-                WHERE program_number = ?
-            """, (new_number, new_file_path or file_path, datetime.now().isoformat(), program_number))
-
-            # Update registry
-            self.sync_registry_for_operation('RENAME', program_number, new_number, new_file_path or file_path)
-
-            conn.commit()
-            conn.close()
-
-            result['success'] = True
+            result.update(success=item['status'] == STATUS_READY and item['error'] is None,
+                          new_number=item['new_number'], old_file_path=item['old_file_path'],
+                          new_file_path=item['new_file_path'], error=item['error'])
             return result
 
         except Exception as e:
@@ -4802,6 +4927,9 @@ class GCodeDatabaseGUI:
         """
         Resolve all programs with suffix placeholders to proper unique numbers.
 
+        The numbers for every program are planned together from one snapshot
+        (RenamePlanner) and applied as one journaled batch.
+
         Args:
             dry_run: If True, only simulate without making changes
             progress_callback: Function(current, total, message) for progress updates
@@ -4819,46 +4947,77 @@ class GCodeDatabaseGUI:
         }
 
         try:
-            # Find all suffix programs
-            suffix_programs = self.find_suffix_programs()
-            stats['total'] = len(suffix_programs)
+            plan = self._rename_planner().plan_suffix_renames()
+            stats['total'] = len(plan)
 
             if stats['total'] == 0:
                 return stats
 
-            for i, prog in enumerate(suffix_programs):
-                if progress_callback:
-                    progress_callback(i + 1, stats['total'], f"Resolving {prog['program_number']}...")
-
-                result = self.resolve_suffix_program(prog['program_number'], dry_run=dry_run)
-
-                if result['success']:
-                    stats['resolved'] += 1
-                    stats['renames'].append({
-                        'old': result['old_number'],
-                        'new': result['new_number'],
-                        'title': prog['title']
-                    })
-                else:
-                    stats['failed'] += 1
-                    stats['errors'].append({
-                        'program': prog['program_number'],
-                        'error': result['error']
-                    })
-
+            done = [item for item in plan if item['status'] == STATUS_READY]
+            failed = [item for item in plan if item['status'] != STATUS_READY]
+            if not dry_run and done:
+                result = self._execute_rename_plan(done, "resolve_suffixes", progress_callback)
+                done = result['renamed']
+                failed += result['failed']
+
+            stats['resolved'] = len(done)
+            stats['failed'] = len(failed)
+            stats['renames'] = [{'old': item['old_number'], 'new': item['new_number'], 'title': item['title']}
+                                for item in done]
+            stats['errors'] = [{'program': item['old_number'], 'error': item['error']} for item in failed]
             return stats
 
         except Exception as e:
             stats['errors'].append({'program': 'BATCH', 'error': str(e)})
             return stats
 
-    def check_for_duplicates(self, source_path, file_hash=None):
+    def _rename_planner(self):
+        """RenamePlanner over a fresh snapshot of the database"""
+        def round_size_from_file(file_path):
+            try:
+                return self.parser.parse_file(file_path).outer_diameter
+            except Exception:
+                return None
+
+        return RenamePlanner(self.db_path, self.get_round_size_ranges(), self.get_range_for_round_size,
+                             round_size_from_file=round_size_from_file)
+
+    def _execute_rename_plan(self, plan, operation_name, progress_callback=None):
+        """Execute a rename plan while holding the write lease, then sync caches"""
+        with self._write_lease_batch(operation_name) as proceed:
+            if not proceed:
+                return {'renamed': [], 'failed': []}
+            result = execute_rename_plan(self.db_path, plan, progress_callback)
+        if result['renamed']:
+            self.log_activity('batch_rename', details={
+                'operation': operation_name,
+                'renamed': len(result['renamed']),
+                'failed': len(result['failed'])
+            })
+        return result
+
+    def _recover_rename_batch(self):
+        """Finish a batch rename that was interrupted (crash, power loss)"""
+        if self.write_lease.other_writer():
+            # Another workstation may be running the batch right now
+            return
+        try:
+            result = recover_rename_journal(self.db_path)
+        except Exception as e:
+            logger.error(f"Could not recover interrupted rename batch: {e}", exc_info=True)
+            return
+        if result is not None:
+            logger.warning(f"Recovered interrupted rename batch: {len(result['renamed'])} renamed, "
+                           f"{len(result['failed'])} not renamed")
+
+    def check_for_duplicates(self, source_path, file_hash=None, content=None):
         """
         Multi-layered duplicate detection with enhanced similarity checking.
 
         Args:
             source_path: Path to file being imported
             file_hash: Pre-computed hash (optional, will compute if not provided)
+            content: FileContent already read for source_path (optional)
 
         Returns:
             dict: {
@@ -4882,7 +5041,7 @@ class GCodeDatabaseGUI:
         try:
             # Compute hash if not provided
             if file_hash is None:
-                file_hash = self.compute_file_hash(source_path)
+                file_hash = self.compute_file_hash(source_path, content)
 
             if not file_hash:
                 return result
@@ -4912,7 +5071,7 @@ class GCodeDatabaseGUI:
             # Get filename and internal O-number
             filename = os.path.basename(source_path)
             filename_base = os.path.splitext(filename)[0].lower()
-            internal_number = self.extract_internal_program_number(source_path)
+            internal_number = self.extract_internal_program_number(source_path, content=content)
 
             # Check 2: Filename collision (same filename exists but different content)
             cursor.execute("""
@@ -4933,7 +5092,7 @@ class GCodeDatabaseGUI:
 
                 # Compare the files to decide what to do
                 if existing[2] and os.path.exists(existing[2]):
-                    comparison = self.compare_file_contents(source_path, existing[2])
+                    comparison = self.compare_file_contents(source_path, existing[2], content1=content)
                     result['comparison'] = comparison
 
                     if comparison['identical']:
@@ -5010,7 +5169,8 @@ class GCodeDatabaseGUI:
         except Exception as e:
             logger.error(f"Error during cascade refresh: {e}", exc_info=True)
 
-    def process_new_file(self, source_path, import_mode='repository', auto_resolve_collision=True):
+    def process_new_file(self, source_path, import_mode='repository', auto_resolve_collision=True,
+                         content=None):
         """
         Central entry point for ALL file additions to the system.
 
@@ -5018,6 +5178,9 @@ class GCodeDatabaseGUI:
             source_path: Path to the file to import
             import_mode: 'repository' (copy to managed folder) or 'external' (reference only)
             auto_resolve_collision: If True, automatically assign new number on collision
+            content: The program already in memory (FileContent, e.g. split from
+                a memory dump). source_path then only names it and need not
+                exist; the program is written straight into the repository.
 
         Returns:
             dict: {
@@ -5046,20 +5209,37 @@ class GCodeDatabaseGUI:
             'errors': []
         }
 
+        in_memory = content is not None
+
         try:
             # Step 1: Validate file exists
-            if not os.path.exists(source_path):
+            if in_memory and import_mode != 'repository':
+                result['errors'].append(f"In-memory program {source_path} can only be imported to the repository")
+                return result
+            if not in_memory and not os.path.exists(source_path):
                 result['errors'].append(f"File not found: {source_path}")
                 return result
 
-            # Step 2: Compute content hash
-            file_hash = self.compute_file_hash(source_path)
-            if not file_hash:
+            # Step 2: Read the file once and compute content hash
+            # (hash, parse, scan and O-number lookup all use this read)
+            if not in_memory:
+                content = read_file_content(source_path)
+            if content is None:
                 result['errors'].append("Could not compute file hash")
                 return result
+            file_hash = content.sha256
+
+            def place(final_path):
+                """Put the program at final_path (copy, or write the in-memory program)"""
+                if in_memory:
+                    with open(final_path, 'wb') as f:
+                        f.write(content.data)
+                else:
+                    import shutil
+                    shutil.copy2(source_path, final_path)
 
             # Step 3: Check for duplicates
-            dup_check = self.check_for_duplicates(source_path, file_hash)
+            dup_check = self.check_for_duplicates(source_path, file_hash, content=content)
 
             if dup_check['is_duplicate']:
                 if dup_check['duplicate_type'] == 'CONTENT_EXACT':
@@ -5105,7 +5285,7 @@ class GCodeDatabaseGUI:
 
             # Step 4: Parse the G-code file
             try:
-                parse_result = self.parser.parse_file(source_path)
+                parse_result = self.parser.parse_file(source_path, content=content)
                 if parse_result is None:
                     result['errors'].append(f"Parse failed: Could not parse file (returned None)")
                     return result
@@ -5116,7 +5296,7 @@ class GCodeDatabaseGUI:
             # Step 4.5: Optional file scanning (Phase 1 feature)
             if self.config.get('scan_on_import', True):
                 try:
-                    scan_results = self.file_scanner.scan_file_for_issues(source_path)
+                    scan_results = self.file_scanner.scan_file_for_issues(source_path, parse_result=parse_result)
 
                     # Add scan warnings to result object
                     if scan_results.get('warnings'):
@@ -5139,26 +5319,26 @@ class GCodeDatabaseGUI:
                         try:
                             logger.info("Auto-fix enabled - attempting to fix issues...")
 
-                            # Read file content
-                            with open(source_path, 'r') as f:
-                                content = f.read()
-
                             # Apply fixes
-                            fixed_content, fixes_applied = AutoFixer.apply_all_fixes(content, scan_results)
+                            fixed_content, fixes_applied = AutoFixer.apply_all_fixes(content.text, scan_results)
 
                             if fixes_applied:
-                                # Save fixed version to temporary file
-                                temp_file = source_path + '.fixed.tmp'
-                                with open(temp_file, 'w') as f:
-                                    f.write(fixed_content)
-
-                                # Update source_path to use fixed version
-                                source_path = temp_file
+                                if in_memory:
+                                    content = FileContent(source_path, fixed_content.encode('utf-8'))
+                                else:
+                                    # Save fixed version to temporary file
+                                    temp_file = source_path + '.fixed.tmp'
+                                    with open(temp_file, 'w') as f:
+                                        f.write(fixed_content)
+
+                                    # Update source_path to use fixed version
+                                    source_path = temp_file
+                                    content = FileContent.read(source_path)
                                 result['warnings'].append(f"Auto-fixed {len(fixes_applied)} issue(s): {', '.join(fixes_applied)}")
                                 logger.info(f"Applied {len(fixes_applied)} auto-fixes")
 
                                 # Re-parse fixed file
-                                parse_result = self.parser.parse_file(source_path)
+                                parse_result = self.parser.parse_file(source_path, content=content)
                         except Exception as e:
                             logger.warning(f"Auto-fix failed: {e}")
                             # Continue with original file
@@ -5168,7 +5348,7 @@ class GCodeDatabaseGUI:
                     # Don't block import if scanning fails
 
             # Step 5: Determine program number
-            internal_number = self.extract_internal_program_number(source_path)
+            internal_number = self.extract_internal_program_number(source_path, content=content)
             filename_base = os.path.splitext(os.path.basename(source_path))[0].lower()
 
             # Decide what program number to use
@@ -5194,10 +5374,9 @@ class GCodeDatabaseGUI:
                 final_path = os.path.join(self.repository_path, new_filename)
 
                 # If file already exists at destination, check if content is different
-                if os.path.exists(final_path) and final_path.lower() != source_path.lower():
+                if os.path.exists(final_path) and (in_memory or final_path.lower() != source_path.lower()):
                     # Check if content is actually different before archiving
-                    import filecmp
-                    files_are_identical = filecmp.cmp(source_path, final_path, shallow=False)
+                    files_are_identical = file_sha256(final_path) == content.sha256
 
                     if files_are_identical:
                         # Same content - no need to archive or copy, but STILL add to database
@@ -5264,8 +5443,7 @@ class GCodeDatabaseGUI:
                                 return result
 
                             # Copy with new name
-                            import shutil
-                            shutil.copy2(source_path, final_path)
+                            place(final_path)
                             result['file_path'] = final_path
                         else:
                             # Same part, updated version - archive old and replace
@@ -5274,13 +5452,11 @@ class GCodeDatabaseGUI:
                                 self.repo_manager.archive_old_file(final_path, program_number, "replaced_by_update")
 
                             # Copy new file
-                            import shutil
-                            shutil.copy2(source_path, final_path)
+                            place(final_path)
                             result['file_path'] = final_path
-                elif source_path.lower() != final_path.lower():
+                elif in_memory or source_path.lower() != final_path.lower():
                     # File doesn't exist at destination - just copy
-                    import shutil
-                    shutil.copy2(source_path, final_path)
+                    place(final_path)
                     result['file_path'] = final_path
                 else:
                     # Source and destination are the same file
@@ -5299,119 +5475,127 @@ class GCodeDatabaseGUI:
                 logger.info(f"Import cancelled by safety check: {msg}")
                 return result
 
-            # Step 7: Update database
-            logger.debug(f"Step 7: Updating database for {program_number}, file_path={result.get('file_path')}")
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
+            conn = None
+            try:
+                # Step 7: Update database
+                logger.debug(f"Step 7: Updating database for {program_number}, file_path={result.get('file_path')}")
+                conn = sqlite3.connect(self.db_path, timeout=30.0)
+                cursor = conn.cursor()
 
-            # Determine validation status
-            validation_status = "PASS"
-            if parse_result.validation_issues:
-                validation_status = "CRITICAL"
-            elif parse_result.bore_warnings:
-                validation_status = "BORE_WARNING"
-            elif parse_result.dimensional_issues:
-                validation_status = "DIMENSIONAL"
-            elif parse_result.validation_warnings:
-                validation_status = "WARNING"
+                # Determine validation status
+                validation_status = "PASS"
+                if parse_result.validation_issues:
+                    validation_status = "CRITICAL"
+                elif parse_result.bore_warnings:
+                    validation_status = "BORE_WARNING"
+                elif parse_result.dimensional_issues:
+                    validation_status = "DIMENSIONAL"
+                elif parse_result.validation_warnings:
+                    validation_status = "WARNING"
 
-            # Check if program exists
-            cursor.execute("SELECT 1 FROM programs WHERE program_number = ?", (program_number,))
-            exists = cursor.fetchone()
+                # Check if program exists
+                cursor.execute("SELECT 1 FROM programs WHERE program_number = ?", (program_number,))
+                exists = cursor.fetchone()
 
-            now = datetime.now().isoformat()
+                now = datetime.now().isoformat()
 
-            if exists:
-                # Update existing record
-                cursor.execute("""
-                    UPDATE programs SET
-                        title = ?, outer_diameter = ?, thickness = ?, thickness_display = ?,
-                        center_bore = ?, hub_height = ?, hub_diameter = ?,
-                        counter_bore_diameter = ?, counter_bore_depth = ?,
-                        material = ?, file_path = ?, last_modified = ?,
-                        validation_status = ?, validation_issues = ?, validation_warnings = ?,
-                        bore_warnings = ?, dimensional_issues = ?,
-                        cb_from_gcode = ?, ob_from_gcode = ?, content_hash = ?,
-                        is_managed = ?, round_size = ?,
-                        tool_home_status = ?, tool_home_issues = ?,
-                        feasibility_status = ?, feasibility_issues = ?, feasibility_warnings = ?,
-                        crash_issues = ?, crash_warnings = ?
-                    WHERE program_number = ?
-                """, (
-                    parse_result.title, parse_result.outer_diameter,
-                    parse_result.thickness, parse_result.thickness_display,
-                    parse_result.center_bore, parse_result.hub_height, parse_result.hub_diameter,
-                    parse_result.counter_bore_diameter, parse_result.counter_bore_depth,
-                    parse_result.material, result['file_path'], now,
-                    validation_status,
-                    json.dumps(parse_result.validation_issues) if parse_result.validation_issues else None,
-                    json.dumps(parse_result.validation_warnings) if parse_result.validation_warnings else None,
-                    json.dumps(parse_result.bore_warnings) if parse_result.bore_warnings else None,
-                    json.dumps(parse_result.dimensional_issues) if parse_result.dimensional_issues else None,
-                    parse_result.cb_from_gcode, parse_result.ob_from_gcode, file_hash,
-                    1 if import_mode == 'repository' else 0,
-                    parse_result.outer_diameter,
-                    parse_result.tool_home_status,
-                    json.dumps(parse_result.tool_home_issues) if parse_result.tool_home_issues else None,
-                    parse_result.feasibility_status,
-                    json.dumps(parse_result.feasibility_issues) if parse_result.feasibility_issues else None,
-                    json.dumps(parse_result.feasibility_warnings) if parse_result.feasibility_warnings else None,
-                    json.dumps(parse_result.crash_issues) if parse_result.crash_issues else None,
-                    json.dumps(parse_result.crash_warnings) if parse_result.crash_warnings else None,
-                    program_number
-                ))
-            else:
-                # Insert new record
-                cursor.execute("""
-                    INSERT INTO programs (
-                        program_number, title, spacer_type, outer_diameter, thickness, thickness_display,
-                        center_bore, hub_height, hub_diameter, counter_bore_diameter, counter_bore_depth,
-                        material, file_path, date_created, last_modified,
-                        validation_status, validation_issues, validation_warnings,
-                        bore_warnings, dimensional_issues, cb_from_gcode, ob_from_gcode,
-                        content_hash, is_managed, round_size, round_size_confidence, round_size_source, in_correct_range,
-                        tool_home_status, tool_home_issues,
-                        feasibility_status, feasibility_issues, feasibility_warnings,
-                        crash_issues, crash_warnings,
-                        is_deleted, deleted_date
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    program_number, parse_result.title, parse_result.spacer_type or 'Unknown',
-                    parse_result.outer_diameter, parse_result.thickness, parse_result.thickness_display,
-                    parse_result.center_bore, parse_result.hub_height, parse_result.hub_diameter,
-                    parse_result.counter_bore_diameter, parse_result.counter_bore_depth,
-                    parse_result.material, result['file_path'], now, now,
-                    validation_status,
-                    json.dumps(parse_result.validation_issues) if parse_result.validation_issues else None,
-                    json.dumps(parse_result.validation_warnings) if parse_result.validation_warnings else None,
-                    json.dumps(parse_result.bore_warnings) if parse_result.bore_warnings else None,
-                    json.dumps(parse_result.dimensional_issues) if parse_result.dimensional_issues else None,
-                    parse_result.cb_from_gcode, parse_result.ob_from_gcode,
-                    file_hash,
-                    1 if import_mode == 'repository' else 0,
-                    parse_result.outer_diameter, 'HIGH', 'PARSED',
-                    1 if self.is_in_correct_range(program_number, parse_result.outer_diameter) else 0,
-                    parse_result.tool_home_status,
-                    json.dumps(parse_result.tool_home_issues) if parse_result.tool_home_issues else None,
-                    parse_result.feasibility_status,
-                    json.dumps(parse_result.feasibility_issues) if parse_result.feasibility_issues else None,
-                    json.dumps(parse_result.feasibility_warnings) if parse_result.feasibility_warnings else None,
-                    json.dumps(parse_result.crash_issues) if parse_result.crash_issues else None,
-                    json.dumps(parse_result.crash_warnings) if parse_result.crash_warnings else None,
-                    0, None  # is_deleted, deleted_date
-                ))
+                if exists:
+                    # Update existing record
+                    cursor.execute("""
+                        UPDATE programs SET
+                            title = ?, outer_diameter = ?, thickness = ?, thickness_display = ?,
+                            center_bore = ?, hub_height = ?, hub_diameter = ?,
+                            counter_bore_diameter = ?, counter_bore_depth = ?,
+                            material = ?, file_path = ?, last_modified = ?,
+                            validation_status = ?, validation_issues = ?, validation_warnings = ?,
+                            bore_warnings = ?, dimensional_issues = ?,
+                            cb_from_gcode = ?, ob_from_gcode = ?, content_hash = ?,
+                            is_managed = ?, round_size = ?,
+                            tool_home_status = ?, tool_home_issues = ?,
+                            feasibility_status = ?, feasibility_issues = ?, feasibility_warnings = ?,
+                            crash_issues = ?, crash_warnings = ?
+                        WHERE program_number = ?
+                    """, (
+                        parse_result.title, parse_result.outer_diameter,
+                        parse_result.thickness, parse_result.thickness_display,
+                        parse_result.center_bore, parse_result.hub_height, parse_result.hub_diameter,
+                        parse_result.counter_bore_diameter, parse_result.counter_bore_depth,
+                        parse_result.material, result['file_path'], now,
+                        validation_status,
+                        json.dumps(parse_result.validation_issues) if parse_result.validation_issues else None,
+                        json.dumps(parse_result.validation_warnings) if parse_result.validation_warnings else None,
+                        json.dumps(parse_result.bore_warnings) if parse_result.bore_warnings else None,
+                        json.dumps(parse_result.dimensional_issues) if parse_result.dimensional_issues else None,
+                        parse_result.cb_from_gcode, parse_result.ob_from_gcode, file_hash,
+                        1 if import_mode == 'repository' else 0,
+                        parse_result.outer_diameter,
+                        parse_result.tool_home_status,
+                        json.dumps(parse_result.tool_home_issues) if parse_result.tool_home_issues else None,
+                        parse_result.feasibility_status,
+                        json.dumps(parse_result.feasibility_issues) if parse_result.feasibility_issues else None,
+                        json.dumps(parse_result.feasibility_warnings) if parse_result.feasibility_warnings else None,
+                        json.dumps(parse_result.crash_issues) if parse_result.crash_issues else None,
+                        json.dumps(parse_result.crash_warnings) if parse_result.crash_warnings else None,
+                        program_number
+                    ))
+                    store_program_issues(cursor, program_number, parse_result.get_issues())
+                else:
+                    # Insert new record
+                    cursor.execute("""
+                        INSERT INTO programs (
+                            program_number, title, spacer_type, outer_diameter, thickness, thickness_display,
+                            center_bore, hub_height, hub_diameter, counter_bore_diameter, counter_bore_depth,
+                            material, file_path, date_created, last_modified,
+                            validation_status, validation_issues, validation_warnings,
+                            bore_warnings, dimensional_issues, cb_from_gcode, ob_from_gcode,
+                            content_hash, is_managed, round_size, round_size_confidence, round_size_source, in_correct_range,
+                            tool_home_status, tool_home_issues,
+                            feasibility_status, feasibility_issues, feasibility_warnings,
+                            crash_issues, crash_warnings,
+                            is_deleted, deleted_date
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        program_number, parse_result.title, parse_result.spacer_type or 'Unknown',
+                        parse_result.outer_diameter, parse_result.thickness, parse_result.thickness_display,
+                        parse_result.center_bore, parse_result.hub_height, parse_result.hub_diameter,
+                        parse_result.counter_bore_diameter, parse_result.counter_bore_depth,
+                        parse_result.material, result['file_path'], now, now,
+                        validation_status,
+                        json.dumps(parse_result.validation_issues) if parse_result.validation_issues else None,
+                        json.dumps(parse_result.validation_warnings) if parse_result.validation_warnings else None,
+                        json.dumps(parse_result.bore_warnings) if parse_result.bore_warnings else None,
+                        json.dumps(parse_result.dimensional_issues) if parse_result.dimensional_issues else None,
+                        parse_result.cb_from_gcode, parse_result.ob_from_gcode,
+                        file_hash,
+                        1 if import_mode == 'repository' else 0,
+                        parse_result.outer_diameter, 'HIGH', 'PARSED',
+                        1 if self.is_in_correct_range(program_number, parse_result.outer_diameter) else 0,
+                        parse_result.tool_home_status,
+                        json.dumps(parse_result.tool_home_issues) if parse_result.tool_home_issues else None,
+                        parse_result.feasibility_status,
+                        json.dumps(parse_result.feasibility_issues) if parse_result.feasibility_issues else None,
+                        json.dumps(parse_result.feasibility_warnings) if parse_result.feasibility_warnings else None,
+                        json.dumps(parse_result.crash_issues) if parse_result.crash_issues else None,
+                        json.dumps(parse_result.crash_warnings) if parse_result.crash_warnings else None,
+                        0, None  # is_deleted, deleted_date
+                    ))
+                    store_program_issues(cursor, program_number, parse_result.get_issues())
 
-            conn.commit()
-            conn.close()
+                conn.commit()
+                conn.close()
 
-            # Record successful database write (Phase 1)
-            self._record_database_write("import_file")
+                # Record successful database write (Phase 1)
+                self._record_database_write("import_file")
 
-            # Step 8: Sync registry
-            if result['original_number'] and result['new_number']:
-                self.sync_registry_for_operation('RENAME', result['original_number'], result['new_number'], result['file_path'])
-            else:
-                self.sync_registry_for_operation('ADD', None, program_number, result['file_path'])
+                # Step 8: Sync registry
+                if result['original_number'] and result['new_number']:
+                    self.sync_registry_for_operation('RENAME', result['original_number'], result['new_number'], result['file_path'])
+                else:
+                    self.sync_registry_for_operation('ADD', None, program_number, result['file_path'])
+            finally:
+                if conn is not None:
+                    conn.close()  # Rolls back a failed write, which would block the release
+                self._release_write_lease()
 
             result['success'] = True
             logger.debug(f"Successfully processed {program_number}")
@@ -5855,7 +6039,7 @@ class GCodeDatabaseGUI:
     # ------------------------------------------------------------------
 
     def scan_folder_for_issues(self):
-        """Scan every G-code file in a chosen folder and report per-file issues without importing."""
+        """Scan every G-code file in a chosen folder and report per-file issues (worst first, as they finish) without importing."""
         if not self.has_permission('add_files'):
             messagebox.showerror("Permission Denied", "You don't have permission to scan files.")
             return
@@ -5887,87 +6071,85 @@ class GCodeDatabaseGUI:
                                 f"Searched for: .nc, .txt, .tap, .gcode, and extensionless O-number files")
             return
 
-        # --- Progress window ---
-        progress_window = tk.Toplevel(self.root)
-        progress_window.title("Scanning Folder for Issues...")
-        progress_window.geometry("650x420")
-        progress_window.configure(bg=self.bg_color)
-        progress_window.transient(self.root)
-
-        tk.Label(progress_window, text=f"Scanning {len(nc_files)} file(s)...",
-                 bg=self.bg_color, fg=self.fg_color,
-                 font=("Arial", 12, "bold")).pack(pady=12)
+        # Results stream into the dialog (worst first) while the scan runs
+        cancel_event = threading.Event()
+        add_results, finish = self.show_folder_scan_results_dialog(
+            folder, total_files=len(nc_files), cancel_event=cancel_event)
 
-        from tkinter import ttk
-        progress_var = tk.DoubleVar()
-        ttk.Progressbar(progress_window, variable=progress_var,
-                        maximum=len(nc_files), length=560).pack(pady=4, padx=20)
+        msg_queue = queue.Queue()
+        db_path = self.db_path
 
-        current_lbl = tk.Label(progress_window, text="",
-                               bg=self.bg_color, fg=self.fg_color,
-                               font=("Arial", 9), wraplength=600)
-        current_lbl.pack(pady=4, padx=20)
-
-        log_text = scrolledtext.ScrolledText(progress_window,
-                                             bg=self.input_bg, fg=self.fg_color,
-                                             font=("Courier", 9),
-                                             width=75, height=16)
-        log_text.pack(padx=10, pady=6, fill=tk.BOTH, expand=True)
-        self.root.update()
+        def scan_thread():
+            """Run the worker pool; results are handed to the GUI through msg_queue"""
+            try:
+                for result in scan_files(nc_files, db_path=db_path, cancel_event=cancel_event):
+                    msg_queue.put(('result', result))
+            except Exception as e:
+                logger.error(f"Folder scan failed: {e}", exc_info=True)
+                msg_queue.put(('error', str(e)))
+            msg_queue.put(('done', None))
 
-        # --- Scan loop ---
-        all_results = []
-        for i, file_path in enumerate(nc_files):
-            filename = os.path.basename(file_path)
-            current_lbl.config(text=f"Scanning: {filename}")
-            log_text.insert(tk.END, f"Scanning {filename}...")
-            log_text.see(tk.END)
-            self.root.update_idletasks()
+        def update_gui():
+            """Move finished results into the dialog"""
+            batch = []
+            error = None
+            done = False
+            try:
+                while not done:
+                    kind, value = msg_queue.get_nowait()
+                    if kind == 'result':
+                        batch.append(value)
+                    elif kind == 'error':
+                        error = value
+                    else:
+                        done = True
+            except queue.Empty:
+                pass
 
             try:
-                result = self.file_scanner.scan_file_for_issues(file_path)
-                result['file_path'] = file_path
-                all_results.append(result)
+                if batch:
+                    add_results(batch)
+                if error:
+                    messagebox.showerror("Scan Failed", f"Folder scan stopped:\n{error}")
+                if done:
+                    finish()
+                    return
+                self.root.after(100, update_gui)
+            except tk.TclError:
+                # Dialog closed - stop the scan
+                cancel_event.set()
 
-                errors = len(result.get('errors', []))
-                warnings = len(result.get('warnings', []))
-                if errors > 0:
-                    log_text.insert(tk.END, f"  ✗ {errors} error(s), {warnings} warning(s)\n")
-                elif warnings > 0:
-                    log_text.insert(tk.END, f"  ⚠ {warnings} warning(s)\n")
-                else:
-                    log_text.insert(tk.END, "  ✓ PASS\n")
+        threading.Thread(target=scan_thread, daemon=True).start()
+        update_gui()
 
-            except Exception as e:
-                all_results.append({
-                    'file_path': file_path,
-                    'success': False,
-                    'program_number': '',
-                    'round_size': None,
-                    'errors': [{'category': 'scan_error', 'message': str(e)}],
-                    'warnings': [],
-                    'suggestions': [],
-                })
-                log_text.insert(tk.END, f"  ✗ Scan failed: {e}\n")
+    def show_folder_scan_results_dialog(self, folder, all_results=(), total_files=None, cancel_event=None):
+        """
+        Display per-file scan results for an entire folder in a results dialog.
 
-            progress_var.set(i + 1)
-            log_text.see(tk.END)
-            self.root.update_idletasks()
+        Results can be added while a scan is still running; the list is kept
+        sorted by severity (crash risks first).
 
-        progress_window.destroy()
-        self.show_folder_scan_results_dialog(folder, all_results)
+        Args:
+            folder: Scanned folder
+            all_results: Results to show right away
+            total_files: Number of files being scanned (for the progress line)
+            cancel_event: threading.Event set by the Cancel button and on close
+
+        Returns:
+            (add_results, finish): add_results(list of results) inserts more
+            results; finish() marks the scan as ended
+        """
+        import bisect
 
-    def show_folder_scan_results_dialog(self, folder, all_results):
-        """Display per-file scan results for an entire folder in a results dialog."""
         dialog = tk.Toplevel(self.root)
         dialog.title(f"Folder Scan Results — {os.path.basename(folder)}")
         dialog.geometry("950x680")
         dialog.configure(bg=self.bg_color)
 
-        total = len(all_results)
-        passed = sum(1 for r in all_results if not r.get('errors') and not r.get('warnings'))
-        with_warnings = sum(1 for r in all_results if not r.get('errors') and r.get('warnings'))
-        with_errors = sum(1 for r in all_results if r.get('errors'))
+        keys = []      # scan_severity() of each row, parallel to ordered
+        ordered = []   # Results in list order (most severe first)
+        counts = {'passed': 0, 'warnings': 0, 'errors': 0}
+        state = {'finished': cancel_event is None}
 
         # Header
         hdr = tk.Frame(dialog, bg=self.bg_color)
@@ -5975,24 +6157,27 @@ class GCodeDatabaseGUI:
         tk.Label(hdr, text=f"Folder: {folder}",
                  bg=self.bg_color, fg=self.fg_color,
                  font=("Arial", 10), wraplength=900, justify=tk.LEFT).pack(anchor='w')
+        progress_lbl = tk.Label(hdr, text="", bg=self.bg_color, fg=self.fg_color,
+                                font=("Arial", 9, "italic"))
+        progress_lbl.pack(anchor='w')
 
         # Summary bar
         summ = tk.Frame(dialog, bg=self.bg_color, relief=tk.RIDGE, borderwidth=2)
         summ.pack(fill=tk.X, padx=12, pady=4)
         inner = tk.Frame(summ, bg=self.bg_color)
         inner.pack(pady=8)
-        tk.Label(inner, text=f"Total: {total}",
-                 bg=self.bg_color, fg=self.fg_color,
-                 font=("Arial", 11, "bold")).pack(side=tk.LEFT, padx=14)
-        tk.Label(inner, text=f"✓ Pass: {passed}",
-                 bg=self.bg_color, fg="#4CAF50",
-                 font=("Arial", 11, "bold")).pack(side=tk.LEFT, padx=14)
-        tk.Label(inner, text=f"⚠ Warnings: {with_warnings}",
-                 bg=self.bg_color, fg="#FF9800",
-                 font=("Arial", 11, "bold")).pack(side=tk.LEFT, padx=14)
-        tk.Label(inner, text=f"✗ Errors: {with_errors}",
-                 bg=self.bg_color, fg="#F44336",
-                 font=("Arial", 11, "bold")).pack(side=tk.LEFT, padx=14)
+        total_lbl = tk.Label(inner, bg=self.bg_color, fg=self.fg_color,
+                             font=("Arial", 11, "bold"))
+        total_lbl.pack(side=tk.LEFT, padx=14)
+        passed_lbl = tk.Label(inner, bg=self.bg_color, fg="#4CAF50",
+                              font=("Arial", 11, "bold"))
+        passed_lbl.pack(side=tk.LEFT, padx=14)
+        warnings_lbl = tk.Label(inner, bg=self.bg_color, fg="#FF9800",
+                                font=("Arial", 11, "bold"))
+        warnings_lbl.pack(side=tk.LEFT, padx=14)
+        errors_lbl = tk.Label(inner, bg=self.bg_color, fg="#F44336",
+                              font=("Arial", 11, "bold"))
+        errors_lbl.pack(side=tk.LEFT, padx=14)
 
         # File list
         list_frame = tk.Frame(dialog, bg=self.bg_color)
@@ -6021,43 +6206,79 @@ class GCodeDatabaseGUI:
         sb_y.config(command=file_listbox.yview)
         sb_x.config(command=file_listbox.xview)
 
-        result_map = {}
-        for idx, result in enumerate(all_results):
-            filename = os.path.basename(result['file_path'])
-            errors = len(result.get('errors', []))
-            warnings = len(result.get('warnings', []))
-            suggestions = len(result.get('suggestions', []))
-            prog_num = result.get('program_number', '')
-
-            if errors > 0:
-                icon, status_str, color = "✗", f"{errors}E  {warnings}W", "#F44336"
-            elif warnings > 0:
-                icon = "⚠"
-                status_str = f"{warnings}W"
-                if suggestions:
-                    status_str += f"  {suggestions}S"
-                color = "#FF9800"
+        def update_summary():
+            total_lbl.config(text=f"Total: {len(ordered)}")
+            passed_lbl.config(text=f"✓ Pass: {counts['passed']}")
+            warnings_lbl.config(text=f"⚠ Warnings: {counts['warnings']}")
+            errors_lbl.config(text=f"✗ Errors: {counts['errors']}")
+            if total_files is None:
+                progress_lbl.config(text="")
+            elif not state['finished']:
+                progress_lbl.config(text=f"Scanning... {len(ordered)} of {total_files} file(s)")
+            elif cancel_event is not None and cancel_event.is_set() and len(ordered) < total_files:
+                progress_lbl.config(text=f"Scan cancelled — {len(ordered)} of {total_files} file(s) scanned")
             else:
-                icon = "✓"
-                status_str = "PASS"
-                if suggestions:
-                    status_str += f"  {suggestions}S"
-                color = "#4CAF50"
-
-            prog_part = f"[{prog_num}]" if prog_num else ""
-            line = f"{icon}  {filename:<32} {prog_part:<14} {status_str}"
-            file_listbox.insert(tk.END, line)
-            file_listbox.itemconfig(idx, fg=color)
-            result_map[idx] = result
+                progress_lbl.config(text=f"Scan complete — {len(ordered)} file(s)")
+
+        def add_results(results):
+            for result in results:
+                filename = os.path.basename(result['file_path'])
+                errors = len(result.get('errors', []))
+                warnings = len(result.get('warnings', []))
+                suggestions = len(result.get('suggestions', []))
+                prog_num = result.get('program_number', '')
+
+                if errors > 0:
+                    icon, status_str, color = "✗", f"{errors}E  {warnings}W", "#F44336"
+                    counts['errors'] += 1
+                elif warnings > 0:
+                    icon = "⚠"
+                    status_str = f"{warnings}W"
+                    if suggestions:
+                        status_str += f"  {suggestions}S"
+                    color = "#FF9800"
+                    counts['warnings'] += 1
+                else:
+                    icon = "✓"
+                    status_str = "PASS"
+                    if suggestions:
+                        status_str += f"  {suggestions}S"
+                    color = "#4CAF50"
+                    counts['passed'] += 1
+
+                prog_part = f"[{prog_num}]" if prog_num else ""
+                line = f"{icon}  {filename:<32} {prog_part:<14} {status_str}"
+
+                # Insert at the result's severity position
+                key = scan_severity(result)
+                idx = bisect.bisect_right(keys, key)
+                keys.insert(idx, key)
+                ordered.insert(idx, result)
+                file_listbox.insert(idx, line)
+                file_listbox.itemconfig(idx, fg=color)
+            update_summary()
 
         def on_double_click(event):
             sel = file_listbox.curselection()
             if sel:
-                r = result_map[sel[0]]
+                r = ordered[sel[0]]
+                if r.get('stored_program'):
+                    # Answered from the database during the scan; the details
+                    # view gets a full scan (suggestions, P-codes)
+                    r = dict(self.file_scanner.scan_file_for_issues(r['file_path']), file_path=r['file_path'])
                 self.show_scan_results_dialog(r, r['file_path'])
 
         file_listbox.bind('<Double-1>', on_double_click)
 
+        def close():
+            if cancel_event is not None:
+                cancel_event.set()
+            dialog.destroy()
+
+        def cancel_scan():
+            cancel_event.set()
+            cancel_btn.config(state=tk.DISABLED, text="Cancelling...")
+
         # Bottom buttons
         btn_frame = tk.Frame(dialog, bg=self.bg_color)
         btn_frame.pack(fill=tk.X, padx=12, pady=10)
@@ -6065,15 +6286,31 @@ class GCodeDatabaseGUI:
                  bg=self.bg_color, fg=self.fg_color,
                  font=("Arial", 9, "italic")).pack(side=tk.LEFT)
         tk.Button(btn_frame, text="Export Report",
-                  command=lambda: self._export_folder_scan_report(folder, all_results),
+                  command=lambda: self._export_folder_scan_report(folder, ordered, total_files),
                   bg=self.button_bg, fg=self.fg_color, font=("Arial", 10),
                   width=15).pack(side=tk.RIGHT, padx=5)
-        tk.Button(btn_frame, text="Close", command=dialog.destroy,
+        tk.Button(btn_frame, text="Close", command=close,
                   bg=self.button_bg, fg=self.fg_color, font=("Arial", 10),
                   width=10).pack(side=tk.RIGHT, padx=5)
+        cancel_btn = None
+        if cancel_event is not None:
+            cancel_btn = tk.Button(btn_frame, text="Cancel Scan", command=cancel_scan,
+                                   bg="#D32F2F", fg=self.fg_color, font=("Arial", 10, "bold"),
+                                   width=12)
+            cancel_btn.pack(side=tk.RIGHT, padx=5)
+        dialog.protocol("WM_DELETE_WINDOW", close)
+
+        def finish():
+            state['finished'] = True
+            if cancel_btn is not None:
+                cancel_btn.pack_forget()
+            update_summary()
 
-    def _export_folder_scan_report(self, folder, all_results):
-        """Save a plain-text folder scan report to a file chosen by the user."""
+        add_results(all_results)
+        return add_results, finish
+
+    def _export_folder_scan_report(self, folder, all_results, total_files=None):
+        """Save a plain-text folder scan report (most severe files first) to a file chosen by the user."""
         from tkinter import filedialog as fd
         from datetime import datetime
 
@@ -6086,6 +6323,7 @@ class GCodeDatabaseGUI:
         if not save_path:
             return
 
+        all_results = sorted(all_results, key=scan_severity)
         total = len(all_results)
         passed = sum(1 for r in all_results if not r.get('errors') and not r.get('warnings'))
         with_warnings = sum(1 for r in all_results if not r.get('errors') and r.get('warnings'))
@@ -6102,6 +6340,10 @@ class GCodeDatabaseGUI:
             f"Pass        : {passed}",
             f"Warnings    : {with_warnings}",
             f"Errors      : {with_errors}",
+        ]
+        if total_files is not None and total < total_files:
+            lines.append(f"Not scanned : {total_files - total} (scan cancelled)")
+        lines += [
             "",
             "FILE DETAILS",
             "------------",
@@ -6128,6 +6370,8 @@ class GCodeDatabaseGUI:
                 f"Program : {prog_num}",
                 f"Status  : {status}",
             ]
+            if result.get('stored_program'):
+                lines.append(f"Source  : stored results of {result['stored_program']} (identical content)")
             if errors:
                 lines.append("ERRORS:")
                 for e in errors:
@@ -6182,6 +6426,13 @@ class GCodeDatabaseGUI:
         except Exception as e:
             logger.error(f"Error updating internal program number: {e}", exc_info=True)
 
+    def _get_repository_audit(self):
+        """Repository audit for the current database and repository folder"""
+        audit = getattr(self, '_repository_audit', None)
+        if audit is None or audit.db_path != self.db_path or audit.repository_path != str(self.repository_path):
+            audit = self._repository_audit = RepositoryAudit(self.db_path, self.repository_path)
+        return audit
+
     def verify_repository_integrity(self, fix_issues=False):
         """
         Comprehensive integrity check between filesystem and database.
@@ -6197,8 +6448,6 @@ class GCodeDatabaseGUI:
                 'fixed': dict                 # What was fixed (if fix_issues=True)
             }
         """
-        import glob
-
         result = {
             'untracked_files': [],
             'orphaned_records': [],
@@ -6212,95 +6461,58 @@ class GCodeDatabaseGUI:
 
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            # Get all file_paths from database (managed files only)
-            cursor.execute("""
-                SELECT program_number, file_path
-                FROM programs
-                WHERE is_managed = 1 AND file_path IS NOT NULL
-            """)
-            db_records = {row[1].lower(): row[0] for row in cursor.fetchall() if row[1]}
-
-            # Get all files in repository
-            repo_files = glob.glob(os.path.join(self.repository_path, '*'))
-            repo_files = [f for f in repo_files if os.path.isfile(f)]
-
-            # Find untracked files (in repo but not in DB)
-            for file_path in repo_files:
-                if file_path.lower() not in db_records:
-                    # Skip non-gcode files
-                    import re
-                    if re.match(r'^[oO]\d{4,}', os.path.basename(file_path)):
-                        result['untracked_files'].append(file_path)
-
-            # Find orphaned records (in DB but file missing)
-            for file_path_lower, prog_num in db_records.items():
-                if not os.path.exists(file_path_lower):
-                    # Try case-insensitive check
-                    found = False
-                    for repo_file in repo_files:
-                        if repo_file.lower() == file_path_lower:
-                            found = True
-                            break
-                    if not found:
-                        result['orphaned_records'].append({
-                            'program_number': prog_num,
-                            'file_path': file_path_lower
-                        })
-
-            # Check registry sync
-            cursor.execute("""
-                SELECT program_number, file_path, status
-                FROM program_number_registry
-                WHERE status = 'IN_USE'
-            """)
-            for prog_num, reg_path, status in cursor.fetchall():
-                if reg_path and not os.path.exists(reg_path):
-                    result['registry_stale'].append({
-                        'program_number': prog_num,
-                        'file_path': reg_path
-                    })
+            # Untracked files, records with missing files and stale registry
+            # entries all come from one repository audit
+            # Fixes act on the findings, so they get a fresh audit
+            audit = self._get_repository_audit()
+            if fix_issues:
+                audit.run()
+            else:
+                audit.ensure_fresh()
+            result['untracked_files'] = [f['file_path'] for f in audit.findings(UNTRACKED_FILE, refresh=False)]
+            result['orphaned_records'] = [{'program_number': f['program_number'], 'file_path': f['file_path']}
+                                          for f in audit.findings(MISSING_FILE, refresh=False)]
+            result['registry_stale'] = [{'program_number': f['program_number'], 'file_path': f['file_path']}
+                                        for f in audit.findings(REGISTRY_STALE, refresh=False)]
+
+            # Fix issues if requested (one write lease for all fixes)
+            if fix_issues:
+                with self._write_lease_batch("repository_integrity_fix") as proceed:
+                    if not proceed:
+                        return result
 
-            # Close connection before fix operations to avoid nested connections
-            conn.close()
-            conn = None
+                    # Add untracked files
+                    for file_path in result['untracked_files']:
+                        import_result = self.process_new_file(file_path, import_mode='repository')
+                        if import_result['success']:
+                            result['fixed']['files_added'] += 1
 
-            # Fix issues if requested
-            if fix_issues:
-                # Add untracked files
-                for file_path in result['untracked_files']:
-                    import_result = self.process_new_file(file_path, import_mode='repository')
-                    if import_result['success']:
-                        result['fixed']['files_added'] += 1
-
-                # Remove orphaned records - use single connection for batch
-                if result['orphaned_records'] or result['registry_stale']:
-                    conn = sqlite3.connect(self.db_path, timeout=30.0)
-                    cursor = conn.cursor()
+                    # Remove orphaned records - use single connection for batch
+                    if result['orphaned_records'] or result['registry_stale']:
+                        conn = sqlite3.connect(self.db_path, timeout=30.0)
+                        cursor = conn.cursor()
 
-                    for orphan in result['orphaned_records']:
-                        cursor.execute("DELETE FROM programs WHERE program_number = ?",
-                                     (orphan['program_number'],))
-                        result['fixed']['records_removed'] += 1
+                        for orphan in result['orphaned_records']:
+                            cursor.execute("DELETE FROM programs WHERE program_number = ?",
+                                         (orphan['program_number'],))
+                            result['fixed']['records_removed'] += 1
 
-                    # Fix stale registry entries
-                    for stale in result['registry_stale']:
-                        cursor.execute("""
-                            UPDATE program_number_registry
-                            SET status = 'AVAILABLE', file_path = NULL
-                            WHERE program_number = ?
-                        """, (stale['program_number'],))
-                        result['fixed']['registry_updated'] += 1
+                        # Fix stale registry entries
+                        for stale in result['registry_stale']:
+                            cursor.execute("""
+                                UPDATE program_number_registry
+                                SET status = 'AVAILABLE', file_path = NULL
+                                WHERE program_number = ?
+                            """, (stale['program_number'],))
+                            result['fixed']['registry_updated'] += 1
 
-                    conn.commit()
-                    conn.close()
-                    conn = None
+                        conn.commit()
+                        conn.close()
+                        conn = None
 
-                # Sync registry for removed orphans (separate connections)
-                for orphan in result['orphaned_records']:
-                    self.sync_registry_for_operation('REMOVE', orphan['program_number'])
+                    # Sync registry for removed orphans (separate connections)
+                    for orphan in result['orphaned_records']:
+                        self.sync_registry_for_operation('REMOVE', orphan['program_number'])
 
             return result
 
@@ -6314,26 +6526,24 @@ class GCodeDatabaseGUI:
             if conn:
                 conn.close()
 
-    def check_missing_m30(self, file_path):
+    def check_missing_m30(self, file_path, content=None):
         """
         Check if a G-code file is missing the M30 program end code.
 
         Args:
             file_path: Path to the G-code file
+            content: FileContent already read for file_path (optional)
 
         Returns:
             bool: True if M30 is missing, False if present
         """
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read().upper()
+            if content is None:
+                content = FileContent.read(file_path)
 
             # Check for M30 (program end) or M02 (program stop - also acceptable)
             # Should be near the end of the file
-            last_500_chars = content[-500:] if len(content) > 500 else content
-
-            has_m30 = 'M30' in last_500_chars or 'M02' in last_500_chars
-            return not has_m30
+            return content.missing_program_end()
 
         except OSError as e:
             logger.warning(f"File read error checking M30 in {file_path}: {e}")
@@ -6349,36 +6559,12 @@ class GCodeDatabaseGUI:
         Returns:
             list: List of dicts with program_number, title, file_path
         """
-        missing = []
-
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT program_number, title, file_path
-                FROM programs
-                WHERE file_path IS NOT NULL AND is_managed = 1
-            """)
-
-            for prog_num, title, file_path in cursor.fetchall():
-                if file_path and os.path.exists(file_path):
-                    if self.check_missing_m30(file_path):
-                        missing.append({
-                            'program_number': prog_num,
-                            'title': title,
-                            'file_path': file_path
-                        })
-
-            conn.close()
-            return missing
-
+            return [{'program_number': f['program_number'], 'title': f['title'], 'file_path': f['file_path']}
+                    for f in self._get_repository_audit().findings(MISSING_M30)]
         except sqlite3.Error as e:
             logger.error(f"Database error finding missing M30 programs: {e}")
-            return missing
-        except Exception as e:
-            logger.error(f"Error finding missing M30 programs: {e}", exc_info=True)
-            return missing
+            return []
 
     def find_duplicate_internal_onumbers(self):
         """
@@ -6396,55 +6582,17 @@ class GCodeDatabaseGUI:
             'duplicates': {}
         }
 
-        internal_numbers = {}  # {internal_number: [(prog_num, file_path), ...]}
-
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT program_number, file_path
-                FROM programs
-                WHERE file_path IS NOT NULL AND is_managed = 1
-            """)
-
-            for prog_num, file_path in cursor.fetchall():
-                if not file_path or not os.path.exists(file_path):
-                    continue
-
-                internal_num = self.extract_internal_program_number(file_path)
-                if not internal_num:
-                    continue
-
-                # Check for mismatch between filename and internal number
-                if internal_num.lower() != prog_num.lower():
-                    result['mismatched'].append({
-                        'program_number': prog_num,
-                        'internal_number': internal_num,
-                        'file_path': file_path
-                    })
-
-                # Track for duplicate detection
-                if internal_num.lower() not in internal_numbers:
-                    internal_numbers[internal_num.lower()] = []
-                internal_numbers[internal_num.lower()].append((prog_num, file_path))
-
-            # Find duplicates (same internal number in multiple files)
-            for internal_num, files in internal_numbers.items():
-                if len(files) > 1:
-                    result['duplicates'][internal_num] = [
-                        {'program_number': f[0], 'file_path': f[1]} for f in files
-                    ]
-
-            conn.close()
+            audit = self._get_repository_audit()
+            result['mismatched'] = audit.findings(INTERNAL_MISMATCH)
+            for f in audit.findings(INTERNAL_DUPLICATE, refresh=False):
+                result['duplicates'].setdefault(f['internal_number'], []).append(
+                    {'program_number': f['program_number'], 'file_path': f['file_path']})
             return result
 
         except sqlite3.Error as e:
             logger.error(f"Database error finding duplicate internal O-numbers: {e}")
             return result
-        except Exception as e:
-            logger.error(f"Error finding duplicate internal O-numbers: {e}", exc_info=True)
-            return result
 
     def find_stale_records(self):
         """
@@ -6453,52 +6601,11 @@ class GCodeDatabaseGUI:
         Returns:
             list: List of dicts with program_number, db_modified, file_modified, file_path
         """
-        from datetime import datetime, timedelta
-        stale = []
-
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT program_number, last_modified, file_path
-                FROM programs
-                WHERE file_path IS NOT NULL AND is_managed = 1
-            """)
-
-            for prog_num, db_modified, file_path in cursor.fetchall():
-                if not file_path or not os.path.exists(file_path):
-                    continue
-
-                try:
-                    file_mtime = os.path.getmtime(file_path)
-                    file_modified = datetime.fromtimestamp(file_mtime).isoformat()
-
-                    # Compare timestamps
-                    if db_modified:
-                        db_time = datetime.fromisoformat(db_modified.replace('Z', '+00:00').split('+')[0])
-                        file_time = datetime.fromtimestamp(file_mtime)
-
-                        # File is newer than DB record by more than 1 second
-                        if file_time > db_time + timedelta(seconds=1):
-                            stale.append({
-                                'program_number': prog_num,
-                                'db_modified': db_modified,
-                                'file_modified': file_modified,
-                                'file_path': file_path
-                            })
-                except (ValueError, OSError):
-                    continue
-
-            conn.close()
-            return stale
-
+            return self._get_repository_audit().findings(STALE_RECORD)
         except sqlite3.Error as e:
             logger.error(f"Database error finding stale records: {e}")
-            return stale
-        except Exception as e:
-            logger.error(f"Error finding stale records: {e}", exc_info=True)
-            return stale
+            return []
 
     def find_zero_byte_files(self):
         """
@@ -6507,47 +6614,11 @@ class GCodeDatabaseGUI:
         Returns:
             list: List of dicts with program_number, file_path, in_database
         """
-        zero_byte = []
-
         try:
-            import glob
-
-            # Get all files in repository
-            repo_files = glob.glob(os.path.join(self.repository_path, '*'))
-
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            for file_path in repo_files:
-                if not os.path.isfile(file_path):
-                    continue
-
-                try:
-                    if os.path.getsize(file_path) == 0:
-                        # Check if in database
-                        filename = os.path.basename(file_path)
-                        prog_num = os.path.splitext(filename)[0].lower()
-
-                        cursor.execute("SELECT 1 FROM programs WHERE LOWER(program_number) = ?", (prog_num,))
-                        in_db = cursor.fetchone() is not None
-
-                        zero_byte.append({
-                            'program_number': prog_num,
-                            'file_path': file_path,
-                            'in_database': in_db
-                        })
-                except OSError:
-                    continue
-
-            conn.close()
-            return zero_byte
-
+            return self._get_repository_audit().findings(ZERO_BYTE)
         except sqlite3.Error as e:
             logger.error(f"Database error finding zero-byte files: {e}")
-            return zero_byte
-        except Exception as e:
-            logger.error(f"Error finding zero-byte files: {e}", exc_info=True)
-            return zero_byte
+            return []
 
     def run_extended_integrity_check(self, fix_issues=False):
         """
@@ -6567,6 +6638,7 @@ class GCodeDatabaseGUI:
             'duplicate_internal_numbers': {'mismatched': [], 'duplicates': {}},
             'stale_records': [],
             'zero_byte_files': [],
+            'exact_duplicates': {},
             'fixed': {
                 'stale_refreshed': 0,
                 'zero_byte_removed': 0
@@ -6579,8 +6651,17 @@ class GCodeDatabaseGUI:
         }
 
         try:
+            # One audit pass serves every check below (with fix_issues,
+            # verify_repository_integrity runs it before fixing anything)
+            audit = self._get_repository_audit()
+            if not fix_issues:
+                audit.run()
+
             # Run basic integrity check
             result['basic'] = self.verify_repository_integrity(fix_issues=fix_issues)
+            if fix_issues and any(result['basic']['fixed'].values()):
+                # Files were added / records removed - re-audit (unchanged files come from the cache)
+                audit.run()
 
             # Check for missing M30
             result['missing_m30'] = self.find_missing_m30_programs()
@@ -6594,39 +6675,37 @@ class GCodeDatabaseGUI:
             # Check for zero-byte files
             result['zero_byte_files'] = self.find_zero_byte_files()
 
+            # Repository files with identical content
+            for f in audit.findings(EXACT_DUPLICATE):
+                result['exact_duplicates'].setdefault(f['sha256'], []).append(f['file_path'])
+
             # Fix issues if requested
             if fix_issues:
-                # Refresh stale records
+                # Refresh stale records that still parse
+                refreshed = []
                 for stale in result['stale_records']:
                     try:
-                        # Re-parse and update the file
-                        parse_result = self.parser.parse_file(stale['file_path'])
-                        if parse_result:
-                            conn = sqlite3.connect(self.db_path, timeout=30.0)
-                            cursor = conn.cursor()
-                            cursor.execute("""
-                                UPDATE programs SET last_modified = ?
-                                WHERE program_number = ?
-                            """, (datetime.now().isoformat(), stale['program_number']))
-                            conn.commit()
-                            conn.close()
-                            result['fixed']['stale_refreshed'] += 1
-                    except:
+                        if self.parser.parse_file(stale['file_path']):
+                            refreshed.append(stale['program_number'])
+                    except Exception:
                         pass
 
                 # Remove zero-byte files from database (but don't delete files - user should decide)
-                for zb in result['zero_byte_files']:
-                    if zb['in_database']:
-                        try:
-                            conn = sqlite3.connect(self.db_path, timeout=30.0)
-                            cursor = conn.cursor()
-                            cursor.execute("DELETE FROM programs WHERE LOWER(program_number) = ?",
-                                         (zb['program_number'].lower(),))
-                            conn.commit()
-                            conn.close()
-                            result['fixed']['zero_byte_removed'] += 1
-                        except:
-                            pass
+                zero_byte = [zb['program_number'].lower() for zb in result['zero_byte_files'] if zb['in_database']]
+
+                if refreshed or zero_byte:
+                    conn = sqlite3.connect(self.db_path, timeout=30.0)
+                    try:
+                        with conn:
+                            now = datetime.now().isoformat()
+                            conn.executemany("UPDATE programs SET last_modified = ? WHERE program_number = ?",
+                                             [(now, prog_num) for prog_num in refreshed])
+                            conn.executemany("DELETE FROM programs WHERE LOWER(program_number) = ?",
+                                             [(prog_num,) for prog_num in zero_byte])
+                        result['fixed']['stale_refreshed'] = len(refreshed)
+                        result['fixed']['zero_byte_removed'] = len(zero_byte)
+                    finally:
+                        conn.close()
 
             # Calculate summary
             result['summary']['critical'] = (
@@ -6636,7 +6715,8 @@ class GCodeDatabaseGUI:
             result['summary']['warnings'] = (
                 len(result['missing_m30']) +
                 len(result['stale_records']) +
-                len(result['duplicate_internal_numbers']['mismatched'])
+                len(result['duplicate_internal_numbers']['mismatched']) +
+                len(result['exact_duplicates'])
             )
             result['summary']['total_issues'] = (
                 result['summary']['critical'] + result['summary']['warnings']
@@ -6728,192 +6808,44 @@ class GCodeDatabaseGUI:
                 - legacy_name_added: bool
                 - error: str (if failed)
         """
-        from datetime import datetime
-        import json
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            # Get program info
-            cursor.execute("""
-                SELECT round_size, file_path, title, legacy_names
-                FROM programs
-                WHERE program_number = ?
-            """, (program_number,))
-
-            result = cursor.fetchone()
-            if not result:
-                return {'success': False, 'error': f'Program {program_number} not found'}
-
-            round_size, file_path, title, legacy_names = result
-
-            if not round_size:
-                return {'success': False, 'error': f'Program {program_number} has no detected round size'}
-
-            # Check if already in correct range
-            if self.is_in_correct_range(program_number, round_size):
-                return {'success': False, 'error': f'Program {program_number} is already in correct range'}
-
-            # Find next available number in correct range
-            new_number = self.find_next_available_number(round_size)
-            if not new_number:
-                return {'success': False, 'error': f'No available numbers in range for round size {round_size}'}
+            plan = self._rename_planner().plan_out_of_range([program_number])
+            item = plan[0]
+            if item['status'] != STATUS_READY:
+                return {'success': False, 'error': item['error']}
 
             if dry_run:
-                conn.close()
                 return {
                     'success': True,
                     'dry_run': True,
                     'old_number': program_number,
-                    'new_number': new_number,
-                    'round_size': round_size,
-                    'file_path': file_path,
-                    'title': title
+                    'new_number': item['new_number'],
+                    'round_size': item['round_size'],
+                    'file_path': item['old_file_path'],
+                    'title': item['title']
                 }
 
-            # Update legacy names
-            if legacy_names:
-                try:
-                    legacy_list = json.loads(legacy_names)
-                except:
-                    legacy_list = []
-            else:
-                legacy_list = []
-
-            legacy_list.append({
-                'old_number': program_number,
-                'renamed_date': datetime.now().isoformat(),
-                'reason': 'Out of range - moved to correct range'
-            })
-
-            # Read file content
-            if not os.path.exists(file_path):
-                conn.close()
-                return {'success': False, 'error': f'File not found: {file_path}'}
-
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-
-            # Update program number in file content
-            import re
-
-            # Strip any suffix from old program number for matching internal content
-            # Database might have o00002(1) or o00002_1, but file content has O00002
-            old_num_plain = program_number.replace('o', '').replace('O', '')
-            # Remove any suffix patterns: (1), (2), _1, _2, etc.
-            old_num_base = re.sub(r'[(_]\d+[\)]?$', '', old_num_plain)
-
-            new_num_plain = new_number.replace('o', '').replace('O', '')
-
-            # Replace program number (common patterns)
-            updated_content = content
-
-            # Pattern 1: O12345 or o12345 at start of line
-            # Use the BASE number without suffix to match file content
-            updated_content = re.sub(
-                rf'^[oO]{old_num_base}\b',
-                new_number.upper(),
-                updated_content,
-                flags=re.MULTILINE
-            )
-
-            # Pattern 2: In program number comments
-            # Use the BASE number without suffix to match file content
-            updated_content = re.sub(
-                rf'\b[oO]{old_num_base}\b',
-                new_number.upper(),
-                updated_content
-            )
-
-            # Add legacy comment at top of file (after first line if it's a program number)
-            lines = updated_content.split('\n')
-            legacy_comment = f"(RENAMED FROM {program_number.upper()} ON {datetime.now().strftime('%Y-%m-%d')} - OUT OF RANGE)"
-
-            # Insert after the program number line
-            if len(lines) > 0:
-                lines.insert(1, legacy_comment)
-            else:
-                lines.insert(0, legacy_comment)
-
-            updated_content = '\n'.join(lines)
-
-            # Generate new file path with new program number
-            old_dir = os.path.dirname(file_path)
-            new_filename = f"{new_number}.nc"
-            new_file_path = os.path.join(old_dir, new_filename)
-
-            # Write updated content to new file
-            with open(new_file_path, 'w', encoding='utf-8') as f:
-                f.write(updated_content)
-
-            # Delete old file if new file was created successfully
-            if os.path.exists(new_file_path) and os.path.exists(file_path):
-                os.remove(file_path)
-
-            # Update database - programs table with new file path
-            cursor.execute("""
-                UPDATE programs
-                SET program_number = ?,
-                    file_path = ?,
-                    legacy_names = ?,
-                    last_renamed_date = ?,
-                    rename_reason = 'Out of range correction',
-                    in_correct_range = 1
-                WHERE program_number = ?
-            """, (new_number, new_file_path, json.dumps(legacy_list), datetime.now().isoformat(), program_number))
-
-            # Update registry - mark old number as available
-            cursor.execute("""
-                UPDATE program_number_registry
-                SET status = 'AVAILABLE',
-                    file_path = NULL
-                WHERE program_number = ?
-            """, (program_number,))
-
-            # Update registry - mark new number as in use with new file path
-            cursor.execute("""
-                UPDATE program_number_registry
-                SET status = 'IN_USE',
-                    file_path = ?
-                WHERE program_number = ?
-            """, (new_file_path, new_number))
-
-            # Log resolution in duplicate_resolutions table
-            cursor.execute("""
-                INSERT INTO duplicate_resolutions
-                (resolution_date, duplicate_type, program_numbers, action_taken,
-                 files_affected, old_values, new_values, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                datetime.now().isoformat(),
-                'TYPE_1_OUT_OF_RANGE',
-                json.dumps([program_number, new_number]),
-                'RENAME',
-                json.dumps([{'old': file_path, 'new': new_file_path}]),
-                json.dumps({'program_number': program_number, 'round_size': round_size, 'old_file': file_path}),
-                json.dumps({'program_number': new_number, 'round_size': round_size, 'new_file': new_file_path}),
-                f'Renamed from {program_number} to {new_number} - file renamed from {os.path.basename(file_path)} to {new_filename}'
-            ))
-
-            conn.commit()
-            conn.close()
+            result = self._execute_rename_plan(plan, "rename_to_correct_range")
+            if not result['renamed']:
+                return {'success': False, 'error': f"Rename failed: {result['failed'][0]['error']}"}
 
             return {
                 'success': True,
                 'old_number': program_number,
-                'new_number': new_number,
-                'round_size': round_size,
-                'file_path': new_file_path,
-                'old_file_path': file_path,
-                'new_file_path': new_file_path,
-                'title': title,
+                'new_number': item['new_number'],
+                'round_size': item['round_size'],
+                'file_path': item['new_file_path'],
+                'old_file_path': item['old_file_path'],
+                'new_file_path': item['new_file_path'],
+                'title': item['title'],
                 'legacy_name_added': True
             }
 
         except Exception as e:
             return {'success': False, 'error': f'Rename failed: {str(e)}'}
 
-    def batch_resolve_out_of_range(self, program_numbers=None, dry_run=False, progress_callback=None):
+    def batch_resolve_out_of_range(self, program_numbers=None, dry_run=False, progress_callback=None,
+                                   plan=None):
         """
         Batch rename programs that are out of range.
 
@@ -6921,51 +6853,42 @@ class GCodeDatabaseGUI:
             program_numbers: List of specific programs to rename, or None for all out-of-range
             dry_run: If True, simulate without making changes
             progress_callback: Function to call with progress updates
+            plan: Items from preview_rename_plan() to execute as previewed
+                (planned afresh when None)
 
         Returns:
             dict: Statistics about the batch operation
         """
         try:
-            # Get programs to process
-            if program_numbers:
-                programs_to_process = program_numbers
-            else:
-                out_of_range = self.get_out_of_range_programs()
-                programs_to_process = [prog[0] for prog in out_of_range]  # Extract program numbers
+            if plan is None:
+                plan = self._rename_planner().plan_out_of_range(program_numbers)
 
-            total = len(programs_to_process)
             stats = {
-                'total': total,
+                'total': len(plan),
                 'successful': 0,
                 'failed': 0,
-                'skipped': 0,
+                'skipped': sum(1 for item in plan if item['status'] == STATUS_SKIPPED),
                 'errors': [],
                 'renames': []
             }
 
-            for i, prog_num in enumerate(programs_to_process):
-                if progress_callback:
-                    progress_callback(i + 1, total, prog_num)
-
-                result = self.rename_to_correct_range(prog_num, dry_run=dry_run)
-
-                if result['success']:
-                    stats['successful'] += 1
-                    stats['renames'].append({
-                        'old': result['old_number'],
-                        'new': result['new_number'],
-                        'round_size': result['round_size'],
-                        'file': result.get('file_path', '')
-                    })
-                elif 'already in correct range' in result.get('error', ''):
-                    stats['skipped'] += 1
-                else:
-                    stats['failed'] += 1
-                    stats['errors'].append({
-                        'program': prog_num,
-                        'error': result.get('error', 'Unknown error')
-                    })
-
+            done = [item for item in plan if item['status'] == STATUS_READY]
+            failed = [item for item in plan if item['status'] not in (STATUS_READY, STATUS_SKIPPED)]
+            if not dry_run and done:
+                result = self._execute_rename_plan(done, "batch_rename", progress_callback)
+                done = result['renamed']
+                failed += result['failed']
+
+            stats['successful'] = len(done)
+            stats['failed'] = len(failed)
+            stats['renames'] = [{
+                'old': item['old_number'],
+                'new': item['new_number'],
+                'round_size': item['round_size'],
+                'file': item['new_file_path'] or ''
+            } for item in done]
+            stats['errors'] = [{'program': item['old_number'], 'error': item['error'] or 'Unknown error'}
+                               for item in failed]
             return stats
 
         except Exception as e:
@@ -6981,94 +6904,21 @@ class GCodeDatabaseGUI:
     def preview_rename_plan(self, limit=None):
         """
         Preview what would happen if we renamed all out-of-range programs.
-        This is a dry-run of the batch resolution.
+
+        The preview is the rename plan itself: numbers are handed out from one
+        snapshot, so no two programs get the same number, and the plan can be
+        passed to batch_resolve_out_of_range() to execute exactly what was shown.
 
         Args:
             limit: Maximum number of programs to preview (None = all)
 
         Returns:
-            list: Preview data with old number, new number, round size, title
+            list: Plan items with old_number, new_number (None when no number
+                could be assigned), round_size, current_range, correct_range,
+                title, status ('Ready' or 'Error: ...')
         """
         try:
-            out_of_range = self.get_out_of_range_programs()
-
-            if limit:
-                out_of_range = out_of_range[:limit]
-
-            preview = []
-            # Track which numbers we've already assigned in this batch
-            # to prevent conflicts where multiple programs get assigned the same number
-            assigned_in_batch = set()
-
-            for prog_num, round_size, current_range, correct_range, title in out_of_range:
-                # Find what the new number would be
-                new_number = self.find_next_available_number(round_size)
-
-                # If this number was already assigned in this batch, find the next one
-                while new_number and new_number in assigned_in_batch:
-                    # Get the numeric part of the new_number
-                    try:
-                        current_num = int(new_number.replace('o', '').replace('O', ''))
-                        range_info = self.get_range_for_round_size(round_size)
-                        if not range_info:
-                            new_number = None
-                            break
-
-                        range_start, range_end = range_info
-
-                        # Try the next sequential number
-                        next_num = current_num + 1
-                        if next_num > range_end:
-                            # Range is full
-                            new_number = None
-                            break
-
-                        # Check if this next number is available in the registry
-                        conn = sqlite3.connect(self.db_path)
-                        cursor = conn.cursor()
-                        cursor.execute("""
-                            SELECT status FROM program_number_registry
-                            WHERE program_number = ?
-                        """, (self.format_program_number(next_num),))
-                        result = cursor.fetchone()
-                        conn.close()
-
-                        if result and result[0] == 'AVAILABLE':
-                            new_number = self.format_program_number(next_num)
-                        else:
-                            # This number is also taken, keep searching
-                            current_num = next_num
-                            new_number = self.format_program_number(current_num)
-                    except Exception:
-                        new_number = None
-                        break
-
-                if new_number:
-                    # Mark this number as assigned in this batch
-                    assigned_in_batch.add(new_number)
-
-                    preview.append({
-                        'old_number': prog_num,
-                        'new_number': new_number,
-                        'round_size': round_size,
-                        'current_range': current_range,
-                        'correct_range': correct_range,
-                        'title': title,
-                        'status': 'Ready'
-                    })
-                else:
-                    preview.append({
-                        'old_number': prog_num,
-                        'new_number': 'NO SPACE',
-                        'round_size': round_size,
-                        'current_range': current_range,
-                        'correct_range': correct_range,
-                        'title': title,
-                        'status': 'Error: No available numbers'
-                    })
-
-            return preview
-
+            return self._rename_planner().plan_out_of_range(limit=limit)
         except Exception as e:
             messagebox.showerror("Preview Error", f"Failed to generate preview:\n{str(e)}")
             return []
@@ -7105,7 +6955,14 @@ class GCodeDatabaseGUI:
 
             # Configurable paths (empty = use default next to app)
             "db_path": "",
-            "repository_path": ""
+            "repository_path": "",
+
+            # Local replica + changeset sync (db_path is the shared database
+            # used to seed the replica)
+            "replica_enabled": False,
+            "replica_db_path": "",
+            "replica_sync_folder": "",
+            "replica_sync_interval": 30
         }
 
         if os.path.exists(self.config_file):
@@ -7248,31 +7105,19 @@ class GCodeDatabaseGUI:
         style.configure('TScrollbar', background=self.button_bg, troughcolor=self.bg_color)
 
     def _update_error_filter_counts(self):
-        """Refresh the Error Contains combobox to show (N) hit counts from the DB."""
+        """Refresh the Error Contains combobox to show (N) program counts per issue type."""
         if not hasattr(self, '_error_filter_keywords') or not hasattr(self, 'filter_error_text'):
             return
         try:
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            sync_program_issues(conn)
+            counts = issue_counts(conn.cursor())
+            conn.close()
 
             new_values = []
-            for kw in self._error_filter_keywords:
-                if not kw:
-                    new_values.append("")
-                    continue
-                search = f"%{kw}%"
-                cursor.execute(
-                    "SELECT COUNT(*) FROM programs WHERE ("
-                    "validation_issues LIKE ? OR validation_warnings LIKE ? "
-                    "OR bore_warnings LIKE ? OR dimensional_issues LIKE ? "
-                    "OR tool_home_issues LIKE ? OR crash_issues LIKE ? "
-                    "OR crash_warnings LIKE ?)",
-                    [search] * 7
-                )
-                count = cursor.fetchone()[0]
-                new_values.append(f"{kw} ({count})" if count > 0 else kw)
-
-            conn.close()
+            for label in self._error_filter_keywords:
+                count = counts.get(code_for_label(label), 0) if label else 0
+                new_values.append(f"{label} ({count})" if count > 0 else label)
 
             # Preserve current selection (strip suffix before comparing)
             current_raw = re.sub(r'\s*\(\d+\)$', '', self.filter_error_text.get())
@@ -7782,6 +7627,9 @@ class GCodeDatabaseGUI:
                 tk.Button(g, text="🔍 Scan Folder\nfor Issues", command=self.scan_folder_for_issues,
                          bg="#6A1B9A", fg=self.fg_color, font=("Arial", 9, "bold"),
                          width=14, height=2).pack(side=tk.LEFT, padx=3)
+                tk.Button(g, text="💾 Import\nMemory Dump", command=self.import_memory_dump_dialog,
+                         bg="#00695C", fg=self.fg_color, font=("Arial", 9, "bold"),
+                         width=14, height=2).pack(side=tk.LEFT, padx=3)
             tk.Button(g, text="📁 Scan Folder", command=self.scan_folder,
                      bg=self.button_bg, fg=self.fg_color, font=("Arial", 9, "bold"),
                      width=14, height=2).pack(side=tk.LEFT, padx=3)
@@ -7843,6 +7691,9 @@ class GCodeDatabaseGUI:
             tk.Button(g, text="🔩 Tool Positions", command=self.scan_tool_change_positions,
                      bg="#FF5722", fg=self.fg_color, font=("Arial", 9, "bold"),
                      width=14, height=2).pack(side=tk.LEFT, padx=3)
+            tk.Button(g, text="⏱️ Cycle Times", command=self.compute_cycle_times,
+                     bg="#00838F", fg=self.fg_color, font=("Arial", 9, "bold"),
+                     width=14, height=2).pack(side=tk.LEFT, padx=3)
             tk.Button(g, text="❓ Legend/Help", command=self.show_legend,
                      bg=self.button_bg, fg=self.fg_color, font=("Arial", 9, "bold"),
                      width=14, height=2).pack(side=tk.LEFT, padx=3)
@@ -7931,6 +7782,12 @@ class GCodeDatabaseGUI:
             tk.Button(g, text="🗑 Deleted/Archived", command=self.open_archived_files_browser,
                      bg="#E91E63", fg=self.fg_color, font=("Arial", 9, "bold"),
                      width=14, height=2).pack(side=tk.LEFT, padx=3)
+            tk.Button(g, text="⏱️ Startup Times", command=self.show_startup_timings,
+                     bg=self.button_bg, fg=self.fg_color, font=("Arial", 9, "bold"),
+                     width=14, height=2).pack(side=tk.LEFT, padx=3)
+            tk.Button(g, text="🔄 Replica Sync", command=self.show_replica_sync_status,
+                     bg=self.button_bg, fg=self.fg_color, font=("Arial", 9, "bold"),
+                     width=14, height=2).pack(side=tk.LEFT, padx=3)
 
         # ── Register tabs (permission-gated) ─────────────────────────────
         _tab('files',       '📂 Files',        build_files)
@@ -8112,64 +7969,9 @@ class GCodeDatabaseGUI:
         tk.Label(row2_6, text="Error Contains:", bg=self.bg_color, fg=self.fg_color,
                 font=("Arial", 9, "bold")).pack(side=tk.LEFT, padx=5)
 
-        # Combobox with common error types (editable for custom searches)
-        common_errors = [
-            "",  # Empty for "all"
-            # --- Crash / Safety ---
-            "CRASH RISK",
-            "Diagonal rapid",
-            "Z before G53",
-            "JAW CLEARANCE",
-            "BORE CHAMFER CRASH",
-            # --- Turning / OD ---
-            "Hub face plunge",
-            "exceeds standard depth",
-            "OUT OF COMMON PRACTICE",
-            # --- Work Offset ---
-            "no work offset",
-            # --- Dimensional / Title ---
-            "THICKNESS ERROR",
-            "TITLE MISLABELED",
-            "P-CODE MISMATCH",
-            "FILENAME MISMATCH",
-            "CB TOO LARGE",
-            "CB TOO SMALL",
-            "OB TOO LARGE",
-            "OB TOO SMALL",
-            "OD MISMATCH",
-            # --- 2PC ---
-            "2PC ring size",
-            "2PC LUG recess",
-            # --- Steel Ring ---
-            "Steel ring",
-            # --- Hub / Bore ---
-            "HUB BREAK-THROUGH",
-            "Counterbore",
-            "DRILL",
-            "CHAMFER",
-            "STEP",
-            "HUB",
-            "BORE",
-            # --- Tool Home ---
-            "G53",
-            "TOOL_HOME",
-            "Z-16",
-            "Z-13",
-            "Z-11",
-            "Z-9",
-            # --- Haas Validation ---
-            "G00 and G01",
-            "G01 without feedrate",
-            "G96",
-            "G50",
-            "M08",
-            "M09",
-            "M05",
-            "M30",
-            "decimal point",
-            "coolant",
-        ]
-        # Store raw keywords so _update_error_filter_counts can add (N) suffixes
+        # Combobox with issue types from program_issues (editable for custom text searches)
+        common_errors = [""] + list(ISSUE_LABELS.values())  # Empty for "all"
+        # Store raw labels so _update_error_filter_counts can add (N) suffixes
         self._error_filter_keywords = common_errors
         # Longest keyword + counter suffix: "exceeds standard depth (2121)" = 29 chars
         self.filter_error_text = ttk.Combobox(row2_6, values=common_errors, width=30)
@@ -8638,8 +8440,8 @@ class GCodeDatabaseGUI:
             files_to_add.append((filepath, filename, content))
 
         # Process files to add
-        if files_to_add:
-            self._import_files(files_to_add, warnings)
+        if files_to_add and not self._import_files(files_to_add, warnings):
+            files_to_add = []  # Cancelled - nothing was added
 
         # Show summary
         if warnings:
@@ -8693,108 +8495,123 @@ class GCodeDatabaseGUI:
         return None
 
     def _import_files(self, files_to_add, warnings):
-        """Import files into the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """
+        Import files into the database (one batch under the write lease).
 
-        # Use repository folder by default for drag & drop imports
-        target_folder = self.repository_path if hasattr(self, 'repository_path') else self.config.get("target_folder", "")
-        if not target_folder or not os.path.exists(target_folder):
-            # Try to create repository folder if it doesn't exist
-            if hasattr(self, 'repository_path'):
-                os.makedirs(self.repository_path, exist_ok=True)
-                target_folder = self.repository_path
-            else:
-                messagebox.showerror("No Target Folder",
-                                   "Repository folder not found. Please check your installation.")
-                conn.close()
-                return
+        Returns:
+            bool: False if the import was cancelled (nothing was imported)
+        """
+        with self._write_lease_batch("import_files") as proceed:
+            if not proceed:
+                warnings.append("⏭️ Import cancelled - another workstation is writing to the database")
+                return False
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
 
-        for original_path, suggested_filename, _ in files_to_add:
-            try:
-                # Determine destination path
-                dest_path = os.path.join(target_folder, suggested_filename)
+            # Use repository folder by default for drag & drop imports
+            target_folder = self.repository_path if hasattr(self, 'repository_path') else self.config.get("target_folder", "")
+            if not target_folder or not os.path.exists(target_folder):
+                # Try to create repository folder if it doesn't exist
+                if hasattr(self, 'repository_path'):
+                    os.makedirs(self.repository_path, exist_ok=True)
+                    target_folder = self.repository_path
+                else:
+                    messagebox.showerror("No Target Folder",
+                                       "Repository folder not found. Please check your installation.")
+                    conn.close()
+                    return False
 
-                # Copy file to target folder
-                if original_path != dest_path:
-                    shutil.copy2(original_path, dest_path)
+            imported = []  # (program_number, dest_path)
+            for original_path, suggested_filename, _ in files_to_add:
+                try:
+                    # Determine destination path
+                    dest_path = os.path.join(target_folder, suggested_filename)
 
-                # Parse the file
-                record = self.parse_gcode_file(dest_path)
-                if not record:
-                    warnings.append(f"⚠️ Failed to parse: {suggested_filename}")
-                    continue
+                    # Copy file to target folder
+                    if original_path != dest_path:
+                        shutil.copy2(original_path, dest_path)
+
+                    # Parse the file
+                    record = self.parse_gcode_file(dest_path)
+                    if not record:
+                        warnings.append(f"⚠️ Failed to parse: {suggested_filename}")
+                        continue
+
+                    # Insert into database (or update if exists)
+                    cursor.execute("""
+                        INSERT OR REPLACE INTO programs (
+                            program_number, title, spacer_type, outer_diameter, thickness, thickness_display,
+                            center_bore, hub_height, hub_diameter, counter_bore_diameter, counter_bore_depth,
+                            paired_program, material, notes, date_created, last_modified, file_path,
+                            detection_confidence, detection_method, validation_status, validation_issues,
+                            validation_warnings, cb_from_gcode, ob_from_gcode, bore_warnings, dimensional_issues,
+                            lathe, duplicate_type, parent_file, duplicate_group, current_version, modified_by, is_managed,
+                            round_size, round_size_confidence, round_size_source, in_correct_range,
+                            legacy_names, last_renamed_date, rename_reason,
+                            tools_used, tool_sequence, tool_validation_status, tool_validation_issues,
+                            safety_blocks_status, safety_blocks_issues, content_hash,
+                            tool_home_status, tool_home_issues, hub_height_display, counter_bore_depth_display,
+                            feasibility_status, feasibility_issues, feasibility_warnings,
+                            crash_issues, crash_warnings, date_imported
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        record.program_number,
+                        record.title,
+                        record.spacer_type,
+                        record.outer_diameter,
+                        record.thickness,
+                        record.thickness_display,
+                        record.center_bore,
+                        record.hub_height,
+                        record.hub_diameter,
+                        record.counter_bore_diameter,
+                        record.counter_bore_depth,
+                        record.paired_program,
+                        record.material,
+                        record.notes,
+                        record.date_created,
+                        record.last_modified,
+                        record.file_path,
+                        record.detection_confidence,
+                        record.detection_method,
+                        record.validation_status,
+                        record.validation_issues,
+                        record.validation_warnings,
+                        record.cb_from_gcode,
+                        record.ob_from_gcode,
+                        record.bore_warnings,
+                        record.dimensional_issues,
+                        record.lathe,
+                        None, None, None,  # duplicate_type, parent_file, duplicate_group
+                        None, None, None,  # current_version, modified_by, is_managed
+                        None, None, None, None,  # round_size, round_size_confidence, round_size_source, in_correct_range
+                        None, None, None,  # legacy_names, last_renamed_date, rename_reason
+                        None, None, None, None,  # tools_used, tool_sequence, tool_validation_status, tool_validation_issues
+                        None, None,  # safety_blocks_status, safety_blocks_issues
+                        None,  # content_hash
+                        None, None,  # tool_home_status, tool_home_issues
+                        None, None,  # hub_height_display, counter_bore_depth_display
+                        None, None, None,  # feasibility_status, feasibility_issues, feasibility_warnings
+                        json.dumps(record.crash_issues) if record.crash_issues else None,
+                        json.dumps(record.crash_warnings) if record.crash_warnings else None,
+                        datetime.now().isoformat()  # date_imported
+                    ))
 
-                # Insert into database (or update if exists)
-                cursor.execute("""
-                    INSERT OR REPLACE INTO programs (
-                        program_number, title, spacer_type, outer_diameter, thickness, thickness_display,
-                        center_bore, hub_height, hub_diameter, counter_bore_diameter, counter_bore_depth,
-                        paired_program, material, notes, date_created, last_modified, file_path,
-                        detection_confidence, detection_method, validation_status, validation_issues,
-                        validation_warnings, cb_from_gcode, ob_from_gcode, bore_warnings, dimensional_issues,
-                        lathe, duplicate_type, parent_file, duplicate_group, current_version, modified_by, is_managed,
-                        round_size, round_size_confidence, round_size_source, in_correct_range,
-                        legacy_names, last_renamed_date, rename_reason,
-                        tools_used, tool_sequence, tool_validation_status, tool_validation_issues,
-                        safety_blocks_status, safety_blocks_issues, content_hash,
-                        tool_home_status, tool_home_issues, hub_height_display, counter_bore_depth_display,
-                        feasibility_status, feasibility_issues, feasibility_warnings,
-                        crash_issues, crash_warnings, date_imported
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    record.program_number,
-                    record.title,
-                    record.spacer_type,
-                    record.outer_diameter,
-                    record.thickness,
-                    record.thickness_display,
-                    record.center_bore,
-                    record.hub_height,
-                    record.hub_diameter,
-                    record.counter_bore_diameter,
-                    record.counter_bore_depth,
-                    record.paired_program,
-                    record.material,
-                    record.notes,
-                    record.date_created,
-                    record.last_modified,
-                    record.file_path,
-                    record.detection_confidence,
-                    record.detection_method,
-                    record.validation_status,
-                    record.validation_issues,
-                    record.validation_warnings,
-                    record.cb_from_gcode,
-                    record.ob_from_gcode,
-                    record.bore_warnings,
-                    record.dimensional_issues,
-                    record.lathe,
-                    None, None, None,  # duplicate_type, parent_file, duplicate_group
-                    None, None, None,  # current_version, modified_by, is_managed
-                    None, None, None, None,  # round_size, round_size_confidence, round_size_source, in_correct_range
-                    None, None, None,  # legacy_names, last_renamed_date, rename_reason
-                    None, None, None, None,  # tools_used, tool_sequence, tool_validation_status, tool_validation_issues
-                    None, None,  # safety_blocks_status, safety_blocks_issues
-                    None,  # content_hash
-                    None, None,  # tool_home_status, tool_home_issues
-                    None, None,  # hub_height_display, counter_bore_depth_display
-                    None, None, None,  # feasibility_status, feasibility_issues, feasibility_warnings
-                    json.dumps(record.crash_issues) if record.crash_issues else None,
-                    json.dumps(record.crash_warnings) if record.crash_warnings else None,
-                    datetime.now().isoformat()  # date_imported
-                ))
+                    # Registry is synced after commit - its own connection would
+                    # wait on this transaction's write lock
+                    imported.append((record.program_number, dest_path))
 
-                # Sync registry for this program
-                self.sync_registry_for_operation('ADD', None, record.program_number, dest_path)
+                    warnings.append(f"✅ Added: {suggested_filename}")
 
-                warnings.append(f"✅ Added: {suggested_filename}")
+                except Exception as e:
+                    warnings.append(f"❌ Error importing {suggested_filename}: {str(e)}")
 
-            except Exception as e:
-                warnings.append(f"❌ Error importing {suggested_filename}: {str(e)}")
+            conn.commit()
+            conn.close()
 
-        conn.commit()
-        conn.close()
+            for program_number, dest_path in imported:
+                self.sync_registry_for_operation('ADD', None, program_number, dest_path)
+        return True
 
     def _import_single_file(self, filepath):
         """Import a single file into the database"""
@@ -8882,11 +8699,11 @@ class GCodeDatabaseGUI:
             logger.error(f"Error importing single file {filepath}: {e}", exc_info=True)
             return False
 
-    def parse_gcode_file(self, filepath: str) -> Optional[ProgramRecord]:
-        """Parse a gcode file using the improved parser"""
+    def parse_gcode_file(self, filepath: str, content: Optional[FileContent] = None) -> Optional[ProgramRecord]:
+        """Parse a gcode file using the improved parser (content: FileContent already read)"""
         try:
             # Use improved parser
-            result = self.parser.parse_file(filepath)
+            result = self.parser.parse_file(filepath, content=content)
             if not result:
                 return None
 
@@ -9077,6 +8894,10 @@ class GCodeDatabaseGUI:
         self.config["last_folder"] = folder
         self.save_config()
 
+        # The import runs on a background thread, which cannot ask - ask here
+        if not self._confirm_batch_write("scan_folder"):
+            return
+
         # Show progress window
         progress_window = tk.Toplevel(self.root)
         progress_window.title("Scanning Files...")
@@ -9509,7 +9330,7 @@ class GCodeDatabaseGUI:
 
                             # Insert new
                             cursor.execute('''
-                                INSERT INTO programs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                INSERT INTO programs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                             ''', (record.program_number, record.title, record.spacer_type, record.outer_diameter,
                                  record.thickness, record.thickness_display, record.center_bore, record.hub_height,
                                  record.hub_diameter, record.counter_bore_diameter,
@@ -9532,7 +9353,8 @@ class GCodeDatabaseGUI:
                                  None,  # content_hash
                                  record.tool_home_status, json.dumps(record.tool_home_issues) if record.tool_home_issues else None,  # tool_home_status, tool_home_issues
                                  None, None,  # hub_height_display, counter_bore_depth_display
-                                 0, None))  # is_deleted, deleted_date
+                                 0, None,  # is_deleted, deleted_date
+                                 None, None, None))  # cycle_time_seconds, air_cut_seconds, cycle_time_hash
                             added += 1
 
                     except Exception as e:
@@ -9571,13 +9393,134 @@ class GCodeDatabaseGUI:
                 msg_queue.put(('text', f"\nERROR: {str(e)}\n"))
                 msg_queue.put(('done', None))
 
+        def scan_thread_with_lease():
+            """Hold the write lease for the whole scan"""
+            with self._write_lease_batch("scan_folder", confirmed=True):
+                scan_thread()
+
         # Start the background thread
-        thread = threading.Thread(target=scan_thread, daemon=True)
+        thread = threading.Thread(target=scan_thread_with_lease, daemon=True)
         thread.start()
 
         # Start GUI update loop
         update_gui()
 
+    def import_memory_dump(self, dump_path, save_folder=None, progress_callback=None):
+        """
+        Import every program in a control-memory dump (ALL.nc / .cnc backup).
+
+        The dump is streamed through utils.program_splitter: each program goes
+        into process_new_file() as soon as it is cut from the dump, without an
+        intermediate split folder.
+
+        Args:
+            dump_path: Path to the dump
+            save_folder: Also write the split programs here (optional)
+            progress_callback: Optional function(programs_done, program_number)
+
+        Returns:
+            dict: {'programs', 'imported', 'skipped', 'incomplete', 'errors'}
+        """
+        stats = {'programs': 0, 'imported': 0, 'skipped': 0, 'incomplete': [], 'errors': []}
+        source_folder = save_folder or os.path.dirname(dump_path)
+        if save_folder:
+            os.makedirs(save_folder, exist_ok=True)
+
+        with self._write_lease_batch("import_memory_dump") as proceed:
+            if not proceed:
+                stats['errors'].append("Import cancelled - another workstation is writing to the database")
+                return stats
+            for program in iter_programs(dump_path):
+                stats['programs'] += 1
+                if not program.complete:
+                    stats['incomplete'].append(program.number)
+
+                # The program is named after its place in source_folder; it is
+                # only written there when a save folder was asked for
+                source_path = os.path.join(source_folder, program.filename)
+                if save_folder:
+                    with open(source_path, 'wb') as f:
+                        f.write(program.data)
+
+                result = self.process_new_file(source_path, import_mode='repository',
+                                               content=program.content(source_path))
+                if result['success']:
+                    stats['imported'] += 1
+                elif result['errors']:
+                    stats['errors'].append(f"{program.number}: {'; '.join(result['errors'])}")
+                else:
+                    stats['skipped'] += 1
+
+                if progress_callback:
+                    progress_callback(stats['programs'], program.number)
+
+        self.log_activity('import_memory_dump', 'batch', {
+            'dump': os.path.basename(dump_path),
+            'programs': stats['programs'],
+            'imported': stats['imported'],
+            'skipped': stats['skipped'],
+            'errors': len(stats['errors'])
+        })
+        return stats
+
+    def import_memory_dump_dialog(self):
+        """Pick a memory dump and import its programs (optionally keeping the split files)"""
+        dump_path = filedialog.askopenfilename(
+            title="Select Machine Memory Dump",
+            initialdir=self.config.get("last_folder", ""),
+            filetypes=[("G-code dumps", "*.nc *.NC *.cnc *.CNC *.txt"), ("All files", "*.*")]
+        )
+        if not dump_path:
+            return
+
+        save_folder = None
+        if messagebox.askyesno("Keep Split Files?",
+                               "Also save each program as its own file?\n\n"
+                               "(Not needed for the import - programs go straight into the repository.)"):
+            save_folder = filedialog.askdirectory(title="Folder for Split Programs",
+                                                  initialdir=os.path.dirname(dump_path))
+            if not save_folder:
+                return
+
+        backup_path = self.create_auto_backup("import_memory_dump")
+        if backup_path:
+            logger.info("Auto-backup created before importing memory dump")
+
+        progress_win = tk.Toplevel(self.root)
+        progress_win.title("Importing Memory Dump")
+        progress_win.geometry("450x120")
+        progress_win.configure(bg=self.bg_color)
+        progress_win.transient(self.root)
+        status_label = tk.Label(progress_win, text=f"Reading {os.path.basename(dump_path)}...",
+                                bg=self.bg_color, fg=self.fg_color, font=("Arial", 10))
+        status_label.pack(pady=30)
+
+        def progress(done, program_number):
+            try:
+                status_label.config(text=f"Imported {done} programs - {program_number}")
+                progress_win.update()
+            except tk.TclError:
+                pass
+
+        try:
+            stats = self.import_memory_dump(dump_path, save_folder, progress)
+        except OSError as e:
+            progress_win.destroy()
+            messagebox.showerror("Import Failed", f"Could not read dump:\n{e}")
+            return
+        progress_win.destroy()
+
+        summary = (f"Programs in dump: {stats['programs']}\n"
+                   f"Imported: {stats['imported']}\n"
+                   f"Skipped (duplicates): {stats['skipped']}\n"
+                   f"Errors: {len(stats['errors'])}")
+        if stats['incomplete']:
+            summary += f"\nWithout M30: {len(stats['incomplete'])}"
+        if stats['errors']:
+            summary += "\n\n" + "\n".join(stats['errors'][:10])
+        messagebox.showinfo("Memory Dump Imported", summary)
+        self.refresh_results()
+
     def process_new_files_workflow(self):
         """
         One-click workflow to process new files:
@@ -9747,6 +9690,7 @@ class GCodeDatabaseGUI:
             cursor = conn.cursor()
 
             files_to_import = []
+            file_hashes = {}  # filepath -> content hash, reused at import
             total_check = len(all_files)
             for idx, filepath in enumerate(all_files):
                 filename = os.path.basename(filepath)
@@ -9773,6 +9717,7 @@ class GCodeDatabaseGUI:
                         log(f"  Skip (content match with {existing[0]}): {filename}")
                     else:
                         files_to_import.append(filepath)
+                        file_hashes[filepath] = file_hash
 
             conn.close()
             log(f"\nFiles to import: {len(files_to_import)}")
@@ -9824,8 +9769,8 @@ class GCodeDatabaseGUI:
                     else:
                         is_managed = 0
 
-                    # Compute hash
-                    file_hash = self.compute_file_hash(record.file_path or filepath)
+                    # Hash from the duplicate check (the repository copy is byte-identical)
+                    file_hash = file_hashes.get(filepath) or self.compute_file_hash(record.file_path or filepath)
 
                     # Insert into database
                     # Convert tool_home_issues list to JSON
@@ -9833,7 +9778,7 @@ class GCodeDatabaseGUI:
                     tool_home_issues_json = json.dumps(record.tool_home_issues) if record.tool_home_issues else None
 
                     cursor.execute('''
-                        INSERT OR REPLACE INTO programs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        INSERT OR REPLACE INTO programs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ''', (record.program_number, record.title, record.spacer_type, record.outer_diameter,
                          record.thickness, record.thickness_display, record.center_bore, record.hub_height,
                          record.hub_diameter, record.counter_bore_diameter,
@@ -9856,7 +9801,8 @@ class GCodeDatabaseGUI:
                          json.dumps(record.crash_issues) if record.crash_issues else None,
                          json.dumps(record.crash_warnings) if record.crash_warnings else None,
                          datetime.now().isoformat(),  # date_imported
-                         0, None))  # is_deleted, deleted_date
+                         0, None,  # is_deleted, deleted_date
+                         None, None, None))  # cycle_time_seconds, air_cut_seconds, cycle_time_hash
 
                     imported_programs.append((record.program_number, record.file_path))
                     stats['files_imported'] += 1
@@ -10118,20 +10064,6 @@ class GCodeDatabaseGUI:
             exact_duplicates = []
             different_content = []
 
-            import hashlib
-
-            def calculate_file_hash(filepath):
-                """Calculate SHA256 hash of a file efficiently"""
-                sha256_hash = hashlib.sha256()
-                try:
-                    with open(filepath, 'rb') as f:
-                        # Read in 4KB chunks to handle large files
-                        for byte_block in iter(lambda: f.read(4096), b""):
-                            sha256_hash.update(byte_block)
-                    return sha256_hash.hexdigest()
-                except:
-                    return None
-
             for new_file, existing_paths in name_collisions:
                 try:
                     # Step 1: Quick file size check
@@ -10155,8 +10087,8 @@ class GCodeDatabaseGUI:
                                 continue
 
                             # Step 2: Sizes match - calculate hashes for accurate comparison
-                            new_hash = calculate_file_hash(new_file)
-                            existing_hash = calculate_file_hash(existing_path)
+                            new_hash = file_sha256(new_file)
+                            existing_hash = file_sha256(existing_path)
 
                             if new_hash and existing_hash and new_hash == existing_hash:
                                 is_exact_match = True
@@ -10396,43 +10328,116 @@ class GCodeDatabaseGUI:
         self.refresh_filter_values()
         self.refresh_results()
 
-    def _predict_dimension_fallback(self, fallback_extractor, dimension, parse_result, program_number):
-        """Helper method to predict a single dimension using secondary fallback"""
-        try:
-            import numpy as np
-
-            # Extract features from title
-            title = parse_result.title if parse_result.title else ""
-            features = fallback_extractor.extract_title_features(title)
-
-            # Add G-code features
-            features['cb_from_gcode'] = parse_result.cb_from_gcode if parse_result.cb_from_gcode else 0
-            features['ob_from_gcode'] = parse_result.ob_from_gcode if parse_result.ob_from_gcode else 0
-
-            # Add known dimensions for cross-prediction
-            features['known_od'] = parse_result.outer_diameter if (dimension != 'outer_diameter' and parse_result.outer_diameter) else 0
-            features['known_cb'] = parse_result.center_bore if (dimension != 'center_bore' and parse_result.center_bore) else 0
-            features['known_thickness'] = parse_result.thickness if (dimension != 'thickness' and parse_result.thickness) else 0
-
-            # Create feature vector matching training
-            feature_vector = [features.get(fn, 0) for fn in fallback_extractor.feature_names]
-            feature_vector = np.array(feature_vector).reshape(1, -1)
+    def _store_rescan_result(self, cursor, prog_num, parse_result):
+        """Write a rescanned parse result (dimensions, validation, issues) to its program row"""
+        # Calculate validation status (prioritized by severity)
+        # NOTE: Safety and tool validation disabled for now - too many false positives
+        validation_status = "PASS"
+        if parse_result.crash_issues:
+            validation_status = "CRASH_RISK"  # BRIGHT RED - Crash risk detected
+        elif parse_result.validation_issues:
+            validation_status = "CRITICAL"  # RED - Critical errors
+        elif parse_result.tool_home_status == "CRITICAL":
+            validation_status = "TOOL_HOME_CRITICAL"  # DARK RED - G53 Z-16 or beyond (dangerous)
+        # elif parse_result.safety_blocks_status == "MISSING":
+        #     validation_status = "SAFETY_ERROR"  # DARK RED - Missing safety blocks (DISABLED - too strict)
+        # elif parse_result.tool_validation_status == "ERROR":
+        #     validation_status = "TOOL_ERROR"  # ORANGE-RED - Wrong/missing tools (DISABLED - needs tuning)
+        elif parse_result.crash_warnings:
+            validation_status = "CRASH_WARNING"  # ORANGE - Crash warnings
+        elif parse_result.bore_warnings:
+            validation_status = "BORE_WARNING"  # ORANGE - Bore dimension warnings
+        elif parse_result.tool_home_status == "WARNING":
+            validation_status = "TOOL_HOME_WARNING"  # AMBER - G53 Z doesn't match thickness
+        elif parse_result.dimensional_issues:
+            validation_status = "DIMENSIONAL"  # PURPLE - P-code/thickness mismatches
+        # elif parse_result.tool_validation_status == "WARNING":
+        #     validation_status = "TOOL_WARNING"  # AMBER - Tool suggestions (DISABLED - needs tuning)
+        elif parse_result.validation_warnings:
+            validation_status = "WARNING"  # YELLOW - General warnings
+
+        # Update database with refreshed data
+        # Note: paired_program not updated (not in parser result)
+        notes = '|'.join(parse_result.detection_notes) if parse_result.detection_notes else None
 
-            # Predict
-            model = fallback_extractor.models.get(dimension)
-            if model:
-                prediction = model.predict(feature_vector)[0]
-                return prediction
-            return None
-        except Exception as e:
-            return None
+        cursor.execute("""
+            UPDATE programs
+            SET title = ?,
+                spacer_type = ?,
+                outer_diameter = ?,
+                thickness = ?,
+                thickness_display = ?,
+                center_bore = ?,
+                hub_height = ?,
+                hub_diameter = ?,
+                counter_bore_diameter = ?,
+                counter_bore_depth = ?,
+                material = ?,
+                detection_confidence = ?,
+                detection_method = ?,
+                validation_status = ?,
+                validation_issues = ?,
+                validation_warnings = ?,
+                cb_from_gcode = ?,
+                ob_from_gcode = ?,
+                bore_warnings = ?,
+                dimensional_issues = ?,
+                lathe = ?,
+                notes = ?,
+                tools_used = ?,
+                tool_sequence = ?,
+                tool_validation_status = ?,
+                tool_validation_issues = ?,
+                safety_blocks_status = ?,
+                safety_blocks_issues = ?,
+                tool_home_status = ?,
+                tool_home_issues = ?,
+                crash_issues = ?,
+                crash_warnings = ?
+            WHERE program_number = ?
+        """, (
+            parse_result.title,
+            parse_result.spacer_type,
+            parse_result.outer_diameter,
+            parse_result.thickness,
+            parse_result.thickness_display,
+            parse_result.center_bore,
+            parse_result.hub_height,
+            parse_result.hub_diameter,
+            parse_result.counter_bore_diameter,
+            parse_result.counter_bore_depth,
+            parse_result.material,
+            parse_result.detection_confidence,
+            parse_result.detection_method,
+            validation_status,
+            '|'.join(parse_result.validation_issues) if parse_result.validation_issues else None,
+            '|'.join(parse_result.validation_warnings) if parse_result.validation_warnings else None,
+            parse_result.cb_from_gcode,
+            parse_result.ob_from_gcode,
+            '|'.join(parse_result.bore_warnings) if parse_result.bore_warnings else None,
+            '|'.join(parse_result.dimensional_issues) if parse_result.dimensional_issues else None,
+            parse_result.lathe,
+            notes,
+            json.dumps(parse_result.tools_used) if parse_result.tools_used else None,
+            json.dumps(parse_result.tool_sequence) if parse_result.tool_sequence else None,
+            None,  # tool_validation_status - DISABLED
+            None,  # tool_validation_issues - DISABLED
+            None,  # safety_blocks_status - DISABLED
+            None,  # safety_blocks_issues - DISABLED
+            parse_result.tool_home_status,
+            json.dumps(parse_result.tool_home_issues) if parse_result.tool_home_issues else None,
+            json.dumps(parse_result.crash_issues) if parse_result.crash_issues else None,
+            json.dumps(parse_result.crash_warnings) if parse_result.crash_warnings else None,
+            prog_num
+        ))
+        store_program_issues(cursor, prog_num, parse_result.get_issues())
 
     def rescan_database(self):
         """Re-parse all files already in database to refresh with latest parser improvements"""
         # Create custom dialog with secondary fallback option
         dialog = tk.Toplevel(self.root)
         dialog.title("Rescan Database")
-        dialog.geometry("500x300")
+        dialog.geometry("500x360")
         dialog.configure(bg=self.bg_color)
         dialog.transient(self.root)
         dialog.grab_set()
@@ -10441,7 +10446,7 @@ class GCodeDatabaseGUI:
         dialog.update_idletasks()
         x = (dialog.winfo_screenwidth() // 2) - (500 // 2)
         y = (dialog.winfo_screenheight() // 2) - (300 // 2)
-        dialog.geometry(f"500x300+{x}+{y}")
+        dialog.geometry(f"500x360+{x}+{y}")
 
         # Message
         msg_frame = tk.Frame(dialog, bg=self.bg_color)
@@ -10475,21 +10480,43 @@ class GCodeDatabaseGUI:
         fallback_check.pack(anchor='w')
 
         fallback_note = tk.Label(fallback_frame,
-                          text="(Slower but fills all missing dimensions automatically)",
+                          text="(Fills missing dimensions automatically after the scan)",
                           bg=self.bg_color, fg=self.fg_color,
                           font=("Arial", 8, "italic"),
                           justify=tk.LEFT)
         fallback_note.pack(anchor='w', padx=25)
 
+        # Parser profiling checkbox
+        profile_var = tk.BooleanVar(value=False)
+
+        profile_check = tk.Checkbutton(fallback_frame,
+                                 text="Profile parser stages",
+                                 variable=profile_var,
+                                 bg=self.bg_color, fg=self.fg_color,
+                                 selectcolor=self.input_bg,
+                                 activebackground=self.bg_color,
+                                 activeforeground=self.fg_color,
+                                 font=("Arial", 10, "bold"),
+                                 cursor='hand2')
+        profile_check.pack(anchor='w', pady=(8, 0))
+
+        profile_note = tk.Label(fallback_frame,
+                          text="(Time spent per detection stage and validator, shown after the rescan)",
+                          bg=self.bg_color, fg=self.fg_color,
+                          font=("Arial", 8, "italic"),
+                          justify=tk.LEFT)
+        profile_note.pack(anchor='w', padx=25)
+
         # Buttons
         button_frame = tk.Frame(dialog, bg=self.bg_color)
         button_frame.pack(pady=20)
 
-        result = {'proceed': False, 'use_fallback': False}
+        result = {'proceed': False, 'use_fallback': False, 'profile': False}
 
         def on_proceed():
             result['proceed'] = True
             result['use_fallback'] = use_fallback_var.get()
+            result['profile'] = profile_var.get()
             dialog.destroy()
 
         def on_cancel():
@@ -10552,26 +10579,22 @@ class GCodeDatabaseGUI:
         # Import parser
         from improved_gcode_parser import ImprovedGCodeParser
         parser = ImprovedGCodeParser()
+        parse_profile = parser.enable_profiling() if result['profile'] else None
 
         # Try to initialize secondary fallback (only if user enabled it)
+        # Models are cached by training-data fingerprint - only retrained when the data changed
         fallback_extractor = None
         fallback_available = False
         if use_secondary_fallback:
-            try:
-                from analysis_tools.ml_dimension_extractor import MLDimensionExtractor
-                fallback_extractor = MLDimensionExtractor(self.db_path)
-                if fallback_extractor.load_models():
-                    fallback_available = True
-                    progress_text.insert(tk.END, "[Secondary Fallback] Loaded models for missing dimensions\n\n")
-                else:
-                    progress_text.insert(tk.END, "[Secondary Fallback] Training models...\n")
-                    fallback_extractor.load_data()
-                    fallback_extractor.train_all_models()
-                    fallback_extractor.save_models()
-                    fallback_available = True
-                    progress_text.insert(tk.END, "[Secondary Fallback] Models trained successfully\n\n")
+            def fallback_log(message):
+                progress_text.insert(tk.END, message + "\n")
                 progress_text.see(tk.END)
                 self.root.update()
+
+            try:
+                fallback_extractor = load_fallback_extractor(self.db_path, fallback_log)
+                fallback_available = True
+                progress_text.insert(tk.END, "\n")
             except ImportError:
                 progress_text.insert(tk.END, "[Secondary Fallback] Libraries not installed - skipping predictions\n")
                 progress_text.insert(tk.END, "              Install with: pip install pandas scikit-learn numpy\n\n")
@@ -10582,7 +10605,7 @@ class GCodeDatabaseGUI:
                 progress_text.see(tk.END)
                 self.root.update()
         else:
-            progress_text.insert(tk.END, "Secondary Fallback disabled (for faster scanning)\n\n")
+            progress_text.insert(tk.END, "Secondary Fallback disabled\n\n")
             progress_text.see(tk.END)
             self.root.update()
 
@@ -10590,6 +10613,8 @@ class GCodeDatabaseGUI:
         skipped = 0
         errors = 0
         fallback_predictions = 0
+        # (prog_num, parse_result) missing dimensions - written after the fallback stage
+        fallback_pending = []
 
         for idx, (prog_num, file_path) in enumerate(all_files, 1):
             filename = os.path.basename(file_path)
@@ -10620,138 +10645,12 @@ class GCodeDatabaseGUI:
                         self.root.update()
                     continue
 
-                # Apply secondary fallback for missing dimensions
-                if fallback_available and fallback_extractor:
-                    # Check and predict Outer Diameter
-                    if not parse_result.outer_diameter:
-                        fallback_od = self._predict_dimension_fallback(fallback_extractor, 'outer_diameter', parse_result, prog_num)
-                        if fallback_od:
-                            parse_result.outer_diameter = fallback_od
-                            if parse_result.detection_confidence != 'SECONDARY_FALLBACK':
-                                parse_result.detection_confidence = 'SECONDARY_FALLBACK'
-                            parse_result.detection_notes.append(f'OD from secondary: {fallback_od:.2f}"')
-                            fallback_predictions += 1
-
-                    # Check and predict Thickness
-                    if not parse_result.thickness:
-                        fallback_thickness = self._predict_dimension_fallback(fallback_extractor, 'thickness', parse_result, prog_num)
-                        if fallback_thickness:
-                            parse_result.thickness = fallback_thickness
-                            if parse_result.detection_confidence != 'SECONDARY_FALLBACK':
-                                parse_result.detection_confidence = 'SECONDARY_FALLBACK'
-                            parse_result.detection_notes.append(f'Thickness from secondary: {fallback_thickness:.3f}"')
-                            fallback_predictions += 1
-
-                    # Check and predict Center Bore
-                    if not parse_result.center_bore:
-                        fallback_cb = self._predict_dimension_fallback(fallback_extractor, 'center_bore', parse_result, prog_num)
-                        if fallback_cb:
-                            parse_result.center_bore = fallback_cb
-                            if parse_result.detection_confidence != 'SECONDARY_FALLBACK':
-                                parse_result.detection_confidence = 'SECONDARY_FALLBACK'
-                            parse_result.detection_notes.append(f'CB from secondary: {fallback_cb:.1f}mm')
-                            fallback_predictions += 1
-
-                # Calculate validation status (prioritized by severity)
-                # NOTE: Safety and tool validation disabled for now - too many false positives
-                validation_status = "PASS"
-                if parse_result.crash_issues:
-                    validation_status = "CRASH_RISK"  # BRIGHT RED - Crash risk detected
-                elif parse_result.validation_issues:
-                    validation_status = "CRITICAL"  # RED - Critical errors
-                elif parse_result.tool_home_status == "CRITICAL":
-                    validation_status = "TOOL_HOME_CRITICAL"  # DARK RED - G53 Z-16 or beyond (dangerous)
-                # elif parse_result.safety_blocks_status == "MISSING":
-                #     validation_status = "SAFETY_ERROR"  # DARK RED - Missing safety blocks (DISABLED - too strict)
-                # elif parse_result.tool_validation_status == "ERROR":
-                #     validation_status = "TOOL_ERROR"  # ORANGE-RED - Wrong/missing tools (DISABLED - needs tuning)
-                elif parse_result.crash_warnings:
-                    validation_status = "CRASH_WARNING"  # ORANGE - Crash warnings
-                elif parse_result.bore_warnings:
-                    validation_status = "BORE_WARNING"  # ORANGE - Bore dimension warnings
-                elif parse_result.tool_home_status == "WARNING":
-                    validation_status = "TOOL_HOME_WARNING"  # AMBER - G53 Z doesn't match thickness
-                elif parse_result.dimensional_issues:
-                    validation_status = "DIMENSIONAL"  # PURPLE - P-code/thickness mismatches
-                # elif parse_result.tool_validation_status == "WARNING":
-                #     validation_status = "TOOL_WARNING"  # AMBER - Tool suggestions (DISABLED - needs tuning)
-                elif parse_result.validation_warnings:
-                    validation_status = "WARNING"  # YELLOW - General warnings
-
-                # Update database with refreshed data
-                # Note: paired_program not updated (not in parser result)
-                notes = '|'.join(parse_result.detection_notes) if parse_result.detection_notes else None
+                # Missing dimensions wait for the batched secondary fallback stage
+                if fallback_available and needs_fallback(parse_result):
+                    fallback_pending.append((prog_num, parse_result))
+                    continue
 
-                cursor.execute("""
-                    UPDATE programs
-                    SET title = ?,
-                        spacer_type = ?,
-                        outer_diameter = ?,
-                        thickness = ?,
-                        thickness_display = ?,
-                        center_bore = ?,
-                        hub_height = ?,
-                        hub_diameter = ?,
-                        counter_bore_diameter = ?,
-                        counter_bore_depth = ?,
-                        material = ?,
-                        detection_confidence = ?,
-                        detection_method = ?,
-                        validation_status = ?,
-                        validation_issues = ?,
-                        validation_warnings = ?,
-                        cb_from_gcode = ?,
-                        ob_from_gcode = ?,
-                        bore_warnings = ?,
-                        dimensional_issues = ?,
-                        lathe = ?,
-                        notes = ?,
-                        tools_used = ?,
-                        tool_sequence = ?,
-                        tool_validation_status = ?,
-                        tool_validation_issues = ?,
-                        safety_blocks_status = ?,
-                        safety_blocks_issues = ?,
-                        tool_home_status = ?,
-                        tool_home_issues = ?,
-                        crash_issues = ?,
-                        crash_warnings = ?
-                    WHERE program_number = ?
-                """, (
-                    parse_result.title,
-                    parse_result.spacer_type,
-                    parse_result.outer_diameter,
-                    parse_result.thickness,
-                    parse_result.thickness_display,
-                    parse_result.center_bore,
-                    parse_result.hub_height,
-                    parse_result.hub_diameter,
-                    parse_result.counter_bore_diameter,
-                    parse_result.counter_bore_depth,
-                    parse_result.material,
-                    parse_result.detection_confidence,
-                    parse_result.detection_method,
-                    validation_status,
-                    '|'.join(parse_result.validation_issues) if parse_result.validation_issues else None,
-                    '|'.join(parse_result.validation_warnings) if parse_result.validation_warnings else None,
-                    parse_result.cb_from_gcode,
-                    parse_result.ob_from_gcode,
-                    '|'.join(parse_result.bore_warnings) if parse_result.bore_warnings else None,
-                    '|'.join(parse_result.dimensional_issues) if parse_result.dimensional_issues else None,
-                    parse_result.lathe,
-                    notes,
-                    json.dumps(parse_result.tools_used) if parse_result.tools_used else None,
-                    json.dumps(parse_result.tool_sequence) if parse_result.tool_sequence else None,
-                    None,  # tool_validation_status - DISABLED
-                    None,  # tool_validation_issues - DISABLED
-                    None,  # safety_blocks_status - DISABLED
-                    None,  # safety_blocks_issues - DISABLED
-                    parse_result.tool_home_status,
-                    json.dumps(parse_result.tool_home_issues) if parse_result.tool_home_issues else None,
-                    json.dumps(parse_result.crash_issues) if parse_result.crash_issues else None,
-                    json.dumps(parse_result.crash_warnings) if parse_result.crash_warnings else None,
-                    prog_num
-                ))
+                self._store_rescan_result(cursor, prog_num, parse_result)
 
                 updated += 1
 
@@ -10768,6 +10667,20 @@ class GCodeDatabaseGUI:
                     progress_text.see(tk.END)
                     self.root.update()
 
+        # Secondary fallback stage: one vectorized prediction per dimension
+        if fallback_pending:
+            progress_label.config(text=f"Predicting missing dimensions for {len(fallback_pending)} programs...")
+            self.root.update()
+            predicted = predict_missing_dimensions(fallback_extractor, [r for _, r in fallback_pending])
+            fallback_predictions = sum(predicted.values())
+            for prog_num, parse_result in fallback_pending:
+                try:
+                    self._store_rescan_result(cursor, prog_num, parse_result)
+                    updated += 1
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"Rescan write failed for {prog_num}: {e}")
+
         # Commit all changes
         conn.commit()
         conn.close()
@@ -10784,6 +10697,10 @@ class GCodeDatabaseGUI:
             progress_text.insert(tk.END, f"\n[Secondary Fallback] {fallback_predictions} dimensions predicted\n")
             progress_text.insert(tk.END, f"              (Programs marked as 'SECONDARY_FALLBACK')\n")
         progress_text.insert(tk.END, f"Errors: {errors}\n")
+        if parse_profile is not None:
+            report = parse_profile.report()
+            logger.info(f"Rescan parser profile:\n{report}")
+            progress_text.insert(tk.END, f"\n{report}\n")
         progress_text.see(tk.END)
 
         # Close button — also opens details for the selected program so the
@@ -11015,6 +10932,7 @@ class GCodeDatabaseGUI:
                         datetime.now().isoformat(),
                         prog_num
                     ))
+                    store_program_issues(cursor, prog_num, parse_result.get_issues())
 
                     updated += 1
 
@@ -11068,26 +10986,46 @@ class GCodeDatabaseGUI:
         self.refresh_results()
 
     def view_tool_statistics(self):
-        """Display tool usage statistics across all programs"""
+        """Display tool usage statistics across all programs (current filter applied)"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
-        # Get all programs with tool data
-        cursor.execute("""
-            SELECT program_number, spacer_type, outer_diameter, tools_used, tool_sequence,
-                   tool_validation_status, tool_validation_issues, safety_blocks_status, safety_blocks_issues
-            FROM programs
-            WHERE tools_used IS NOT NULL AND tools_used != 'null'
-        """)
-        results = cursor.fetchall()
+        if not json_available(cursor):
+            conn.close()
+            messagebox.showerror("Tool Statistics Unavailable",
+                               "Tool statistics need SQLite JSON support, which this Python build lacks.")
+            return
 
-        if not results:
+        # Counts from the tool summary tables (filtered programs grouped in one query)
+        filter_where, filter_params = self.build_filter_query(getattr(self, '_last_view_mode', 'all'))
+        filters_active = filter_where != ACTIVE_PROGRAMS_WHERE
+        if filters_active:
+            summary_rows = cube_rows(cursor, TOOL_SUMMARY_STATS, filter_where, filter_params)
+            tool_counts_rows = tool_rows(cursor, filter_where, filter_params)
+        else:
+            summary_rows = [r for r in cube_rows(cursor, TOOL_SUMMARY_STATS) if not r['is_deleted']]
+            tool_counts_rows = tool_rows(cursor)
+        summary_rows = [r for r in summary_rows if r['has_tools']]
+
+        if not summary_rows:
             messagebox.showinfo("No Tool Data",
                               "No tool usage data found.\n\n"
                               "Run a rescan to extract tool information from your G-code files.")
             conn.close()
             return
 
+        # Only programs with tool/safety issues are listed individually
+        cursor.execute(f"""
+            SELECT program_number, spacer_type, tool_validation_issues, safety_blocks_issues
+            FROM programs
+            WHERE {filter_where}
+              AND tools_used IS NOT NULL AND tools_used != 'null'
+              AND (tool_validation_issues NOT IN ('', '[]', 'null')
+                   OR safety_blocks_issues NOT IN ('', '[]', 'null'))
+            ORDER BY program_number
+        """, filter_params)
+        results = cursor.fetchall()
+
         # Create statistics window
         stats_window = tk.Toplevel(self.root)
         stats_window.title("Tool Usage Statistics")
@@ -11115,51 +11053,35 @@ class GCodeDatabaseGUI:
         summary_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # Calculate statistics
+        programs_analyzed = sum(r['count'] for r in summary_rows)
+        tool_issues_count = sum(r['count'] for r in summary_rows if r['has_tool_issues'])
+        safety_issues_count = sum(r['count'] for r in summary_rows if r['has_safety_issues'])
+
         tool_counts = {}
         tool_by_part_type = {}
-        tool_sequences_common = {}
-        tool_issues_count = 0
-        safety_issues_count = 0
-
-        for row in results:
-            prog_num, spacer_type, od, tools_json, sequence_json, tool_status, tool_issues_json, safety_status, safety_issues_json = row
+        for row in tool_counts_rows:
+            tool, spacer_type, count = row['tool'], row['spacer_type'], row['count']
+            tool_counts[tool] = tool_counts.get(tool, 0) + count
+            tool_by_part_type.setdefault(spacer_type, {})[tool] = count
 
-            # Parse JSON
+        tool_sequences_common = {}
+        for sequence_json, count in rollup(summary_rows, 'tool_sequence').items():
             try:
-                tools = json.loads(tools_json) if tools_json else []
                 sequence = json.loads(sequence_json) if sequence_json else []
-                tool_issues = json.loads(tool_issues_json) if tool_issues_json else []
-                safety_issues = json.loads(safety_issues_json) if safety_issues_json else []
-
-                # Count tools
-                for tool in tools:
-                    tool_counts[tool] = tool_counts.get(tool, 0) + 1
-
-                    # By part type
-                    if spacer_type not in tool_by_part_type:
-                        tool_by_part_type[spacer_type] = {}
-                    tool_by_part_type[spacer_type][tool] = tool_by_part_type[spacer_type].get(tool, 0) + 1
-
-                # Count sequences
-                seq_str = " → ".join(sequence)
-                if seq_str:
-                    tool_sequences_common[seq_str] = tool_sequences_common.get(seq_str, 0) + 1
-
-                # Count issues
-                if tool_issues:
-                    tool_issues_count += 1
-                if safety_issues:
-                    safety_issues_count += 1
-
-            except:
+            except (TypeError, ValueError):
                 continue
+            seq_str = " → ".join(sequence)
+            if seq_str:
+                tool_sequences_common[seq_str] = tool_sequences_common.get(seq_str, 0) + count
 
         # Write summary
         summary_text.insert(tk.END, f"{'='*80}\n")
         summary_text.insert(tk.END, f"TOOL USAGE SUMMARY\n")
         summary_text.insert(tk.END, f"{'='*80}\n\n")
 
-        summary_text.insert(tk.END, f"Total programs analyzed: {len(results)}\n")
+        if filters_active:
+            summary_text.insert(tk.END, "NOTE: Showing FILTERED data only\n\n")
+        summary_text.insert(tk.END, f"Total programs analyzed: {programs_analyzed}\n")
         summary_text.insert(tk.END, f"Programs with tool issues: {tool_issues_count}\n")
         summary_text.insert(tk.END, f"Programs with safety issues: {safety_issues_count}\n\n")
 
@@ -11168,14 +11090,14 @@ class GCodeDatabaseGUI:
         summary_text.insert(tk.END, f"{'='*80}\n\n")
 
         for tool, count in sorted(tool_counts.items(), key=lambda x: x[1], reverse=True):
-            pct = (count / len(results)) * 100
+            pct = (count / programs_analyzed) * 100
             summary_text.insert(tk.END, f"{tool:6s}: {count:5d} programs ({pct:5.1f}%)\n")
 
         summary_text.insert(tk.END, f"\n{'='*80}\n")
         summary_text.insert(tk.END, f"TOOLS BY PART TYPE\n")
         summary_text.insert(tk.END, f"{'='*80}\n\n")
 
-        for part_type in sorted(tool_by_part_type.keys()):
+        for part_type in sorted(tool_by_part_type.keys(), key=lambda t: t or ''):
             summary_text.insert(tk.END, f"{part_type}:\n")
             for tool, count in sorted(tool_by_part_type[part_type].items(), key=lambda x: x[1], reverse=True)[:5]:
                 summary_text.insert(tk.END, f"  {tool}: {count} programs\n")
@@ -11205,7 +11127,7 @@ class GCodeDatabaseGUI:
         issues_text.insert(tk.END, f"{'='*80}\n\n")
 
         for row in results:
-            prog_num, spacer_type, od, tools_json, sequence_json, tool_status, tool_issues_json, safety_status, safety_issues_json = row
+            prog_num, spacer_type, tool_issues_json, safety_issues_json = row
 
             try:
                 tool_issues = json.loads(tool_issues_json) if tool_issues_json else []
@@ -11238,7 +11160,7 @@ class GCodeDatabaseGUI:
         safety_text.insert(tk.END, f"{'='*80}\n\n")
 
         for row in results:
-            prog_num, spacer_type, od, tools_json, sequence_json, tool_status, tool_issues_json, safety_status, safety_issues_json = row
+            prog_num, spacer_type, tool_issues_json, safety_issues_json = row
 
             try:
                 safety_issues = json.loads(safety_issues_json) if safety_issues_json else []
@@ -11265,6 +11187,161 @@ class GCodeDatabaseGUI:
 
         conn.close()
 
+    def compute_cycle_times(self):
+        """Estimate cycle time and air-cutting time for every program (parallel)"""
+        from utils.cycle_time_estimator import estimate_cycle_times, format_cycle_time
+
+        recompute_all = messagebox.askyesnocancel(
+            "Estimate Cycle Times",
+            "Estimate cycle times from each program's moves\n"
+            "(feeds, spindle speeds/CSS, rapids, tool changes).\n\n"
+            "YES = Only programs that are new or changed\n"
+            "NO = Recompute all programs\n"
+            "CANCEL = Cancel"
+        )
+        if recompute_all is None:
+            return
+        recompute_all = not recompute_all
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT program_number, file_path, lathe, COALESCE(round_size, outer_diameter), cycle_time_hash
+            FROM programs
+            WHERE file_path IS NOT NULL AND (is_deleted IS NULL OR is_deleted = 0)
+        """)
+        jobs = [(prog_num, file_path, lathe, round_size, None if recompute_all else known_hash)
+                for prog_num, file_path, lathe, round_size, known_hash in cursor.fetchall()]
+        conn.close()
+
+        if not jobs:
+            messagebox.showinfo("No Programs", "No programs with files to estimate.")
+            return
+
+        # Progress window
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title("Estimating Cycle Times...")
+        progress_window.geometry("700x500")
+        progress_window.configure(bg=self.bg_color)
+
+        progress_label = tk.Label(progress_window, text=f"Estimating {len(jobs)} programs...",
+                                 bg=self.bg_color, fg=self.fg_color,
+                                 font=("Arial", 12))
+        progress_label.pack(pady=20)
+
+        progress_text = scrolledtext.ScrolledText(progress_window,
+                                                 bg=self.input_bg, fg=self.fg_color,
+                                                 font=("Courier", 9),
+                                                 width=80, height=20)
+        progress_text.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+
+        cancel_event = threading.Event()
+
+        def cancel_estimate():
+            cancel_event.set()
+            cancel_btn.config(state=tk.DISABLED, text="Cancelling...")
+
+        cancel_btn = tk.Button(progress_window, text="Cancel",
+                              command=cancel_estimate,
+                              bg="#D32F2F", fg=self.fg_color,
+                              font=("Arial", 10, "bold"))
+        cancel_btn.pack(pady=5)
+
+        msg_queue = queue.Queue()
+        db_path = self.db_path
+
+        def update_gui():
+            """Process messages from the background thread to update GUI"""
+            try:
+                while True:
+                    msg = msg_queue.get_nowait()
+                    if msg[0] == 'label':
+                        progress_label.config(text=msg[1])
+                    elif msg[0] == 'text':
+                        progress_text.insert(tk.END, msg[1])
+                        progress_text.see(tk.END)
+                    elif msg[0] == 'done':
+                        progress_label.config(text=msg[1])
+                        cancel_btn.config(text="Close", state=tk.NORMAL,
+                                          command=progress_window.destroy, bg=self.button_bg)
+                        return
+            except queue.Empty:
+                pass
+
+            if progress_window.winfo_exists():
+                progress_window.after(100, update_gui)
+
+        def estimate_thread():
+            """Run the worker pool and write estimates in batches"""
+            updates = []
+            air_cut_programs = []  # (air_cut_seconds, program_number, lines)
+            estimated = unchanged = errors = 0
+            conn = sqlite3.connect(db_path)
+            cursor = conn.cursor()
+
+            def flush():
+                if updates:
+                    cursor.executemany("""
+                        UPDATE programs SET cycle_time_seconds = ?, air_cut_seconds = ?, cycle_time_hash = ?
+                        WHERE program_number = ?
+                    """, updates)
+                    commit_with_retry(conn)
+                    updates.clear()
+
+            try:
+                for idx, (prog_num, content_hash, estimate, error) in enumerate(
+                        estimate_cycle_times(jobs, cancel_event=cancel_event), 1):
+                    if error:
+                        errors += 1
+                        msg_queue.put(('text', f"  {prog_num}: {error[:80]}\n"))
+                    elif estimate is None:
+                        unchanged += 1
+                    else:
+                        estimated += 1
+                        updates.append((round(estimate.total_seconds, 1),
+                                        round(estimate.air_cut_seconds, 1),
+                                        content_hash, prog_num))
+                        if estimate.air_cut_seconds >= 1.0:
+                            air_cut_programs.append((estimate.air_cut_seconds, prog_num,
+                                                     estimate.air_cut_lines))
+                    if len(updates) >= 500:
+                        flush()
+                    if idx % 100 == 0:
+                        msg_queue.put(('label', f"Estimating... {idx}/{len(jobs)} programs"))
+                flush()
+
+                cursor.execute("""
+                    SELECT COUNT(cycle_time_seconds), SUM(cycle_time_seconds), SUM(air_cut_seconds)
+                    FROM programs WHERE is_deleted IS NULL OR is_deleted = 0
+                """)
+                count, total, air_total = cursor.fetchone()
+            except Exception as e:
+                logger.error(f"Cycle time estimation failed: {e}", exc_info=True)
+                msg_queue.put(('text', f"\nERROR: {e}\n"))
+                msg_queue.put(('done', "Cycle time estimation failed"))
+                return
+            finally:
+                conn.close()
+
+            summary = (f"\nEstimated: {estimated}   Unchanged: {unchanged}   Errors: {errors}\n"
+                       f"Programs with estimates: {count}\n")
+            if count:
+                summary += (f"Average cycle time: {format_cycle_time(total / count)}\n"
+                            f"Total air-cutting time: {format_cycle_time(air_total or 0)}\n")
+            if air_cut_programs:
+                air_cut_programs.sort(reverse=True)
+                summary += "\nMost air cutting (feed moves above the face or outside the stock):\n"
+                for air_seconds, prog_num, lines in air_cut_programs[:20]:
+                    shown = ', '.join(str(line) for line in lines[:8])
+                    more = f" +{len(lines) - 8}" if len(lines) > 8 else ""
+                    summary += f"  {prog_num:<10} {format_cycle_time(air_seconds):>7}  lines {shown}{more}\n"
+            msg_queue.put(('text', summary))
+            status = "Cancelled" if cancel_event.is_set() else "Complete"
+            msg_queue.put(('done', f"Cycle time estimation {status.lower()}"))
+
+        threading.Thread(target=estimate_thread, daemon=True).start()
+        update_gui()
+
     def scan_tool_change_positions(self):
         """Scan G-code files to find all G53 X Z tool change position lines"""
         # Ask user which files to scan
@@ -12468,7 +12545,10 @@ class GCodeDatabaseGUI:
         new_materials = self.get_available_values("material")
         new_statuses = self.get_available_values("validation_status")
 
-        # Update filter widgets if values changed
+        self._apply_filter_values(new_types, new_materials, new_statuses)
+
+    def _apply_filter_values(self, new_types, new_materials, new_statuses):
+        """Update filter widgets whose available values changed"""
         if new_types != self.available_types:
             self.available_types = new_types
             self.filter_type.values = new_types
@@ -12482,43 +12562,38 @@ class GCodeDatabaseGUI:
         if new_statuses != self.available_statuses:
             self.available_statuses = new_statuses
             self.filter_status.values = new_statuses
-            self.filter_status.clear()
-
-    def refresh_results(self, view_mode='all', external_only=False):
-        """Refresh the results table based on current filters
-
-        Args:
-            view_mode: 'all' (default), 'repository', 'revised', or 'external'
-            external_only: Deprecated, use view_mode='external' instead
+            self.filter_status.clear()
+
+    def build_filter_query(self, view_mode='all'):
         """
-        # Handle deprecated parameter
-        if external_only:
-            view_mode = 'external'
+        Build the WHERE clause for the current filter set.
 
-        # Clear existing - PERFORMANCE: Use delete('') to clear all at once
-        children = self.tree.get_children()
-        if children:
-            self.tree.delete(*children)
+        Shared by the results table, statistics and exports so they all see
+        the same programs. Fuzzy title search is applied to query results in
+        refresh_results and is not part of the clause.
 
-        # Build query
-        query = "SELECT * FROM programs WHERE 1=1"
-        params = []
+        Args:
+            view_mode: 'all', 'repository', 'revised' or 'external'
 
+        Returns:
+            (where_sql, params) - where_sql has no leading WHERE
+        """
         # Exclude soft-deleted records from normal views
-        query += " AND (is_deleted IS NULL OR is_deleted = 0)"
+        where = ACTIVE_PROGRAMS_WHERE
+        params = []
 
         # Add view mode filter
         if view_mode == 'repository':
             # Only show managed files in MAIN repository (not revised)
-            query += " AND is_managed = 1 AND file_path NOT LIKE ?"
+            where += " AND is_managed = 1 AND file_path NOT LIKE ?"
             params.append("%revised_repository%")
         elif view_mode == 'revised':
             # Only show files in revised repository
-            query += " AND file_path LIKE ?"
+            where += " AND file_path LIKE ?"
             params.append("%revised_repository%")
         elif view_mode == 'external':
             # Only show external files (NOT in any repository)
-            query += " AND (is_managed = 0 OR is_managed IS NULL)"
+            where += " AND (is_managed = 0 OR is_managed IS NULL)"
         # 'all' mode shows everything (no additional filter)
 
         # Title search filter - supports multiple terms with + and fuzzy search
@@ -12540,12 +12615,12 @@ class GCodeDatabaseGUI:
 
                     # Each term must be present in title OR program_number (AND logic across terms)
                     for term in search_terms:
-                        query += " AND (title LIKE ? OR program_number LIKE ?)"
+                        where += " AND (title LIKE ? OR program_number LIKE ?)"
                         params.append(f"%{term}%")
                         params.append(f"%{term}%")
                 else:
                     # Single term search - match title or program number
-                    query += " AND (title LIKE ? OR program_number LIKE ?)"
+                    where += " AND (title LIKE ? OR program_number LIKE ?)"
                     params.append(f"%{search_text}%")
                     params.append(f"%{search_text}%")
 
@@ -12560,7 +12635,7 @@ class GCodeDatabaseGUI:
 
                 # Build OR condition for exact matches
                 placeholders = ','.join('?' * len(program_numbers))
-                query += f" AND program_number IN ({placeholders})"
+                where += f" AND program_number IN ({placeholders})"
                 params.extend(program_numbers)
             else:
                 # Single program number search
@@ -12568,32 +12643,32 @@ class GCodeDatabaseGUI:
                 if '*' in program_filter or '%' in program_filter or '_' in program_filter:
                     # Has wildcards - use LIKE (convert * to %)
                     wildcard_filter = program_filter.replace('*', '%')
-                    query += " AND program_number LIKE ?"
+                    where += " AND program_number LIKE ?"
                     params.append(wildcard_filter)
                 else:
                     # Exact match - use = for PRIMARY KEY index optimization
-                    query += " AND program_number = ?"
+                    where += " AND program_number = ?"
                     params.append(program_filter)
         
         # Type filter (multi-select)
         selected_types = self.filter_type.get_selected()
         if selected_types and len(selected_types) < len(self.filter_type.values):
             placeholders = ','.join('?' * len(selected_types))
-            query += f" AND spacer_type IN ({placeholders})"
+            where += f" AND spacer_type IN ({placeholders})"
             params.extend(selected_types)
 
         # Material filter (multi-select)
         selected_materials = self.filter_material.get_selected()
         if selected_materials and len(selected_materials) < len(self.filter_material.values):
             placeholders = ','.join('?' * len(selected_materials))
-            query += f" AND material IN ({placeholders})"
+            where += f" AND material IN ({placeholders})"
             params.extend(selected_materials)
 
         # Validation Status filter (multi-select)
         selected_statuses = self.filter_status.get_selected()
         if selected_statuses and len(selected_statuses) < len(self.filter_status.values):
             placeholders = ','.join('?' * len(selected_statuses))
-            query += f" AND validation_status IN ({placeholders})"
+            where += f" AND validation_status IN ({placeholders})"
             params.extend(selected_statuses)
 
         # Duplicate Type filter (multi-select)
@@ -12604,75 +12679,74 @@ class GCodeDatabaseGUI:
                 other_types = [t for t in selected_dup_types if t != "None"]
                 if other_types:
                     placeholders = ','.join('?' * len(other_types))
-                    query += f" AND (duplicate_type IN ({placeholders}) OR duplicate_type IS NULL)"
+                    where += f" AND (duplicate_type IN ({placeholders}) OR duplicate_type IS NULL)"
                     params.extend(other_types)
                 else:
-                    query += " AND duplicate_type IS NULL"
+                    where += " AND duplicate_type IS NULL"
             else:
                 placeholders = ','.join('?' * len(selected_dup_types))
-                query += f" AND duplicate_type IN ({placeholders})"
+                where += f" AND duplicate_type IN ({placeholders})"
                 params.extend(selected_dup_types)
 
         # OD range
         if self.filter_od_min.get():
-            query += " AND outer_diameter >= ?"
+            where += " AND outer_diameter >= ?"
             params.append(float(self.filter_od_min.get()))
         if self.filter_od_max.get():
-            query += " AND outer_diameter <= ?"
+            where += " AND outer_diameter <= ?"
             params.append(float(self.filter_od_max.get()))
         
         # Thickness range
         if self.filter_thickness_min.get():
-            query += " AND thickness >= ?"
+            where += " AND thickness >= ?"
             params.append(float(self.filter_thickness_min.get()))
         if self.filter_thickness_max.get():
-            query += " AND thickness <= ?"
+            where += " AND thickness <= ?"
             params.append(float(self.filter_thickness_max.get()))
         
         # CB range
         if self.filter_cb_min.get():
-            query += " AND center_bore >= ?"
+            where += " AND center_bore >= ?"
             params.append(float(self.filter_cb_min.get()))
         if self.filter_cb_max.get():
-            query += " AND center_bore <= ?"
+            where += " AND center_bore <= ?"
             params.append(float(self.filter_cb_max.get()))
 
         # Hub Diameter range
         if self.filter_hub_dia_min.get():
-            query += " AND hub_diameter >= ?"
+            where += " AND hub_diameter >= ?"
             params.append(float(self.filter_hub_dia_min.get()))
         if self.filter_hub_dia_max.get():
-            query += " AND hub_diameter <= ?"
+            where += " AND hub_diameter <= ?"
             params.append(float(self.filter_hub_dia_max.get()))
 
         # Hub Height range
         if self.filter_hub_h_min.get():
-            query += " AND hub_height >= ?"
+            where += " AND hub_height >= ?"
             params.append(float(self.filter_hub_h_min.get()))
         if self.filter_hub_h_max.get():
-            query += " AND hub_height <= ?"
+            where += " AND hub_height <= ?"
             params.append(float(self.filter_hub_h_max.get()))
 
         # Step Diameter range
         if self.filter_step_d_min.get():
-            query += " AND counter_bore_diameter >= ?"
+            where += " AND counter_bore_diameter >= ?"
             params.append(float(self.filter_step_d_min.get()))
         if self.filter_step_d_max.get():
-            query += " AND counter_bore_diameter <= ?"
+            where += " AND counter_bore_diameter <= ?"
             params.append(float(self.filter_step_d_max.get()))
 
-        # Error text filter — searches all error/warning columns including crash
+        # Error filter — issue type (indexed program_issues lookup) or free text
         if self.filter_error_text.get():
             # Strip count suffix added by _update_error_filter_counts, e.g. " (14)"
             _raw_term = re.sub(r'\s*\(\d+\)$', '', self.filter_error_text.get())
-            error_search = f"%{_raw_term}%"
-            query += (
-                " AND (validation_issues LIKE ? OR validation_warnings LIKE ?"
-                " OR bore_warnings LIKE ? OR dimensional_issues LIKE ?"
-                " OR tool_home_issues LIKE ? OR crash_issues LIKE ?"
-                " OR crash_warnings LIKE ?)"
-            )
-            params.extend([error_search] * 7)
+            issue_code = code_for_label(_raw_term)
+            if issue_code:
+                where += " AND program_number IN (SELECT program_number FROM program_issues WHERE issue_code = ?)"
+                params.append(issue_code)
+            else:
+                where += " AND program_number IN (SELECT program_number FROM program_issues WHERE message LIKE ?)"
+                params.append(f"%{_raw_term}%")
 
         # Date Imported filter
         if hasattr(self, 'filter_date_from') and self.filter_date_from.get():
@@ -12680,7 +12754,7 @@ class GCodeDatabaseGUI:
                 # Accept YYYY-MM-DD format and convert to ISO timestamp for comparison
                 date_from = self.filter_date_from.get().strip()
                 # Add time component to make it start of day
-                query += " AND date_imported >= ?"
+                where += " AND date_imported >= ?"
                 params.append(f"{date_from}T00:00:00")
             except:
                 pass  # Ignore invalid date format
@@ -12690,7 +12764,7 @@ class GCodeDatabaseGUI:
                 # Accept YYYY-MM-DD format and convert to ISO timestamp for comparison
                 date_to = self.filter_date_to.get().strip()
                 # Add time component to make it end of day
-                query += " AND date_imported <= ?"
+                where += " AND date_imported <= ?"
                 params.append(f"{date_to}T23:59:59")
             except:
                 pass  # Ignore invalid date format
@@ -12699,32 +12773,60 @@ class GCodeDatabaseGUI:
         if hasattr(self, 'filter_crash_type'):
             selected_crash_types = self.filter_crash_type.get_selected()
             if selected_crash_types and len(selected_crash_types) < len(self.filter_crash_type.values):
-                # Build conditions based on selected crash types
+                # Map selected crash types to issue codes / severity in program_issues
+                crash_codes = []
                 crash_conditions = []
 
                 if "G00 Rapid to Z" in selected_crash_types:
-                    crash_conditions.append("crash_issues LIKE '%G00 rapid to Z%'")
+                    crash_codes.append('RAPID_TO_NEGATIVE_Z')
 
                 if "Diagonal Rapid" in selected_crash_types:
-                    crash_conditions.append("crash_issues LIKE '%diagonal%'")
+                    crash_codes.append('DIAGONAL_RAPID')
 
                 if "Z Before Tool Home" in selected_crash_types:
-                    crash_conditions.append("crash_issues LIKE '%Z before G53%' OR crash_issues LIKE '%negative Z before tool home%'")
+                    crash_codes.append('TOOL_HOME_NEGATIVE_Z')
 
                 if "Jaw Clearance" in selected_crash_types:
-                    crash_conditions.append("crash_warnings LIKE '%jaw clearance%'")
+                    crash_codes.extend(['JAW_CLEARANCE_CRITICAL', 'JAW_CLEARANCE_CAUTION'])
+
+                if crash_codes:
+                    crash_conditions.append(
+                        "program_number IN (SELECT program_number FROM program_issues WHERE issue_code IN (%s))"
+                        % ', '.join('?' * len(crash_codes)))
+                    params.extend(crash_codes)
 
                 if "All Crashes" in selected_crash_types:
-                    crash_conditions.append("(crash_issues IS NOT NULL AND crash_issues != 'null' AND crash_issues != '[]')")
+                    crash_conditions.append("program_number IN (SELECT program_number FROM program_issues WHERE severity = 'CRASH_RISK')")
 
                 if crash_conditions:
-                    query += f" AND ({' OR '.join(crash_conditions)})"
+                    where += f" AND ({' OR '.join(crash_conditions)})"
 
         # Missing file path filter
         if self.filter_missing_file_path.get():
-            query += " AND (file_path IS NULL OR file_path = '')"
+            where += " AND (file_path IS NULL OR file_path = '')"
+
+        return where, params
+
+    def refresh_results(self, view_mode='all', external_only=False):
+        """Refresh the results table based on current filters
+
+        Args:
+            view_mode: 'all' (default), 'repository', 'revised', or 'external'
+            external_only: Deprecated, use view_mode='external' instead
+        """
+        # Handle deprecated parameter
+        if external_only:
+            view_mode = 'external'
+
+        # Clear existing - PERFORMANCE: Use delete('') to clear all at once
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
 
-        query += " ORDER BY program_number"
+        # Build query
+        where, params = self.build_filter_query(view_mode)
+        self._last_view_mode = view_mode
+        query = f"SELECT * FROM programs WHERE {where} ORDER BY program_number"
 
         # Note: Duplicates filter is applied after query in the display logic
         # since it requires checking for duplicate filenames across all results
@@ -12735,6 +12837,11 @@ class GCodeDatabaseGUI:
         column_names = []
         try:
             conn = sqlite3.connect(self.db_path, timeout=30.0)
+            # Pick up issue changes queued by writes that bypass the parser
+            try:
+                sync_program_issues(conn)
+            except sqlite3.Error as e:
+                logger.warning(f"refresh_results: Issue sync skipped: {e}")
             cursor = conn.cursor()
             cursor.execute(query, params)
             results = cursor.fetchall()
@@ -13329,6 +13436,9 @@ class GCodeDatabaseGUI:
                     pass
 
             if os.path.exists(filepath):
+                if not self._lock_program_for_edit(program_number):
+                    return
+
                 # AUTO-BACKUP: Create version archive before opening file for editing
                 try:
                     # Only backup managed repository files (not external files)
@@ -13357,16 +13467,22 @@ class GCodeDatabaseGUI:
 
                 # Launch integrated text editor — pass crash lines so they are
                 # highlighted immediately and the view scrolls to the first one
-                editor = GCodeTextEditor(
-                    parent=self.root,
-                    file_path=filepath,
-                    program_number=program_number,
-                    on_save_callback=lambda: self.refresh_selected_file(),
-                    bg_color=self.bg_color,
-                    fg_color=self.fg_color,
-                    repository_manager=repo_mgr,
-                    crash_lines=crash_lines or None
-                )
+                try:
+                    editor = GCodeTextEditor(
+                        parent=self.root,
+                        file_path=filepath,
+                        program_number=program_number,
+                        on_save_callback=lambda: self.refresh_selected_file(),
+                        bg_color=self.bg_color,
+                        fg_color=self.fg_color,
+                        repository_manager=repo_mgr,
+                        crash_lines=crash_lines or None,
+                        save_guard=lambda: self._check_program_lock_before_save(program_number),
+                        on_close_callback=lambda: self._unlock_program(program_number)
+                    )
+                except Exception:
+                    self._unlock_program(program_number)
+                    raise
             else:
                 messagebox.showerror("File Not Found", f"File not found:\n{filepath}")
         else:
@@ -13645,6 +13761,7 @@ class GCodeDatabaseGUI:
                 datetime.now().isoformat(),
                 program_number
             ))
+            store_program_issues(cursor, program_number, parse_result.get_issues())
             conn.commit()
             conn.close()
 
@@ -14070,6 +14187,7 @@ class GCodeDatabaseGUI:
                             datetime.now().isoformat(),
                             prog_num
                         ))
+                        store_program_issues(cursor, prog_num, parse_result.get_issues())
                         conn.commit()
                         conn.close()
                     except Exception as e:
@@ -14407,6 +14525,8 @@ class GCodeDatabaseGUI:
             return
 
         program_number = self.tree.item(selected[0])['values'][0]
+        if not self._lock_program_for_edit(program_number):
+            return
         EditEntryWindow(self, program_number, self.refresh_results)
         
     def archive_program(self):
@@ -14513,14 +14633,18 @@ class GCodeDatabaseGUI:
                 logger.info(f"Delete entry cancelled by safety check: {msg}")
                 return
 
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM programs WHERE program_number = ?", (program_number,))
-            conn.commit()
-            conn.close()
+            try:
+                conn = sqlite3.connect(self.db_path)
+                try:
+                    conn.execute("DELETE FROM programs WHERE program_number = ?", (program_number,))
+                    conn.commit()
+                finally:
+                    conn.close()
 
-            # Record successful write (Phase 1)
-            self._record_database_write("delete_entry")
+                # Record successful write (Phase 1)
+                self._record_database_write("delete_entry")
+            finally:
+                self._release_write_lease()
 
             self.refresh_results()
             messagebox.showinfo("Deleted", "Entry deleted successfully")
@@ -14569,1006 +14693,251 @@ class GCodeDatabaseGUI:
         # Open version history window
         VersionHistoryWindow(self.root, self, program_number, file_path)
 
-    def export_csv(self):
-        """Export database to Excel with separate sheets for each round size"""
-        try:
-            import openpyxl
-        except ImportError:
-            messagebox.showerror("Missing Library",
-                "openpyxl is required for Excel export.\n\n"
-                "Install it with:\npip install openpyxl")
-            return
+    def _export_view_programs(self, title):
+        """
+        Ask whether an export covers the current view or the whole database.
 
-        from datetime import datetime
-        default_filename = f"GCode_Programs_{datetime.now().strftime('%Y%m%d')}.xlsx"
+        Only asked while filters are active. The view is taken from the
+        results table, so fuzzy title search and "Duplicates Only" (applied
+        after the query) are honoured too.
 
-        filepath = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            initialfile=default_filename,
-            filetypes=[("Excel Workbook", "*.xlsx"), ("All files", "*.*")],
-            title="Export to Excel - By Round Size"
+        Returns:
+            (proceed, program_numbers) - program_numbers is None for the whole database
+        """
+        where, _ = self.build_filter_query(getattr(self, '_last_view_mode', 'all'))
+        fuzzy = (hasattr(self, 'fuzzy_search_enabled') and self.fuzzy_search_enabled.get()
+                 and self.filter_title.get())
+        if where == ACTIVE_PROGRAMS_WHERE and not fuzzy and not self.filter_duplicates.get():
+            return True, None
+
+        items = self.tree.get_children()
+        choice = messagebox.askyesnocancel(
+            title,
+            f"Filters are active - {len(items)} programs shown.\n\n"
+            "YES = Export only the current view\n"
+            "NO = Export the entire database\n"
+            "CANCEL = Cancel"
         )
+        if choice is None:
+            return False, None
+        if not choice:
+            return True, None
+        return True, [self.tree.item(item, "values")[0] for item in items]
 
-        if filepath:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Define organized column order - dimensions and key info only
-            export_columns = [
-                # Identity
-                'program_number',
-                'title',
-
-                # Dimensions (sorted by OD, Type, CB, Thickness)
-                'outer_diameter',
-                'spacer_type',
-                'center_bore',
-                'thickness',
-                'hub_diameter',
-                'hub_height',
-                'counter_bore_diameter',
-                'counter_bore_depth',
-
-                # Classification
-                'material',
-                'lathe',
-
-                # Status (summary only)
-                'validation_status',
-                'detection_confidence',
-
-                # Metadata
-                'last_modified'
-            ]
-
-            # Build query with ordering: OD, Type, CB, Thickness
-            # NULLS LAST ensures NULL values don't cause sorting issues
-            columns_str = ', '.join(export_columns)
-            cursor.execute(f"""
-                SELECT {columns_str} FROM programs
-                ORDER BY
-                    CASE WHEN outer_diameter IS NULL THEN 1 ELSE 0 END,
-                    outer_diameter,
-                    spacer_type,
-                    CASE WHEN center_bore IS NULL THEN 1 ELSE 0 END,
-                    center_bore,
-                    CASE WHEN thickness IS NULL THEN 1 ELSE 0 END,
-                    thickness
-            """)
-            results = cursor.fetchall()
-
-            # Create Excel workbook
-            wb = openpyxl.Workbook()
-            wb.remove(wb.active)  # Remove default sheet
-
-            # Define standard round sizes
-            round_sizes = [
-                ('5.75"', 5.75),
-                ('6.00"', 6.00),
-                ('6.25"', 6.25),
-                ('6.50"', 6.50),
-                ('7.00"', 7.00),
-                ('7.50"', 7.50),
-                ('8.00"', 8.00),
-                ('9.00"', 9.00),
-                ('9.50"', 9.50),
-                ('10.00"', 10.00),
-                ('13.00"', 13.00),
-            ]
-
-            # Group programs by OD
-            programs_by_od = {}
-            for row in results:
-                od = row[2]  # outer_diameter column (index 2: program_number, title, outer_diameter)
-                if od not in programs_by_od:
-                    programs_by_od[od] = []
-                programs_by_od[od].append(row)
-
-            # Create sheet for each round size
-            for sheet_name, od_value in round_sizes:
-                if od_value in programs_by_od:
-                    ws = wb.create_sheet(title=sheet_name)
-                    self._write_excel_sheet(ws, programs_by_od[od_value])
-
-            # Create "Other Sizes" sheet for non-standard sizes
-            other_ods = [od for od in programs_by_od.keys()
-                        if od not in [size[1] for size in round_sizes]]
-            if other_ods:
-                ws = wb.create_sheet(title="Other Sizes")
-                other_programs = []
-                # Sort ODs, handling None values (put them last)
-                sorted_ods = sorted([od for od in other_ods if od is not None])
-                none_ods = [od for od in other_ods if od is None]
-                for od in sorted_ods + none_ods:
-                    other_programs.extend(programs_by_od[od])
-                self._write_excel_sheet(ws, other_programs)
-
-            # Save workbook
-            wb.save(filepath)
-            conn.close()
-
-            total_sheets = len(wb.sheetnames)
-            messagebox.showinfo("Export Complete",
-                f"Exported {len(results)} records to {total_sheets} sheets:\n{filepath}")
-
-    def _write_excel_sheet(self, ws, data):
-        """Write data to an Excel sheet with formatting"""
-        from openpyxl.styles import Font, PatternFill, Alignment
-
-        # Header
-        headers = [
-            'Program #',
-            'Title',
-            'OD (in)',
-            'Type',
-            'CB (mm)',
-            'Thickness (in)',
-            'Hub (mm)',
-            'Hub Height (in)',
-            'Counterbore (mm)',
-            'CB Depth (in)',
-            'Material',
-            'Lathe',
-            'Status',
-            'Confidence',
-            'Last Modified'
-        ]
-
-        # Write header with formatting
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Write data
-        for row_idx, row_data in enumerate(data, start=2):
-            for col_idx, value in enumerate(row_data, start=1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-
-                if value is None:
-                    cell.value = ""
-                elif isinstance(value, float):
-                    # Format floats to 2 decimal places
-                    cell.value = round(value, 2)
-                    cell.number_format = '0.00'
-                else:
-                    cell.value = str(value)
-
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)  # Cap at 50
-            ws.column_dimensions[column_letter].width = adjusted_width
+    def _run_export(self, title, export, on_complete, wait=False):
+        """
+        Run an export in a background thread behind a small progress window.
 
-    def export_google_sheets(self):
-        """Export database to Excel optimized for Google Sheets import"""
-        try:
-            import openpyxl
-        except ImportError:
-            messagebox.showerror("Missing Library",
-                "openpyxl is required for Google Sheets export.\n\n"
-                "Install it with:\npip install openpyxl")
+        Args:
+            title: Progress window title
+            export: Callable(conn, progress, cancel_event) doing the export -
+                conn is opened in the export thread
+            on_complete: Callable(result) returning the completion message
+            wait: Run in the calling thread instead (used before the
+                database is cleared)
+        """
+        if wait:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            try:
+                result = export(conn, None, None)
+            except Exception as e:
+                logger.error(f"{title} failed: {e}", exc_info=True)
+                messagebox.showerror("Export Error", f"Failed to export:\n{str(e)}")
+                return
+            finally:
+                conn.close()
+            messagebox.showinfo("Export Complete", on_complete(result))
             return
 
-        from datetime import datetime
-        default_filename = f"GCode_GoogleSheets_{datetime.now().strftime('%Y%m%d')}.xlsx"
-
-        filepath = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            initialfile=default_filename,
-            filetypes=[("Excel Workbook", "*.xlsx"), ("All files", "*.*")],
-            title="Export for Google Sheets"
-        )
-
-        if filepath:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Define organized column order per user request:
-            # Program Number, Round Size, Thickness (display), CB, OB, Hub Height, Hub D, CB Diam, CB Depth, Type, Title, Status, Warning Details
-            # Use thickness_display to show mm when applicable
-            # CB Depth shown in mm if title contains 'MM' for depth indication
-            # Sort order: Round Size, Type, CB, Thickness
-            cursor.execute("""
-                SELECT
-                    program_number, round_size, thickness_display, center_bore, hub_diameter,
-                    hub_height, hub_diameter as hub_d_mm, counter_bore_diameter,
-                    CASE
-                        WHEN counter_bore_depth IS NOT NULL AND (title LIKE '%MM B/C%' OR title LIKE '%MM DEEP%' OR title LIKE '%MM STEP%')
-                        THEN ROUND(counter_bore_depth * 25.4, 1)
-                        ELSE counter_bore_depth
-                    END as cb_depth_display,
-                    spacer_type, title, validation_status,
-                    COALESCE(tool_home_issues, '') || COALESCE(bore_warnings, '') || COALESCE(dimensional_issues, '') || COALESCE(validation_issues, '')
-                FROM programs
-                WHERE (is_deleted IS NULL OR is_deleted = 0)
-                ORDER BY
-                    CASE WHEN round_size IS NULL THEN 1 ELSE 0 END,
-                    round_size,
-                    CASE WHEN spacer_type IS NULL THEN 99 ELSE
-                        CASE
-                            WHEN LOWER(spacer_type) = 'standard' THEN 1
-                            WHEN LOWER(spacer_type) = 'hub_centric' THEN 2
-                            WHEN LOWER(spacer_type) = 'step' THEN 3
-                            WHEN LOWER(spacer_type) LIKE '%steel%' THEN 4
-                            WHEN LOWER(spacer_type) LIKE '%2pc%' THEN 5
-                            ELSE 6
-                        END
-                    END,
-                    CASE WHEN center_bore IS NULL THEN 1 ELSE 0 END,
-                    center_bore,
-                    CASE WHEN thickness IS NULL THEN 1 ELSE 0 END,
-                    thickness
-            """)
-            results = cursor.fetchall()
+        progress_win = tk.Toplevel(self.root)
+        progress_win.title(title)
+        progress_win.geometry("400x150")
+        progress_win.configure(bg=self.bg_color)
+        progress_win.transient(self.root)
 
-            # Create Excel workbook
-            wb = openpyxl.Workbook()
-            wb.remove(wb.active)  # Remove default sheet
-
-            # FIRST SHEET: All Programs together, sorted by Round Size, Type, Thickness, CB
-            ws_all = wb.create_sheet(title="All Programs")
-            self._write_google_sheet(ws_all, results)
-
-            # Define standard round sizes for individual sheets (one sheet per size)
-            round_size_groups = [
-                ('5.75"', [5.75]),
-                ('6.00"', [6.00]),
-                ('6.25"', [6.25]),
-                ('6.50"', [6.50]),
-                ('7.00"', [7.00]),
-                ('7.50"', [7.50]),
-                ('8.00"', [8.00]),
-                ('8.50"', [8.50]),
-                ('9.50"', [9.50]),
-                ('10.25"', [10.25]),
-                ('10.50"', [10.50]),
-                ('13.00"', [13.00]),
-            ]
+        progress_label = tk.Label(progress_win, text="Starting export...",
+                                  bg=self.bg_color, fg=self.fg_color,
+                                  font=("Arial", 11), wraplength=380)
+        progress_label.pack(pady=20)
 
-            # Group programs by round_size
-            programs_by_round_size = {}
-            for row in results:
-                round_size = row[1]  # round_size is index 1 in new column order
-                if round_size not in programs_by_round_size:
-                    programs_by_round_size[round_size] = []
-                programs_by_round_size[round_size].append(row)
-
-            # Create sheet for each round size group
-            for sheet_name, round_size_values in round_size_groups:
-                group_programs = []
-                for round_size_value in round_size_values:
-                    if round_size_value in programs_by_round_size:
-                        group_programs.extend(programs_by_round_size[round_size_value])
-
-                if group_programs:
-                    ws = wb.create_sheet(title=sheet_name)
-                    self._write_google_sheet(ws, group_programs)
-
-            # Create "Other Sizes" sheet for non-standard sizes
-            all_standard_sizes = []
-            for _, size_list in round_size_groups:
-                all_standard_sizes.extend(size_list)
-
-            other_sizes = [size for size in programs_by_round_size.keys()
-                          if size not in all_standard_sizes]
-            if other_sizes:
-                ws = wb.create_sheet(title="Other Sizes")
-                other_programs = []
-                # Sort sizes, handling None values (put them last)
-                sorted_sizes = sorted([size for size in other_sizes if size is not None])
-                none_sizes = [size for size in other_sizes if size is None]
-                for size in sorted_sizes + none_sizes:
-                    other_programs.extend(programs_by_round_size[size])
-                self._write_google_sheet(ws, other_programs)
-
-            # Create LPN (Lot Program Number) Tracker Sheet - COMBINED (existing + available in gaps)
-            self.create_lpn_tracker_sheet(wb)
-
-            # Create Available Numbers Report - SEPARATE (compact summary by round size)
-            self.create_available_numbers_sheet(wb)
-
-            # Save workbook
-            wb.save(filepath)
-            conn.close()
+        cancel_event = threading.Event()
 
-            total_sheets = len(wb.sheetnames)
-            messagebox.showinfo("Google Sheets Export Complete",
-                f"Exported {len(results)} records to {total_sheets} sheets.\n\n"
-                f"Sheets included:\n"
-                f"• All Programs - Complete list sorted by round size\n"
-                f"• LPN Tracker - Existing + available numbers in gaps (combined)\n"
-                f"• Available Numbers - Compact summary of available ranges\n"
-                f"• Individual round size sheets (5.75\", 6.0\", etc.)\n\n"
-                f"To import to Google Sheets:\n"
-                f"1. Go to sheets.google.com\n"
-                f"2. File → Import → Upload\n"
-                f"3. Select this file\n"
-                f"4. Import location: Replace spreadsheet")
-
-    def _write_google_sheet(self, ws, data):
-        """Write data to an Excel sheet optimized for Google Sheets"""
-        from openpyxl.styles import Font, PatternFill, Alignment
-
-        # Header - columns per user request:
-        # Program Number, Round Size, Thickness, CB, OB, Hub Height, Hub D (mm), CB Diam (mm), CB Depth (in), Type, Title, Status, Warning Details
-        headers = [
-            'Program #', 'Round Size', 'Thickness', 'CB (mm)', 'OB (mm)',
-            'Hub Height', 'Hub D (mm)', 'CB Diam (mm)', 'CB Depth (in)',
-            'Type', 'Title', 'Status', 'Warning Details'
-        ]
+        def cancel_export():
+            cancel_event.set()
+            cancel_btn.config(state=tk.DISABLED, text="Cancelling...")
 
-        # Alternating row colors - light green and medium green
-        light_green = PatternFill(start_color="E8F5E9", end_color="E8F5E9", fill_type="solid")
-        medium_green = PatternFill(start_color="C8E6C9", end_color="C8E6C9", fill_type="solid")
-
-        # Write header with Google Sheets-friendly formatting
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            # Google green color for headers
-            cell.fill = PatternFill(start_color="34A853", end_color="34A853", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Status column cleanup mapping
-        status_display = {
-            'OK': 'OK',
-            'WARNING': 'Warning',
-            'TOOL_HOME_WARNING': 'Tool Home Warning',
-            'TOOL_HOME_CRITICAL': 'Tool Home Critical',
-            'CB_OB_WARNING': 'CB/OB Warning',
-            'MISMATCH': 'Mismatch',
-            'ERROR': 'Error',
-        }
+        cancel_btn = tk.Button(progress_win, text="Cancel", command=cancel_export,
+                               bg="#D32F2F", fg=self.fg_color,
+                               font=("Arial", 10, "bold"))
+        cancel_btn.pack(pady=10)
+        progress_win.protocol("WM_DELETE_WINDOW", cancel_export)
 
-        # Write data with alternating row colors
-        for row_idx, row_data in enumerate(data, start=2):
-            # Determine row fill color (alternating)
-            row_fill = light_green if row_idx % 2 == 0 else medium_green
-            for col_idx, value in enumerate(row_data, start=1):
-                cell = ws.cell(row=row_idx, column=col_idx)
+        msg_queue = queue.Queue()
+        db_path = self.db_path
 
-                # Clean up status column (column 12 now with added columns)
-                if col_idx == 12 and value:
-                    value = status_display.get(str(value), str(value))
+        def update_gui():
+            """Process messages from the export thread"""
+            try:
+                while True:
+                    msg = msg_queue.get_nowait()
+                    if msg[0] == 'label':
+                        progress_label.config(text=msg[1])
+                        continue
+                    progress_win.destroy()
+                    if msg[0] == 'done':
+                        messagebox.showinfo("Export Complete", on_complete(msg[1]))
+                    elif msg[0] == 'error':
+                        messagebox.showerror("Export Error", f"Failed to export:\n{msg[1]}")
+                    return
+            except queue.Empty:
+                pass
 
-                # Clean up warning details column (column 13 now with added columns) - parse JSON and format
-                if col_idx == 13 and value:
-                    try:
-                        import json
-                        # Value might be concatenated JSON arrays, try to parse
-                        details = []
-                        # Try to extract individual JSON arrays from concatenated string
-                        raw = str(value)
-                        if raw.startswith('['):
-                            # Find all JSON arrays in the string
-                            import re
-                            json_arrays = re.findall(r'\[.*?\]', raw)
-                            for arr in json_arrays:
-                                try:
-                                    items = json.loads(arr)
-                                    if isinstance(items, list):
-                                        details.extend(items)
-                                except:
-                                    pass
-                        if details:
-                            # Clean up and join, remove prefixes like "WARNING: "
-                            cleaned = []
-                            for d in details:
-                                d = str(d).replace('WARNING: ', '').replace('CRITICAL: ', '').replace('REVIEW: ', '')
-                                if d and d not in cleaned:
-                                    cleaned.append(d)
-                            value = '; '.join(cleaned[:3])  # Limit to first 3 issues
-                        else:
-                            value = ""
-                    except:
-                        value = ""
-
-                if value is None:
-                    cell.value = ""
-                elif isinstance(value, float):
-                    # Format floats to 2 decimal places
-                    cell.value = round(value, 2)
-                    cell.number_format = '0.00'
-                else:
-                    cell.value = str(value)
+            if progress_win.winfo_exists():
+                progress_win.after(100, update_gui)
 
-                # Apply alternating row fill color
-                cell.fill = row_fill
+        def export_thread():
+            conn = sqlite3.connect(db_path, timeout=30.0)
+            try:
+                result = export(conn, lambda message: msg_queue.put(('label', message)), cancel_event)
+                msg_queue.put(('done', result))
+            except ExportCancelled:
+                msg_queue.put(('cancelled', None))
+            except Exception as e:
+                logger.error(f"{title} failed: {e}", exc_info=True)
+                msg_queue.put(('error', str(e)))
+            finally:
+                conn.close()
 
-        # Auto-adjust column widths (Google Sheets respects this)
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)  # Cap at 50
-            ws.column_dimensions[column_letter].width = adjusted_width
+        threading.Thread(target=export_thread, daemon=True).start()
+        update_gui()
 
-    def create_lpn_tracker_sheet(self, wb):
+    def export_csv(self, wait=False):
         """
-        Create LPN (Lot Program Number) tracking sheet - COMBINED VIEW.
-        Shows existing programs + available numbers within gaps (smart detection).
-        Prevents Excel crash by only showing relevant available numbers near gaps.
-        """
-        from openpyxl.styles import Font, PatternFill, Alignment
-        import re
-
-        ws = wb.create_sheet(title="LPN Tracker", index=1)  # Second sheet (after "All Programs")
-
-        # Headers
-        headers = ["Program #", "Round Size", "Title", "Type", "OD", "Thick",
-                   "CB", "OB", "Status", "Last Modified"]
-
-        # Header formatting
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="34A853", end_color="34A853", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Get all existing programs
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT program_number, round_size, title, spacer_type,
-                   outer_diameter, thickness, center_bore, hub_diameter,
-                   validation_status, last_modified
-            FROM programs
-            WHERE (is_deleted IS NULL OR is_deleted = 0)
-            ORDER BY program_number
-        """)
-        existing_rows = cursor.fetchall()
-        conn.close()
-
-        # Build lookup and extract numeric IDs
-        existing_programs = {}  # program_number -> data
-        existing_nums = []  # sorted list of numeric IDs
-
-        for row in existing_rows:
-            prog_num = row[0]
-            existing_programs[prog_num] = row
-
-            # Extract numeric ID
-            match = re.search(r'[oO]?(\d+)', str(prog_num))
-            if match:
-                existing_nums.append(int(match.group(1)))
-
-        existing_nums.sort()
-
-        # Get round size ranges
-        round_size_ranges = self.get_round_size_ranges()
-
-        # Build reverse lookup: number -> round size
-        def get_round_size_for_number(num):
-            for rs, (start, end, name) in round_size_ranges.items():
-                if start <= num <= end:
-                    return rs if rs > 0 else 0  # Free ranges return 0
-            return None
-
-        # Colors
-        light_green = PatternFill(start_color="E8F5E9", end_color="E8F5E9", fill_type="solid")
-        medium_green = PatternFill(start_color="C8E6C9", end_color="C8E6C9", fill_type="solid")
-        light_gray = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-        medium_gray = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
-
-        row_num = 2
-
-        # Smart gap detection: Show numbers to include
-        numbers_to_show = set()
-
-        # 1. Add all existing numbers
-        numbers_to_show.update(existing_nums)
-
-        # 2. For each round size range, add first 20 and last 20 numbers (to show range boundaries)
-        for round_size, (start_num, end_num, range_name) in round_size_ranges.items():
-            # First 20
-            for i in range(start_num, min(start_num + 20, end_num + 1)):
-                numbers_to_show.add(i)
-            # Last 20
-            for i in range(max(end_num - 19, start_num), end_num + 1):
-                numbers_to_show.add(i)
-
-        # 3. Add numbers within gaps (±10 around each gap between consecutive existing programs)
-        for i in range(len(existing_nums) - 1):
-            current_num = existing_nums[i]
-            next_num = existing_nums[i + 1]
-
-            gap_size = next_num - current_num - 1
-
-            if gap_size > 0:
-                # Show gap: numbers around the gap
-                if gap_size <= 20:
-                    # Small gap: show all numbers in gap
-                    for num in range(current_num + 1, next_num):
-                        numbers_to_show.add(num)
-                else:
-                    # Large gap: show first 10 and last 10 of gap
-                    for num in range(current_num + 1, min(current_num + 11, next_num)):
-                        numbers_to_show.add(num)
-                    for num in range(max(next_num - 10, current_num + 1), next_num):
-                        numbers_to_show.add(num)
-
-        # Convert to sorted list
-        all_numbers = sorted(numbers_to_show)
-
-        # Write rows
-        for num in all_numbers:
-            prog_num = f"o{num:05d}"
-            round_size = get_round_size_for_number(num)
-
-            if prog_num in existing_programs:
-                # Existing program - show full details
-                row = existing_programs[prog_num]
-                row_fill = light_green if row_num % 2 == 0 else medium_green
-
-                data = [
-                    row[0],  # Program #
-                    f"{row[1]:.2f}\"" if row[1] else "",  # Round Size
-                    row[2],  # Title
-                    row[3],  # Type
-                    f"{row[4]:.2f}" if row[4] else "",  # OD
-                    f"{row[5]:.3f}" if row[5] else "",  # Thick
-                    f"{row[6]:.1f}" if row[6] else "",  # CB
-                    f"{row[7]:.1f}" if row[7] else "",  # OB
-                    row[8] or "OK",  # Status
-                    row[9] or ""  # Last Modified
-                ]
-            else:
-                # Available number - show as empty
-                row_fill = light_gray if row_num % 2 == 0 else medium_gray
-
-                data = [
-                    prog_num,  # Program #
-                    f"{round_size:.2f}\"" if round_size and round_size > 0 else "",  # Round Size
-                    "—",  # No title
-                    "—",  # No type
-                    "",  # No OD
-                    "",  # No thickness
-                    "",  # No CB
-                    "",  # No OB
-                    "AVAILABLE",  # Status
-                    ""  # No last modified
-                ]
+        Export programs to Excel with separate sheets for each round size
+        (or a single CSV file).
 
-            # Write row
-            for col_idx, value in enumerate(data, start=1):
-                cell = ws.cell(row=row_num, column=col_idx, value=value)
-                cell.fill = row_fill
-
-                # Gray text for available numbers
-                if data[8] == "AVAILABLE":
-                    cell.font = Font(color="808080")
-
-            row_num += 1
-
-        # Auto-size columns
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-
-    def create_available_numbers_sheet(self, wb):
-        """
-        Create Available Numbers Report - SEPARATE SHEET.
-        Shows summary of available numbers grouped by round size with compact ranges.
+        Args:
+            wait: Export the whole database in the calling thread (used
+                right before the database is cleared)
         """
-        from openpyxl.styles import Font, PatternFill, Alignment
-        import re
-
-        ws = wb.create_sheet(title="Available Numbers", index=2)  # Third sheet
-
-        # Title row
-        title_cell = ws.cell(row=1, column=1, value="AVAILABLE PROGRAM NUMBERS REPORT")
-        title_cell.font = Font(bold=True, size=14, color="FFFFFF")
-        title_cell.fill = PatternFill(start_color="1976D2", end_color="1976D2", fill_type="solid")
-        ws.merge_cells('A1:E1')
-
-        # Headers
-        headers = ["Round Size", "Range", "Used Count", "Available Count", "Available Ranges"]
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=3, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="34A853", end_color="34A853", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Get all existing programs
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT program_number
-            FROM programs
-            WHERE (is_deleted IS NULL OR is_deleted = 0)
-            ORDER BY program_number
-        """)
-        existing_rows = cursor.fetchall()
-        conn.close()
-
-        # Extract numeric IDs
-        existing_nums = set()
-        for row in existing_rows:
-            prog_num = row[0]
-            match = re.search(r'[oO]?(\d+)', str(prog_num))
-            if match:
-                existing_nums.add(int(match.group(1)))
-
-        # Get round size ranges
-        round_size_ranges = self.get_round_size_ranges()
-
-        # Helper function to format consecutive numbers as ranges
-        def format_ranges(numbers):
-            """Convert list of numbers to compact range strings"""
-            if not numbers:
-                return "None"
-
-            numbers = sorted(numbers)
-            ranges = []
-            start = numbers[0]
-            prev = numbers[0]
-
-            for num in numbers[1:]:
-                if num == prev + 1:
-                    # Continue range
-                    prev = num
-                else:
-                    # End current range
-                    if start == prev:
-                        ranges.append(f"o{start:05d}")
-                    else:
-                        ranges.append(f"o{start:05d}-o{prev:05d}")
-                    start = num
-                    prev = num
-
-            # Add final range
-            if start == prev:
-                ranges.append(f"o{start:05d}")
-            else:
-                ranges.append(f"o{start:05d}-o{prev:05d}")
-
-            # Limit to first 10 ranges to prevent cell overflow
-            if len(ranges) > 10:
-                return ", ".join(ranges[:10]) + f" ... ({len(ranges)-10} more)"
-            else:
-                return ", ".join(ranges)
-
-        # Colors
-        light_blue = PatternFill(start_color="E3F2FD", end_color="E3F2FD", fill_type="solid")
-        medium_blue = PatternFill(start_color="BBDEFB", end_color="BBDEFB", fill_type="solid")
-
-        row_num = 4
-
-        # Process each round size range
-        for round_size, (start_num, end_num, range_name) in sorted(round_size_ranges.items()):
-            # Find used and available numbers in this range
-            used_in_range = [n for n in existing_nums if start_num <= n <= end_num]
-            available_in_range = [n for n in range(start_num, end_num + 1) if n not in existing_nums]
-
-            used_count = len(used_in_range)
-            available_count = len(available_in_range)
-            total_count = end_num - start_num + 1
-
-            # Format round size display
-            if round_size > 0:
-                round_size_display = f"{round_size:.2f}\""
-            elif round_size == 0:
-                round_size_display = "FREE 1"
-            else:
-                round_size_display = "FREE 2"
-
-            # Format range
-            range_display = f"o{start_num:05d} - o{end_num:05d}"
-
-            # Format available ranges
-            available_ranges_display = format_ranges(available_in_range)
-
-            # Row fill
-            row_fill = light_blue if row_num % 2 == 0 else medium_blue
-
-            data = [
-                round_size_display,
-                range_display,
-                f"{used_count} / {total_count}",
-                available_count,
-                available_ranges_display
-            ]
-
-            # Write row
-            for col_idx, value in enumerate(data, start=1):
-                cell = ws.cell(row=row_num, column=col_idx, value=value)
-                cell.fill = row_fill
-                cell.alignment = Alignment(horizontal="left", vertical="top", wrap_text=True)
-
-            row_num += 1
+        if wait:
+            program_numbers = None
+        else:
+            proceed, program_numbers = self._export_view_programs("Export to Excel")
+            if not proceed:
+                return
 
-        # Summary row
-        ws.cell(row=row_num + 1, column=1, value="TOTAL:").font = Font(bold=True)
-        total_used = len(existing_nums)
-        ws.cell(row=row_num + 1, column=3, value=f"{total_used}").font = Font(bold=True)
+        from datetime import datetime
+        default_filename = f"GCode_Programs_{datetime.now().strftime('%Y%m%d')}.xlsx"
 
-        # Calculate total available in all defined ranges
-        total_in_ranges = sum(end - start + 1 for _, (start, end, _) in round_size_ranges.items())
-        total_available = total_in_ranges - total_used
-        ws.cell(row=row_num + 1, column=4, value=f"{total_available}").font = Font(bold=True)
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            initialfile=default_filename,
+            filetypes=[("Excel Workbook", "*.xlsx"), ("CSV file", "*.csv"), ("All files", "*.*")],
+            title="Export to Excel - By Round Size"
+        )
+        if not filepath:
+            return
 
-        # Auto-size columns
-        ws.column_dimensions['A'].width = 15
-        ws.column_dimensions['B'].width = 25
-        ws.column_dimensions['C'].width = 15
-        ws.column_dimensions['D'].width = 18
-        ws.column_dimensions['E'].width = 60  # Wide for ranges
+        if filepath.lower().endswith('.xlsx') and not HAS_OPENPYXL:
+            messagebox.showerror("Missing Library",
+                "openpyxl is required for Excel export.\n\n"
+                "Install it with:\npip install openpyxl\n\n"
+                "Or save as .csv instead.")
+            return
 
-        # Set row heights for wrapped text
-        for row in range(4, row_num):
-            ws.row_dimensions[row].height = 30
+        def export(conn, progress, cancel_event):
+            return export_programs_by_od(conn, filepath, program_numbers=program_numbers,
+                                         progress=progress, cancel_event=cancel_event)
 
-    def export_unused_numbers(self):
-        """Export program numbers with two sheets: All Programs (in order) and Unused Numbers"""
-        import csv
+        def complete(result):
+            records, sheets = result
+            return f"Exported {records} records to {sheets} sheets:\n{filepath}"
 
-        # Get round size ranges for reference
-        round_size_ranges = self.get_round_size_ranges()
+        self._run_export("Exporting to Excel...", export, complete, wait=wait)
 
-        # Build reverse lookup: program number -> round size
-        def get_round_size_for_number(num):
-            for rs, (start, end, name) in round_size_ranges.items():
-                if start <= num <= end:
-                    if rs > 0:
-                        return rs
-                    elif rs == 0:
-                        return "FREE"
-                    else:
-                        return "FREE2"
-            return ""
+    def export_google_sheets(self):
+        """Export database to Excel optimized for Google Sheets import"""
+        if not HAS_OPENPYXL:
+            messagebox.showerror("Missing Library",
+                "openpyxl is required for Google Sheets export.\n\n"
+                "Install it with:\npip install openpyxl")
+            return
 
-        # Get all existing program data from database
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT program_number, outer_diameter, thickness, thickness_display,
-                   center_bore, hub_diameter, hub_height, counter_bore_depth, spacer_type
-            FROM programs
-        """)
+        proceed, program_numbers = self._export_view_programs("Export for Google Sheets")
+        if not proceed:
+            return
 
-        # Build lookup of existing programs
-        existing_programs = {}  # num -> (program_number, od, thickness, cb, ob, hub_depth, piece_type)
-        for row in cursor.fetchall():
-            prog_num, od, thickness, thickness_display, cb, ob, hub_h, cb_depth, stype = row
-            # Extract numeric part
-            match = re.search(r'[oO]?(\d+)', str(prog_num))
-            if match:
-                num = int(match.group(1))
-                # Determine piece type
-                if stype:
-                    stype_upper = stype.upper()
-                    if '2PC' in stype_upper:
-                        piece_type = '2PC'
-                    elif 'STEEL' in stype_upper:
-                        piece_type = 'STEEL'
-                    elif 'STEP' in stype_upper:
-                        piece_type = 'STEP'
-                    else:
-                        piece_type = 'STD'
-                else:
-                    piece_type = 'STD'
+        from datetime import datetime
+        default_filename = f"GCode_GoogleSheets_{datetime.now().strftime('%Y%m%d')}.xlsx"
 
-                # Hub/Step depth (use hub_height for HC, counter_bore_depth for STEP)
-                hub_step = hub_h if hub_h else cb_depth if cb_depth else ''
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            initialfile=default_filename,
+            filetypes=[("Excel Workbook", "*.xlsx"), ("All files", "*.*")],
+            title="Export for Google Sheets"
+        )
+        if not filepath:
+            return
 
-                # Use thickness_display if available, otherwise thickness value
-                thick_val = thickness_display if thickness_display else (thickness if thickness else '')
+        round_size_ranges = self.get_round_size_ranges()
 
-                existing_programs[num] = (prog_num, od, thick_val, cb, ob, hub_step, piece_type)
-        conn.close()
+        def export(conn, progress, cancel_event):
+            return export_google_workbook(conn, filepath, ACTIVE_PROGRAMS_WHERE, round_size_ranges,
+                                          program_numbers=program_numbers,
+                                          progress=progress, cancel_event=cancel_event)
+
+        def complete(result):
+            records, sheets = result
+            return (f"Exported {records} records to {sheets} sheets.\n\n"
+                    f"Sheets included:\n"
+                    f"• All Programs - Complete list sorted by round size\n"
+                    f"• LPN Tracker - Existing + available numbers in gaps (combined)\n"
+                    f"• Available Numbers - Compact summary of available ranges\n"
+                    f"• Individual round size sheets (5.75\", 6.0\", etc.)\n\n"
+                    f"To import to Google Sheets:\n"
+                    f"1. Go to sheets.google.com\n"
+                    f"2. File → Import → Upload\n"
+                    f"3. Select this file\n"
+                    f"4. Import location: Replace spreadsheet")
+
+        self._run_export("Exporting for Google Sheets...", export, complete)
 
-        # Ask user for save location
+    def export_unused_numbers(self):
+        """Export program numbers with two sheets: All Programs (in order) and Unused Numbers"""
         filepath = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
             filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("All files", "*.*")],
             title="Export Program Numbers"
         )
-
         if not filepath:
             return
 
-        # Check if user wants Excel or CSV
-        if filepath.endswith('.xlsx'):
-            self._export_unused_numbers_excel(filepath, existing_programs, get_round_size_for_number)
-        else:
-            self._export_unused_numbers_csv(filepath, existing_programs, get_round_size_for_number)
-
-    def _export_unused_numbers_excel(self, filepath, existing_programs, get_round_size_for_number):
-        """Export to Excel with two sheets"""
-        try:
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill, Alignment
-            from openpyxl.worksheet.datavalidation import DataValidation
-        except ImportError:
+        if filepath.lower().endswith('.xlsx') and not HAS_OPENPYXL:
             messagebox.showerror("Missing Module",
                                "openpyxl is required for Excel export.\n\n"
                                "Install with: pip install openpyxl\n\n"
                                "Falling back to CSV export.")
-            csv_path = filepath.replace('.xlsx', '.csv')
-            self._export_unused_numbers_csv(csv_path, existing_programs, get_round_size_for_number)
-            return
-
-        wb = openpyxl.Workbook()
-
-        # Sheet 1: All Programs (in order)
-        ws1 = wb.active
-        ws1.title = "All Programs"
-
-        # Headers: A=Program#, B=Round Size, C=Thickness, D=CB, E=OB, F=Hub/Step Depth, G=Type
-        headers = ["Program #", "Round Size", "Thickness", "CB", "OB", "Hub/Step Depth", "Type"]
-        for col, header in enumerate(headers, 1):
-            cell = ws1.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            cell.font = Font(bold=True, color="FFFFFF")
-
-        # Define range to export (skip 0, start from 1)
-        # Use the round size ranges to determine which numbers to include
-        ranges_to_export = []
-        round_size_ranges = self.get_round_size_ranges()
-        for rs, (start, end, name) in sorted(round_size_ranges.items(), key=lambda x: x[1][0]):
-            ranges_to_export.append((start, end))
-
-        # Green fill for available
-        green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-        green_font = Font(color="006100")
-
-        row_num = 2
-        total_available = 0
-
-        for range_start, range_end in ranges_to_export:
-            for num in range(range_start, range_end + 1):
-                prog_str = f"o{num:05d}"
-                round_size = get_round_size_for_number(num)
-
-                if num in existing_programs:
-                    # Existing program - show details
-                    prog_num, od, thick_val, cb, ob, hub_step, piece_type = existing_programs[num]
-                    ws1.cell(row=row_num, column=1, value=prog_num)
-                    ws1.cell(row=row_num, column=2, value=od if od else round_size)
-                    ws1.cell(row=row_num, column=3, value=thick_val if thick_val else '')
-                    ws1.cell(row=row_num, column=4, value=round(cb, 1) if cb else '')
-                    ws1.cell(row=row_num, column=5, value=round(ob, 1) if ob else '')
-                    ws1.cell(row=row_num, column=6, value=hub_step if hub_step else '')
-                    ws1.cell(row=row_num, column=7, value=piece_type)
-                else:
-                    # Available - mark as available with green
-                    ws1.cell(row=row_num, column=1, value=prog_str)
-                    for col in range(2, 8):
-                        cell = ws1.cell(row=row_num, column=col, value="AVAILABLE")
-                        cell.fill = green_fill
-                        cell.font = green_font
-                    total_available += 1
-
-                row_num += 1
-
-        # Auto-width columns
-        for col in range(1, 8):
-            ws1.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 15
-
-        # Sheet 2: Unused Numbers Only
-        ws2 = wb.create_sheet("Unused Numbers")
-
-        # Headers: A=Program#, B=Round Size, C=Range, D=Date Added, E=Status, F=Notes
-        headers2 = ["Program #", "Round Size", "Range", "Date Added", "Status", "Notes"]
-        for col, header in enumerate(headers2, 1):
-            cell = ws2.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            cell.font = Font(bold=True, color="FFFFFF")
-
-        row_num = 2
-        for range_start, range_end in ranges_to_export:
-            for num in range(range_start, range_end + 1):
-                if num not in existing_programs:
-                    prog_str = f"o{num:05d}"
-                    round_size = get_round_size_for_number(num)
-                    range_name = f"o{range_start:05d}-o{range_end:05d}"
-
-                    ws2.cell(row=row_num, column=1, value=prog_str)
-                    ws2.cell(row=row_num, column=2, value=round_size)
-                    ws2.cell(row=row_num, column=3, value=range_name)
-                    ws2.cell(row=row_num, column=4, value='')  # Date Added - blank
-                    ws2.cell(row=row_num, column=5, value='Unused')  # Status - default to Unused
-                    ws2.cell(row=row_num, column=6, value='')  # Notes - blank
-
-                    row_num += 1
-
-        # Apply dropdown validation to entire Status column at once (much faster)
-        if row_num > 2:
-            status_dropdown = DataValidation(
-                type="list",
-                formula1='"Unused,Created,Added,Issue"',
-                allow_blank=True
-            )
-            status_dropdown.error = "Please select from the list"
-            status_dropdown.errorTitle = "Invalid Status"
-            # Apply to range E2:E{last_row}
-            status_dropdown.add(f"E2:E{row_num - 1}")
-            ws2.add_data_validation(status_dropdown)
-
-        # Auto-width columns
-        col_widths = [12, 12, 18, 12, 12, 30]  # Program#, Round Size, Range, Date Added, Status, Notes
-        for col, width in enumerate(col_widths, 1):
-            ws2.column_dimensions[openpyxl.utils.get_column_letter(col)].width = width
-
-        # Save
-        try:
-            wb.save(filepath)
-            messagebox.showinfo(
-                "Export Complete",
-                f"Exported to:\n{filepath}\n\n"
-                f"Sheet 1 'All Programs': All program numbers in order\n"
-                f"Sheet 2 'Unused Numbers': {total_available:,} available numbers\n\n"
-                f"Available numbers are highlighted in green."
-            )
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to save Excel file:\n{str(e)}")
-
-    def _export_unused_numbers_csv(self, filepath, existing_programs, get_round_size_for_number):
-        """Export to CSV (single file with all programs)"""
-        import csv
+            filepath = filepath[:-len('.xlsx')] + '.csv'
 
         round_size_ranges = self.get_round_size_ranges()
-        ranges_to_export = []
-        for rs, (start, end, name) in sorted(round_size_ranges.items(), key=lambda x: x[1][0]):
-            ranges_to_export.append((start, end))
-
-        total_available = 0
+        excel = filepath.lower().endswith('.xlsx')
 
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Program #", "Round Size", "Thickness", "CB", "OB", "Hub/Step Depth", "Type"])
-
-            for range_start, range_end in ranges_to_export:
-                for num in range(range_start, range_end + 1):
-                    prog_str = f"o{num:05d}"
-                    round_size = get_round_size_for_number(num)
+        def export(conn, progress, cancel_event):
+            return export_program_numbers(conn, filepath, round_size_ranges,
+                                          progress=progress, cancel_event=cancel_event)
 
-                    if num in existing_programs:
-                        prog_num, od, thick_val, cb, ob, hub_step, piece_type = existing_programs[num]
-                        writer.writerow([
-                            prog_num,
-                            od if od else round_size,
-                            thick_val if thick_val else '',
-                            round(cb, 1) if cb else '',
-                            round(ob, 1) if ob else '',
-                            hub_step if hub_step else '',
-                            piece_type
-                        ])
-                    else:
-                        writer.writerow([prog_str, "AVAILABLE", "AVAILABLE", "AVAILABLE", "AVAILABLE", "AVAILABLE", "AVAILABLE"])
-                        total_available += 1
+        def complete(total_available):
+            if excel:
+                return (f"Exported to:\n{filepath}\n\n"
+                        f"Sheet 1 'All Programs': All program numbers in order\n"
+                        f"Sheet 2 'Unused Numbers': {total_available:,} available numbers\n\n"
+                        f"Available numbers are highlighted in green.")
+            return (f"Exported to:\n{filepath}\n\n"
+                    f"Total available numbers: {total_available:,}\n\n"
+                    f"For Excel with multiple sheets, save as .xlsx")
 
-        messagebox.showinfo(
-            "Export Complete",
-            f"Exported to:\n{filepath}\n\n"
-            f"Total available numbers: {total_available:,}\n\n"
-            f"For Excel with multiple sheets, save as .xlsx"
-        )
+        self._run_export("Exporting Program Numbers...", export, complete)
 
     def find_and_mark_repeats(self):
         """Enhanced duplicate detection with parent/child relationships and classification"""
@@ -15870,78 +15239,83 @@ class GCodeDatabaseGUI:
             messagebox.showinfo("Operation Cancelled", "Delete operation cancelled by safety check.")
             return
 
-        # Create database backup before deleting
-        if not self.backup_database():
-            messagebox.showerror("Backup Failed",
-                "Database backup failed. Delete operation canceled for safety.\n\n"
-                "Please check the error and try again.")
-            return
-
-        # Show progress window
-        progress_window = tk.Toplevel(self.root)
-        progress_window.title("Deleting Duplicates")
-        progress_window.geometry("700x500")
-        progress_window.configure(bg=self.bg_color)
+        try:
+            # Create database backup before deleting
+            if not self.backup_database():
+                messagebox.showerror("Backup Failed",
+                    "Database backup failed. Delete operation canceled for safety.\n\n"
+                    "Please check the error and try again.")
+                return
 
-        tk.Label(progress_window,
-                text="Deleting duplicate records...",
-                bg=self.bg_color, fg=self.fg_color,
-                font=("Arial", 12, "bold")).pack(pady=10)
+            # Show progress window
+            progress_window = tk.Toplevel(self.root)
+            progress_window.title("Deleting Duplicates")
+            progress_window.geometry("700x500")
+            progress_window.configure(bg=self.bg_color)
 
-        progress_text = scrolledtext.ScrolledText(progress_window,
-                                                  bg=self.input_bg, fg=self.fg_color,
-                                                  font=("Courier", 9),
-                                                  wrap=tk.WORD)
-        progress_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            tk.Label(progress_window,
+                    text="Deleting duplicate records...",
+                    bg=self.bg_color, fg=self.fg_color,
+                    font=("Arial", 12, "bold")).pack(pady=10)
 
-        # Group duplicates by type for reporting
-        by_type = {}
-        for prog_num, dup_type, parent in duplicates:
-            if dup_type not in by_type:
-                by_type[dup_type] = []
-            by_type[dup_type].append((prog_num, parent))
-
-        # Show what's being deleted
-        progress_text.insert(tk.END, f"Deleting {dup_count} duplicate records:\n\n")
-
-        for dup_type, items in by_type.items():
-            progress_text.insert(tk.END, f"--- {dup_type or 'Unknown Type'} ({len(items)} records) ---\n")
-            for prog_num, parent in items[:10]:  # Show first 10
-                progress_text.insert(tk.END, f"  DELETE: {prog_num} (parent: {parent or 'N/A'})\n")
-            if len(items) > 10:
-                progress_text.insert(tk.END, f"  ... and {len(items) - 10} more\n")
-            progress_text.insert(tk.END, "\n")
-            self.root.update()
+            progress_text = scrolledtext.ScrolledText(progress_window,
+                                                      bg=self.input_bg, fg=self.fg_color,
+                                                      font=("Courier", 9),
+                                                      wrap=tk.WORD)
+            progress_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+            # Group duplicates by type for reporting
+            by_type = {}
+            for prog_num, dup_type, parent in duplicates:
+                if dup_type not in by_type:
+                    by_type[dup_type] = []
+                by_type[dup_type].append((prog_num, parent))
+
+            # Show what's being deleted
+            progress_text.insert(tk.END, f"Deleting {dup_count} duplicate records:\n\n")
+
+            for dup_type, items in by_type.items():
+                progress_text.insert(tk.END, f"--- {dup_type or 'Unknown Type'} ({len(items)} records) ---\n")
+                for prog_num, parent in items[:10]:  # Show first 10
+                    progress_text.insert(tk.END, f"  DELETE: {prog_num} (parent: {parent or 'N/A'})\n")
+                if len(items) > 10:
+                    progress_text.insert(tk.END, f"  ... and {len(items) - 10} more\n")
+                progress_text.insert(tk.END, "\n")
+                self.root.update()
 
-        # Delete from database
-        try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
+            # Delete from database
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=30.0)
+                try:
+                    cursor = conn.cursor()
 
-            cursor.execute("""
-                DELETE FROM programs
-                WHERE validation_status = 'REPEAT'
-            """)
+                    cursor.execute("""
+                        DELETE FROM programs
+                        WHERE validation_status = 'REPEAT'
+                    """)
 
-            deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
+                    deleted_count = cursor.rowcount
+                    conn.commit()
+                finally:
+                    conn.close()
 
-            # Record successful write (Phase 1)
-            self._record_database_write("delete_duplicates")
+                # Record successful write (Phase 1)
+                self._record_database_write("delete_duplicates")
 
-            progress_text.insert(tk.END, f"{'='*60}\n")
-            progress_text.insert(tk.END, f"✓ Successfully deleted {deleted_count} duplicate record(s)\n")
-            progress_text.insert(tk.END, f"✓ Parent files have been preserved\n")
-            progress_text.insert(tk.END, f"⚠️  Files on disk were NOT deleted\n")
+                progress_text.insert(tk.END, f"{'='*60}\n")
+                progress_text.insert(tk.END, f"✓ Successfully deleted {deleted_count} duplicate record(s)\n")
+                progress_text.insert(tk.END, f"✓ Parent files have been preserved\n")
+                progress_text.insert(tk.END, f"⚠️  Files on disk were NOT deleted\n")
 
-            # Refresh the display
-            self.refresh_filter_values()
-            self.refresh_results()
+                # Refresh the display
+                self.refresh_filter_values()
+                self.refresh_results()
 
-        except Exception as e:
-            progress_text.insert(tk.END, f"\n\n❌ ERROR: {str(e)}\n")
-            messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
+            except Exception as e:
+                progress_text.insert(tk.END, f"\n\n❌ ERROR: {str(e)}\n")
+                messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
+        finally:
+            self._release_write_lease()
 
         # Add close button
         close_btn = tk.Button(progress_window, text="Close",
@@ -16716,10 +16090,7 @@ class GCodeDatabaseGUI:
 
     def export_filtered_to_excel(self):
         """Export currently filtered/displayed items to Excel file"""
-        try:
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        except ImportError:
+        if not HAS_OPENPYXL:
             messagebox.showerror("Missing Library",
                 "openpyxl is required for Excel export.\n\n"
                 "Install with: pip install openpyxl")
@@ -16742,84 +16113,19 @@ class GCodeDatabaseGUI:
         if not filepath:
             return
 
-        try:
-            # Create workbook
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Filtered Results"
-
-            # Get column headers from treeview
-            columns = list(self.tree["columns"])
-
-            # Style definitions
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-
-            # Write headers
-            for col_idx, col_name in enumerate(columns, 1):
-                cell = ws.cell(row=1, column=col_idx, value=col_name)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = thin_border
-
-            # Color fills for different statuses
-            status_fills = {
-                'CRITICAL': PatternFill(start_color="FF6B6B", end_color="FF6B6B", fill_type="solid"),
-                'TOOL_HOME_CRITICAL': PatternFill(start_color="FF3333", end_color="FF3333", fill_type="solid"),
-                'BORE_WARNING': PatternFill(start_color="FFA500", end_color="FFA500", fill_type="solid"),
-                'TOOL_HOME_WARNING': PatternFill(start_color="FFBB44", end_color="FFBB44", fill_type="solid"),
-                'DIMENSIONAL': PatternFill(start_color="DA77F2", end_color="DA77F2", fill_type="solid"),
-                'WARNING': PatternFill(start_color="FFD43B", end_color="FFD43B", fill_type="solid"),
-                'PASS': PatternFill(start_color="69DB7C", end_color="69DB7C", fill_type="solid"),
-            }
-
-            # Write data rows
-            for row_idx, item in enumerate(displayed_items, 2):
-                values = self.tree.item(item, "values")
-                status_value = None
-
-                for col_idx, value in enumerate(values, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=value if value != "-" else "")
-                    cell.border = thin_border
+        # Read the view on the main thread (Tk is not thread-safe), write in the background
+        columns = list(self.tree["columns"])
+        rows = [self.tree.item(item, "values") for item in displayed_items]
+        status_column = columns.index("Status") if "Status" in columns else None
 
-                    # Track status column (index 15 = "Status" after adding Tool Home)
-                    if columns[col_idx - 1] == "Status":
-                        status_value = value
+        def export(conn, progress, cancel_event):
+            return export_rows(filepath, "Filtered Results", columns, rows, status_column,
+                               progress=progress, cancel_event=cancel_event)
 
-                # Apply row color based on status
-                if status_value and status_value in status_fills:
-                    for col_idx in range(1, len(columns) + 1):
-                        ws.cell(row=row_idx, column=col_idx).fill = status_fills[status_value]
+        def complete(count):
+            return f"Successfully exported {count} records to:\n\n{filepath}"
 
-            # Auto-adjust column widths
-            for col_idx, col_name in enumerate(columns, 1):
-                max_length = len(col_name)
-                for row_idx in range(2, len(displayed_items) + 2):
-                    cell_value = ws.cell(row=row_idx, column=col_idx).value
-                    if cell_value:
-                        max_length = max(max_length, len(str(cell_value)))
-                # Set width with some padding, max 50
-                ws.column_dimensions[openpyxl.utils.get_column_letter(col_idx)].width = min(max_length + 2, 50)
-
-            # Freeze header row
-            ws.freeze_panes = "A2"
-
-            # Save workbook
-            wb.save(filepath)
-
-            messagebox.showinfo("Export Complete",
-                f"Successfully exported {len(displayed_items)} records to:\n\n{filepath}")
-
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export:\n{str(e)}")
+        self._run_export("Exporting Filtered Results...", export, complete)
 
     def copy_filtered_view(self):
         """Copy currently filtered/displayed files to folder with OD subfolders and auto-rename"""
@@ -18124,52 +17430,33 @@ class GCodeDatabaseGUI:
         sorted by CB proximity then fit quality.
         """
         if '2PC STUD' in have_type:
-            search_type_pattern = '%2PC LUG%'
+            search_type_pattern = '2PC LUG'
             have_label, find_label = 'STUD', 'LUG'
         else:
-            search_type_pattern = '%2PC STUD%'
+            search_type_pattern = '2PC STUD'
             have_label, find_label = 'LUG', 'STUD'
 
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT program_number, title, outer_diameter, center_bore,
-                       thickness, hub_height, hub_diameter, counter_bore_depth,
-                       counter_bore_diameter, spacer_type, validation_status
-                FROM programs
-                WHERE spacer_type LIKE ?
-                  AND is_deleted = 0
-                ORDER BY center_bore
-            """, (search_type_pattern,))
-            rows = cursor.fetchall()
-            conn.close()
+            catalog = self._get_twopc_catalog()
+            candidates = [p for p in catalog.of_type(search_type_pattern) if p['is_deleted'] == 0]
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"Failed to query programs: {e}")
             return
 
-        if not rows:
+        if not candidates:
             messagebox.showinfo("No Results", f"No {find_label} programs found in the database.")
             return
 
-        # Build, score, and sort results
+        # Score (ring fit is cached per part until the database changes) and sort
         results = []
-        for row in rows:
-            prog = {
-                'program_number': row[0], 'title': row[1], 'outer_diameter': row[2],
-                'center_bore': row[3], 'thickness': row[4], 'hub_height': row[5],
-                'hub_diameter': row[6], 'counter_bore_depth': row[7],
-                'counter_bore_diameter': row[8], 'spacer_type': row[9],
-                'validation_status': row[10],
-            }
-            cb = prog['center_bore']
-            prog['cb_diff'] = abs(cb - target_cb_mm) if cb is not None else 9999
-            label, score = self._eval_2pc_ring_fit(prog)
-            prog['ring_fit_label'] = label
-            prog['ring_fit_score'] = score
-            results.append(prog)
+        for part in candidates:
+            cb = part['center_bore']
+            label, score = catalog.derived('ring_fit', part, self._eval_2pc_ring_fit)
+            results.append(dict(part, cb_diff=abs(cb - target_cb_mm) if cb is not None else 9999,
+                                ring_fit_label=label, ring_fit_score=score))
 
-        results.sort(key=lambda x: (x['cb_diff'], x['ring_fit_score']))
+        results.sort(key=lambda x: (x['cb_diff'], x['ring_fit_score'],
+                                    x['center_bore'] if x['center_bore'] is not None else float('-inf')))
 
         # Look up expected hub OD for the target CB
         hub_info = '—'
@@ -18545,6 +17832,13 @@ class GCodeDatabaseGUI:
             else:
                 basic_text.insert(tk.END, "  None found\n")
 
+            basic_text.insert(tk.END, "\n=== IDENTICAL FILES (same content, different names) ===\n\n")
+            if result['exact_duplicates']:
+                for files in result['exact_duplicates'].values():
+                    basic_text.insert(tk.END, "  " + ", ".join(os.path.basename(f) for f in files) + "\n")
+            else:
+                basic_text.insert(tk.END, "  None found\n")
+
         # Tab 2: Missing M30
         tab_m30 = tk.Frame(notebook, bg=self.bg_color)
         notebook.add(tab_m30, text=f'⚠️ Missing M30 ({len(result["missing_m30"])})')
@@ -18670,7 +17964,12 @@ class GCodeDatabaseGUI:
                  width=10).pack(side=tk.RIGHT, padx=5)
 
     def show_statistics(self):
-        """Show comprehensive database statistics with filtering support"""
+        """Show comprehensive database statistics with filtering support
+
+        Counts come from the program_stats summary table (kept current by
+        triggers); when the main window has filters active they are grouped
+        from the filtered programs in one query instead.
+        """
         stats_window = tk.Toplevel(self.root)
         stats_window.title("Database Statistics")
         stats_window.geometry("1200x800")
@@ -18680,36 +17979,14 @@ class GCodeDatabaseGUI:
         notebook = ttk.Notebook(stats_window)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        # Get current filters to show filtered vs total stats
+        # Same filter set as the results table
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        filter_where, filter_params = self.build_filter_query(getattr(self, '_last_view_mode', 'all'))
+        filters_active = filter_where != ACTIVE_PROGRAMS_WHERE
 
-        # Build filter query
-        filter_query = "SELECT COUNT(*) FROM programs WHERE 1=1"
-        filter_params = []
-
-        # Apply current filters
-        if hasattr(self, 'filter_od_min') and self.filter_od_min.get():
-            filter_query += " AND outer_diameter >= ?"
-            filter_params.append(float(self.filter_od_min.get()))
-        if hasattr(self, 'filter_od_max') and self.filter_od_max.get():
-            filter_query += " AND outer_diameter <= ?"
-            filter_params.append(float(self.filter_od_max.get()))
-        if hasattr(self, 'filter_thickness_min') and self.filter_thickness_min.get():
-            filter_query += " AND thickness >= ?"
-            filter_params.append(float(self.filter_thickness_min.get()))
-        if hasattr(self, 'filter_thickness_max') and self.filter_thickness_max.get():
-            filter_query += " AND thickness <= ?"
-            filter_params.append(float(self.filter_thickness_max.get()))
-        if hasattr(self, 'filter_cb_min') and self.filter_cb_min.get():
-            filter_query += " AND center_bore >= ?"
-            filter_params.append(float(self.filter_cb_min.get()))
-        if hasattr(self, 'filter_cb_max') and self.filter_cb_max.get():
-            filter_query += " AND center_bore <= ?"
-            filter_params.append(float(self.filter_cb_max.get()))
-
-        # Check if any filters are active
-        filters_active = len(filter_params) > 0
+        all_rows = [r for r in cube_rows(cursor, PROGRAM_STATS) if not r['is_deleted']]
+        rows = cube_rows(cursor, PROGRAM_STATS, filter_where, filter_params) if filters_active else all_rows
 
         # TAB 1: Overall Statistics
         tab_overall = tk.Frame(notebook, bg=self.bg_color)
@@ -18719,35 +17996,26 @@ class GCodeDatabaseGUI:
                                                  font=("Courier", 10), wrap=tk.NONE, padx=10, pady=10)
         overall_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        # Get total count
-        cursor.execute("SELECT COUNT(*) FROM programs")
-        total_count = cursor.fetchone()[0]
-
-        # Get filtered count
-        cursor.execute(filter_query, filter_params)
-        filtered_count = cursor.fetchone()[0]
+        total_count = sum(r['count'] for r in all_rows)
+        filtered_count = sum(r['count'] for r in rows)
 
         overall_text.insert(tk.END, "="*100 + "\n")
         overall_text.insert(tk.END, "DATABASE STATISTICS - OVERALL SUMMARY\n")
         overall_text.insert(tk.END, "="*100 + "\n\n")
 
         if filters_active:
+            filtered_pct = (filtered_count / total_count * 100) if total_count > 0 else 0
             overall_text.insert(tk.END, f"Total Programs in Database: {total_count:,}\n")
-            overall_text.insert(tk.END, f"Filtered View: {filtered_count:,} ({filtered_count/total_count*100:.1f}%)\n\n")
+            overall_text.insert(tk.END, f"Filtered View: {filtered_count:,} ({filtered_pct:.1f}%)\n\n")
             overall_text.insert(tk.END, "NOTE: Statistics below show FILTERED data only\n")
             overall_text.insert(tk.END, "="*100 + "\n\n")
         else:
             overall_text.insert(tk.END, f"Total Programs: {total_count:,}\n")
             overall_text.insert(tk.END, "="*100 + "\n\n")
 
-        # Validation Status Breakdown
-        if filter_params:
-            status_query = filter_query.replace("SELECT COUNT(*)", "SELECT validation_status, COUNT(*)") + " GROUP BY validation_status ORDER BY validation_status"
-        else:
-            status_query = "SELECT validation_status, COUNT(*) FROM programs GROUP BY validation_status ORDER BY validation_status"
-
-        cursor.execute(status_query, filter_params)
-        status_results = cursor.fetchall()
+        # Validation Status Breakdown (NULL first, then alphabetical)
+        status_results = sorted(rollup(rows, 'validation_status').items(),
+                                key=lambda x: (x[0] is not None, x[0] or ''))
 
         overall_text.insert(tk.END, "VALIDATION STATUS BREAKDOWN:\n")
         overall_text.insert(tk.END, "-"*100 + "\n")
@@ -18763,13 +18031,7 @@ class GCodeDatabaseGUI:
         overall_text.insert(tk.END, f"{'TOTAL':<20} {status_total:>10,} {100.0:>11.1f}%\n\n\n")
 
         # Spacer Type Breakdown
-        if filter_params:
-            type_query = filter_query.replace("SELECT COUNT(*)", "SELECT spacer_type, COUNT(*)") + " GROUP BY spacer_type ORDER BY COUNT(*) DESC"
-        else:
-            type_query = "SELECT spacer_type, COUNT(*) FROM programs GROUP BY spacer_type ORDER BY COUNT(*) DESC"
-
-        cursor.execute(type_query, filter_params)
-        type_results = cursor.fetchall()
+        type_results = sorted(rollup(rows, 'spacer_type').items(), key=lambda x: x[1], reverse=True)
 
         overall_text.insert(tk.END, "SPACER TYPE BREAKDOWN:\n")
         overall_text.insert(tk.END, "-"*100 + "\n")
@@ -18785,13 +18047,7 @@ class GCodeDatabaseGUI:
         overall_text.insert(tk.END, f"{'TOTAL':<25} {type_total:>10,} {100.0:>11.1f}%\n\n\n")
 
         # Material Breakdown
-        if filter_params:
-            material_query = filter_query.replace("SELECT COUNT(*)", "SELECT material, COUNT(*)") + " GROUP BY material ORDER BY COUNT(*) DESC"
-        else:
-            material_query = "SELECT material, COUNT(*) FROM programs GROUP BY material ORDER BY COUNT(*) DESC"
-
-        cursor.execute(material_query, filter_params)
-        material_results = cursor.fetchall()
+        material_results = sorted(rollup(rows, 'material').items(), key=lambda x: x[1], reverse=True)
 
         overall_text.insert(tk.END, "MATERIAL BREAKDOWN:\n")
         overall_text.insert(tk.END, "-"*100 + "\n")
@@ -18804,10 +18060,31 @@ class GCodeDatabaseGUI:
             overall_text.insert(tk.END, f"{material or 'NULL':<25} {count:>10,} {percentage:>11.1f}%\n")
 
         overall_text.insert(tk.END, "-"*100 + "\n")
-        overall_text.insert(tk.END, f"{'TOTAL':<25} {material_total:>10,} {100.0:>11.1f}%\n")
+        overall_text.insert(tk.END, f"{'TOTAL':<25} {material_total:>10,} {100.0:>11.1f}%\n\n\n")
+
+        # Lathe Breakdown
+        lathe_results = sorted(rollup(rows, 'lathe').items(), key=lambda x: x[1], reverse=True)
+
+        overall_text.insert(tk.END, "LATHE BREAKDOWN:\n")
+        overall_text.insert(tk.END, "-"*100 + "\n")
+        overall_text.insert(tk.END, f"{'Lathe':<25} {'Count':>10} {'Percentage':>12}\n")
+        overall_text.insert(tk.END, "-"*100 + "\n")
+
+        lathe_total = sum(r[1] for r in lathe_results)
+        for lathe, count in lathe_results:
+            percentage = (count / lathe_total * 100) if lathe_total > 0 else 0
+            overall_text.insert(tk.END, f"{lathe or 'NULL':<25} {count:>10,} {percentage:>11.1f}%\n")
+
+        overall_text.insert(tk.END, "-"*100 + "\n")
+        overall_text.insert(tk.END, f"{'TOTAL':<25} {lathe_total:>10,} {100.0:>11.1f}%\n")
 
         overall_text.config(state=tk.DISABLED)
 
+        # Counts by OD size and status / spacer type
+        od_status = rollup(rows, 'od_range', 'validation_status')
+        od_type = rollup(rows, 'od_range', 'spacer_type')
+        od_totals = rollup(rows, 'od_range')
+
         # TAB 2: By OD Size
         tab_od = tk.Frame(notebook, bg=self.bg_color)
         notebook.add(tab_od, text='📏 By OD Size')
@@ -18816,23 +18093,6 @@ class GCodeDatabaseGUI:
                                            font=("Courier", 9), wrap=tk.NONE, padx=10, pady=10)
         od_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        # Define OD ranges
-        od_ranges = [
-            (5.50, 6.00, '5.75"'),
-            (6.00, 6.25, '6.00"'),
-            (6.25, 6.50, '6.25"'),
-            (6.50, 7.00, '6.50"'),
-            (7.00, 7.50, '7.00"'),
-            (7.50, 8.00, '7.50"'),
-            (8.00, 8.50, '8.00"'),
-            (8.50, 9.00, '8.50"'),
-            (9.00, 10.00, '9.50"'),
-            (10.00, 10.50, '10.25"'),
-            (10.50, 11.00, '10.50"'),
-            (11.00, 12.00, '11.00"'),
-            (12.00, 13.50, '13.00"'),
-        ]
-
         od_text.insert(tk.END, "="*140 + "\n")
         od_text.insert(tk.END, "STATISTICS BY OD SIZE\n")
         od_text.insert(tk.END, "="*140 + "\n\n")
@@ -18850,27 +18110,17 @@ class GCodeDatabaseGUI:
         grand_warning = 0
         grand_bore = 0
 
-        for min_od, max_od, label in od_ranges:
-            # Build query with OD range and optional filters
-            od_filter_query = filter_query + " AND outer_diameter >= ? AND outer_diameter < ?"
-            od_params = filter_params + [min_od, max_od]
-
-            cursor.execute(od_filter_query, od_params)
-            range_total = cursor.fetchone()[0]
+        for min_od, max_od, label in OD_RANGES:
+            range_total = od_totals.get(label, 0)
 
             if range_total == 0:
                 continue
 
-            # Get status breakdown for this range
-            status_query = od_filter_query.replace("SELECT COUNT(*)", "SELECT validation_status, COUNT(*)") + " GROUP BY validation_status"
-            cursor.execute(status_query, od_params)
-            status_breakdown = dict(cursor.fetchall())
-
-            pass_count = status_breakdown.get('PASS', 0)
-            critical_count = status_breakdown.get('CRITICAL', 0)
-            dimensional_count = status_breakdown.get('DIMENSIONAL', 0)
-            warning_count = status_breakdown.get('WARNING', 0)
-            bore_count = status_breakdown.get('BORE_WARNING', 0)
+            pass_count = od_status.get((label, 'PASS'), 0)
+            critical_count = od_status.get((label, 'CRITICAL'), 0)
+            dimensional_count = od_status.get((label, 'DIMENSIONAL'), 0)
+            warning_count = od_status.get((label, 'WARNING'), 0)
+            bore_count = od_status.get((label, 'BORE_WARNING'), 0)
             pass_pct = (pass_count / range_total * 100) if range_total > 0 else 0
 
             od_text.insert(tk.END, f"{label:<10} {range_total:>8,} {pass_count:>8,} {critical_count:>10,} {dimensional_count:>13,} {warning_count:>9,} {bore_count:>11,} {pass_pct:>8.1f}%\n")
@@ -18903,8 +18153,8 @@ class GCodeDatabaseGUI:
         if filters_active:
             matrix_text.insert(tk.END, "NOTE: Showing FILTERED data only\n\n")
 
-        # Get all validation statuses
         status_list = ['PASS', 'CRITICAL', 'DIMENSIONAL', 'WARNING', 'BORE_WARNING']
+        status_totals = rollup(rows, 'validation_status')
 
         # Create matrix
         for status in status_list:
@@ -18914,29 +18164,20 @@ class GCodeDatabaseGUI:
             matrix_text.insert(tk.END, f"{'OD Size':<12} {'Count':>10} {'% of Size':>12} {'% of Status':>14}\n")
             matrix_text.insert(tk.END, "-"*140 + "\n")
 
-            # Get total for this status
-            status_filter_query = filter_query + " AND validation_status = ?"
-            cursor.execute(status_filter_query, filter_params + [status])
-            status_total = cursor.fetchone()[0]
+            status_total = status_totals.get(status, 0)
 
             if status_total == 0:
                 matrix_text.insert(tk.END, f"No programs with {status} status\n")
                 continue
 
             status_subtotal = 0
-            for min_od, max_od, label in od_ranges:
-                od_status_query = filter_query + " AND outer_diameter >= ? AND outer_diameter < ? AND validation_status = ?"
-                cursor.execute(od_status_query, filter_params + [min_od, max_od, status])
-                count = cursor.fetchone()[0]
+            for min_od, max_od, label in OD_RANGES:
+                count = od_status.get((label, status), 0)
 
                 if count == 0:
                     continue
 
-                # Get total for this OD size
-                od_total_query = filter_query + " AND outer_diameter >= ? AND outer_diameter < ?"
-                cursor.execute(od_total_query, filter_params + [min_od, max_od])
-                od_total = cursor.fetchone()[0]
-
+                od_total = od_totals.get(label, 0)
                 pct_of_size = (count / od_total * 100) if od_total > 0 else 0
                 pct_of_status = (count / status_total * 100) if status_total > 0 else 0
 
@@ -18948,6 +18189,31 @@ class GCodeDatabaseGUI:
 
         matrix_text.config(state=tk.DISABLED)
 
+        # Error types come from the indexed program_issues table
+        # (validation_issues messages are stored with severity CRITICAL)
+        try:
+            sync_program_issues(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"show_statistics: Issue sync skipped: {e}")
+        cursor.execute(f"""
+            SELECT {od_range_sql('p.outer_diameter')}, i.issue_code, COUNT(*)
+            FROM program_issues i
+            JOIN (SELECT program_number, outer_diameter FROM programs WHERE {filter_where}) p
+              ON p.program_number = i.program_number
+            WHERE i.severity = 'CRITICAL'
+            GROUP BY 1, 2
+        """, filter_params)
+        od_error_counts = cursor.fetchall()
+        cursor.execute(f"""
+            SELECT {od_range_sql('p.outer_diameter')}, COUNT(DISTINCT i.program_number)
+            FROM program_issues i
+            JOIN (SELECT program_number, outer_diameter FROM programs WHERE {filter_where}) p
+              ON p.program_number = i.program_number
+            WHERE i.severity = 'CRITICAL'
+            GROUP BY 1
+        """, filter_params)
+        od_error_programs = dict(cursor.fetchall())
+
         # TAB 4: Top Error Types
         tab_errors = tk.Frame(notebook, bg=self.bg_color)
         notebook.add(tab_errors, text='⚠️ Error Types')
@@ -18963,22 +18229,10 @@ class GCodeDatabaseGUI:
         if filters_active:
             error_text.insert(tk.END, "NOTE: Showing FILTERED data only\n\n")
 
-        # Count different error types from validation_issues
-        issues_query = filter_query.replace("SELECT COUNT(*)", "SELECT validation_issues") + " AND validation_issues IS NOT NULL"
-        cursor.execute(issues_query, filter_params)
-        all_issues = cursor.fetchall()
-
-        # Parse and count error types
         error_counts = {}
-        for (issues_str,) in all_issues:
-            if not issues_str:
-                continue
-            # Split by pipe delimiter
-            issues = [i.strip() for i in issues_str.split('|') if i.strip()]
-            for issue in issues:
-                # Extract error type (first part before colon)
-                error_type = issue.split(':')[0].strip() if ':' in issue else issue.strip()
-                error_counts[error_type] = error_counts.get(error_type, 0) + 1
+        for od_label, issue_code, count in od_error_counts:
+            error_type = ISSUE_LABELS.get(issue_code, issue_code)
+            error_counts[error_type] = error_counts.get(error_type, 0) + count
 
         # Sort by count
         sorted_errors = sorted(error_counts.items(), key=lambda x: x[1], reverse=True)
@@ -18994,7 +18248,7 @@ class GCodeDatabaseGUI:
         error_text.insert(tk.END, "-"*100 + "\n")
         error_text.insert(tk.END, f"{'TOTAL ERRORS':<60} {total_errors:>10,} {100.0:>11.1f}%\n\n")
 
-        error_text.insert(tk.END, f"\nTotal programs with errors: {len(all_issues):,}\n")
+        error_text.insert(tk.END, f"\nTotal programs with errors: {sum(od_error_programs.values()):,}\n")
 
         error_text.config(state=tk.DISABLED)
 
@@ -19013,12 +18267,10 @@ class GCodeDatabaseGUI:
         if filters_active:
             type_status_text.insert(tk.END, "NOTE: Showing FILTERED data only\n\n")
 
-        # Get all spacer types
-        type_query = "SELECT DISTINCT spacer_type FROM programs WHERE spacer_type IS NOT NULL ORDER BY spacer_type"
-        cursor.execute(type_query)
-        all_types = [row[0] for row in cursor.fetchall()]
-
-        status_list = ['PASS', 'CRITICAL', 'DIMENSIONAL', 'WARNING', 'BORE_WARNING']
+        # All spacer types in the database, with their (filtered) status breakdown
+        all_types = sorted(t for t in rollup(all_rows, 'spacer_type') if t is not None)
+        type_status = rollup(rows, 'spacer_type', 'validation_status')
+        type_totals = rollup(rows, 'spacer_type')
 
         for spacer_type in all_types:
             type_status_text.insert(tk.END, f"\n{spacer_type.upper()}:\n")
@@ -19026,21 +18278,13 @@ class GCodeDatabaseGUI:
             type_status_text.insert(tk.END, f"{'Status':<20} {'Count':>10} {'% of Type':>12}\n")
             type_status_text.insert(tk.END, "-"*140 + "\n")
 
-            # Get total for this type
-            type_total_query = filter_query + " AND spacer_type = ?"
-            cursor.execute(type_total_query, filter_params + [spacer_type])
-            type_total = cursor.fetchone()[0]
+            type_total = type_totals.get(spacer_type, 0)
 
             if type_total == 0:
                 continue
 
-            # Get status breakdown
-            type_status_query = type_total_query.replace("SELECT COUNT(*)", "SELECT validation_status, COUNT(*)") + " GROUP BY validation_status"
-            cursor.execute(type_status_query, filter_params + [spacer_type])
-            status_breakdown = dict(cursor.fetchall())
-
             for status in status_list:
-                count = status_breakdown.get(status, 0)
+                count = type_status.get((spacer_type, status), 0)
                 pct = (count / type_total * 100) if type_total > 0 else 0
                 type_status_text.insert(tk.END, f"{status:<20} {count:>10,} {pct:>11.1f}%\n")
 
@@ -19070,25 +18314,16 @@ class GCodeDatabaseGUI:
         size_type_text.insert(tk.END, f"{'Total':>10}\n")
         size_type_text.insert(tk.END, "-"*140 + "\n")
 
-        for min_od, max_od, label in od_ranges:
-            od_filter_query = filter_query + " AND outer_diameter >= ? AND outer_diameter < ?"
-            od_params = filter_params + [min_od, max_od]
-
-            cursor.execute(od_filter_query, od_params)
-            range_total = cursor.fetchone()[0]
+        for min_od, max_od, label in OD_RANGES:
+            range_total = od_totals.get(label, 0)
 
             if range_total == 0:
                 continue
 
             size_type_text.insert(tk.END, f"{label:<10}")
 
-            # Get type breakdown for this OD range
-            type_breakdown_query = od_filter_query.replace("SELECT COUNT(*)", "SELECT spacer_type, COUNT(*)") + " GROUP BY spacer_type"
-            cursor.execute(type_breakdown_query, od_params)
-            type_breakdown = dict(cursor.fetchall())
-
             for stype in ['hub_centric', 'standard', '2PC LUG', '2PC STUD', 'step', 'STEP']:
-                count = type_breakdown.get(stype, 0)
+                count = od_type.get((label, stype), 0)
                 size_type_text.insert(tk.END, f"{count:>10,}")
 
             size_type_text.insert(tk.END, f"{range_total:>10,}\n")
@@ -19110,34 +18345,22 @@ class GCodeDatabaseGUI:
         if filters_active:
             size_errors_text.insert(tk.END, "NOTE: Showing FILTERED data only\n\n")
 
-        # For each OD range, show top error types
-        for min_od, max_od, label in od_ranges:
-            od_filter_query = filter_query + " AND outer_diameter >= ? AND outer_diameter < ?"
-            od_params = filter_params + [min_od, max_od]
-
-            # Get programs with issues in this range
-            issues_query = od_filter_query.replace("SELECT COUNT(*)", "SELECT validation_issues") + " AND validation_issues IS NOT NULL"
-            cursor.execute(issues_query, od_params)
-            range_issues = cursor.fetchall()
+        range_error_counts = {}
+        for od_label, issue_code, count in od_error_counts:
+            counts = range_error_counts.setdefault(od_label, {})
+            error_type = ISSUE_LABELS.get(issue_code, issue_code)
+            counts[error_type] = counts.get(error_type, 0) + count
 
-            if not range_issues:
+        # For each OD range, show top error types
+        for min_od, max_od, label in OD_RANGES:
+            if label not in range_error_counts:
                 continue
 
             size_errors_text.insert(tk.END, f"\n{label} ROUND:\n")
             size_errors_text.insert(tk.END, "-"*140 + "\n")
 
-            # Parse error types for this range
-            range_error_counts = {}
-            for (issues_str,) in range_issues:
-                if not issues_str:
-                    continue
-                issues = [i.strip() for i in issues_str.split('|') if i.strip()]
-                for issue in issues:
-                    error_type = issue.split(':')[0].strip() if ':' in issue else issue.strip()
-                    range_error_counts[error_type] = range_error_counts.get(error_type, 0) + 1
-
             # Sort and show top 5 errors
-            sorted_range_errors = sorted(range_error_counts.items(), key=lambda x: x[1], reverse=True)
+            sorted_range_errors = sorted(range_error_counts[label].items(), key=lambda x: x[1], reverse=True)
 
             size_errors_text.insert(tk.END, f"{'Error Type':<60} {'Count':>10}\n")
             size_errors_text.insert(tk.END, "-"*140 + "\n")
@@ -19145,9 +18368,9 @@ class GCodeDatabaseGUI:
             for error_type, count in sorted_range_errors[:5]:
                 size_errors_text.insert(tk.END, f"{error_type:<60} {count:>10,}\n")
 
-            total_range_errors = sum(range_error_counts.values())
+            total_range_errors = sum(range_error_counts[label].values())
             size_errors_text.insert(tk.END, "-"*140 + "\n")
-            size_errors_text.insert(tk.END, f"Total programs with errors in {label}: {len(range_issues):,} ({total_range_errors:,} total errors)\n")
+            size_errors_text.insert(tk.END, f"Total programs with errors in {label}: {od_error_programs.get(label, 0):,} ({total_range_errors:,} total errors)\n")
 
         size_errors_text.config(state=tk.DISABLED)
 
@@ -20450,34 +19673,39 @@ For more documentation, see project README files in the application directory.
         except Exception as e:
             messagebox.showerror("Refresh Error", f"Error refreshing repository:\n{str(e)}")
 
+    def _repository_storage_sizes(self):
+        """Return (repository bytes, versions bytes) using os.scandir entry stats"""
+        def folder_size(path, recursive):
+            total = 0
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file():
+                                total += entry.stat().st_size
+                            elif recursive and entry.is_dir():
+                                total += folder_size(entry.path, True)
+                        except OSError:
+                            continue
+            except OSError:
+                pass
+            return total
+
+        return folder_size(self.repository_path, False), folder_size(self.versions_path, True)
+
     def show_repository_stats(self):
         """Show ONLY repository (managed) files statistics"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
-        # Only count managed files (is_managed = 1)
-        cursor.execute("SELECT COUNT(*) FROM programs WHERE is_managed = 1")
-        managed_count = cursor.fetchone()[0]
+        # Only count managed files (is_managed = 1) - from the round_size_stats summary
+        managed_count = rollup(cube_rows(cursor, ROUND_SIZE_STATS), 'is_managed').get(1, 0)
 
         # Count versions
         cursor.execute("SELECT COUNT(*) FROM program_versions")
         versions_count = cursor.fetchone()[0]
 
-        # Repository size
-        repo_size = 0
-        if os.path.exists(self.repository_path):
-            for file in os.listdir(self.repository_path):
-                file_path = os.path.join(self.repository_path, file)
-                if os.path.isfile(file_path):
-                    repo_size += os.path.getsize(file_path)
-
-        # Versions size
-        versions_size = 0
-        if os.path.exists(self.versions_path):
-            for root, _, files in os.walk(self.versions_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    versions_size += os.path.getsize(file_path)
+        repo_size, versions_size = self._repository_storage_sizes()
 
         conn.close()
 
@@ -21054,13 +20282,10 @@ For more documentation, see project README files in the application directory.
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
-        # Count all programs
-        cursor.execute("SELECT COUNT(*) FROM programs WHERE file_path IS NOT NULL")
-        total_count = cursor.fetchone()[0]
-
-        # Count managed files
-        cursor.execute("SELECT COUNT(*) FROM programs WHERE is_managed = 1")
-        managed_count = cursor.fetchone()[0]
+        # Count all programs and managed files from the round_size_stats summary
+        size_rows = cube_rows(cursor, ROUND_SIZE_STATS)
+        total_count = rollup(size_rows, 'has_file').get(1, 0)
+        managed_count = rollup(size_rows, 'is_managed').get(1, 0)
 
         # Count external files
         external_count = total_count - managed_count
@@ -21069,21 +20294,7 @@ For more documentation, see project README files in the application directory.
         cursor.execute("SELECT COUNT(*) FROM program_versions")
         versions_count = cursor.fetchone()[0]
 
-        # Repository size
-        repo_size = 0
-        if os.path.exists(self.repository_path):
-            for file in os.listdir(self.repository_path):
-                file_path = os.path.join(self.repository_path, file)
-                if os.path.isfile(file_path):
-                    repo_size += os.path.getsize(file_path)
-
-        # Versions size
-        versions_size = 0
-        if os.path.exists(self.versions_path):
-            for root, _, files in os.walk(self.versions_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    versions_size += os.path.getsize(file_path)
+        repo_size, versions_size = self._repository_storage_sizes()
 
         conn.close()
 
@@ -21651,7 +20862,6 @@ For more documentation, see project README files in the application directory.
         self.root.update()
 
         try:
-            import hashlib
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
@@ -21684,11 +20894,7 @@ For more documentation, see project README files in the application directory.
 
                 if file_path and os.path.exists(file_path):
                     try:
-                        sha256_hash = hashlib.sha256()
-                        with open(file_path, 'rb') as f:
-                            for byte_block in iter(lambda: f.read(4096), b""):
-                                sha256_hash.update(byte_block)
-                        file_hash = sha256_hash.hexdigest()
+                        file_hash = FileContent.read(file_path).sha256
 
                         if file_hash not in file_hashes:
                             file_hashes[file_hash] = []
@@ -22047,8 +21253,6 @@ For more documentation, see project README files in the application directory.
 
     def delete_content_duplicates(self):
         """Find and delete files with duplicate content (same hash), keeping parent files"""
-        import hashlib
-
         # Create progress window
         progress_window = tk.Toplevel(self.root)
         progress_window.title("Delete Content Duplicates")
@@ -22111,12 +21315,7 @@ For more documentation, see project README files in the application directory.
                     continue
 
                 try:
-                    # Calculate SHA256 hash
-                    sha256_hash = hashlib.sha256()
-                    with open(file_path, 'rb') as f:
-                        for byte_block in iter(lambda: f.read(4096), b""):
-                            sha256_hash.update(byte_block)
-                    file_hash = sha256_hash.hexdigest()
+                    file_hash = FileContent.read(file_path).sha256
 
                     if file_hash not in file_hashes:
                         file_hashes[file_hash] = []
@@ -22311,8 +21510,6 @@ For more documentation, see project README files in the application directory.
 
     def scan_for_duplicates(self):
         """Scan repository for all types of duplicates and show report"""
-        import hashlib
-
         # Create progress window
         progress_window = tk.Toplevel(self.root)
         progress_window.title("Duplicate Scan Report")
@@ -22387,11 +21584,7 @@ For more documentation, see project README files in the application directory.
 
                 if file_path and os.path.exists(file_path):
                     try:
-                        sha256_hash = hashlib.sha256()
-                        with open(file_path, 'rb') as f:
-                            for byte_block in iter(lambda: f.read(4096), b""):
-                                sha256_hash.update(byte_block)
-                        file_hash = sha256_hash.hexdigest()
+                        file_hash = FileContent.read(file_path).sha256
 
                         if file_hash not in file_hashes:
                             file_hashes[file_hash] = []
@@ -26182,6 +25375,7 @@ For more documentation, see project README files in the application directory.
                         json.dumps(parse_result.crash_warnings) if parse_result.crash_warnings else None,
                         prog_num
                     ))
+                    store_program_issues(cursor, prog_num, parse_result.get_issues())
                     success += 1
                 else:
                     failed.append(f"{prog_num} (file not found)")
@@ -26678,40 +25872,33 @@ For more documentation, see project README files in the application directory.
             conn = sqlite3.connect(self.db_path, timeout=30.0)
             cursor = conn.cursor()
 
-            # Get overall stats
-            cursor.execute("""
-                SELECT
-                    COUNT(*) as total,
-                    SUM(CASE WHEN round_size IS NOT NULL THEN 1 ELSE 0 END) as detected,
-                    SUM(CASE WHEN round_size IS NULL THEN 1 ELSE 0 END) as not_detected,
-                    SUM(CASE WHEN in_correct_range = 1 THEN 1 ELSE 0 END) as in_range,
-                    SUM(CASE WHEN in_correct_range = 0 AND round_size IS NOT NULL THEN 1 ELSE 0 END) as out_of_range
-                FROM programs
-            """)
-            overall = cursor.fetchone()
-
-            # Get stats by source
-            cursor.execute("""
-                SELECT round_size_source, COUNT(*) as count
-                FROM programs
-                WHERE round_size IS NOT NULL
-                GROUP BY round_size_source
-            """)
-            by_source = cursor.fetchall()
-
-            # Get stats by round size
-            cursor.execute("""
-                SELECT
-                    round_size,
-                    COUNT(*) as count,
-                    SUM(CASE WHEN in_correct_range = 1 THEN 1 ELSE 0 END) as in_range,
-                    SUM(CASE WHEN in_correct_range = 0 THEN 1 ELSE 0 END) as out_of_range
-                FROM programs
-                WHERE round_size IS NOT NULL
-                GROUP BY round_size
-                ORDER BY round_size
-            """)
-            by_size = cursor.fetchall()
+            # Counts from the round_size_stats summary (filtered programs
+            # grouped in one query when the main window has filters active)
+            filter_where, filter_params = self.build_filter_query(getattr(self, '_last_view_mode', 'all'))
+            filters_active = filter_where != ACTIVE_PROGRAMS_WHERE
+            if filters_active:
+                rows = cube_rows(cursor, ROUND_SIZE_STATS, filter_where, filter_params)
+            else:
+                rows = [r for r in cube_rows(cursor, ROUND_SIZE_STATS) if not r['is_deleted']]
+
+            # Overall stats
+            total = sum(r['count'] for r in rows)
+            detected = sum(r['count'] for r in rows if r['round_size'] is not None)
+            not_detected = total - detected
+            in_range = sum(r['count'] for r in rows if r['in_correct_range'] == 1)
+            out_of_range = sum(r['count'] for r in rows
+                               if r['in_correct_range'] == 0 and r['round_size'] is not None)
+            overall = (total, detected, not_detected, in_range, out_of_range)
+
+            # Stats by source
+            by_source = list(rollup([r for r in rows if r['round_size'] is not None],
+                                    'round_size_source').items())
+
+            # Stats by round size
+            size_totals = rollup(rows, 'round_size')
+            size_range = rollup(rows, 'round_size', 'in_correct_range')
+            by_size = [(size, size_totals[size], size_range.get((size, 1), 0), size_range.get((size, 0), 0))
+                       for size in sorted(size for size in size_totals if size is not None)]
 
             conn.close()
 
@@ -26747,6 +25934,8 @@ Range Validation:
   ⚠️ Out of range: {out_of_range:,} ({out_of_range/total*100:.1f}%)
   ❓ No round size: {not_detected:,}
 """
+            if filters_active:
+                stats_text = "\nNOTE: Showing FILTERED data only\n" + stats_text
 
             tk.Label(overall_frame, text=stats_text,
                     bg=self.bg_color, fg=self.fg_color,
@@ -27021,7 +26210,7 @@ Range Validation:
         # Step 2: Export CSV
         if messagebox.askyesno("Export Excel?",
                               "Would you also like to export to Excel/CSV?"):
-            self.export_csv()
+            self.export_csv(wait=True)
 
         # Step 3: Clear database
         try:
@@ -27160,6 +26349,7 @@ class EditEntryWindow:
         self.window.title("Edit Entry" if program_number else "Add Entry")
         self.window.geometry("600x700")
         self.window.configure(bg=parent.bg_color)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
         
         # Load existing data if editing
         self.record = None
@@ -27281,7 +26471,7 @@ class EditEntryWindow:
                             font=("Arial", 10, "bold"), width=15)
         btn_save.pack(side=tk.LEFT, padx=5)
         
-        btn_cancel = tk.Button(button_frame, text="❌ Cancel", command=self.window.destroy,
+        btn_cancel = tk.Button(button_frame, text="❌ Cancel", command=self.close,
                               bg=self.parent.button_bg, fg=self.parent.fg_color,
                               font=("Arial", 10, "bold"), width=15)
         btn_cancel.pack(side=tk.LEFT, padx=5)
@@ -27298,6 +26488,12 @@ class EditEntryWindow:
             self.entry_filepath.delete(0, tk.END)
             self.entry_filepath.insert(0, filepath)
             
+    def close(self):
+        """Close the window and release the program's edit lock"""
+        self.window.destroy()
+        if self.program_number:
+            self.parent._unlock_program(self.program_number)
+
     def save_entry(self):
         """Save entry to database"""
         # Validate
@@ -27305,6 +26501,9 @@ class EditEntryWindow:
         if not program_number:
             messagebox.showerror("Error", "Program number is required")
             return
+
+        if self.program_number and not self.parent._check_program_lock_before_save(self.program_number):
+            return
         
         spacer_type = self.entry_type.get()
         if not spacer_type:
@@ -27352,7 +26551,7 @@ class EditEntryWindow:
                      datetime.now().isoformat(), file_path, program_number))
             else:  # Insert
                 cursor.execute('''
-                    INSERT INTO programs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO programs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (program_number, None,  # title
                      spacer_type, outer_diameter, thickness, None,  # thickness_display
                      center_bore, hub_height, hub_diameter, cb_diameter, cb_depth,
@@ -27372,11 +26571,12 @@ class EditEntryWindow:
                      None,  # content_hash
                      None, None,  # tool_home_status, tool_home_issues
                      None, None,  # hub_height_display, counter_bore_depth_display
-                     0, None))  # is_deleted, deleted_date
+                     0, None,  # is_deleted, deleted_date
+                     None, None, None))  # cycle_time_seconds, air_cut_seconds, cycle_time_hash
             
             conn.commit()
             messagebox.showinfo("Success", "Entry saved successfully")
-            self.window.destroy()
+            self.close()
             self.callback()
             
         except sqlite3.IntegrityError:
@@ -28174,7 +27374,7 @@ class FileComparisonWindow:
 
     def highlight_differences(self, text_widget, content1, content2):
         """Highlight differences between two file contents with color coding"""
-        import difflib
+        from utils.gcode_diff_engine import GCodeDiffEngine, line_ranges
 
         # Configure tags for different types of changes
         text_widget.tag_configure("changed", background="#5a3a00", foreground="#ffcc80")  # Orange for changed lines
@@ -28185,30 +27385,24 @@ class FileComparisonWindow:
         if content1 == content2:
             return  # No differences
 
-        lines1 = content1.split('\n')
-        lines2 = content2.split('\n')
+        line_count = len(content1.split('\n'))
 
-        # Use SequenceMatcher to find differences
-        matcher = difflib.SequenceMatcher(None, lines2, lines1)
-
-        # Track changes by line number
-        changed_lines = set()
-        added_lines = set()
+        # Changed / added spans of content1 lines (compared against content2)
+        changed_spans = []
+        added_spans = []
         deleted_lines = set()
 
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        for tag, i1, i2, j1, j2 in GCodeDiffEngine.diff_hunks(content2, content1):
             if tag == 'replace':
                 # Lines were changed
-                for line_num in range(j1, j2):
-                    changed_lines.add(line_num)
+                changed_spans.append((j1, j2))
             elif tag == 'insert':
                 # Lines were added (exist in content1 but not content2)
-                for line_num in range(j1, j2):
-                    added_lines.add(line_num)
+                added_spans.append((j1, j2))
             elif tag == 'delete':
                 # Lines were deleted (exist in content2 but not content1)
                 # Mark where they would have been
-                if j1 < len(lines1):
+                if j1 < line_count:
                     deleted_lines.add(j1)
 
         # Apply highlighting to the text widget
@@ -28216,29 +27410,20 @@ class FileComparisonWindow:
         text_widget.config(state=tk.NORMAL)
 
         # Add difference summary at top
-        total_changes = len(changed_lines) + len(added_lines) + len(deleted_lines)
+        changed_count = sum(end - start for start, end in changed_spans)
+        added_count = sum(end - start for start, end in added_spans)
+        total_changes = changed_count + added_count + len(deleted_lines)
         if total_changes > 0:
-            summary = f"⚠ {total_changes} difference(s): {len(changed_lines)} changed, {len(added_lines)} added, {len(deleted_lines)} removed\n"
+            summary = f"⚠ {total_changes} difference(s): {changed_count} changed, {added_count} added, {len(deleted_lines)} removed\n"
             text_widget.insert("1.0", summary, "diff_marker")
             text_widget.insert("1.0", "\n")  # Add blank line after summary
 
-        # Highlight changed lines
-        for line_num in changed_lines:
-            start_idx = f"{line_num + 3}.0"  # +3 because we added 2 lines at top (blank + summary)
-            end_idx = f"{line_num + 3}.end"
-            text_widget.tag_add("changed", start_idx, end_idx)
-
-        # Highlight added lines
-        for line_num in added_lines:
-            start_idx = f"{line_num + 3}.0"
-            end_idx = f"{line_num + 3}.end"
-            text_widget.tag_add("added", start_idx, end_idx)
-
-        # Highlight deleted line markers
-        for line_num in deleted_lines:
-            start_idx = f"{line_num + 3}.0"
-            end_idx = f"{line_num + 3}.end"
-            text_widget.tag_add("deleted", start_idx, end_idx)
+        # One tag_add per tag; +3 because we added 2 lines at top (blank + summary)
+        deleted_spans = [(line, line + 1) for line in sorted(deleted_lines)]
+        for tag, spans in (("changed", changed_spans), ("added", added_spans), ("deleted", deleted_spans)):
+            ranges = line_ranges(spans, first_line=3, whole_lines=False)
+            if ranges:
+                text_widget.tag_add(tag, *ranges)
 
         # Re-disable the widget
         text_widget.config(state=tk.DISABLED)
@@ -28717,10 +27902,11 @@ class VersionComparisonWindow:
         self.window.configure(bg=self.bg_color)
 
         # Import diff engine
-        from gcode_diff_engine import GCodeDiffEngine, DimensionExtractor
+        from utils.gcode_diff_engine import GCodeDiffEngine, DimensionExtractor, DiffOptions
         from utils.archive_metadata_manager import ArchiveMetadataExtractor
 
         self.diff_engine = GCodeDiffEngine
+        self.diff_options = DiffOptions
         self.dim_extractor = DimensionExtractor
         self.meta_extractor = ArchiveMetadataExtractor
 
@@ -28903,19 +28089,35 @@ class VersionComparisonWindow:
         left_scroll_y.config(command=sync_scroll)
         right_scroll_y.config(command=sync_scroll)
 
+        # Stats label and normalization options at bottom
+        options_frame = tk.Frame(parent, bg=self.bg_color)
+        options_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        stats_label = tk.Label(options_frame, bg=self.bg_color, fg=self.fg_color,
+                              font=("Arial", 9))
+        stats_label.pack(side=tk.LEFT)
+
+        ignore_n_var = tk.BooleanVar(value=False)
+        ignore_comments_var = tk.BooleanVar(value=False)
+
         # Apply highlighting using diff engine
         content_old = self.files_to_compare[1][1]
         content_current = self.files_to_compare[0][1]
 
-        stats = self.diff_engine.highlight_changes(left_text, right_text,
-                                                   content_old, content_current)
+        def render():
+            options = self.diff_options(ignore_line_numbers=ignore_n_var.get(),
+                                        ignore_comments=ignore_comments_var.get())
+            stats = self.diff_engine.highlight_changes(left_text, right_text,
+                                                       content_old, content_current, options)
+            stats_label.config(text=f"📊 {stats['additions']} added, {stats['deletions']} deleted, {stats['changes']} changed")
 
-        # Stats label at bottom
-        stats_label = tk.Label(parent,
-                              text=f"📊 {stats['additions']} added, {stats['deletions']} deleted, {stats['changes']} changed",
-                              bg=self.bg_color, fg=self.fg_color,
-                              font=("Arial", 9))
-        stats_label.pack(pady=5)
+        for text, var in (("Ignore comments", ignore_comments_var), ("Ignore N-numbers", ignore_n_var)):
+            tk.Checkbutton(options_frame, text=text, variable=var, command=render,
+                           bg=self.bg_color, fg=self.fg_color, selectcolor=self.input_bg,
+                           activebackground=self.bg_color,
+                           font=("Arial", 9)).pack(side=tk.RIGHT, padx=5)
+
+        render()
 
 
 class VersionHistoryWindow:
@@ -29721,7 +28923,7 @@ Legacy names will be tracked in the database and added as comments in the files.
             for item in self.preview_data:
                 values = (
                     item['old_number'],
-                    item['new_number'],
+                    item['new_number'] or "-",
                     item['round_size'],
                     item['current_range'],
                     item['correct_range'],
@@ -29832,17 +29034,17 @@ Legacy names will be tracked in the database and added as comments in the files.
             status_label.config(text=f"Processing {current}/{total}: {prog_num}")
             log(f"[{current}/{total}] Processing {prog_num}...")
 
-        # Get programs to rename (only those with 'Ready' status)
-        programs_to_rename = [item['old_number'] for item in self.preview_data if item['status'] == 'Ready']
+        # Rename exactly what the preview showed (only those with 'Ready' status)
+        plan = [item for item in self.preview_data if item['status'] == 'Ready']
 
-        log(f"Starting batch rename of {len(programs_to_rename):,} programs...")
+        log(f"Starting batch rename of {len(plan):,} programs...")
         log("-" * 60)
 
         # Execute batch rename
         stats = self.db_manager.batch_resolve_out_of_range(
-            program_numbers=programs_to_rename,
             dry_run=False,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            plan=plan
         )
 
         # Show results
@@ -29904,7 +29106,7 @@ Legacy names will be tracked in the database and added as comments in the files.
                     for item in self.preview_data:
                         writer.writerow([
                             item['old_number'],
-                            item['new_number'],
+                            item['new_number'] or "",
                             item['round_size'],
                             item['current_range'],
                             item['correct_range'],
@@ -0,0 +1,569 @@
+"""
+Batch Generation
+
+Generates a whole order list in one run and checks every program with the
+same parser and validators that police hand-written programs:
+
+1. Read the order list (CSV: spacer type, round size, thickness, CB, OB,
+   hub height, ...)
+2. Reserve program numbers for all orders from the database registry in
+   one transaction - pre-assigned numbers are reserved too, unless they are
+   repeated in the list, already used or not AVAILABLE (those orders fail)
+3. Generate each program in a worker process and immediately parse it with
+   ImprovedGCodeParser; programs with critical findings, or whose parsed
+   dimensions do not match the order, are not saved
+4. Mark saved numbers IN_USE, release the rest, and write a CSV report of
+   the failed orders
+
+Usage:
+    python -m gcode_generator.batch orders.csv --db gcode_database.db --output OUT_DIR
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Repository root (improved_gcode_parser) and package imports
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _root_dir not in sys.path:
+    sys.path.insert(0, _root_dir)
+
+from gcode_generator.generator import GCodeGenerator, SpacerType
+from improved_gcode_parser import ImprovedGCodeParser
+
+
+# Order list columns: canonical name -> accepted header spellings
+ORDER_COLUMNS = {
+    'spacer_type': ('spacer_type', 'type'),
+    'round_size': ('round_size', 'od', 'round'),
+    'thickness': ('thickness', 'thick'),
+    'cb_mm': ('cb_mm', 'cb', 'center_bore'),
+    'ob_mm': ('ob_mm', 'ob', 'outer_bore', 'hub_diameter'),
+    'hub_height': ('hub_height', 'hub_h'),
+    'counterbore_mm': ('counterbore_mm', 'counterbore'),
+    'step_depth': ('step_depth',),
+    'lathe': ('lathe',),
+    'program_number': ('program_number', 'program'),
+}
+REQUIRED_COLUMNS = ('spacer_type', 'round_size', 'thickness', 'cb_mm')
+
+# Parsed status that keeps a program from being saved
+FAILING_STATUSES = ('CRASH_RISK', 'CRITICAL', 'TOOL_HOME_CRITICAL')
+
+# Parsed dimensions must match the order within these tolerances
+ROUND_SIZE_TOLERANCE = 0.1   # inches
+THICKNESS_TOLERANCE = 0.02   # inches
+BORE_TOLERANCE = 0.3         # mm
+
+# Registry number reserved for the length of a batch run
+RESERVED_STATUS = 'RESERVED'
+
+# Orders handed to each worker process at a time
+BATCH_CHUNK_SIZE = 8
+
+
+@dataclass
+class BatchOrder:
+    """One line of the order list"""
+    line: int
+    spacer_type: str
+    round_size: float
+    thickness: str
+    cb_mm: float
+    ob_mm: Optional[float] = None
+    hub_height: Optional[float] = None
+    counterbore_mm: Optional[float] = None
+    step_depth: Optional[float] = None
+    lathe: Optional[str] = None
+    program_number: Optional[str] = None  # Pre-assigned, otherwise from the registry
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one order"""
+    order: BatchOrder
+    program_number: Optional[str]
+    status: str  # 'SAVED', 'FAILED' (validation/mismatch), 'ERROR' (could not generate)
+    validation_status: Optional[str] = None
+    file_path: Optional[str] = None
+    issues: List[str] = field(default_factory=list)
+
+
+def _optional_float(value: str) -> Optional[float]:
+    value = (value or '').strip()
+    return float(value) if value else None
+
+
+def read_orders(csv_path: str) -> Tuple[List[BatchOrder], List[str]]:
+    """
+    Read an order list.
+
+    Header names are matched case-insensitively against ORDER_COLUMNS.
+
+    Returns:
+        (orders, errors) - errors describe lines that could not be read
+    """
+    orders = []
+    errors = []
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        headers = {name.strip().lower(): name for name in (reader.fieldnames or [])}
+        columns = {}
+        for column, spellings in ORDER_COLUMNS.items():
+            for spelling in spellings:
+                if spelling in headers:
+                    columns[column] = headers[spelling]
+                    break
+        missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+        if missing:
+            return [], [f"Missing column(s): {', '.join(missing)}"]
+
+        for line, row in enumerate(reader, start=2):
+            values = {column: (row.get(header) or '').strip() for column, header in columns.items()}
+            if not any(values.values()):
+                continue
+            try:
+                spacer_type = values['spacer_type'].lower().replace('-', '_').replace(' ', '_')
+                SpacerType(spacer_type)
+                orders.append(BatchOrder(
+                    line=line,
+                    spacer_type=spacer_type,
+                    round_size=float(values['round_size']),
+                    thickness=values['thickness'],
+                    cb_mm=float(values['cb_mm']),
+                    ob_mm=_optional_float(values.get('ob_mm')),
+                    hub_height=_optional_float(values.get('hub_height')),
+                    counterbore_mm=_optional_float(values.get('counterbore_mm')),
+                    step_depth=_optional_float(values.get('step_depth')),
+                    lathe=values.get('lathe') or None,
+                    program_number=values.get('program_number') or None,
+                ))
+            except ValueError as e:
+                errors.append(f"Line {line}: {e}")
+    return orders, errors
+
+
+def _number_value(program_number: str) -> Optional[int]:
+    match = re.search(r'[oO]?(\d+)', str(program_number))
+    return int(match.group(1)) if match else None
+
+
+def _registry_number(program_number: str) -> str:
+    """Registry spelling of a program number ('O62500' / '62500' -> 'o62500')"""
+    value = _number_value(program_number)
+    return f"o{value:05d}" if value is not None else str(program_number)
+
+
+def repeated_program_numbers(orders: Sequence[BatchOrder]) -> Dict[int, str]:
+    """
+    Orders whose pre-assigned number appears more than once in the list.
+
+    Returns:
+        {order line: reason} - every order sharing the number (they would
+        all be saved to the same file)
+    """
+    lines_by_number: Dict[int, List[int]] = {}
+    for order in orders:
+        if order.program_number:
+            lines_by_number.setdefault(_number_value(order.program_number), []).append(order.line)
+    rejected = {}
+    for lines in lines_by_number.values():
+        if len(lines) > 1:
+            for line in lines:
+                others = ', '.join(str(other) for other in lines if other != line)
+                rejected[line] = f"Program number also pre-assigned on line(s) {others}"
+    return rejected
+
+
+def reserve_program_numbers(db_path: str,
+                            orders: Sequence[BatchOrder]) -> Tuple[Dict[int, str], Dict[int, str]]:
+    """
+    Reserve a registry number for every order in one transaction.
+
+    Pre-assigned numbers are checked first: a number repeated in the order
+    list, already used in the programs table, or not AVAILABLE in the
+    registry (in use, or reserved by another run) is rejected. The rest are
+    reserved as given.
+
+    Orders without a number get one in order from their round size's
+    AVAILABLE registry entries, skipping numbers already used in the
+    programs table or pre-assigned to another order.
+
+    Returns:
+        (assigned, rejected) - assigned is {order line: registry number
+        ('o62500')} for every number marked RESERVED; rejected is
+        {order line: reason} for pre-assigned numbers that cannot be used.
+        Orders whose range is full are in neither.
+    """
+    rejected = repeated_program_numbers(orders)
+
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        used_in_db = set()
+        for (program_number,) in cursor.execute(
+                "SELECT program_number FROM programs WHERE program_number IS NOT NULL"):
+            num = _number_value(program_number)
+            if num is not None:
+                used_in_db.add(num)
+        registry_status = dict(cursor.execute(
+            "SELECT program_number, status FROM program_number_registry"))
+
+        assigned = {}
+        needed: Dict[float, List[BatchOrder]] = {}
+        for order in orders:
+            if not order.program_number:
+                needed.setdefault(order.round_size, []).append(order)
+                continue
+            if order.line in rejected:
+                continue
+            program_number = _registry_number(order.program_number)
+            status = registry_status.get(program_number)
+            if _number_value(program_number) in used_in_db:
+                rejected[order.line] = f"Program number {program_number} is already used by a program"
+            elif status != 'AVAILABLE':
+                rejected[order.line] = (f"Program number {program_number} is "
+                                        f"{status or 'not in the registry'}")
+            else:
+                assigned[order.line] = program_number
+
+        taken = used_in_db | {_number_value(order.program_number) for order in orders
+                              if order.program_number}
+        for round_size, size_orders in needed.items():
+            cursor.execute("""
+                SELECT program_number FROM program_number_registry
+                WHERE ABS(round_size - ?) < 0.001 AND status = 'AVAILABLE'
+                ORDER BY CAST(REPLACE(program_number, 'o', '') AS INTEGER)
+            """, (round_size,))
+            free = (row[0] for row in cursor.fetchall()
+                    if _number_value(row[0]) not in taken)
+            for order, program_number in zip(size_orders, free):
+                assigned[order.line] = program_number
+
+        now = datetime.now().isoformat()
+        cursor.executemany("""
+            UPDATE program_number_registry SET status = ?, last_checked = ?, notes = ?
+            WHERE program_number = ?
+        """, [(RESERVED_STATUS, now, 'Batch generation', program_number)
+              for program_number in assigned.values()])
+        conn.commit()
+        return assigned, rejected
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def finish_reservations(db_path: str, results: Sequence[BatchResult],
+                        reserved: Sequence[str]) -> None:
+    """
+    Mark saved programs IN_USE and release the numbers of failed orders.
+
+    Only numbers in reserved (this run's reservations, pre-assigned ones
+    included) are touched - a number this run did not reserve is never
+    pointed at one of its files.
+    """
+    now = datetime.now().isoformat()
+    reserved = set(reserved)
+    saved = [(r.file_path, now, r.program_number) for r in results
+             if r.status == 'SAVED' and r.program_number in reserved]
+    released = [(now, r.program_number) for r in results
+                if r.status != 'SAVED' and r.program_number in reserved]
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        conn.executemany("""
+            UPDATE program_number_registry SET status = 'IN_USE', file_path = ?, last_checked = ?, notes = NULL
+            WHERE program_number = ? AND status = 'RESERVED'
+        """, saved)
+        conn.executemany("""
+            UPDATE program_number_registry SET status = 'AVAILABLE', last_checked = ?, notes = NULL
+            WHERE program_number = ? AND status = 'RESERVED'
+        """, released)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def overall_status(result) -> str:
+    """Validation status of a parse result (same priority order as the database manager)"""
+    if result.crash_issues:
+        return "CRASH_RISK"
+    if result.validation_issues:
+        return "CRITICAL"
+    if result.tool_home_status == "CRITICAL":
+        return "TOOL_HOME_CRITICAL"
+    if result.crash_warnings:
+        return "CRASH_WARNING"
+    if result.bore_warnings:
+        return "BORE_WARNING"
+    if result.tool_home_status == "WARNING":
+        return "TOOL_HOME_WARNING"
+    if result.dimensional_issues:
+        return "DIMENSIONAL"
+    if result.validation_warnings:
+        return "WARNING"
+    return "PASS"
+
+
+def dimension_mismatches(order: BatchOrder, result, thickness_inches: float) -> List[str]:
+    """Differences between the order and what the parser reads back from the program"""
+    mismatches = []
+
+    def check(label, ordered, parsed, tolerance, unit):
+        if ordered is None:
+            return
+        if parsed is None:
+            mismatches.append(f"{label} not detected (ordered {ordered}{unit})")
+        elif abs(parsed - ordered) > tolerance:
+            mismatches.append(f"{label} {parsed:g}{unit} does not match ordered {ordered:g}{unit}")
+
+    check("Round size", order.round_size, result.outer_diameter, ROUND_SIZE_TOLERANCE, '"')
+    check("Thickness", thickness_inches, result.thickness, THICKNESS_TOLERANCE, '"')
+    check("CB", order.cb_mm, result.center_bore, BORE_TOLERANCE, "mm")
+    if order.spacer_type in ('hub_centric', 'thin_lip'):
+        check("OB", order.ob_mm, result.hub_diameter, BORE_TOLERANCE, "mm")
+        check("Hub height", order.hub_height, result.hub_height, THICKNESS_TOLERANCE, '"')
+    elif order.spacer_type == 'step':
+        check("Counterbore", order.counterbore_mm, result.counter_bore_diameter, BORE_TOLERANCE, "mm")
+    return mismatches
+
+
+# Per-process generator and parser (built on first use in each worker)
+_worker_state: Dict[str, object] = {}
+
+
+def _generate_order(order: BatchOrder, program_number: str, output_dir: str,
+                    use_tolerance: bool) -> BatchResult:
+    """Generate, parse and (when clean) save one order - runs in a worker process"""
+    generator = _worker_state.get('generator')
+    if generator is None:
+        generator = _worker_state['generator'] = GCodeGenerator(use_templates=False)
+        _worker_state['parser'] = ImprovedGCodeParser()
+    parser = _worker_state['parser']
+
+    try:
+        gcode = generator.generate(
+            spacer_type=order.spacer_type,
+            program_number=program_number,
+            round_size=order.round_size,
+            thickness=order.thickness,
+            cb_mm=order.cb_mm,
+            lathe=order.lathe,
+            ob_mm=order.ob_mm,
+            hub_height=order.hub_height,
+            counterbore_mm=order.counterbore_mm,
+            step_depth=order.step_depth,
+            use_tolerance=use_tolerance,
+        )
+    except Exception as e:
+        return BatchResult(order, program_number, 'ERROR', issues=[f"Generation failed: {e}"])
+
+    file_path = generator.get_output_path(output_dir, order.spacer_type, order.round_size,
+                                          program_number)
+    result = parser.parse_text(gcode, file_path=file_path)
+    if result is None:
+        return BatchResult(order, program_number, 'FAILED', issues=["Parser could not read the program"])
+
+    validation_status = overall_status(result)
+    thickness_key = generator.normalize_thickness_key(order.thickness)
+    if thickness_key.endswith("MM"):
+        thickness_inches = generator.mm_to_inches(float(thickness_key[:-2]))
+    else:
+        thickness_inches = float(thickness_key)
+    issues = (list(result.crash_issues) + list(result.validation_issues)
+              + dimension_mismatches(order, result, thickness_inches))
+
+    if validation_status in FAILING_STATUSES or issues:
+        return BatchResult(order, program_number, 'FAILED', validation_status, issues=issues)
+
+    generator.save_gcode(gcode, file_path)
+    warnings = (list(result.bore_warnings) + list(result.dimensional_issues)
+                + list(result.validation_warnings))
+    return BatchResult(order, program_number, 'SAVED', validation_status, file_path, warnings)
+
+
+def _generate_chunk(jobs: List[tuple]) -> List[BatchResult]:
+    """Run a chunk of jobs in one worker call"""
+    return [_generate_order(*job) for job in jobs]
+
+
+def generate_orders(jobs: Sequence[tuple], max_workers: Optional[int] = None,
+                    cancel_event=None) -> Iterator[BatchResult]:
+    """
+    Generate orders in parallel, yielding results as they finish.
+
+    Args:
+        jobs: (order, program_number, output_dir, use_tolerance) tuples
+        max_workers: Worker processes (default: CPU count - 1)
+        cancel_event: Optional threading.Event; chunks not yet started are
+            dropped once set, chunks already running are waited for and their
+            results still yielded (their programs are already being saved)
+    """
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 2) - 1)
+
+    chunks = [list(jobs[i:i + BATCH_CHUNK_SIZE]) for i in range(0, len(jobs), BATCH_CHUNK_SIZE)]
+
+    if max_workers <= 1 or len(chunks) <= 1:
+        for job in jobs:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            yield _generate_order(*job)
+        return
+
+    def chunk_results(future):
+        try:
+            return future.result()
+        except Exception as e:
+            return [BatchResult(job[0], job[1], 'ERROR', issues=[f"Worker failed: {e}"])
+                    for job in futures[future]]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_generate_chunk, chunk): chunk for chunk in chunks}
+        pending = set(futures)
+        try:
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                pending.discard(future)
+                yield from chunk_results(future)
+
+            if pending:
+                # Cancelled - drop chunks that have not started and collect the
+                # ones already running, so their saved programs are reported
+                in_flight = [future for future in pending if not future.cancel()]
+                for future in as_completed(in_flight):
+                    yield from chunk_results(future)
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def write_failure_report(report_path: str, results: Sequence[BatchResult]) -> int:
+    """
+    Write failed/errored orders to a CSV report.
+
+    Returns:
+        Number of failures written
+    """
+    failures = sorted((r for r in results if r.status != 'SAVED'), key=lambda r: r.order.line)
+    with open(report_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Line', 'Spacer Type', 'Round Size', 'Thickness', 'CB (mm)', 'OB (mm)',
+                         'Hub Height', 'Program #', 'Result', 'Validation Status', 'Issues'])
+        for r in failures:
+            o = r.order
+            writer.writerow([o.line, o.spacer_type, o.round_size, o.thickness, o.cb_mm,
+                             o.ob_mm if o.ob_mm is not None else '',
+                             o.hub_height if o.hub_height is not None else '',
+                             r.program_number or '', r.status, r.validation_status or '',
+                             '; '.join(r.issues)])
+    return len(failures)
+
+
+def run_batch(orders_csv: str, output_dir: str, db_path: Optional[str] = None,
+              use_tolerance: bool = True, max_workers: Optional[int] = None,
+              progress=None, cancel_event=None) -> Tuple[List[BatchResult], Optional[str]]:
+    """
+    Generate and vet every order in an order list.
+
+    Args:
+        orders_csv: Order list CSV
+        output_dir: Base folder for saved programs (type/size subfolders)
+        db_path: Database with the program number registry - required for
+            orders without a pre-assigned program number; pre-assigned
+            numbers are checked against it and reserved too
+        use_tolerance: Apply standard CB/OB tolerances
+        max_workers: Worker processes (default: CPU count - 1)
+        progress: Optional callable(message)
+        cancel_event: Optional threading.Event
+
+    Returns:
+        (results, failure report path or None when every order was saved)
+    """
+    def report(message):
+        if progress:
+            progress(message)
+
+    orders, read_errors = read_orders(orders_csv)
+    for error in read_errors:
+        report(f"  Skipped - {error}")
+    report(f"Read {len(orders)} orders from {os.path.basename(orders_csv)}")
+
+    assigned = {}
+    if db_path:
+        assigned, rejected = reserve_program_numbers(db_path, orders)
+        report(f"Reserved {len(assigned)} program numbers from the registry")
+    else:
+        rejected = repeated_program_numbers(orders)
+
+    results = []
+    jobs = []
+    for order in orders:
+        if order.line in rejected:
+            results.append(BatchResult(order, order.program_number, 'ERROR', issues=[rejected[order.line]]))
+            continue
+        program_number = assigned.get(order.line) if db_path else order.program_number
+        if not program_number:
+            reason = ("No database given for program numbers" if not db_path
+                      else f"No available program number for round size {order.round_size}")
+            results.append(BatchResult(order, None, 'ERROR', issues=[reason]))
+            continue
+        jobs.append((order, program_number, output_dir, use_tolerance))
+
+    try:
+        for result in generate_orders(jobs, max_workers, cancel_event):
+            results.append(result)
+            mark = {'SAVED': 'OK ', 'FAILED': 'FAIL', 'ERROR': 'ERR '}[result.status]
+            detail = f" - {result.issues[0]}" if result.issues and result.status != 'SAVED' else ""
+            report(f"  [{mark}] line {result.order.line}: {result.program_number}{detail}")
+    finally:
+        if db_path:
+            # Numbers of orders that never ran (cancelled) are released too
+            finished = {r.order.line for r in results}
+            results_for_registry = results + [
+                BatchResult(order, program_number, 'ERROR')
+                for order, program_number, _, _ in jobs if order.line not in finished]
+            finish_reservations(db_path, results_for_registry, assigned.values())
+
+    report_path = None
+    if any(r.status != 'SAVED' for r in results):
+        os.makedirs(output_dir, exist_ok=True)
+        report_path = os.path.join(
+            output_dir, f"batch_failures_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        write_failure_report(report_path, results)
+
+    saved = sum(1 for r in results if r.status == 'SAVED')
+    report(f"Saved {saved} of {len(orders)} programs"
+           + (f" - failures in {report_path}" if report_path else ""))
+    return results, report_path
+
+
+def main():
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate and validate programs from an order list")
+    parser.add_argument("orders", help="Order list CSV")
+    parser.add_argument("--output", required=True, help="Output folder for generated programs")
+    parser.add_argument("--db", help="Database with the program number registry")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--no-tolerance", action="store_true", help="Do not apply CB/OB tolerances")
+    args = parser.parse_args()
+
+    results, report_path = run_batch(args.orders, args.output, args.db,
+                                     use_tolerance=not args.no_tolerance,
+                                     max_workers=args.workers, progress=print)
+    return 1 if report_path else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
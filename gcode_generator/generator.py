@@ -22,13 +22,15 @@ if __name__ == "__main__" or __package__ is None:
         SpacerDimensions,
         HubCentricDimensions,
         StepSpacerDimensions,
+        TwoPieceDimensions,
     )
     from gcode_generator.spacer_types.standard import StandardSpacerGenerator
     from gcode_generator.spacer_types.hub_centric import HubCentricSpacerGenerator
     from gcode_generator.spacer_types.thin_lip import ThinLipSpacerGenerator
     from gcode_generator.spacer_types.step import StepSpacerGenerator
     from gcode_generator.spacer_types.steel_ring import SteelRingSpacerGenerator
-    from gcode_generator.spacer_types.two_piece import TwoPieceSpacerGenerator
+    from gcode_generator.spacer_types.two_piece_lug import TwoPieceLugGenerator
+    from gcode_generator.spacer_types.two_piece_stud import TwoPieceStudGenerator
     from gcode_generator.templates.template_matcher import TemplateMatcher
     from gcode_generator.rules.lathe_config import LatheConfig
 else:
@@ -38,13 +40,15 @@ else:
         SpacerDimensions,
         HubCentricDimensions,
         StepSpacerDimensions,
+        TwoPieceDimensions,
     )
     from .spacer_types.standard import StandardSpacerGenerator
     from .spacer_types.hub_centric import HubCentricSpacerGenerator
     from .spacer_types.thin_lip import ThinLipSpacerGenerator
     from .spacer_types.step import StepSpacerGenerator
     from .spacer_types.steel_ring import SteelRingSpacerGenerator
-    from .spacer_types.two_piece import TwoPieceSpacerGenerator
+    from .spacer_types.two_piece_lug import TwoPieceLugGenerator
+    from .spacer_types.two_piece_stud import TwoPieceStudGenerator
     from .templates.template_matcher import TemplateMatcher
     from .rules.lathe_config import LatheConfig
 
@@ -77,7 +81,14 @@ class GCodeGenerator:
         SpacerType.THIN_LIP: ThinLipSpacerGenerator,
         SpacerType.STEP: StepSpacerGenerator,
         SpacerType.STEEL_RING: SteelRingSpacerGenerator,
-        SpacerType.TWO_PIECE: TwoPieceSpacerGenerator,
+        SpacerType.TWO_PIECE: TwoPieceStudGenerator,
+    }
+
+    # Two-piece generator by piece: the male (STUD) piece carries the hub,
+    # the female (LUG) piece the matching recess
+    TWO_PIECE_GENERATORS: Dict[bool, Type[BaseSpacerGenerator]] = {
+        True: TwoPieceStudGenerator,
+        False: TwoPieceLugGenerator,
     }
 
     # Map spacer types to folder names for saving
@@ -237,8 +248,26 @@ class GCodeGenerator:
                 step_depth_inches=step_depth,
             )
 
+        elif spacer_type == SpacerType.TWO_PIECE:
+            # Hub (OB) and recess (counterbore) are both optional
+            dimensions = TwoPieceDimensions(**base_kwargs)
+            if ob_mm is not None:
+                dimensions.ob_mm = ob_mm
+                dimensions.ob_mm_adjusted = self.apply_tolerance(ob_mm, is_cb=False) if use_tolerance else ob_mm
+                dimensions.ob_inches = self.mm_to_inches(dimensions.ob_mm_adjusted)
+            if hub_height is not None:
+                dimensions.hub_height_inches = hub_height
+            if counterbore_mm is not None:
+                dimensions.counterbore_mm = counterbore_mm
+                dimensions.counterbore_mm_adjusted = (
+                    self.apply_tolerance(counterbore_mm, is_cb=False) if use_tolerance else counterbore_mm)
+                dimensions.counterbore_inches = self.mm_to_inches(dimensions.counterbore_mm_adjusted)
+            if step_depth is not None:
+                dimensions.recess_depth_inches = step_depth
+            return dimensions
+
         else:
-            # Standard, Steel Ring, Two-Piece
+            # Standard, Steel Ring
             return SpacerDimensions(**base_kwargs)
 
     def generate(
@@ -317,13 +346,13 @@ class GCodeGenerator:
         )
 
         # Get the appropriate generator
-        generator_class = self.GENERATOR_MAP[spacer_type]
-
-        # Create generator instance
         if spacer_type == SpacerType.TWO_PIECE:
-            generator = generator_class(dimensions, is_male_piece=is_male_piece)
+            generator_class = self.TWO_PIECE_GENERATORS[bool(is_male_piece)]
         else:
-            generator = generator_class(dimensions)
+            generator_class = self.GENERATOR_MAP[spacer_type]
+
+        # Create generator instance
+        generator = generator_class(dimensions)
 
         # Validate dimensions
         is_valid, errors = generator.validate_dimensions()
@@ -349,31 +378,45 @@ class GCodeGenerator:
             Tuple of (gcode_content, filepath)
         """
         gcode = self.generate(**kwargs)
+        filepath = self.get_output_path(
+            output_dir,
+            kwargs.get('spacer_type'),
+            kwargs.get('round_size', 0),
+            kwargs.get('program_number', 'O00000'),
+        )
+        self.save_gcode(gcode, filepath)
+        return (gcode, filepath)
+
+    def get_output_path(
+        self,
+        output_dir: str,
+        spacer_type: Union[SpacerType, str],
+        round_size: float,
+        program_number: str,
+    ) -> str:
+        """
+        Build the save path for a program: <type folder>/<size folder>/<O-number>.nc
 
-        # Build output path
-        spacer_type = kwargs.get('spacer_type')
+        Creates the folders if needed.
+        """
         if isinstance(spacer_type, str):
             spacer_type = SpacerType(spacer_type.lower())
 
-        round_size = kwargs.get('round_size', 0)
-        program_number = kwargs.get('program_number', 'O00000')
-
         type_folder = self.FOLDER_MAP.get(spacer_type, "Unknown")
         size_folder = f"{str(round_size).replace('.', '_')}_inch"
 
         full_dir = os.path.join(output_dir, type_folder, size_folder)
         os.makedirs(full_dir, exist_ok=True)
 
-        filename = f"{program_number.upper()}.nc"
-        filepath = os.path.join(full_dir, filename)
+        return os.path.join(full_dir, f"{program_number.upper()}.nc")
 
-        # Write file
+    @staticmethod
+    def save_gcode(gcode: str, filepath: str) -> None:
+        """Write G-code to a file as ASCII (other characters replaced)."""
         gcode_ascii = gcode.encode('ascii', 'replace').decode('ascii')
         with open(filepath, 'w', encoding='ascii') as f:
             f.write(gcode_ascii)
 
-        return (gcode, filepath)
-
     def get_available_spacer_types(self) -> list:
         """Get list of available spacer types."""
         return [t.value for t in SpacerType]
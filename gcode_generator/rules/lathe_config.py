@@ -3,7 +3,7 @@ Lathe Configuration
 
 Contains configuration for the different Haas lathes (L1, L2, L3) including:
 - Round size assignments (which lathe handles which sizes)
-- Machine limits (max RPM, travel limits, etc.)
+- Machine limits (max RPM, travel limits, rapid rates, tool change time)
 - Tool turret positions
 """
 
@@ -23,6 +23,9 @@ class LatheSpecs:
     x_min: float  # Minimum X travel
     z_min: float  # Minimum Z travel
     chuck_max: float  # Maximum chuck capacity
+    rapid_x: float = 945.0  # X rapid traverse (inches/min)
+    rapid_z: float = 945.0  # Z rapid traverse (inches/min)
+    tool_change_time: float = 6.0  # Seconds per tool change incl. G53 home move and spindle restart
 
 
 class LatheConfig:
@@ -48,6 +51,9 @@ class LatheConfig:
             x_min=-11.0,
             z_min=-15.0,
             chuck_max=8.0,
+            rapid_x=709.0,
+            rapid_z=945.0,
+            tool_change_time=5.5,
         ),
         "L2": LatheSpecs(
             name="Lathe 2",
@@ -59,6 +65,9 @@ class LatheConfig:
             x_min=-11.0,
             z_min=-15.0,
             chuck_max=15.0,
+            rapid_x=945.0,
+            rapid_z=945.0,
+            tool_change_time=6.5,
         ),
         "L3": LatheSpecs(
             name="Lathe 3",
@@ -70,6 +79,9 @@ class LatheConfig:
             x_min=-11.0,
             z_min=-15.0,
             chuck_max=10.0,
+            rapid_x=945.0,
+            rapid_z=945.0,
+            tool_change_time=6.0,
         ),
     }
 
@@ -230,3 +242,14 @@ class LatheConfig:
     def get_max_css(cls, lathe: str) -> int:
         """Get maximum constant surface speed for a lathe."""
         return cls.LATHE_SPECS[lathe].max_css
+
+    @classmethod
+    def get_rapid_rates(cls, lathe: str) -> Tuple[float, float]:
+        """Get (X, Z) rapid traverse rates in inches/min for a lathe."""
+        specs = cls.LATHE_SPECS[lathe]
+        return (specs.rapid_x, specs.rapid_z)
+
+    @classmethod
+    def get_tool_change_time(cls, lathe: str) -> float:
+        """Get the tool change overhead in seconds for a lathe."""
+        return cls.LATHE_SPECS[lathe].tool_change_time
@@ -201,7 +201,7 @@ class StandardSpacerGenerator(BaseSpacerGenerator):
             "(---------------------------)",
             "T303 (TURN TOOL)",
             f"G97 S{turn_params.rpm} M03",
-            f"G00 G154 {pcode} X{self.format_gcode_value(dim.round_size)} Z0.1 M08",
+            f"G00 G154 {pcode} X{self.format_gcode_value(dim.round_size)} Z1. M08",
             f"G96 S{turn_params.css}",
             "Z0.",
             f"G01 X{self.format_gcode_value(final_od)} "
@@ -251,7 +251,7 @@ class StandardSpacerGenerator(BaseSpacerGenerator):
             "",
             "T303 (TURN TOOL)",
             f"G97 S{turn_params.rpm} M03",
-            f"G00 G154 {pcode} X{start_x} Z0.1 M08",
+            f"G00 G154 {pcode} X{start_x} Z1. M08",
             f"G96 S{turn_params.css}",
             "G00 Z0.",
             f"G01 X{self.format_gcode_value(finish_x)} "
@@ -300,6 +300,7 @@ class StandardSpacerGenerator(BaseSpacerGenerator):
             f"G01 X{self.format_gcode_value(dim.cb_inches)} "
             f"Z-{self.format_gcode_value(chamfer_depth)} "
             f"F{self.format_gcode_value(chamfer_params.feed)}",
+            "G00 Z0.2",
             self.generate_home_position(),
         ]
 
@@ -307,7 +307,7 @@ class SteelRingSpacerGenerator(BaseSpacerGenerator):
             "",
             "T303 (TURN TOOL)",
             f"G97 S{turn_params.rpm} M03",
-            f"G00 G154 {pcode} X{self.format_gcode_value(final_od)} Z0.15 M08",
+            f"G00 G154 {pcode} X{self.format_gcode_value(final_od)} Z1. M08",
             f"G96 S{turn_params.css} (CCS ON)",
             # Face
             "G01 Z0 F0.01",
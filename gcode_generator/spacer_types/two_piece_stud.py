@@ -120,7 +120,8 @@ class TwoPieceStudGenerator(BaseSpacerGenerator):
             f"G50 S{bore_max_rpm}",
             f"G97 S{bore_rpm} M03",
             f"G96 S{bore_css} M08",
-            f"G154 {pcode} G00 X2.3 Z0.1",
+            f"G154 {pcode} G00 X2.3 Z1.",
+            "Z0.1",
         ]
 
         # Boring passes to full depth using calculated diameters
@@ -182,7 +183,7 @@ class TwoPieceStudGenerator(BaseSpacerGenerator):
             "T303 (TURN TOOL)",
             f"G97 S{turn_rpm} M03",
             "M31",
-            f"G00 G154 {pcode} X{self.format_gcode_value(dim.round_size)} Z0.1 M08",
+            f"G00 G154 {pcode} X{self.format_gcode_value(dim.round_size)} Z1. M08",
             f"G96 S{turn_css} (CCS ON)",
             # Face
             f"G01 X{self.format_gcode_value(final_od)} Z0. F0.015",
@@ -234,7 +235,7 @@ class TwoPieceStudGenerator(BaseSpacerGenerator):
             "T303 (TURN TOOL)",
             f"G97 S{turn_rpm} M03",
             "M31",
-            f"G00 G154 {pcode} X{self.format_gcode_value(dim.round_size)} Z0.1 M08",
+            f"G00 G154 {pcode} X{self.format_gcode_value(dim.round_size)} Z1. M08",
             f"G96 S{turn_css} (CCS ON)",
         ]
 
@@ -301,7 +302,7 @@ class TwoPieceStudGenerator(BaseSpacerGenerator):
             f"G50 S{chamfer_max_rpm}",
             f"G97 S{chamfer_rpm} M03",
             f"G96 S{chamfer_css} M08",
-            f"G154 {pcode} G00 X{self.format_gcode_value(x_chamfer_start)} Z0.1",
+            f"G154 {pcode} G00 X{self.format_gcode_value(x_chamfer_start)} Z1.",
             "Z0.",
             f"G01 X{self.format_gcode_value(dim.cb_inches)} "
             f"Z-{self.format_gcode_value(chamfer_depth)} F0.008",
@@ -4,6 +4,7 @@ Template System
 Finds similar files from the repository to use as templates for generation.
 """
 
-from .template_matcher import TemplateMatcher
+from .template_matcher import TemplateMatcher, TemplateMatch, ExtractedPattern
+from .template_library import TemplateLibrary
 
-__all__ = ['TemplateMatcher']
+__all__ = ['TemplateMatcher', 'TemplateMatch', 'ExtractedPattern', 'TemplateLibrary']
@@ -0,0 +1,237 @@
+"""
+Template Library
+
+Pre-extracted machining patterns for every repository program, so template
+lookups during generation never touch the filesystem.
+
+- Patterns (feeds, speeds, peck depth) are extracted once per file content
+  and stored in the template_patterns table keyed by content hash; a file
+  is only read again when its content changes
+- Templates are held in memory, indexed by (round size, spacer type) and
+  ordered by CB/OB distance for nearest-template queries
+"""
+
+import hashlib
+import heapq
+import sqlite3
+from dataclasses import fields
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .template_matcher import ExtractedPattern, TemplateMatch, extract_patterns
+
+
+PATTERN_FIELDS = [f.name for f in fields(ExtractedPattern)]
+# RPM/CSS are whole numbers; stored as REAL like the other columns
+_INT_FIELDS = {f.name for f in fields(ExtractedPattern) if f.type == Optional[int]}
+
+# Spacer types as the generator names them
+_TWO_PIECE_PREFIX = '2pc'
+
+
+def normalize_spacer_type(spacer_type: Optional[str]) -> Optional[str]:
+    """Database spacer type -> generator spacer type ('2PC LUG' -> 'two_piece')"""
+    if not spacer_type:
+        return None
+    spacer_type = spacer_type.strip().lower()
+    if spacer_type.startswith(_TWO_PIECE_PREFIX):
+        return 'two_piece'
+    return spacer_type
+
+
+def round_size_key(round_size: float) -> float:
+    return round(float(round_size), 2)
+
+
+def similarity_score(round_diff: float, cb_diff: float) -> float:
+    """0-1 score: exact round size = 0.5 base, CB closeness up to 0.5"""
+    round_score = 0.5 if round_diff == 0 else max(0, 0.3 - round_diff * 0.1)
+    cb_score = max(0, 0.5 - cb_diff * 0.02)
+    return round(round_score + cb_score, 3)
+
+
+class TemplateLibrary:
+    """
+    In-memory index of repository templates with their extracted patterns.
+
+    Built from the programs table (active programs with a file); call
+    refresh() to pick up repository changes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # (round size, spacer type) -> [TemplateMatch] sorted by CB
+        self._index: Dict[Tuple[float, Optional[str]], List[TemplateMatch]] = {}
+        self._round_sizes: List[float] = []
+        self._loaded = False
+
+    def _ensure_table(self, cursor: sqlite3.Cursor) -> None:
+        columns = ', '.join(f"{name} REAL" for name in PATTERN_FIELDS)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS template_patterns (
+                content_hash TEXT PRIMARY KEY,
+                {columns},
+                extracted_at TEXT
+            )
+        """)
+
+    def refresh(self) -> int:
+        """
+        Rebuild the index, extracting patterns for contents not seen before.
+
+        Returns:
+            Number of files read (new or changed contents)
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            self._ensure_table(cursor)
+            cursor.execute(f"SELECT content_hash, {', '.join(PATTERN_FIELDS)} FROM template_patterns")
+            patterns = {row[0]: ExtractedPattern(*_pattern_values(row[1:])) for row in cursor.fetchall()}
+
+            try:
+                cursor.execute("""
+                    SELECT program_number, file_path, round_size, thickness_display,
+                           center_bore, hub_diameter, spacer_type, content_hash
+                    FROM programs
+                    WHERE (is_deleted IS NULL OR is_deleted = 0)
+                      AND round_size IS NOT NULL AND center_bore IS NOT NULL
+                      AND file_path IS NOT NULL
+                """)
+                rows = cursor.fetchall()
+            except sqlite3.Error:
+                rows = []
+
+            index: Dict[Tuple[float, Optional[str]], List[TemplateMatch]] = {}
+            new_patterns = []
+            files_read = 0
+            for program_number, file_path, round_size, thickness, cb, ob, spacer_type, content_hash in rows:
+                pattern = patterns.get(content_hash) if content_hash else None
+                if pattern is None:
+                    # New or changed content - read the file once and key by what was read
+                    try:
+                        with open(file_path, 'rb') as f:
+                            data = f.read()
+                    except OSError:
+                        continue
+                    files_read += 1
+                    content_hash = hashlib.sha256(data).hexdigest()
+                    pattern = patterns.get(content_hash)
+                    if pattern is None:
+                        pattern = extract_patterns(data.decode('utf-8', errors='replace'))
+                        patterns[content_hash] = pattern
+                        new_patterns.append((content_hash, pattern))
+
+                key = (round_size_key(round_size), normalize_spacer_type(spacer_type))
+                index.setdefault(key, []).append(TemplateMatch(
+                    program_number=program_number,
+                    file_path=file_path,
+                    round_size=round_size,
+                    thickness=thickness,
+                    cb_mm=cb,
+                    ob_mm=ob,
+                    spacer_type=spacer_type,
+                    similarity_score=0.0,
+                    content_hash=content_hash,
+                    pattern=pattern,
+                ))
+
+            if new_patterns:
+                now = datetime.now().isoformat()
+                placeholders = ', '.join('?' * (len(PATTERN_FIELDS) + 2))
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO template_patterns VALUES ({placeholders})",
+                    [(h, *[getattr(p, name) for name in PATTERN_FIELDS], now) for h, p in new_patterns])
+            conn.commit()
+        finally:
+            conn.close()
+
+        for templates in index.values():
+            templates.sort(key=lambda t: t.cb_mm)
+        self._index = index
+        self._round_sizes = sorted({key[0] for key in index})
+        self._loaded = True
+        return files_read
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.refresh()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return sum(len(templates) for templates in self._index.values())
+
+    def _buckets(self, round_size: float, spacer_type: Optional[str]):
+        """Index buckets for a round size (one spacer type, or all)"""
+        if spacer_type is None:
+            return [templates for (size, _), templates in self._index.items() if size == round_size]
+        templates = self._index.get((round_size, spacer_type))
+        return [templates] if templates else []
+
+    def nearest(
+        self,
+        round_size: float,
+        cb_mm: float,
+        ob_mm: Optional[float] = None,
+        spacer_type: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[TemplateMatch]:
+        """
+        Nearest templates: same round size first (then the closest round
+        sizes), ordered by CB distance plus OB distance when both sides
+        have an OB.
+
+        Returns:
+            Copies of the indexed TemplateMatch objects with similarity_score set
+        """
+        self._ensure_loaded()
+        spacer_type = normalize_spacer_type(spacer_type)
+        target = round_size_key(round_size)
+        sizes = sorted(self._round_sizes, key=lambda size: (abs(size - target), size))
+
+        def distance(template: TemplateMatch) -> float:
+            d = abs(template.cb_mm - cb_mm)
+            if ob_mm is not None and template.ob_mm is not None:
+                d += abs(template.ob_mm - ob_mm)
+            return d
+
+        matches = []
+        for size in sizes:
+            candidates = [t for bucket in self._buckets(size, spacer_type) for t in bucket]
+            if not candidates:
+                continue
+            for template in heapq.nsmallest(limit - len(matches), candidates, key=distance):
+                match = TemplateMatch(**{name: getattr(template, name)
+                                         for name in TemplateMatch.__dataclass_fields__})
+                match.similarity_score = similarity_score(abs(size - target),
+                                                          abs(template.cb_mm - cb_mm))
+                matches.append(match)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def exact(
+        self,
+        round_size: float,
+        cb_mm: float,
+        ob_mm: Optional[float] = None,
+        tolerance: float = 0.2,
+    ) -> Optional[TemplateMatch]:
+        """Template with the same round size and CB (and OB when given) within tolerance"""
+        self._ensure_loaded()
+        for template in self.nearest(round_size, cb_mm, ob_mm, limit=1):
+            if round_size_key(template.round_size) != round_size_key(round_size):
+                return None
+            if abs(template.cb_mm - cb_mm) >= tolerance:
+                return None
+            if ob_mm is not None and (template.ob_mm is None or abs(template.ob_mm - ob_mm) >= tolerance):
+                return None
+            template.similarity_score = 1.0
+            return template
+        return None
+
+
+def _pattern_values(values) -> List:
+    """Stored REAL columns back to ExtractedPattern field types"""
+    return [int(value) if value is not None and name in _INT_FIELDS else value
+            for name, value in zip(PATTERN_FIELDS, values)]
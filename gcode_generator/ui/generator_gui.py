@@ -9,6 +9,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 import os
 import sys
+import queue
+import threading
 
 # Add the File organizer directory to path for proper imports
 file_organizer_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -16,6 +18,7 @@ if file_organizer_dir not in sys.path:
     sys.path.insert(0, file_organizer_dir)
 
 from gcode_generator.generator import GCodeGenerator, SpacerType
+from gcode_generator.batch import run_batch
 from gcode_generator.rules.lathe_config import LatheConfig
 
 
@@ -225,6 +228,9 @@ class GCodeGeneratorGUI:
         ttk.Button(frame, text="Clear", command=self._clear).pack(
             side=tk.LEFT, padx=5
         )
+        ttk.Button(frame, text="Batch from CSV...", command=self._batch_generate).pack(
+            side=tk.LEFT, padx=5
+        )
 
     def _build_preview(self, parent):
         """Build preview section."""
@@ -379,6 +385,67 @@ class GCodeGeneratorGUI:
             except Exception as e:
                 messagebox.showerror("Error", f"Save failed:\n{str(e)}")
 
+    def _batch_generate(self):
+        """Generate and validate every order in an order list CSV."""
+        orders_csv = filedialog.askopenfilename(
+            title="Select Order List",
+            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")],
+        )
+        if not orders_csv:
+            return
+
+        output_dir = filedialog.askdirectory(title="Select Output Folder")
+        if not output_dir:
+            return
+
+        db_path = self.generator.db_path
+        if not db_path:
+            messagebox.showinfo(
+                "No Database",
+                "No database was given, so program numbers cannot be taken from the registry.\n\n"
+                "Only orders with a program_number column value will be generated."
+            )
+
+        window = tk.Toplevel(self.root)
+        window.title("Batch Generation")
+        window.geometry("700x500")
+
+        log = scrolledtext.ScrolledText(window, wrap=tk.NONE, font=("Consolas", 9))
+        log.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        cancel_event = threading.Event()
+        cancel_button = ttk.Button(window, text="Cancel", command=cancel_event.set)
+        cancel_button.pack(pady=5)
+
+        messages = queue.Queue()
+        use_tolerance = self.use_tolerance_var.get()
+
+        def worker():
+            try:
+                run_batch(orders_csv, output_dir, db_path, use_tolerance=use_tolerance,
+                          progress=lambda message: messages.put(message + "\n"),
+                          cancel_event=cancel_event)
+            except Exception as e:
+                messages.put(f"\nERROR: {e}\n")
+            messages.put(None)
+
+        def poll():
+            try:
+                while True:
+                    message = messages.get_nowait()
+                    if message is None:
+                        cancel_button.config(text="Close", command=window.destroy)
+                        return
+                    log.insert(tk.END, message)
+                    log.see(tk.END)
+            except queue.Empty:
+                pass
+            if window.winfo_exists():
+                window.after(100, poll)
+
+        threading.Thread(target=worker, daemon=True).start()
+        poll()
+
     def _clear(self):
         """Clear all inputs and preview."""
         self.program_number_var.set("")
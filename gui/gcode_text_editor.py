@@ -4,12 +4,12 @@ Integrated text editor with validation and auto-backup support.
 
 Features:
 - Line numbers synchronized with text content
-- Syntax highlighting for G-code elements
+- Incremental syntax highlighting for G-code elements (visible lines first)
 - Find/Replace dialog
 - Error line highlighting
 - Animation/playback controls
 - Dark theme matching existing UI
-- Validation on save (improved_gcode_parser)
+- Live validation while typing and on save (improved_gcode_parser)
 - Auto-backup before saving (repository_manager)
 - Undo/redo support
 """
@@ -18,12 +18,58 @@ import tkinter as tk
 from tkinter import messagebox, simpledialog
 import os
 import re
+import queue
+import threading
 from datetime import datetime
 from typing import Optional, Callable, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Syntax highlighting tags (in the order they are configured)
+SYNTAX_TAGS = ('gcode', 'mcode', 'tcode', 'comment', 'coordinate', 'program')
+
+# One combined pass per line instead of one regex per token type
+_TOKEN_PATTERN = re.compile(
+    r'(?P<program>\bO\d+)'
+    r'|(?P<gcode>\bG\d+\.?\d*)'
+    r'|(?P<mcode>\bM\d+)'
+    r'|(?P<tcode>\bT\d+)'
+    r'|(?P<coordinate>\b[XYZIJKRFS]-?\d+\.?\d*)',
+    re.IGNORECASE
+)
+
+# Lines highlighted per idle callback when filling in off-screen text
+HIGHLIGHT_CHUNK_LINES = 250
+
+# Quiet period after the last keystroke before live validation runs
+LIVE_VALIDATION_DELAY_MS = 800
+
+
+def tokenize_gcode_line(line: str) -> List[tuple]:
+    """
+    Split a single G-code line into highlight spans.
+
+    Args:
+        line: Line text (without trailing newline)
+
+    Returns:
+        List of (tag, start_col, end_col) tuples
+    """
+    spans = []
+
+    # Comments (entire line or inline) - only the code part is tokenized
+    if '(' in line:
+        comment_start = line.index('(')
+        spans.append(('comment', comment_start, len(line)))
+        line = line[:comment_start]
+
+    for match in _TOKEN_PATTERN.finditer(line):
+        start, end = match.span()
+        spans.append((match.lastgroup, start, end))
+
+    return spans
+
 
 class FindReplaceDialog:
     """Find and Replace dialog for text editor"""
@@ -192,6 +238,7 @@ class LineNumberCanvas(tk.Canvas):
         super().__init__(parent, width=50, bg='#2d2d30',
                         highlightthickness=0, **kwargs)
         self.text_widget = text_widget
+        self.error_lines = set()  # Line numbers drawn with an error marker
 
     def redraw(self, *args):
         """Redraw line numbers when text changes"""
@@ -213,9 +260,14 @@ class LineNumberCanvas(tk.Canvas):
             y = dline[1]
             linenum = str(i).split(".")[0]
 
-            # Draw line number
-            self.create_text(2, y, anchor="nw", text=linenum,
-                           fill='#858585', font=('Consolas', 9))
+            # Draw line number (error lines get a red marker)
+            is_error = int(linenum) in self.error_lines
+            if is_error:
+                self.create_rectangle(0, y, 3, y + dline[3],
+                                      fill='#ff6b6b', outline='')
+            self.create_text(5, y, anchor="nw", text=linenum,
+                           fill='#ff6b6b' if is_error else '#858585',
+                           font=('Consolas', 9))
 
             # Move to next line
             i = self.text_widget.index(f"{i}+1line")
@@ -228,7 +280,9 @@ class GCodeTextEditor:
                  on_save_callback: Optional[Callable] = None,
                  bg_color: str = '#1e1e1e', fg_color: str = '#d4d4d4',
                  repository_manager = None,
-                 crash_lines: list = None):
+                 crash_lines: list = None,
+                 save_guard: Optional[Callable[[], bool]] = None,
+                 on_close_callback: Optional[Callable] = None):
         """
         Initialize G-code text editor.
 
@@ -241,10 +295,15 @@ class GCodeTextEditor:
             fg_color: Foreground color
             repository_manager: RepositoryManager instance for versioning
             crash_lines: Line numbers of known crash risks to highlight on open
+            save_guard: Called before the file is written; saving stops if it
+                returns False (e.g. another user now holds the edit lock)
+            on_close_callback: Function to call when the editor closes
         """
         self.file_path = file_path
         self.program_number = program_number
         self.on_save_callback = on_save_callback
+        self.save_guard = save_guard
+        self.on_close_callback = on_close_callback
         self.bg_color = bg_color
         self.fg_color = fg_color
         self.repository_manager = repository_manager
@@ -254,6 +313,24 @@ class GCodeTextEditor:
         self.current_playback_line = 1  # Current line for playback
         self.syntax_highlighting_enabled = True
 
+        # Incremental highlighting state: snapshot of the text lines and
+        # which of them currently carry up-to-date syntax tags
+        self._hl_lines: List[str] = []
+        self._hl_done = bytearray()
+        self._hl_scan_pos = 0  # Where the idle fill resumes scanning
+        self._hl_idle_job = None
+        self._hl_edit_job = None
+
+        # Live validation: one parser reused by a single background worker
+        self.live_validation_enabled = True
+        self._parser = None
+        self._parser_lock = threading.Lock()
+        self._validation_job = None
+        self._validation_queue = queue.Queue()
+        self._validation_running = False
+        self._validation_pending = False
+        self._validation_generation = 0
+
         # Create dialog
         self.dialog = tk.Toplevel(parent)
         self.dialog.title(f"Edit G-Code: {program_number}")
@@ -334,9 +411,6 @@ class GCodeTextEditor:
         self.text_widget.insert('1.0', self.original_content)
         self.text_widget.edit_reset()  # Reset undo stack
 
-        # Apply initial syntax highlighting
-        self._apply_syntax_highlighting()
-
         # Scrollbars
         vscroll = tk.Scrollbar(editor_frame, orient=tk.VERTICAL,
                               command=self._on_scroll)
@@ -363,6 +437,9 @@ class GCodeTextEditor:
         # Bottom toolbar
         self._create_toolbar()
 
+        # Initial syntax highlighting: visible region first, rest when idle
+        self.dialog.after_idle(self._apply_syntax_highlighting)
+
         # Initial line number draw
         self.dialog.after(100, self.line_numbers.redraw)
 
@@ -371,6 +448,10 @@ class GCodeTextEditor:
         self.text_widget.yview(*args)
         self.line_numbers.redraw()
 
+        # Newly exposed lines may still be waiting for the idle fill
+        if self.syntax_highlighting_enabled and self._hl_done:
+            self._highlight_visible_lines()
+
     def _on_text_modified(self, event=None):
         """Handle text modification"""
         if self.text_widget.edit_modified():
@@ -378,9 +459,12 @@ class GCodeTextEditor:
             self.status_label.config(text="Modified *", fg='#ffc107')
             self.text_widget.edit_modified(False)
 
-            # Reapply syntax highlighting after modification
-            if self.syntax_highlighting_enabled:
-                self.dialog.after(100, self._apply_syntax_highlighting)
+            # Re-highlight only the edited lines (coalesced per idle cycle)
+            if self.syntax_highlighting_enabled and self._hl_edit_job is None:
+                self._hl_edit_job = self.dialog.after_idle(self._on_edit_highlight)
+
+            # Re-validate once typing pauses
+            self._schedule_live_validation()
 
     def _configure_text_tags(self):
         """Configure text tags for syntax highlighting and error display"""
@@ -401,72 +485,152 @@ class GCodeTextEditor:
         self.text_widget.tag_raise('playback')
 
     def _apply_syntax_highlighting(self):
-        """Apply syntax highlighting to entire text"""
+        """Highlight the entire text: visible lines now, the rest when idle"""
         if not self.syntax_highlighting_enabled:
             return
 
-        # Remove all syntax tags
-        for tag in ['gcode', 'mcode', 'tcode', 'comment', 'coordinate', 'program']:
+        content = self.text_widget.get('1.0', 'end-1c')
+        self._hl_lines = content.split('\n')
+        self._hl_done = bytearray(len(self._hl_lines))
+        self._hl_scan_pos = 0
+
+        for tag in SYNTAX_TAGS:
             self.text_widget.tag_remove(tag, '1.0', tk.END)
 
-        content = self.text_widget.get('1.0', 'end-1c')
-        lines = content.split('\n')
-
-        for line_num, line in enumerate(lines, 1):
-            # Comments (entire line or inline)
-            if '(' in line:
-                comment_start = line.index('(')
-                self.text_widget.tag_add('comment',
-                                        f"{line_num}.{comment_start}",
-                                        f"{line_num}.end")
-                # Only process non-comment part for other patterns
-                line = line[:comment_start]
-
-            # Program numbers (O followed by digits)
-            for match in re.finditer(r'\bO\d+', line, re.IGNORECASE):
-                start, end = match.span()
-                self.text_widget.tag_add('program',
-                                        f"{line_num}.{start}",
-                                        f"{line_num}.{end}")
-
-            # G-codes (G followed by digits/decimals)
-            for match in re.finditer(r'\bG\d+\.?\d*', line, re.IGNORECASE):
-                start, end = match.span()
-                self.text_widget.tag_add('gcode',
-                                        f"{line_num}.{start}",
-                                        f"{line_num}.{end}")
-
-            # M-codes (M followed by digits)
-            for match in re.finditer(r'\bM\d+', line, re.IGNORECASE):
-                start, end = match.span()
-                self.text_widget.tag_add('mcode',
-                                        f"{line_num}.{start}",
-                                        f"{line_num}.{end}")
-
-            # Tool numbers (T followed by digits)
-            for match in re.finditer(r'\bT\d+', line, re.IGNORECASE):
-                start, end = match.span()
-                self.text_widget.tag_add('tcode',
-                                        f"{line_num}.{start}",
-                                        f"{line_num}.{end}")
-
-            # Coordinates (X, Y, Z, I, J, K, R, F, S followed by numbers)
-            for match in re.finditer(r'\b[XYZIJKRFS]-?\d+\.?\d*', line, re.IGNORECASE):
-                start, end = match.span()
-                self.text_widget.tag_add('coordinate',
-                                        f"{line_num}.{start}",
-                                        f"{line_num}.{end}")
+        self._highlight_visible_lines()
+        self._schedule_idle_highlight()
 
         # Reapply error highlighting if present
         self._highlight_error_lines()
 
+    def _on_edit_highlight(self):
+        """Re-tokenize the line range touched by the last edit(s)"""
+        self._hl_edit_job = None
+        if not self.syntax_highlighting_enabled:
+            return
+
+        lines = self.text_widget.get('1.0', 'end-1c').split('\n')
+        old_lines = self._hl_lines
+        if not old_lines:
+            self._apply_syntax_highlighting()
+            return
+
+        # Find the changed block by trimming the common prefix and suffix
+        limit = min(len(lines), len(old_lines))
+        prefix = 0
+        while prefix < limit and lines[prefix] == old_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < limit - prefix and
+               lines[-1 - suffix] == old_lines[-1 - suffix]):
+            suffix += 1
+
+        new_end = len(lines) - suffix
+        old_end = len(old_lines) - suffix
+        if prefix == new_end and prefix == old_end:
+            return  # Nothing changed (e.g. modified flag toggled)
+
+        # Splice the snapshot so untouched lines keep their state
+        self._hl_lines = lines
+        self._hl_done[prefix:old_end] = bytes(new_end - prefix)
+        self._hl_scan_pos = min(self._hl_scan_pos, prefix)
+
+        if new_end > prefix:
+            # Large pastes/replacements: highlight what is visible now and
+            # let the idle fill handle the rest
+            if new_end - prefix <= HIGHLIGHT_CHUNK_LINES:
+                self._highlight_lines(prefix + 1, new_end)
+            else:
+                self._highlight_visible_lines()
+                self._schedule_idle_highlight()
+
+    def _highlight_lines(self, first: int, last: int):
+        """
+        Re-tokenize lines first..last (1-based, inclusive) and apply tags.
+
+        Tag ranges are collected per tag type so each tag is removed and
+        added with a single Tk call for the whole range.
+        """
+        first = max(first, 1)
+        last = min(last, len(self._hl_lines))
+        if first > last:
+            return
+
+        ranges = {tag: [] for tag in SYNTAX_TAGS}
+        for line_num in range(first, last + 1):
+            for tag, start, end in tokenize_gcode_line(self._hl_lines[line_num - 1]):
+                ranges[tag].append(f"{line_num}.{start}")
+                ranges[tag].append(f"{line_num}.{end}")
+
+        range_start = f"{first}.0"
+        range_end = f"{last}.end"
+        for tag, indices in ranges.items():
+            self.text_widget.tag_remove(tag, range_start, range_end)
+            if indices:
+                self.text_widget.tag_add(tag, *indices)
+
+        self._hl_done[first - 1:last] = b'\x01' * (last - first + 1)
+
+    def _highlight_dirty_in(self, first: int, last: int):
+        """Highlight the not-yet-highlighted lines within first..last"""
+        first = max(first, 1)
+        last = min(last, len(self._hl_done))
+        line_num = first
+        while line_num <= last:
+            if self._hl_done[line_num - 1]:
+                line_num += 1
+                continue
+            run_end = line_num
+            while run_end < last and not self._hl_done[run_end]:
+                run_end += 1
+            self._highlight_lines(line_num, run_end)
+            line_num = run_end + 1
+
+    def _highlight_visible_lines(self):
+        """Highlight any pending lines in the current viewport"""
+        first = int(self.text_widget.index('@0,0').split('.')[0])
+        height = self.text_widget.winfo_height()
+        last = int(self.text_widget.index(f'@0,{height}').split('.')[0])
+        self._highlight_dirty_in(first, last)
+
+    def _schedule_idle_highlight(self):
+        """Queue the background fill of off-screen lines"""
+        if self._hl_idle_job is None:
+            self._hl_idle_job = self.dialog.after_idle(self._highlight_idle_step)
+
+    def _highlight_idle_step(self):
+        """Highlight one chunk of pending lines, then yield to the event loop"""
+        self._hl_idle_job = None
+        if not self.syntax_highlighting_enabled:
+            return
+        try:
+            # Keep the viewport correct if the user scrolled meanwhile
+            self._highlight_visible_lines()
+
+            pos = self._hl_done.find(0, self._hl_scan_pos)
+            if pos == -1:
+                pos = self._hl_done.find(0)
+            if pos == -1:
+                self._hl_scan_pos = 0
+                return
+
+            last = min(pos + HIGHLIGHT_CHUNK_LINES, len(self._hl_done))
+            self._highlight_dirty_in(pos + 1, last)
+            self._hl_scan_pos = last
+        except tk.TclError:
+            return  # Dialog closed mid-fill
+
+        self._schedule_idle_highlight()
+
     def _highlight_error_lines(self):
         """Highlight lines with validation errors"""
         self.text_widget.tag_remove('error', '1.0', tk.END)
+        self.line_numbers.error_lines = set(self.error_lines)
+        indices = []
         for line_num in self.error_lines:
-            self.text_widget.tag_add('error',
-                                    f"{line_num}.0",
-                                    f"{line_num}.end")
+            indices.extend((f"{line_num}.0", f"{line_num}.end"))
+        if indices:
+            self.text_widget.tag_add('error', *indices)
 
     def _scroll_to_first_error(self):
         """Highlight crash-risk lines and scroll to the first one."""
@@ -642,21 +806,14 @@ class GCodeTextEditor:
         """Validate G-code without saving"""
         content = self.text_widget.get('1.0', 'end-1c')
 
-        # Write to temp file for validation
-        temp_path = self.file_path + '.validate.tmp'
         try:
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-
-            # Validate
-            validation_result = self._validate_gcode(temp_path)
+            # Validate the editor buffer directly (no temp file needed)
+            validation_result = self._validate_gcode(content)
 
             # Extract error line numbers and highlight them
             self.error_lines = validation_result['error_lines']
             self._highlight_error_lines()
-
-            # Clean up temp file
-            os.remove(temp_path)
+            self.line_numbers.redraw()
 
             # Show results
             if validation_result['has_critical_errors']:
@@ -688,13 +845,14 @@ class GCodeTextEditor:
 
         except Exception as e:
             messagebox.showerror("Validation Error", f"Failed to validate:\n{str(e)}")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
 
     def save_file(self):
         """Save file with validation and backup"""
         content = self.text_widget.get('1.0', 'end-1c')
 
+        if self.save_guard and not self.save_guard():
+            return
+
         # Create backup before saving
         if self.repository_manager and os.path.exists(self.file_path):
             try:
@@ -727,7 +885,7 @@ class GCodeTextEditor:
             return
 
         # Validate G-code
-        validation_result = self._validate_gcode(temp_path)
+        validation_result = self._validate_gcode(content)
 
         if validation_result['has_critical_errors']:
             error_text = "\n".join(validation_result['critical_errors'][:5])
@@ -760,21 +918,29 @@ class GCodeTextEditor:
             if os.path.exists(temp_path):
                 os.remove(temp_path)
 
-    def _validate_gcode(self, file_path: str) -> dict:
+    def _get_parser(self):
+        """Return the editor's parser, creating it on first use"""
+        if self._parser is None:
+            from improved_gcode_parser import ImprovedGCodeParser
+            self._parser = ImprovedGCodeParser()
+        return self._parser
+
+    def _validate_gcode(self, content: str) -> dict:
         """
-        Run improved_gcode_parser validation.
+        Run improved_gcode_parser validation on in-memory G-code.
 
         Args:
-            file_path: Path to file to validate
+            content: Program text to validate (usually the editor buffer)
 
         Returns:
             Dict with validation results
         """
         try:
-            from improved_gcode_parser import ImprovedGCodeParser
-
-            parser = ImprovedGCodeParser()
-            result = parser.parse_file(file_path)
+            with self._parser_lock:
+                parser = self._get_parser()
+                result = parser.parse_text(content, file_path=self.file_path)
+            if result is None:
+                raise ValueError("parser returned no result")
 
             # Collect errors
             critical_errors = []
@@ -812,6 +978,74 @@ class GCodeTextEditor:
                 'result': None
             }
 
+    def _schedule_live_validation(self):
+        """Debounce live validation until typing pauses"""
+        if not self.live_validation_enabled:
+            return
+        if self._validation_job is not None:
+            self.dialog.after_cancel(self._validation_job)
+        self._validation_job = self.dialog.after(LIVE_VALIDATION_DELAY_MS,
+                                                 self._start_live_validation)
+
+    def _start_live_validation(self):
+        """Snapshot the buffer and validate it on a background thread"""
+        self._validation_job = None
+        if self._validation_running:
+            # Re-run with the newest text once the current pass finishes
+            self._validation_pending = True
+            return
+
+        self._validation_generation += 1
+        generation = self._validation_generation
+        content = self.text_widget.get('1.0', 'end-1c')
+        self._validation_running = True
+        self.status_label.config(text="Checking...", fg='#858585')
+
+        def run_validation():
+            result = self._validate_gcode(content)
+            self._validation_queue.put((generation, result))
+
+        threading.Thread(target=run_validation, daemon=True).start()
+        self.dialog.after(100, self._poll_live_validation)
+
+    def _poll_live_validation(self):
+        """Apply background validation results on the Tk thread"""
+        try:
+            if not self.dialog.winfo_exists():
+                return
+        except tk.TclError:
+            return
+
+        try:
+            generation, validation_result = self._validation_queue.get_nowait()
+        except queue.Empty:
+            self.dialog.after(100, self._poll_live_validation)
+            return
+
+        self._validation_running = False
+        if self._validation_pending:
+            self._validation_pending = False
+            self._start_live_validation()
+
+        if generation != self._validation_generation:
+            return  # Stale result for text that has since changed
+
+        self.error_lines = validation_result['error_lines']
+        self._highlight_error_lines()
+        self.line_numbers.redraw()
+
+        n_errors = len(validation_result['critical_errors'])
+        n_warnings = len(validation_result['warnings'])
+        if n_errors:
+            self.status_label.config(
+                text=f"Modified * - {n_errors} error(s), {n_warnings} warning(s)",
+                fg='#ff6b6b')
+        elif n_warnings:
+            self.status_label.config(
+                text=f"Modified * - {n_warnings} warning(s)", fg='#ffc107')
+        elif self.modified:
+            self.status_label.config(text="Modified * - no issues", fg='#28a745')
+
     def _extract_line_numbers(self, messages: List[str]) -> List[int]:
         """
         Extract line numbers from validation messages.
@@ -848,8 +1082,18 @@ class GCodeTextEditor:
                 self.save_file()
                 # Only close if save was successful
                 if not self.modified:
-                    self.dialog.destroy()
+                    self._destroy()
             else:  # No - don't save
-                self.dialog.destroy()
+                self._destroy()
         else:
-            self.dialog.destroy()
+            self._destroy()
+
+    def _destroy(self):
+        """Stop background work and close the dialog"""
+        self.live_validation_enabled = False
+        if self._validation_job is not None:
+            self.dialog.after_cancel(self._validation_job)
+            self._validation_job = None
+        self.dialog.destroy()
+        if self.on_close_callback:
+            self.on_close_callback()
@@ -3,9 +3,12 @@ G-Code Toolpath Plotter
 Visualizes 2D lathe toolpaths using matplotlib.
 
 Features:
-- Parses G00/G01 moves and extracts X,Z coordinates
-- Shows rapid moves (dashed green) vs feed moves (solid blue)
+- Parses G00-G03 moves and drilling cycles via utils.toolpath_engine
+  (arcs, work offsets, G53; results cached by content hash)
+- Shows rapid moves (orange) vs feed moves (blue, green for flipped Side 2)
 - Displays tool change positions (orange markers)
+- Moves drawn as a handful of LineCollection/scatter artists, updated in place
+- Click picking through a grid spatial index (segment -> G-code line)
 - Zoom/pan controls via matplotlib toolbar
 - Export to PNG functionality
 """
@@ -14,206 +17,103 @@ import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.collections import LineCollection
+import numpy as np
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import re
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 import os
 import logging
 
+from utils.toolpath_engine import GCodeToolpathParser
+
 logger = logging.getLogger(__name__)
 
 
-class GCodeToolpathParser:
-    """Parse G-code file and extract toolpath coordinates"""
+class SegmentSpatialIndex:
+    """Uniform grid over plotted segments for mapping a click back to a G-code line"""
 
-    def __init__(self, file_path: str):
+    def __init__(self, segments: np.ndarray, line_numbers: np.ndarray, grid_size: int = 64):
         """
-        Initialize parser.
+        Build the index.
 
         Args:
-            file_path: Path to G-code file
+            segments: (N, 2, 2) array of segment endpoints in plot coordinates (z, x)
+            line_numbers: (N,) array of G-code line numbers, one per segment
+            grid_size: Number of cells along the longer side of the bounding box
         """
-        self.file_path = file_path
+        self.segments = segments
+        self.line_numbers = line_numbers
+        self.cells = {}
 
-    def parse(self) -> Dict:
-        """
-        Parse G-code and extract toolpath data.
+        if len(segments) == 0:
+            self.origin = np.zeros(2)
+            self.cell_size = 1.0
+            return
 
-        Returns:
-            {
-                'rapid_moves': [(x1, z1, x2, z2), ...],  # G00 moves
-                'feed_moves': [(x1, z1, x2, z2), ...],   # G01 moves
-                'tool_changes': [(x, z, tool), ...],     # Tool positions
-                'bounds': {'x_min': ..., 'x_max': ..., 'z_min': ..., 'z_max': ...},
-                'line_coordinates': {line_num: (x, z), ...},  # Line number to coordinate mapping
-                'gcode_lines': [...],  # Original G-code lines for display
-                'flip_line': None,  # Line number where flip comment occurs
-                'side1_deepest_z': None  # Deepest (most negative) Z from Side 1
-            }
-        """
-        rapid_moves = []
-        feed_moves = []
-        tool_changes = []
-        line_coordinates = {}  # Map line number to ending coordinate
-        flip_line = None
-        side1_deepest_z = 0.0
-
-        # Load file
-        try:
-            with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                gcode_lines = f.readlines()
-        except Exception as e:
-            logger.error(f"Failed to load file: {e}")
-            return self._empty_result()
-
-        # Track current position (modal G-code)
-        current_x = 0.0
-        current_z = 0.0
-        current_tool = None
-        current_mode = 'G00'  # Default to rapid
-
-        for line_num, original_line in enumerate(gcode_lines, 1):
-            line = original_line.strip().upper()
-
-            # Check for flip comment (before stripping comments)
-            if flip_line is None and '(' in original_line:
-                comment = original_line[original_line.index('('):].upper()
-                if 'FLIP' in comment:
-                    flip_line = line_num
-
-            # Skip comments and empty lines
-            if not line or line.startswith('%'):
-                continue
-
-            # Remove inline comments
-            if '(' in line:
-                comment_start = line.index('(')
-                line = line[:comment_start].strip()
-
-            if not line:
-                continue
-
-            # Tool change (T followed by digits)
-            tool_match = re.match(r'T(\d+)', line)
-            if tool_match:
-                current_tool = tool_match.group(1)
-                tool_changes.append((current_x, current_z, current_tool))
-                line_coordinates[line_num] = (current_x, current_z)
-                continue
-
-            # Detect G-code mode
-            if 'G00' in line or 'G0 ' in line or line == 'G0':
-                current_mode = 'G00'
-            elif 'G01' in line or 'G1 ' in line or line == 'G1':
-                current_mode = 'G01'
-
-            # Extract coordinates (X and Z)
-            new_x, new_z = self._extract_coordinates(line, current_x, current_z)
-
-            # If position changed, add move
-            if new_x != current_x or new_z != current_z:
-                move = (current_x, current_z, new_x, new_z)
-
-                if current_mode == 'G00':
-                    rapid_moves.append(move)
-                else:
-                    feed_moves.append(move)
-
-                # Map this line number to the destination coordinate
-                line_coordinates[line_num] = (new_x, new_z)
-
-                # Track deepest Z from T1xx drilling operations before flip (ignore G53)
-                if flip_line is None or line_num < flip_line:
-                    # Only track drilling tools (T1xx) and not G53 lines
-                    if current_tool and current_tool.startswith('1') and 'G53' not in line:
-                        if new_z < side1_deepest_z:
-                            side1_deepest_z = new_z
-
-                # Update current position
-                current_x, current_z = new_x, new_z
-
-        # Calculate bounds
-        all_x = []
-        all_z = []
-        for x1, z1, x2, z2 in rapid_moves + feed_moves:
-            all_x.extend([x1, x2])
-            all_z.extend([z1, z2])
-
-        if not all_x:
-            return self._empty_result()
-
-        bounds = {
-            'x_min': min(all_x),
-            'x_max': max(all_x),
-            'z_min': min(all_z),
-            'z_max': max(all_z)
-        }
+        points = segments.reshape(-1, 2)
+        self.origin = points.min(axis=0)
+        extent = float((points.max(axis=0) - self.origin).max())
+        self.cell_size = extent / grid_size if extent > 0 else 1.0
 
-        return {
-            'rapid_moves': rapid_moves,
-            'feed_moves': feed_moves,
-            'tool_changes': tool_changes,
-            'bounds': bounds,
-            'line_coordinates': line_coordinates,
-            'gcode_lines': gcode_lines,
-            'flip_line': flip_line,
-            'side1_deepest_z': side1_deepest_z
-        }
+        # Register each segment in every cell its bounding box touches
+        lo = np.floor((segments.min(axis=1) - self.origin) / self.cell_size).astype(int)
+        hi = np.floor((segments.max(axis=1) - self.origin) / self.cell_size).astype(int)
+        for idx, ((c0, r0), (c1, r1)) in enumerate(zip(lo.tolist(), hi.tolist())):
+            for col in range(c0, c1 + 1):
+                for row in range(r0, r1 + 1):
+                    self.cells.setdefault((col, row), []).append(idx)
 
-    def _extract_coordinates(self, line: str, current_x: float, current_z: float) -> Tuple[float, float]:
+    def nearest_line(self, z: float, x: float, max_dist: float) -> Optional[int]:
         """
-        Extract X and Z coordinates from G-code line.
+        Find the G-code line of the segment closest to a point.
 
         Args:
-            line: G-code line (uppercase)
-            current_x: Current X position
-            current_z: Current Z position
+            z: Point Z (plot horizontal axis)
+            x: Point X (plot vertical axis)
+            max_dist: Search radius in plot units
 
         Returns:
-            (new_x, new_z) tuple
+            Line number, or None if no segment is within max_dist
         """
-        new_x = current_x
-        new_z = current_z
-
-        # Check if this is a G53 (machine coordinate) line
-        is_g53 = 'G53' in line
-
-        # X coordinate (radius for lathe)
-        x_match = re.search(r'X\s*(-?\d+\.?\d*)', line)
-        if x_match:
-            new_x = float(x_match.group(1))
-            # G53 uses different offset - use absolute value for visualization
-            if is_g53:
-                new_x = abs(new_x)
-
-        # Z coordinate (length for lathe)
-        z_match = re.search(r'Z\s*(-?\d+\.?\d*)', line)
-        if z_match:
-            new_z = float(z_match.group(1))
-            # G53 uses different offset - use absolute value for visualization
-            if is_g53:
-                new_z = abs(new_z)
-
-        return new_x, new_z
-
-    def _empty_result(self) -> Dict:
-        """Return empty result structure"""
-        return {
-            'rapid_moves': [],
-            'feed_moves': [],
-            'tool_changes': [],
-            'bounds': {'x_min': 0, 'x_max': 0, 'z_min': 0, 'z_max': 0},
-            'line_coordinates': {},
-            'gcode_lines': [],
-            'flip_line': None,
-            'side1_deepest_z': None
-        }
+        if not self.cells:
+            return None
+
+        c0, r0 = np.floor((np.array([z, x]) - max_dist - self.origin) / self.cell_size).astype(int)
+        c1, r1 = np.floor((np.array([z, x]) + max_dist - self.origin) / self.cell_size).astype(int)
+        candidates = set()
+        for col in range(c0, c1 + 1):
+            for row in range(r0, r1 + 1):
+                candidates.update(self.cells.get((col, row), ()))
+        if not candidates:
+            return None
+
+        idx = np.fromiter(sorted(candidates), dtype=int)
+        seg = self.segments[idx]
+        start = seg[:, 0]
+        delta = seg[:, 1] - start
+        point = np.array([z, x])
+
+        # Point-to-segment distance for every candidate at once
+        length_sq = (delta ** 2).sum(axis=1)
+        t = np.where(length_sq > 0,
+                     ((point - start) * delta).sum(axis=1) / np.where(length_sq > 0, length_sq, 1),
+                     0.0)
+        t = np.clip(t, 0.0, 1.0)
+        dist = np.hypot(*(start + delta * t[:, None] - point).T)
+
+        best = int(dist.argmin())
+        if dist[best] > max_dist:
+            return None
+        return int(self.line_numbers[idx[best]])
 
 
 class ToolpathPlotter:
     """Modal window showing 2D toolpath visualization"""
 
+    # Click tolerance for picking a segment, in screen pixels
+    PICK_RADIUS_PX = 5
+
     def __init__(self, parent, file_path: str, program_number: str,
                  bg_color: str = '#1e1e1e', fg_color: str = '#d4d4d4'):
         """
@@ -236,7 +136,7 @@ class ToolpathPlotter:
         self.toolpath_data = parser.parse()
 
         # Check if we have any toolpath data
-        if not self.toolpath_data['rapid_moves'] and not self.toolpath_data['feed_moves']:
+        if not len(self.toolpath_data['segments']):
             messagebox.showwarning(
                 "No Toolpath Data",
                 f"No toolpath movements found in {program_number}\n\n"
@@ -251,9 +151,13 @@ class ToolpathPlotter:
         self.current_filter = 'whole'  # 'whole', 'side1', 'side2'
         self.flip_visualization = False  # Whether to flip Side 2 coordinates
         self.displayed_line_to_original = {}  # Map displayed line numbers to original line numbers
-        self.segment_to_line = {}  # Map plot segment index to G-code line number
+        self.original_to_displayed = {}  # Reverse of displayed_line_to_original
+        self.segment_index = None  # SegmentSpatialIndex for the visible segments
         self.current_playback_line = 1  # Current line for animation/playback
 
+        # Move arrays (built once, filtered/flipped on each replot)
+        self._build_move_arrays()
+
         # Create window
         self.window = tk.Toplevel(parent)
         self.window.title(f"Toolpath Visualization: {program_number}")
@@ -327,13 +231,13 @@ class ToolpathPlotter:
         info_frame.pack(side=tk.RIGHT, padx=10)
 
         bounds = self.toolpath_data['bounds']
-        rapid_count = len(self.toolpath_data['rapid_moves'])
-        feed_count = len(self.toolpath_data['feed_moves'])
+        move_count = self.toolpath_data['move_count']
+        arc_count = self.toolpath_data['arc_count']
         tool_count = len(self.toolpath_data['tool_changes'])
 
         stats_text = (f"X: {bounds['x_min']:.3f} to {bounds['x_max']:.3f} | "
                      f"Z: {bounds['z_min']:.3f} to {bounds['z_max']:.3f} | "
-                     f"Moves: {rapid_count + feed_count} | Tools: {tool_count}")
+                     f"Moves: {move_count} (Arcs: {arc_count}) | Tools: {tool_count}")
 
         tk.Label(info_frame, text=stats_text,
                 bg='#2d2d30', fg='#d4d4d4',
@@ -358,7 +262,6 @@ class ToolpathPlotter:
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
         # Connect click events for plot-to-gcode highlighting
-        self.canvas.mpl_connect('pick_event', self._on_plot_click)
         self.canvas.mpl_connect('button_press_event', self._on_plot_button_press)
 
         # Connect zoom and pan events
@@ -418,11 +321,8 @@ class ToolpathPlotter:
         self.gcode_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.config(command=self.gcode_text.yview)
 
-        # Insert G-code lines
-        for line in self.toolpath_data['gcode_lines']:
-            self.gcode_text.insert(tk.END, line)
-
-        self.gcode_text.config(state=tk.DISABLED)  # Read-only
+        # Insert G-code lines (and build the displayed/original line mapping)
+        self._update_gcode_display()
 
         # Bind click event
         self.gcode_text.bind('<Button-1>', self._on_gcode_click)
@@ -481,47 +381,73 @@ class ToolpathPlotter:
                  bg='#6c757d', fg='white',
                  font=('Segoe UI', 10), padx=15, pady=5).pack(side=tk.RIGHT, padx=10)
 
+    def _build_move_arrays(self):
+        """Convert parsed moves into numpy segment arrays in plot coordinates (z, x)"""
+        data = self.toolpath_data
+        flip_line = data['flip_line']
+
+        def to_segments(moves):
+            if not len(moves):
+                return np.empty((0, 2, 2))
+            arr = np.asarray(moves, dtype=float)  # rows of (x1, z1, x2, z2)
+            return arr[:, [1, 0, 3, 2]].reshape(-1, 2, 2)
+
+        def side2_mask(line_numbers):
+            if not flip_line:
+                return np.zeros(len(line_numbers), dtype=bool)
+            return line_numbers >= flip_line
+
+        self._rapid_segments = to_segments(data['rapid_moves'])
+        self._rapid_line_nums = np.asarray(data['rapid_lines'], dtype=int)
+        self._rapid_side2 = side2_mask(self._rapid_line_nums)
+
+        self._feed_segments = to_segments(data['feed_moves'])
+        self._feed_line_nums = np.asarray(data['feed_lines'], dtype=int)
+        self._feed_side2 = side2_mask(self._feed_line_nums)
+
+        tools = data['tool_changes']
+        self._tool_points = (np.asarray([(z, x) for x, z, _ in tools], dtype=float)
+                             if tools else np.empty((0, 2)))
+        self._tool_names = [tool for _, _, tool in tools]
+        self._tool_line_nums = np.asarray(data['tool_change_lines'], dtype=int)
+        self._tool_side2 = side2_mask(self._tool_line_nums)
+
     def _create_plot(self):
-        """Create matplotlib figure with toolpath"""
+        """Create matplotlib figure and the (few) artists that draw the toolpath"""
         # Create figure with dark theme
         self.fig, self.ax = plt.subplots(figsize=(14, 9), facecolor=self.bg_color)
         self.ax.set_facecolor('#252526')
 
-        # Plot rapid moves (dashed green)
-        rapid_plotted = False
-        for x1, z1, x2, z2 in self.toolpath_data['rapid_moves']:
-            label = 'Rapid (G00)' if not rapid_plotted else ''
-            self.ax.plot([z1, z2], [x1, x2],
-                        color='#4EC9B0', linestyle='--', linewidth=1.5,
-                        alpha=0.7, label=label)
-            rapid_plotted = True
-
-        # Plot feed moves (solid blue)
-        feed_plotted = False
-        for x1, z1, x2, z2 in self.toolpath_data['feed_moves']:
-            label = 'Feed (G01)' if not feed_plotted else ''
-            self.ax.plot([z1, z2], [x1, x2],
-                        color='#569CD6', linestyle='-', linewidth=2.0,
-                        label=label)
-            feed_plotted = True
-
-        # Plot tool change positions (orange markers)
-        tool_plotted = set()
-        for x, z, tool in self.toolpath_data['tool_changes']:
-            label = f'T{tool}' if tool not in tool_plotted else ''
-            self.ax.plot(z, x, 'o', color='#CE9178', markersize=8,
-                        label=label, zorder=5)
-            # Annotate tool number
-            self.ax.annotate(f'T{tool}', (z, x),
-                           xytext=(5, 5), textcoords='offset points',
-                           color='#CE9178', fontsize=9, fontweight='bold')
-            tool_plotted.add(tool)
+        # One collection per move type/side; data is swapped in on every replot
+        self.rapid_collection = LineCollection([], colors='#FF8C00', linewidths=1.0,
+                                               alpha=0.5, label='Rapid (G00)', zorder=2)
+        self.feed_collection = LineCollection([], colors='#569CD6', linewidths=2.0,
+                                              label='Feed (G01)', zorder=2)
+        # Side 2 with flip: neon green
+        self.feed_side2_collection = LineCollection([], colors='#7FFF00', linewidths=2.0,
+                                                    label='Feed Side 2 (G01)', zorder=2)
+        for collection in (self.rapid_collection, self.feed_collection,
+                           self.feed_side2_collection):
+            self.ax.add_collection(collection)
+
+        # Move end points (small black dots) and tool change positions (orange markers)
+        self.endpoint_scatter = self.ax.scatter([], [], s=1.0, color='black', zorder=3)
+        self.tool_scatter = self.ax.scatter([], [], s=64, color='#CE9178',
+                                            label='Tool Change', zorder=5)
+        self.tool_annotations = []
+
+        # Highlight marker (red dot) reused for every selection
+        self.highlight_marker, = self.ax.plot([], [], 'o',
+                                              color='#ff0000',
+                                              markersize=12,
+                                              markeredgewidth=2,
+                                              markeredgecolor='#ffffff',
+                                              zorder=10)
+        self.highlight_marker.set_visible(False)
 
         # Configure axes
         self.ax.set_xlabel('Z - Length (inches)', color=self.fg_color, fontsize=12)
         self.ax.set_ylabel('X - Radius (inches)', color=self.fg_color, fontsize=12)
-        self.ax.set_title(f'Toolpath: {self.program_number}',
-                         color=self.fg_color, fontsize=14, fontweight='bold', pad=20)
 
         # Grid
         self.ax.grid(True, color='#3e3e42', linestyle=':', alpha=0.5, linewidth=0.8)
@@ -533,56 +459,15 @@ class ToolpathPlotter:
         for spine in self.ax.spines.values():
             spine.set_edgecolor('#3e3e42')
 
-        # Legend
-        if self.ax.get_legend_handles_labels()[0]:  # Only if we have labels
-            legend = self.ax.legend(loc='upper right',
-                                  facecolor='#2d2d30',
-                                  edgecolor='#3e3e42',
-                                  labelcolor=self.fg_color,
-                                  fontsize=10)
-            legend.get_frame().set_alpha(0.9)
-
         # Equal aspect ratio for accurate visualization
         self.ax.set_aspect('equal', adjustable='datalim')
 
-        # Add some padding to bounds
-        bounds = self.toolpath_data['bounds']
-        x_range = bounds['x_max'] - bounds['x_min']
-        z_range = bounds['z_max'] - bounds['z_min']
-
-        padding = 0.1  # 10% padding
-        self.ax.set_xlim(bounds['z_min'] - z_range * padding,
-                        bounds['z_max'] + z_range * padding)
-        self.ax.set_ylim(bounds['x_min'] - x_range * padding,
-                        bounds['x_max'] + x_range * padding)
-
+        self._update_artists()
         plt.tight_layout()
 
-    def _on_plot_click(self, event):
-        """Handle click on plot to highlight corresponding G-code line"""
-        if not hasattr(event, 'artist'):
-            return
-
-        # Get the clicked line artist
-        artist = event.artist
-
-        # Get the line number stored in gid
-        line_gid = artist.get_gid()
-        if not line_gid:
-            return
-
-        try:
-            original_line_num = int(line_gid)
-        except (ValueError, TypeError):
-            return
-
-        # Find the displayed line number from original line number
-        displayed_line_num = None
-        for disp_line, orig_line in self.displayed_line_to_original.items():
-            if orig_line == original_line_num:
-                displayed_line_num = disp_line
-                break
-
+    def _select_line(self, original_line_num: int):
+        """Highlight a G-code line in the viewer and its position on the plot"""
+        displayed_line_num = self.original_to_displayed.get(original_line_num)
         if not displayed_line_num:
             return
 
@@ -644,11 +529,12 @@ class ToolpathPlotter:
 
             self._highlight_position(x, z, original_line_num)
         else:
-            # No coordinate for this line, just remove any existing highlight marker
-            if self.highlight_marker:
-                self.highlight_marker.remove()
-                self.highlight_marker = None
-                self.canvas.draw()
+            # No coordinate for this line, just hide any existing highlight marker
+            if self.highlight_marker.get_visible():
+                self.highlight_marker.set_visible(False)
+                self.highlight_marker.set_label('')
+                self._update_legend()
+                self.canvas.draw_idle()
 
     def _highlight_position(self, x: float, z: float, line_num: int):
         """
@@ -659,29 +545,16 @@ class ToolpathPlotter:
             z: Z coordinate
             line_num: Line number for label
         """
-        # Remove previous highlight marker
-        if self.highlight_marker:
-            self.highlight_marker.remove()
-
-        # Add new highlight marker (red dot)
-        self.highlight_marker = self.ax.plot(z, x, 'o',
-                                            color='#ff0000',
-                                            markersize=12,
-                                            markeredgewidth=2,
-                                            markeredgecolor='#ffffff',
-                                            zorder=10,
-                                            label=f'Line {line_num}')[0]
+        # Move the existing marker instead of creating a new artist
+        self.highlight_marker.set_data([z], [x])
+        self.highlight_marker.set_label(f'Line {line_num}')
+        self.highlight_marker.set_visible(True)
 
         # Update legend to include the highlighted line
-        if self.ax.get_legend():
-            self.ax.legend(loc='upper right',
-                          facecolor='#2d2d30',
-                          edgecolor='#3e3e42',
-                          labelcolor=self.fg_color,
-                          fontsize=10).get_frame().set_alpha(0.9)
+        self._update_legend()
 
         # Redraw canvas
-        self.canvas.draw()
+        self.canvas.draw_idle()
 
     def _apply_filter(self, filter_type: str):
         """
@@ -734,115 +607,70 @@ class ToolpathPlotter:
         self.gcode_text.delete('1.0', tk.END)
 
         flip_line = self.toolpath_data['flip_line']
-        self.displayed_line_to_original = {}  # Reset mapping
-        displayed_line_num = 1
-
-        if self.current_filter == 'whole':
-            # Show all lines
-            for original_line_num, line in enumerate(self.toolpath_data['gcode_lines'], 1):
-                self.gcode_text.insert(tk.END, line)
-                self.displayed_line_to_original[displayed_line_num] = original_line_num
-                displayed_line_num += 1
-        elif self.current_filter == 'side1':
+        gcode_lines = self.toolpath_data['gcode_lines']
+
+        # Range of original line numbers shown for the current filter
+        first_line, last_line = 1, len(gcode_lines)
+        if self.current_filter == 'side1' and flip_line:
             # Show only lines before flip
-            for original_line_num, line in enumerate(self.toolpath_data['gcode_lines'], 1):
-                if flip_line and original_line_num >= flip_line:
-                    break
-                self.gcode_text.insert(tk.END, line)
-                self.displayed_line_to_original[displayed_line_num] = original_line_num
-                displayed_line_num += 1
+            last_line = flip_line - 1
         elif self.current_filter == 'side2':
             # Show only lines after flip
-            for original_line_num, line in enumerate(self.toolpath_data['gcode_lines'], 1):
-                if flip_line and original_line_num >= flip_line:
-                    self.gcode_text.insert(tk.END, line)
-                    self.displayed_line_to_original[displayed_line_num] = original_line_num
-                    displayed_line_num += 1
+            first_line = flip_line if flip_line else last_line + 1
+
+        shown = gcode_lines[first_line - 1:last_line]
+        self.displayed_line_to_original = {disp: disp + first_line - 1
+                                           for disp in range(1, len(shown) + 1)}
+        self.original_to_displayed = {orig: disp for disp, orig
+                                      in self.displayed_line_to_original.items()}
+
+        # One insert for the whole block instead of one per line
+        self.gcode_text.insert(tk.END, ''.join(shown))
 
         self.gcode_text.config(state=tk.DISABLED)
 
     def _replot(self):
         """Redraw the plot with current filter settings"""
-        # Clear previous plot
-        self.ax.clear()
-        self.segment_to_line = {}  # Reset segment mapping
-
-        # Get filtered data
-        filtered_data = self._get_filtered_toolpath()
-
-        # Plot rapid moves (bright orange, thinner, more transparent)
-        rapid_plotted = False
-        for i, (x1, z1, x2, z2) in enumerate(filtered_data['rapid_moves']):
-            label = 'Rapid (G00)' if not rapid_plotted else ''
-            line, = self.ax.plot([z1, z2], [x1, x2],
-                        color='#FF8C00', linestyle='-', linewidth=1.0,
-                        alpha=0.5, label=label, picker=5, pickradius=5)
-
-            # Store line number in the line's gid for click detection
-            line_num = None
-            if i < len(filtered_data['rapid_lines']):
-                line_num, _ = filtered_data['rapid_lines'][i]
-                line.set_gid(str(line_num))  # Store line number as gid
-
-            # Add clickable endpoint dots (half the thickness of feed lines: 2.0/2 = 1.0)
-            if line_num:
-                # Add dot at end point only (where the move ends)
-                dot, = self.ax.plot(z2, x2, 'o', color='black', markersize=1.0,
-                           picker=True, pickradius=2, zorder=3)
-                dot.set_gid(str(line_num))  # Same line number for clicking
-
-            rapid_plotted = True
-
-        # Plot feed moves (blue for Side 1, neon green for Side 2 when flipped)
-        feed_side1_plotted = False
-        feed_side2_plotted = False
-        for i, (x1, z1, x2, z2) in enumerate(filtered_data['feed_moves']):
-            # Get line number and side info from tracked data
-            is_side2 = False
-            line_num_for_segment = None
-            if i < len(filtered_data['feed_lines']):
-                line_num_for_segment, is_side2 = filtered_data['feed_lines'][i]
-
-            # Determine color based on side and flip visualization
-            if is_side2 and self.flip_visualization:
-                # Side 2 with flip: neon green
-                label = 'Feed Side 2 (G01)' if not feed_side2_plotted else ''
-                color = '#7FFF00'  # Chartreuse (neon green)
-                feed_side2_plotted = True
-            else:
-                # Side 1 or normal: blue
-                label = 'Feed (G01)' if not feed_side1_plotted else ''
-                color = '#569CD6'
-                feed_side1_plotted = True
-
-            line, = self.ax.plot([z1, z2], [x1, x2],
-                        color=color, linestyle='-', linewidth=2.0,
-                        label=label, picker=5, pickradius=5)
-
-            # Store line number in the line's gid for click detection
-            if line_num_for_segment:
-                line.set_gid(str(line_num_for_segment))
-
-                # Add clickable endpoint dot (half the thickness of feed lines: 2.0/2 = 1.0)
-                # Add dot at end point only (where the move ends)
-                dot, = self.ax.plot(z2, x2, 'o', color='black', markersize=1.0,
-                           picker=True, pickradius=2, zorder=3)
-                dot.set_gid(str(line_num_for_segment))  # Same line number for clicking
-
-        # Plot tool changes
-        tool_plotted = set()
-        for x, z, tool in filtered_data['tool_changes']:
-            label = f'T{tool}' if tool not in tool_plotted else ''
-            self.ax.plot(z, x, 'o', color='#CE9178', markersize=8,
-                        label=label, zorder=5)
+        self._update_artists()
+
+        # Clear highlight marker
+        self.highlight_marker.set_visible(False)
+        self.highlight_marker.set_label('')
+        self._update_legend()
+
+        self.canvas.draw_idle()
+
+    def _update_artists(self):
+        """Push the filtered toolpath into the existing artists (no re-creation)"""
+        filtered = self._get_filtered_toolpath()
+
+        self.rapid_collection.set_segments(filtered['rapid_segments'])
+        self.feed_collection.set_segments(filtered['feed_segments'])
+        self.feed_side2_collection.set_segments(filtered['feed_side2_segments'])
+
+        # Clickable end point dots for every move (where the move ends)
+        all_segments = np.concatenate([filtered['rapid_segments'],
+                                       filtered['feed_segments'],
+                                       filtered['feed_side2_segments']])
+        self.endpoint_scatter.set_offsets(all_segments[:, 1] if len(all_segments)
+                                          else np.empty((0, 2)))
+
+        # Tool changes (annotations are few, so these are simply recreated)
+        self.tool_scatter.set_offsets(filtered['tool_points'])
+        for annotation in self.tool_annotations:
+            annotation.remove()
+        self.tool_annotations = [
             self.ax.annotate(f'T{tool}', (z, x),
-                           xytext=(5, 5), textcoords='offset points',
-                           color='#CE9178', fontsize=9, fontweight='bold')
-            tool_plotted.add(tool)
+                             xytext=(5, 5), textcoords='offset points',
+                             color='#CE9178', fontsize=9, fontweight='bold')
+            for (z, x), tool in zip(filtered['tool_points'].tolist(), filtered['tool_names'])
+        ]
 
-        # Reconfigure axes
-        self.ax.set_xlabel('Z - Length (inches)', color=self.fg_color, fontsize=12)
-        self.ax.set_ylabel('X - Radius (inches)', color=self.fg_color, fontsize=12)
+        # Spatial index for click picking
+        all_lines = np.concatenate([filtered['rapid_lines'],
+                                    filtered['feed_lines'],
+                                    filtered['feed_side2_lines']])
+        self.segment_index = SegmentSpatialIndex(all_segments, all_lines)
 
         title = f'Toolpath: {self.program_number}'
         if self.current_filter == 'side1':
@@ -856,25 +684,12 @@ class ToolpathPlotter:
             title += ' (Side 1 Normal + Side 2 Flipped)'
 
         self.ax.set_title(title, color=self.fg_color, fontsize=14, fontweight='bold', pad=20)
-        self.ax.grid(True, color='#3e3e42', linestyle=':', alpha=0.5, linewidth=0.8)
-        self.ax.tick_params(colors=self.fg_color, labelsize=10)
 
-        for spine in self.ax.spines.values():
-            spine.set_edgecolor('#3e3e42')
-
-        if self.ax.get_legend_handles_labels()[0]:
-            legend = self.ax.legend(loc='upper right',
-                                  facecolor='#2d2d30',
-                                  edgecolor='#3e3e42',
-                                  labelcolor=self.fg_color,
-                                  fontsize=10)
-            legend.get_frame().set_alpha(0.9)
-
-        self.ax.set_aspect('equal', adjustable='datalim')
+        self._update_legend()
 
         # Auto-scale to bounds
-        if filtered_data['rapid_moves'] or filtered_data['feed_moves']:
-            bounds = filtered_data['bounds']
+        if len(all_segments):
+            bounds = filtered['bounds']
             x_range = bounds['x_max'] - bounds['x_min']
             z_range = bounds['z_max'] - bounds['z_min']
             padding = 0.1
@@ -883,133 +698,112 @@ class ToolpathPlotter:
             self.ax.set_ylim(bounds['x_min'] - x_range * padding,
                             bounds['x_max'] + x_range * padding)
 
-        # Clear highlight marker
-        self.highlight_marker = None
-
-        plt.tight_layout()
-        self.canvas.draw()
+    def _update_legend(self):
+        """Rebuild the legend from the artists that currently have data"""
+        handles = [artist for artist in (self.rapid_collection,
+                                         self.feed_collection,
+                                         self.feed_side2_collection)
+                   if len(artist.get_segments())]
+        if len(self.tool_scatter.get_offsets()):
+            handles.append(self.tool_scatter)
+        if self.highlight_marker.get_visible():
+            handles.append(self.highlight_marker)
+
+        legend = self.ax.get_legend()
+        if legend:
+            legend.remove()
+        if handles:
+            legend = self.ax.legend(handles=handles,
+                                    loc='upper right',
+                                    facecolor='#2d2d30',
+                                    edgecolor='#3e3e42',
+                                    labelcolor=self.fg_color,
+                                    fontsize=10)
+            legend.get_frame().set_alpha(0.9)
 
     def _get_filtered_toolpath(self) -> Dict:
-        """Get filtered toolpath data based on current filter settings"""
-        flip_line = self.toolpath_data['flip_line']
-        line_coords = self.toolpath_data['line_coordinates']
-
-        # Build filtered moves with line number tracking
-        filtered_rapid = []
-        filtered_rapid_lines = []  # Line numbers for each rapid move
-        filtered_feed = []
-        filtered_feed_lines = []  # Line numbers for each feed move
-        filtered_tools = []
-
-        # Process each line's coordinates
-        for line_num, (x, z) in line_coords.items():
-            # Determine which side this line belongs to
-            is_side2 = flip_line and line_num >= flip_line
-
-            # Apply filter rules
-            if self.current_filter == 'side1' and is_side2:
-                continue
-            if self.current_filter == 'side2' and not is_side2:
-                continue
-
-            # Find moves that end at this coordinate
-            for move in self.toolpath_data['rapid_moves']:
-                if abs(move[2] - x) < 0.001 and abs(move[3] - z) < 0.001:
-                    # Apply flip transformation for Side 2 if flip visualization is enabled
-                    if self.flip_visualization and is_side2:
-                        z_ref = self.toolpath_data['side1_deepest_z'] or 0
-                        move = self._flip_move(move, z_ref)
-                    if move not in filtered_rapid:
-                        filtered_rapid.append(move)
-                        filtered_rapid_lines.append((line_num, is_side2))
-
-            for move in self.toolpath_data['feed_moves']:
-                if abs(move[2] - x) < 0.001 and abs(move[3] - z) < 0.001:
-                    # Apply flip transformation for Side 2 if flip visualization is enabled
-                    if self.flip_visualization and is_side2:
-                        z_ref = self.toolpath_data['side1_deepest_z'] or 0
-                        move = self._flip_move(move, z_ref)
-                    if move not in filtered_feed:
-                        filtered_feed.append(move)
-                        filtered_feed_lines.append((line_num, is_side2))
-
-        # Process tool changes
-        for x, z, tool in self.toolpath_data['tool_changes']:
-            for line_num, (coord_x, coord_z) in line_coords.items():
-                if abs(coord_x - x) < 0.001 and abs(coord_z - z) < 0.001:
-                    is_side2 = flip_line and line_num >= flip_line
-
-                    # Apply filter rules
-                    if self.current_filter == 'side1' and is_side2:
-                        continue
-                    if self.current_filter == 'side2' and not is_side2:
-                        continue
-
-                    # Apply flip transformation for Side 2 if flip visualization is enabled
-                    if self.flip_visualization and is_side2:
-                        z_ref = self.toolpath_data['side1_deepest_z'] or 0
-                        x_flip, z_flip = self._flip_coordinate(x, z, z_ref)
-                        filtered_tools.append((x_flip, z_flip, tool))
-                    else:
-                        filtered_tools.append((x, z, tool))
-                    break
+        """Get filtered (and optionally flipped) segment arrays for the current view"""
+        z_ref = self.toolpath_data['side1_deepest_z'] or 0
+
+        def visible(side2_mask):
+            if self.current_filter == 'side1':
+                return ~side2_mask
+            if self.current_filter == 'side2':
+                return side2_mask
+            return np.ones(len(side2_mask), dtype=bool)
+
+        def flipped(segments, side2_mask):
+            # Apply flip transformation for Side 2 if flip visualization is enabled
+            if not self.flip_visualization or not side2_mask.any():
+                return segments
+            segments = segments.copy()
+            segments[side2_mask, :, 0] = -(segments[side2_mask, :, 0] - z_ref)
+            return segments
+
+        keep = visible(self._rapid_side2)
+        rapid_segments = flipped(self._rapid_segments, self._rapid_side2)[keep]
+        rapid_lines = self._rapid_line_nums[keep]
+
+        feed_keep = visible(self._feed_side2)
+        feed_segments = flipped(self._feed_segments, self._feed_side2)
+        # Side 2 gets its own colour only while flip visualization is on
+        side2_colour = self._feed_side2 if self.flip_visualization else np.zeros_like(self._feed_side2)
+        feed_mask = feed_keep & ~side2_colour
+        side2_mask = feed_keep & side2_colour
+
+        tool_keep = visible(self._tool_side2)
+        tool_points = self._tool_points.copy()
+        if self.flip_visualization and self._tool_side2.any():
+            tool_points[self._tool_side2, 0] = -(tool_points[self._tool_side2, 0] - z_ref)
+        tool_names = [name for name, shown in zip(self._tool_names, tool_keep.tolist()) if shown]
 
         # Calculate new bounds
-        all_x = []
-        all_z = []
-        for x1, z1, x2, z2 in filtered_rapid + filtered_feed:
-            all_x.extend([x1, x2])
-            all_z.extend([z1, z2])
-
-        if all_x:
-            bounds = {
-                'x_min': min(all_x),
-                'x_max': max(all_x),
-                'z_min': min(all_z),
-                'z_max': max(all_z)
-            }
+        all_points = np.concatenate([rapid_segments.reshape(-1, 2),
+                                     feed_segments[feed_keep].reshape(-1, 2)])
+        if len(all_points):
+            (z_min, x_min), (z_max, x_max) = all_points.min(axis=0), all_points.max(axis=0)
+            bounds = {'x_min': float(x_min), 'x_max': float(x_max),
+                      'z_min': float(z_min), 'z_max': float(z_max)}
         else:
             bounds = {'x_min': 0, 'x_max': 0, 'z_min': 0, 'z_max': 0}
 
         return {
-            'rapid_moves': filtered_rapid,
-            'rapid_lines': filtered_rapid_lines,
-            'feed_moves': filtered_feed,
-            'feed_lines': filtered_feed_lines,
-            'tool_changes': filtered_tools,
+            'rapid_segments': rapid_segments,
+            'rapid_lines': rapid_lines,
+            'feed_segments': feed_segments[feed_mask],
+            'feed_lines': self._feed_line_nums[feed_mask],
+            'feed_side2_segments': feed_segments[side2_mask],
+            'feed_side2_lines': self._feed_line_nums[side2_mask],
+            'tool_points': tool_points[tool_keep] if len(tool_points) else tool_points,
+            'tool_names': tool_names,
             'bounds': bounds
         }
 
-    def _flip_move(self, move: Tuple[float, float, float, float], z_ref: float) -> Tuple[float, float, float, float]:
-        """
-        Flip a move's Z coordinates for Side 2 visualization.
-
-        Args:
-            move: (x1, z1, x2, z2) tuple
-            z_ref: Reference Z (deepest Z from Side 1)
-
-        Returns:
-            Flipped move tuple
-        """
-        x1, z1, x2, z2 = move
-        # Z0 is at z_ref, negative Z goes toward positive
-        z1_flip = -(z1 - z_ref)
-        z2_flip = -(z2 - z_ref)
-        return (x1, z1_flip, x2, z2_flip)
-
     def _flip_coordinate(self, x: float, z: float, z_ref: float) -> Tuple[float, float]:
         """Flip a single coordinate"""
         z_flip = -(z - z_ref)
         return (x, z_flip)
 
     def _on_plot_button_press(self, event):
-        """Handle button press on plot for debugging"""
-        if event.inaxes != self.ax:
+        """Handle left click on plot: select the G-code line of the nearest segment"""
+        if event.inaxes != self.ax or event.button != 1:
+            return
+        if self.toolbar.mode:  # Zoom/pan tool active - not a selection click
             return
+        if self.segment_index is None:
+            return
+
+        # Convert the pixel pick radius into data units at the current zoom
+        inverse = self.ax.transData.inverted()
+        (z0, x0), (z1, x1) = inverse.transform([(event.x, event.y),
+                                                (event.x + self.PICK_RADIUS_PX,
+                                                 event.y + self.PICK_RADIUS_PX)])
+        max_dist = max(abs(z1 - z0), abs(x1 - x0))
 
-        # Print debug info to help troubleshoot clicking
-        logger.debug(f"Plot clicked at Z={event.xdata:.3f}, X={event.ydata:.3f}")
-        logger.debug(f"segment_to_line has {len(self.segment_to_line)} entries")
+        line_num = self.segment_index.nearest_line(event.xdata, event.ydata, max_dist)
+        logger.debug(f"Plot clicked at Z={event.xdata:.3f}, X={event.ydata:.3f} -> line {line_num}")
+        if line_num:
+            self._select_line(line_num)
 
     def _on_scroll_zoom(self, event):
         """Handle scroll wheel zoom"""
@@ -1039,7 +833,7 @@ class ToolpathPlotter:
         self.ax.set_xlim([xdata - new_width * (1 - relx), xdata + new_width * relx])
         self.ax.set_ylim([ydata - new_height * (1 - rely), ydata + new_height * rely])
 
-        self.canvas.draw()
+        self.canvas.draw_idle()
 
     def _on_mouse_press(self, event):
         """Handle mouse button press for panning"""
@@ -1068,7 +862,7 @@ class ToolpathPlotter:
             self.ax.set_xlim([cur_xlim[0] + dx, cur_xlim[1] + dx])
             self.ax.set_ylim([cur_ylim[0] + dy, cur_ylim[1] + dy])
 
-            self.canvas.draw()
+            self.canvas.draw_idle()
 
     def goto_first_line(self):
         """Jump to first line with coordinates"""
@@ -1131,12 +925,7 @@ class ToolpathPlotter:
     def _highlight_playback_line(self):
         """Highlight current playback line in G-code viewer and plot"""
         # Find displayed line number from original line number
-        displayed_line_num = None
-        for disp_line, orig_line in self.displayed_line_to_original.items():
-            if orig_line == self.current_playback_line:
-                displayed_line_num = disp_line
-                break
-
+        displayed_line_num = self.original_to_displayed.get(self.current_playback_line)
         if not displayed_line_num:
             return
 
@@ -12,11 +12,13 @@ This parser provides high-accuracy detection of:
 - P-codes and validation
 """
 
+import io
 import math
 import os
 import re
+import time
 from typing import Optional, Dict, List, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from validators.standards_validator import StandardsValidator, ValidationResult
 from validators.crash_prevention_validator import CrashPreventionValidator
 from validators.od_turndown_validator import ODTurnDownValidator
@@ -28,6 +30,8 @@ from validators.g154_presence_validator import G154PresenceValidator
 from validators.steel_ring_recess_validator import SteelRingRecessValidator
 from validators.twopc_ring_size_validator import TwoPCRingSizeValidator
 from validators.bore_pass_steps_validator import BorePassStepsValidator
+from utils.program_issues import ISSUE_FIELDS, ProgramIssue, build_issues
+from utils.file_content import FileContent
 
 
 # ── Known CB equivalence pairs ────────────────────────────────────────────────
@@ -146,6 +150,12 @@ class GCodeParseResult:
     crash_issues: List[str]               # Critical crash risks (G00 to negative Z, etc.)
     crash_warnings: List[str]             # Crash warnings (jaw clearance, etc.)
 
+    # Validator that reported each issue message (filled in by parse_lines)
+    issue_sources: Dict[str, str] = field(default_factory=dict)
+
+    # SHA256 of the file bytes that were parsed (parse_file only)
+    content_hash: Optional[str] = None
+
     # 2PC Part Field Usage (reuses existing fields):
     # - hub_height: 2PC hub height (0.25" typical for STUD, 0.50" for special)
     # - hub_diameter: OB diameter of the 2PC hub (mm)
@@ -160,6 +170,68 @@ class GCodeParseResult:
     # safety_blocks_status: str             # 'PASS', 'WARNING', 'MISSING'
     # safety_blocks_issues: List[str]       # List of missing safety blocks
 
+    def get_issues(self) -> List[ProgramIssue]:
+        """Structured issues (code, severity, line, source) for the program_issues table"""
+        return build_issues({name: getattr(self, name) for name, _severity in ISSUE_FIELDS},
+                            self.issue_sources)
+
+
+class ParseProfile:
+    """
+    Wall time and call counts per parse stage and validator, aggregated over
+    every file parsed while profiling is enabled (see
+    ImprovedGCodeParser.enable_profiling).
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}  # name -> [calls, seconds]
+        self.files = 0
+        self.total_seconds = 0.0
+
+    def record(self, stage: str, seconds: float):
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def merge(self, other: 'ParseProfile'):
+        """Add another profile's totals (e.g. from a worker's parser)"""
+        for stage, (calls, seconds) in other.stages.items():
+            entry = self.stages.setdefault(stage, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+        self.files += other.files
+        self.total_seconds += other.total_seconds
+
+    def rows(self) -> List[Dict]:
+        """Stages sorted by total time, slowest first"""
+        rows = []
+        for stage, (calls, seconds) in self.stages.items():
+            rows.append({
+                'stage': stage,
+                'calls': int(calls),
+                'seconds': round(seconds, 6),
+                'ms_per_call': round(seconds / calls * 1000, 4) if calls else 0.0,
+                'percent': round(seconds / self.total_seconds * 100, 1) if self.total_seconds else 0.0,
+            })
+        rows.sort(key=lambda row: row['seconds'], reverse=True)
+        return rows
+
+    def to_dict(self) -> Dict:
+        return {'files': self.files, 'total_seconds': round(self.total_seconds, 6), 'stages': self.rows()}
+
+    def report(self) -> str:
+        """Text table for logs and the rescan window"""
+        per_file = self.total_seconds / self.files * 1000 if self.files else 0.0
+        lines = [f"Parser profile: {self.files} files, {self.total_seconds:.2f}s ({per_file:.2f} ms/file)",
+                 f"{'Stage':<36} {'Calls':>8} {'Total (s)':>10} {'ms/call':>9} {'%':>6}"]
+        for row in self.rows():
+            lines.append(f"{row['stage']:<36} {row['calls']:>8} {row['seconds']:>10.3f} "
+                         f"{row['ms_per_call']:>9.3f} {row['percent']:>6.1f}")
+        return '\n'.join(lines)
+
 
 class ImprovedGCodeParser:
     """
@@ -222,6 +294,18 @@ class ImprovedGCodeParser:
     def __init__(self):
         self.debug = False
         self.od_validator = ODTurnDownValidator()
+        # Per-stage timing; None (the default) skips all timing
+        self.profile: Optional[ParseProfile] = None
+
+    def enable_profiling(self, profile: Optional[ParseProfile] = None) -> ParseProfile:
+        """Start recording per-stage timings (into `profile` if given)"""
+        self.profile = profile if profile is not None else ParseProfile()
+        return self.profile
+
+    def disable_profiling(self) -> Optional[ParseProfile]:
+        """Stop recording and return the collected profile"""
+        profile, self.profile = self.profile, None
+        return profile
 
     @staticmethod
     def _round_to_standard_od(od_value: float) -> float:
@@ -245,16 +329,70 @@ class ImprovedGCodeParser:
 
         return closest if closest else od_value
 
-    def parse_file(self, file_path: str) -> Optional[GCodeParseResult]:
+    def parse_file(self, file_path: str, content: Optional[FileContent] = None) -> Optional[GCodeParseResult]:
         """
         Main parsing function - combines all detection methods
+
+        Args:
+            file_path: Program file
+            content: The file already read (utils.file_content) - callers that
+                     also hash or check the file pass it to avoid another read
         """
+        if content is None:
+            start = time.perf_counter() if self.profile is not None else 0.0
+            try:
+                content = FileContent.read(file_path)
+            except Exception as e:
+                if self.debug:
+                    print(f"Error parsing {file_path}: {e}")
+                return None
+            if self.profile is not None:
+                self.profile.record('read_file', time.perf_counter() - start)
+
+        result = self.parse_lines(content.lines, file_path=file_path)
+        if result is not None:
+            result.content_hash = content.sha256
+        return result
+
+    def parse_text(self, text: str, file_path: str = '',
+                   filename: Optional[str] = None) -> Optional[GCodeParseResult]:
+        """
+        Parse in-memory G-code text (e.g. an unsaved editor buffer).
+
+        Args:
+            text: Full program text
+            file_path: Path the text belongs to (used for filename/program
+                       number fallback and timestamps); may be empty
+            filename: Override for the filename (defaults to basename of file_path)
+        """
+        # Same newline handling as reading the file in text mode
+        lines = io.StringIO(text, newline=None).readlines()
+        return self.parse_lines(lines, file_path=file_path, filename=filename)
+
+    def parse_lines(self, lines: List[str], file_path: str = '',
+                    filename: Optional[str] = None) -> Optional[GCodeParseResult]:
+        """
+        Parse a program that is already split into lines.
+
+        parse_file() and parse_text() both end up here, so every detection
+        and validation stage sees identical input regardless of the source.
+        """
+        if self.profile is None:
+            return self._parse_lines(lines, file_path, filename)
+
+        start = time.perf_counter()
         try:
-            filename = os.path.basename(file_path)
+            return self._parse_lines(lines, file_path, filename)
+        finally:
+            self.profile.files += 1
+            self.profile.total_seconds += time.perf_counter() - start
 
-            # Read file
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
+    def _parse_lines(self, lines: List[str], file_path: str,
+                     filename: Optional[str]) -> Optional[GCodeParseResult]:
+        try:
+            if filename is None:
+                filename = os.path.basename(file_path)
+            lines = list(lines)
 
             # Initialize result
             result = GCodeParseResult(
@@ -307,13 +445,13 @@ class ImprovedGCodeParser:
             )
 
             # 1. Extract program number
-            result.program_number = self._extract_program_number(filename, lines)
+            result.program_number = self._run_stage('program_number', self._extract_program_number, filename, lines)
 
             # 2. Extract title
-            result.title = self._extract_title(lines)
+            result.title = self._run_stage('title', self._extract_title, lines)
 
             # 3. Detect spacer type (combined keyword + pattern)
-            type_detection = self._detect_spacer_type_combined(result.title, lines)
+            type_detection = self._run_stage('spacer_type', self._detect_spacer_type_combined, result.title, lines)
             result.spacer_type = type_detection['final_type']
             result.detection_method = type_detection['method']
             result.detection_confidence = type_detection['confidence']
@@ -340,18 +478,18 @@ class ImprovedGCodeParser:
                         break
 
             # 4. Extract dimensions from title
-            self._extract_dimensions_from_title(result)
+            self._run_stage('title_dimensions', self._extract_dimensions_from_title, result)
 
             # 5. Extract dimensions from G-code
-            self._extract_dimensions_from_gcode(result, lines)
+            self._run_stage('gcode_dimensions', self._extract_dimensions_from_gcode, result, lines)
 
             # 5b. Auto-correct title dimensions using G-code (when title parsing failed or is inaccurate)
-            self._auto_correct_dimensions(result)
+            self._run_stage('auto_correct_dimensions', self._auto_correct_dimensions, result)
 
             # 5b. Advanced 2PC classification and dimension extraction using G-code analysis
             # Run for ALL 2PC types to extract hub/step dimensions
             if '2PC' in result.spacer_type and lines:
-                twopc_analysis = self._analyze_2pc_gcode(lines, result.thickness, result.hub_height)
+                twopc_analysis = self._run_stage('2pc_analysis', self._analyze_2pc_gcode, lines, result.thickness, result.hub_height)
 
                 # Update type if UNSURE
                 if result.spacer_type == '2PC UNSURE' and twopc_analysis['type']:
@@ -399,20 +537,20 @@ class ImprovedGCodeParser:
                     result.detection_notes.append(f'STUD inferred from thickness {result.thickness}" (<1.0")')
 
             # 6. Extract material
-            result.material = self._extract_material(result.title, lines)
+            result.material = self._run_stage('material', self._extract_material, result.title, lines)
 
             # 7. Assign lathe based on OD
             result.lathe = self._assign_lathe(result.outer_diameter)
 
             # 8. Extract P-codes
-            result.pcodes_found = self._extract_pcodes(lines)
+            result.pcodes_found = self._run_stage('pcodes', self._extract_pcodes, lines)
 
             # 8. Extract drill depth
-            result.drill_depth = self._extract_drill_depth(lines)
+            result.drill_depth = self._run_stage('drill_depth', self._extract_drill_depth, lines)
 
             # 8a. Detect hub-centric from G-code if not detected from title
             # If title has CB/OB (CB < OB) but no "HC" keyword, check if hub is machined in OP2
-            self._detect_hub_from_gcode(result, lines)
+            self._run_stage('hub_detection', self._detect_hub_from_gcode, result, lines)
 
             # 8b. Calculate hub height from drill depth if needed
             # For ANY part type where drill depth suggests a hub exists
@@ -446,7 +584,7 @@ class ImprovedGCodeParser:
             if result.spacer_type == 'hub_centric' or '2PC' in result.spacer_type:
                 try:
                     od_estimate = result.outer_diameter if result.outer_diameter else None
-                    hub_roughing = self._detect_hub_from_roughing_pattern(lines, od_estimate)
+                    hub_roughing = self._run_stage('hub_roughing', self._detect_hub_from_roughing_pattern, lines, od_estimate)
 
                     if hub_roughing['detected']:
                         # Use roughing-detected hub diameter if OB not extracted
@@ -474,16 +612,16 @@ class ImprovedGCodeParser:
                     pass
 
             # 9. Extract tool usage (for reference only)
-            self._extract_tools(result, lines)
+            self._run_stage('tools', self._extract_tools, result, lines)
 
             # 10. Validate G53 tool home positions (L1-L3 lathes)
-            self._validate_tool_home_positions(result, lines)
+            self._run_validator('tool_home', self._validate_tool_home_positions, result, lines)
 
             # 10a. Validate program feasibility against standards
-            self._validate_feasibility(result)
+            self._run_validator('feasibility', self._validate_feasibility, result)
 
             # 10b. Validate crash prevention patterns (CRITICAL safety checks)
-            self._validate_crash_prevention(result, lines)
+            self._run_validator('crash_prevention', self._validate_crash_prevention, result, lines)
 
             # DISABLED - Tool/Safety validation temporarily disabled (needs tuning)
             # Uncomment to re-enable tool and safety validation
@@ -491,37 +629,37 @@ class ImprovedGCodeParser:
             # self._validate_safety_blocks(result, lines)
 
             # 11. Validate consistency
-            self._validate_consistency(result)
+            self._run_validator('consistency', self._validate_consistency, result)
 
             # 11a. Haas lathe-specific G-code validations
-            self._validate_haas_gcode_patterns(result, lines)
+            self._run_validator('haas_patterns', self._validate_haas_gcode_patterns, result, lines)
 
             # 11b. OD turn-down validation (common practice checks)
-            self._validate_od_turndown(result, lines)
+            self._run_validator('od_turndown', self._validate_od_turndown, result, lines)
 
             # 11c. Hub breakthrough validation (hub-centric parts only)
-            self._validate_hub_breakthrough(result, lines)
+            self._run_validator('hub_breakthrough', self._validate_hub_breakthrough, result, lines)
 
             # 11d. Turning tool depth validation (production standards)
-            self._validate_turning_depth(result, lines)
+            self._run_validator('turning_depth', self._validate_turning_depth, result, lines)
 
             # 11e. Bore chamfer safety validation (hub crash prevention)
-            self._validate_bore_chamfer_safety(result, lines)
+            self._run_validator('bore_chamfer_safety', self._validate_bore_chamfer_safety, result, lines)
 
             # 11f. Counterbore depth validation (STEP parts only)
-            self._validate_counterbore_depth(result, lines)
+            self._run_validator('counterbore_depth', self._validate_counterbore_depth, result, lines)
 
             # 11g. G154 / work offset presence (every operation must declare WCS)
-            self._validate_g154_presence(result, lines)
+            self._run_validator('g154_presence', self._validate_g154_presence, result, lines)
 
             # 11h. Steel ring recess diameter (interference-fit tolerance check)
-            self._validate_steel_ring_recess(result)
+            self._run_validator('steel_ring_recess', self._validate_steel_ring_recess, result)
 
             # 11i. 2PC mating hub ring size (CB → expected ring OD lookup)
-            self._validate_2pc_ring_size(result)
+            self._run_validator('2pc_ring_size', self._validate_2pc_ring_size, result)
 
             # 11j. Bore pass step size (T121 BORE X increment <= 0.300")
-            self._validate_bore_pass_steps(result, lines)
+            self._run_validator('bore_pass_steps', self._validate_bore_pass_steps, result, lines)
 
             # 12. Get file timestamps
             try:
@@ -533,7 +671,7 @@ class ImprovedGCodeParser:
                 pass
 
             # 13. Classify bore type (centerbore vs counterbore)
-            self._classify_bore_type(result)
+            self._run_stage('bore_type', self._classify_bore_type, result)
 
             # 14. Steel ring round size validation
             # CRITICAL: Steel rings are ONLY used for 8", 8.5", and 9.5" round sizes
@@ -607,9 +745,36 @@ class ImprovedGCodeParser:
 
         except Exception as e:
             if self.debug:
-                print(f"Error parsing {file_path}: {e}")
+                print(f"Error parsing {file_path or filename}: {e}")
             return None
 
+    def _run_stage(self, stage: str, func, *args):
+        """Run one detection stage, timing it when profiling is enabled"""
+        if self.profile is None:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.profile.record(stage, time.perf_counter() - start)
+
+    def _run_validator(self, source: str, validator, result: GCodeParseResult, *args):
+        """
+        Run one validation step and record it as the source of the issue
+        messages it adds (messages added outside a validator step are
+        attributed to 'parser').
+        """
+        before = {name: len(getattr(result, name) or []) for name, _severity in ISSUE_FIELDS}
+        if self.profile is None:
+            validator(result, *args)
+        else:
+            start = time.perf_counter()
+            validator(result, *args)
+            self.profile.record(f'validator.{source}', time.perf_counter() - start)
+        for name, count in before.items():
+            for message in (getattr(result, name) or [])[count:]:
+                result.issue_sources.setdefault(message, source)
+
     def _extract_program_number(self, filename: str, lines: List[str]) -> Optional[str]:
         """
         Extract program number from filename and validate against file content
@@ -11,6 +11,9 @@ from pathlib import Path
 from collections import defaultdict
 import re
 
+from utils.file_content import FileContent, file_sha256
+from utils.repository_audit import NAME_DUPLICATE, ORPHAN_FILE, RepositoryAudit
+
 
 class RepositoryManager:
     """Manages repository files, archiving, and cleanup operations"""
@@ -20,6 +23,9 @@ class RepositoryManager:
         self.repository_path = Path(repository_path)
         self.archive_path = self.repository_path.parent / 'archive'
 
+        # Orphan/duplicate detection reads the shared repository audit
+        self.audit = RepositoryAudit(db_path, str(self.repository_path))
+
         # Initialize archive structure
         self.init_archive()
 
@@ -96,18 +102,16 @@ class RepositoryManager:
             counter += 1
 
         try:
-            # Calculate file hash and size before moving
-            import hashlib
-            with open(str(old_file_path), 'rb') as f:
-                file_content = f.read()
-                file_hash = hashlib.sha256(file_content).hexdigest()
-                file_size = len(file_content)
+            # Calculate file hash and size before moving (one read, reused for parsing)
+            content = FileContent.read(str(old_file_path))
+            file_hash = content.sha256
+            file_size = content.size
 
             # Extract dimensions from file before moving
             try:
                 from improved_gcode_parser import ImprovedGCodeParser
                 parser = ImprovedGCodeParser()
-                parse_result = parser.parse_file(str(old_file_path))
+                parse_result = parser.parse_file(str(old_file_path), content=content)
                 dimensions = {
                     'outer_diameter': parse_result.outer_diameter,
                     'thickness': parse_result.thickness,
@@ -239,11 +243,19 @@ class RepositoryManager:
             return None
 
     def _files_identical(self, file1, file2):
-        """Check if two files have identical content"""
+        """
+        Check if two files have identical content.
+
+        file2 (the repository copy) is compared by its audited hash when it
+        has not changed since the last audit, so only file1 is read.
+        """
         try:
-            with open(file1, 'rb') as f1, open(file2, 'rb') as f2:
-                return f1.read() == f2.read()
-        except:
+            # Different sizes can't match - skip reading
+            if os.path.getsize(file1) != os.path.getsize(file2):
+                return False
+            hash2 = self.audit.cached_sha256(file2) or file_sha256(str(file2))
+            return hash2 is not None and file_sha256(str(file1)) == hash2
+        except OSError:
             return False
 
     def detect_orphan_files(self):
@@ -253,23 +265,7 @@ class RepositoryManager:
         Returns:
             list: List of (filename, full_path) tuples for orphan files
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Get all tracked file paths from database
-        cursor.execute('SELECT file_path FROM programs')
-        tracked_files = set(Path(row[0]).name.lower() for row in cursor.fetchall())
-
-        conn.close()
-
-        # Find orphans
-        orphans = []
-        for item in self.repository_path.iterdir():
-            if item.is_file():
-                if item.name.lower() not in tracked_files:
-                    orphans.append((item.name, str(item)))
-
-        return orphans
+        return [(Path(f['file_path']).name, f['file_path']) for f in self.audit.findings(ORPHAN_FILE)]
 
     def cleanup_orphans(self, action='archive', dry_run=False):
         """
@@ -282,6 +278,9 @@ class RepositoryManager:
         Returns:
             dict: Statistics about cleanup
         """
+        if not dry_run:
+            # Files are archived or deleted - never act on an older audit
+            self.audit.run()
         orphans = self.detect_orphan_files()
 
         if not orphans:
@@ -328,18 +327,10 @@ class RepositoryManager:
         Returns:
             dict: {program_number: [list of file paths]}
         """
-        file_groups = defaultdict(list)
-
-        for item in self.repository_path.iterdir():
-            if item.is_file():
-                # Normalize to program number (remove extension, lowercase)
-                prog_num = item.stem.lower()
-                file_groups[prog_num].append(str(item))
-
-        # Filter to only duplicates
-        duplicates = {k: v for k, v in file_groups.items() if len(v) > 1}
-
-        return duplicates
+        duplicates = defaultdict(list)
+        for f in self.audit.findings(NAME_DUPLICATE):
+            duplicates[f['program_number']].append(f['file_path'])
+        return dict(duplicates)
 
     def consolidate_duplicates(self, dry_run=False):
         """
@@ -352,6 +343,8 @@ class RepositoryManager:
         Returns:
             dict: Statistics about consolidation
         """
+        if not dry_run:
+            self.audit.run()
         duplicates = self.detect_duplicates()
 
         if not duplicates:
@@ -12,10 +12,12 @@ Author: G-Code Database Manager
 Date: 2026-02-08
 """
 
-import sqlite3
+import argparse
 import re
 from typing import List, Dict, Optional
 
+from utils.analysis_runner import add_runner_arguments, run_analyzer, select_programs
+
 
 class ModalGCodeCrashDetector:
     """Detects modal G-code crashes where G00 is followed by negative Z"""
@@ -113,30 +115,15 @@ class ModalGCodeCrashDetector:
         except Exception as e:
             print(f"Error analyzing {program_number}: {e}")
 
-    def run_analysis(self, sample_size: int = 1000):
-        """Run analysis on sample of files"""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-
-        query = """
-        SELECT program_number, file_path
-        FROM programs
-        WHERE file_path IS NOT NULL
-        ORDER BY RANDOM()
-        LIMIT ?
-        """
-
-        cursor.execute(query, (sample_size,))
-        files = cursor.fetchall()
-        conn.close()
+    def run_analysis(self, sample_size: int = None, max_workers: int = None):
+        """Run analysis on all files (or a random sample) in parallel"""
+        files = select_programs(self.db_path, ['program_number', 'file_path'],
+                                sample_size=sample_size)
 
         print(f"Analyzing {len(files)} files for modal G-code crash patterns...")
 
-        for i, (program_number, file_path) in enumerate(files, 1):
-            if i % 100 == 0:
-                print(f"Progress: {i}/{len(files)}...")
-
-            self.analyze_file(program_number, file_path)
+        run_analyzer(self, files, max_workers=max_workers,
+                     progress=lambda done, total: print(f"Progress: {done}/{total}..."))
 
         print(f"\nAnalysis complete!")
 
@@ -216,13 +203,17 @@ class ModalGCodeCrashDetector:
 
 def main():
     """Main entry point"""
-    db_path = r"l:\My Drive\Home\File organizer\gcode_database.db"
-    repository_path = r"l:\My Drive\Home\File organizer\repository"
+    parser = argparse.ArgumentParser(description="Modal G00 crash pattern detection over the repository")
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+
+    db_path = args.db or r"l:\My Drive\Home\File organizer\gcode_database.db"
+    repository_path = args.repository or r"l:\My Drive\Home\File organizer\repository"
 
     detector = ModalGCodeCrashDetector(db_path, repository_path)
 
-    # Analyze 1000 files
-    detector.run_analysis(sample_size=1000)
+    # Analyze every file (--sample N for a random sample)
+    detector.run_analysis(sample_size=args.sample, max_workers=args.workers)
 
     # Generate report
     report = detector.generate_report()
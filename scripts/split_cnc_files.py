@@ -1,66 +1,22 @@
-import re
 import os
-from pathlib import Path
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.program_splitter import write_programs
 
 def split_cnc_file(input_file, output_folder):
     """
     Split a CNC file containing multiple programs into individual files.
     Each program starts with O##### and ends with M30.
-    """
-    # Create output folder if it doesn't exist
-    os.makedirs(output_folder, exist_ok=True)
-
-    with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
-
-    current_program = []
-    current_program_number = None
-    programs_created = 0
-
-    for line in lines:
-        stripped_line = line.strip()
-
-        # Check if this line starts a new program (O followed by digits)
-        match = re.match(r'^O(\d+)', stripped_line, re.IGNORECASE)
 
-        if match:
-            # If we already have a program in progress, save it first
-            if current_program and current_program_number:
-                output_file = os.path.join(output_folder, f"o{current_program_number}.nc")
-                with open(output_file, 'w', encoding='utf-8') as out:
-                    out.writelines(current_program)
-                programs_created += 1
-                print(f"Created: {output_file}")
-
-            # Start new program
-            current_program_number = match.group(1)
-            current_program = [line]
-        elif current_program_number:
-            # Add line to current program
-            current_program.append(line)
-
-            # Check if this is the end of the program
-            if stripped_line.upper() == 'M30':
-                # Save the program
-                output_file = os.path.join(output_folder, f"o{current_program_number}.nc")
-                with open(output_file, 'w', encoding='utf-8') as out:
-                    out.writelines(current_program)
-                programs_created += 1
-                print(f"Created: {output_file}")
-
-                # Reset for next program
-                current_program = []
-                current_program_number = None
-
-    # Save any remaining program (in case file doesn't end with M30)
-    if current_program and current_program_number:
-        output_file = os.path.join(output_folder, f"o{current_program_number}.nc")
-        with open(output_file, 'w', encoding='utf-8') as out:
-            out.writelines(current_program)
-        programs_created += 1
-        print(f"Created: {output_file}")
-
-    return programs_created
+    The file is streamed one program at a time (utils.program_splitter).
+    """
+    stats = write_programs(input_file, output_folder, overwrite=True,
+                           log=print)
+    if stats.incomplete:
+        print(f"Programs without M30: {', '.join(stats.incomplete)}")
+    return stats.saved
 
 # Process both files
 print("=" * 60)
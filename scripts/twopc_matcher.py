@@ -15,6 +15,7 @@ The hub OB (from STUD) should be slightly smaller than shelf CB (from LUG) so th
 
 import os
 import re
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Tuple
 from collections import defaultdict
@@ -433,28 +434,30 @@ class TwoPCMatcher:
             if part.round_size and part.part_type in ('STUD', 'LUG'):
                 by_round_size[part.round_size][part.part_type].append(part)
 
-        # Find matches within each round size group
+        # Within each round size group, sort LUGs by hub OB and bisect to the
+        # hubs that fit each STUD's shelf (shelf_cb - clearance_max ..
+        # shelf_cb - clearance_min) instead of checking every LUG
         for round_size, groups in by_round_size.items():
-            studs = groups['STUD']
-            lugs = groups['LUG']
+            lugs = sorted((lug for lug in groups['LUG'] if lug.hub_ob),  # LUG needs a hub to insert into STUD's shelf
+                          key=lambda lug: lug.hub_ob)
+            hub_obs = [lug.hub_ob for lug in lugs]
 
-            for stud in studs:
+            for stud in groups['STUD']:
                 if not stud.shelf_cb:  # STUD needs a shelf to receive LUG's hub
                     continue
 
-                for lug in lugs:
-                    if not lug.hub_ob:  # LUG needs a hub to insert into STUD's shelf
-                        continue
-
-                    # Check if LUG's hub fits into STUD's shelf
+                # Bounds are widened slightly; the clearance is re-checked exactly
+                start = bisect_left(hub_obs, stud.shelf_cb - clearance_max - 1e-9)
+                end = bisect_right(hub_obs, stud.shelf_cb - clearance_min + 1e-9)
+                for lug in lugs[start:end]:
                     # STUD shelf should be slightly larger than LUG hub
                     clearance = stud.shelf_cb - lug.hub_ob
 
                     if clearance_min <= clearance <= clearance_max:
                         self.matches.append((stud, lug, clearance))
 
-        # Sort by clearance (best fit first)
-        self.matches.sort(key=lambda x: x[2])
+        # Sort by clearance (best fit first), then program numbers for a stable report
+        self.matches.sort(key=lambda x: (x[2], x[0].program_number, x[1].program_number))
 
         return self.matches
 
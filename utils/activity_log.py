@@ -0,0 +1,192 @@
+"""
+Activity Log
+Write-behind buffer for the activity_log table.
+
+log_activity() used to open a connection, insert one row and commit for
+every action - during batch operations that doubled the commits, and a
+"database is locked" error silently dropped the entry. ActivityLogger
+queues entries in memory (timestamped when logged) and writes them in
+one transaction:
+
+- every flush_interval seconds (background thread)
+- as soon as max_pending entries are queued (so a long batch does not
+  hold an unbounded queue)
+- on flush(): at the end of every batch operation (the database manager's
+  _write_lease_batch) and before query()
+- on close() (application shutdown)
+
+A write that fails because the database is locked or busy puts the entries
+back at the head of the queue, so lock contention delays entries but never
+drops them. Any other database error (missing table, corrupt or read-only
+file) would fail the same way on every retry and keep the queue growing, so
+those entries are dropped and written to the application log instead.
+query() flushes first, so the history it returns is complete.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+ACTIVITY_FLUSH_INTERVAL = 2.0
+ACTIVITY_MAX_PENDING = 500
+
+# Attempts on close(); entries left after that are reported, not silently lost
+CLOSE_FLUSH_ATTEMPTS = 5
+
+# Error messages that mean another connection holds the database (worth a retry)
+TRANSIENT_ERRORS = ('locked', 'busy')
+
+ACTIVITY_COLUMNS = ('log_id', 'user_id', 'username', 'action_type', 'program_number', 'details', 'timestamp')
+
+
+def create_activity_indexes(cursor):
+    """Indexes behind the activity history queries"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_timestamp ON activity_log(timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_program ON activity_log(program_number, timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_action ON activity_log(action_type, timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_username ON activity_log(username, timestamp)')
+
+
+class ActivityLogger:
+    """Buffered writer and query API for activity_log"""
+
+    def __init__(self, db_path: str, flush_interval: float = ACTIVITY_FLUSH_INTERVAL,
+                 max_pending: int = ACTIVITY_MAX_PENDING):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the background flush thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="activity-log", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def log(self, user_id, username, action_type, program_number=None, details=None):
+        """Queue one entry (dict details are stored as JSON)"""
+        if isinstance(details, dict):
+            details = json.dumps(details)
+        entry = (user_id, username, action_type, program_number, details, datetime.now().isoformat())
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """
+        Write every queued entry in one transaction.
+
+        Returns:
+            Number of entries written (0 if none were queued or the write
+            failed - entries stay queued if the database was locked or busy,
+            otherwise they are dropped to the application log)
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries = list(self._pending)
+                self._pending.clear()
+            if not entries:
+                return 0
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=10.0)
+                try:
+                    with conn:
+                        conn.executemany("""
+                            INSERT INTO activity_log (user_id, username, action_type, program_number, details, timestamp)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        """, entries)
+                finally:
+                    conn.close()
+                return len(entries)
+            except sqlite3.Error as e:
+                message = str(e).lower()
+                if any(transient in message for transient in TRANSIENT_ERRORS):
+                    # Requeue ahead of anything logged meanwhile and retry on the next flush
+                    with self._lock:
+                        self._pending.extendleft(reversed(entries))
+                    logger.debug(f"Database busy, {len(entries)} activity entries kept for retry")
+                else:
+                    logger.error(f"Database error writing activity log, {len(entries)} entries dropped: {e}")
+                    logger.error(f"Dropped activity entries: {json.dumps(entries)}")
+                return 0
+
+    def close(self):
+        """Stop the flush thread and write what is still queued"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        for attempt in range(CLOSE_FLUSH_ATTEMPTS):
+            self.flush()
+            if not self._pending:
+                return
+            time.sleep(0.2 * (attempt + 1))
+        logger.error(f"{len(self._pending)} activity log entries could not be written")
+
+    def query(self, program_number: Optional[str] = None, action_type: Optional[str] = None,
+              username: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None, limit: Optional[int] = 200) -> List[Dict]:
+        """
+        Activity history, newest first.
+
+        Args:
+            program_number / action_type / username: Exact-match filters
+            since / until: ISO timestamp bounds (inclusive / exclusive)
+            limit: Maximum rows (None for all)
+
+        Returns:
+            List of dicts with ACTIVITY_COLUMNS keys
+        """
+        self.flush()
+        clauses, params = [], []
+        for column, value in (('program_number', program_number), ('action_type', action_type),
+                              ('username', username)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+
+        query = f"SELECT {', '.join(ACTIVITY_COLUMNS)} FROM activity_log"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp DESC, log_id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        try:
+            return [dict(zip(ACTIVITY_COLUMNS, row)) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
@@ -0,0 +1,208 @@
+"""
+Analysis Runner
+
+Runs the repository analysis tools (analysis/*.py, the modal crash detector)
+over every program on a process pool instead of a serial random sample.
+
+Each worker builds its own analyzer, runs the analyzer's per-file method on
+a chunk of rows and returns the analyzer's statistics; the chunks are merged
+back into the caller's analyzer in order (counts add, lists and counters
+combine), so the analyzer's own report and JSON writers work unchanged.
+
+Crash analysis reuses the issue lists already stored in the programs table
+for files whose content hash still matches, so unchanged files are not
+re-parsed.
+"""
+
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from utils.file_content import FileContent
+
+logger = logging.getLogger(__name__)
+
+
+# Rows per worker call - large enough that building the analyzer (and its
+# parser) per chunk is negligible
+ANALYSIS_CHUNK_SIZE = 250
+
+# Parse result fields stored as JSON lists in the programs table
+STORED_ISSUE_FIELDS = ('validation_issues', 'validation_warnings', 'bore_warnings',
+                       'dimensional_issues', 'crash_issues', 'crash_warnings')
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def select_programs(db_path: str, columns: Sequence[str], where: str = "file_path IS NOT NULL",
+                    sample_size: Optional[int] = None) -> List[tuple]:
+    """
+    Program rows for an analysis run.
+
+    Args:
+        columns: programs columns to select (in the order the analyzer expects)
+        where: SQL filter
+        sample_size: Random sample of this many rows; None selects every
+            matching program, ordered by program number
+
+    Returns:
+        List of row tuples
+    """
+    query = f"SELECT {', '.join(columns)} FROM programs WHERE {where}"
+    params: tuple = ()
+    if sample_size:
+        query += " ORDER BY RANDOM() LIMIT ?"
+        params = (sample_size,)
+    else:
+        query += " ORDER BY program_number"
+
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+
+def merge_stats(total, partial):
+    """
+    Merge one worker's statistics into the running total.
+
+    Numbers add, lists extend, sets union and dicts (including Counter and
+    defaultdict) merge key by key; anything else takes the partial value.
+
+    Returns:
+        The merged value (total is updated in place where it is mutable)
+    """
+    if isinstance(total, dict) and isinstance(partial, dict):
+        for key, value in partial.items():
+            total[key] = merge_stats(total[key], value) if key in total else value
+        return total
+    if isinstance(total, list):
+        total.extend(partial)
+        return total
+    if isinstance(total, set):
+        total |= partial
+        return total
+    if isinstance(total, (int, float)) and not isinstance(total, bool) and partial is not None:
+        return total + partial
+    return partial
+
+
+def stored_parse_result(stored: Dict[str, Optional[str]]) -> SimpleNamespace:
+    """Parse-result stand-in built from the JSON issue columns of a programs row"""
+    values = {}
+    for field in STORED_ISSUE_FIELDS:
+        raw = stored.get(field)
+        try:
+            values[field] = json.loads(raw) if raw else []
+        except (TypeError, ValueError):
+            values[field] = []
+    return SimpleNamespace(**values)
+
+
+def parse_or_reuse(parser, file_path: str, content_hash: Optional[str] = None,
+                   stored: Optional[Dict[str, Optional[str]]] = None) -> Tuple[object, bool]:
+    """
+    Parse a file, or reuse its stored issues if it is unchanged.
+
+    Args:
+        parser: ImprovedGCodeParser
+        content_hash: Hash the stored issues were computed from
+        stored: STORED_ISSUE_FIELDS -> JSON text from the programs row; None
+            always parses
+
+    Returns:
+        (parse result, reused) - a reused result only carries the issue lists
+
+    Raises:
+        OSError if the file cannot be read
+    """
+    content = FileContent.read(file_path)
+    if stored is not None and content_hash and content.sha256 == content_hash:
+        return stored_parse_result(stored), True
+    return parser.parse_file(file_path, content=content), False
+
+
+def _analyze_chunk(job: tuple):
+    """
+    Worker: run an analyzer over a chunk of rows (module level so it can be
+    pickled).
+
+    Returns:
+        The fresh analyzer's statistics attribute
+    """
+    analyzer_cls, db_path, repository_path, options, method, state, rows = job
+    analyzer = analyzer_cls(db_path, repository_path)
+    for name, value in options.items():
+        setattr(analyzer, name, value)
+    analyze = getattr(analyzer, method)
+    for row in rows:
+        analyze(*row)
+    return getattr(analyzer, state)
+
+
+def run_analyzer(analyzer, rows: Sequence[tuple], method: str = 'analyze_file',
+                 state: str = 'results', options: Optional[Dict] = None,
+                 max_workers: Optional[int] = None, chunk_size: int = ANALYSIS_CHUNK_SIZE,
+                 progress: Optional[Callable[[int, int], None]] = None):
+    """
+    Run analyzer.<method>(*row) for every row, in parallel when worthwhile.
+
+    Workers construct the analyzer class with (db_path, repository_path),
+    apply `options` as attributes and return getattr(analyzer, state); the
+    partial statistics are merged into the caller's analyzer in row order.
+
+    Args:
+        analyzer: Analyzer instance receiving the merged statistics
+        rows: Argument tuples for the per-file method
+        method: Per-file method name
+        state: Statistics attribute name ('results' / 'patterns')
+        options: Attributes to set on worker analyzers (settings that are not
+            constructor arguments)
+        max_workers: Worker processes (default: CPU count - 1); 1 runs serially
+        progress: Optional callback(done, total) after each chunk
+
+    Returns:
+        The caller's analyzer
+    """
+    if max_workers is None:
+        max_workers = default_workers()
+    rows = list(rows)
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+    if max_workers <= 1 or len(chunks) <= 1:
+        analyze = getattr(analyzer, method)
+        for done, chunk in enumerate(chunks, 1):
+            for row in chunk:
+                analyze(*row)
+            if progress:
+                progress(min(done * chunk_size, len(rows)), len(rows))
+        return analyzer
+
+    jobs = [(type(analyzer), analyzer.db_path, analyzer.repository_path, options or {},
+             method, state, chunk) for chunk in chunks]
+    total = getattr(analyzer, state)
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        # map() yields in submission order, so merged lists keep row order
+        for done, partial in enumerate(executor.map(_analyze_chunk, jobs), 1):
+            total = merge_stats(total, partial)
+            if progress:
+                progress(min(done * chunk_size, len(rows)), len(rows))
+    setattr(analyzer, state, total)
+    return analyzer
+
+
+def add_runner_arguments(parser) -> None:
+    """Shared command-line options for the analysis scripts"""
+    parser.add_argument('--db', help="Database path")
+    parser.add_argument('--repository', help="Repository folder")
+    parser.add_argument('--sample', type=int, default=None,
+                        help="Analyze a random sample of N files (default: all files)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count - 1; 1 = serial)")
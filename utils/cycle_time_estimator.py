@@ -0,0 +1,286 @@
+"""
+Cycle Time Estimator
+Estimates lathe cycle time by walking the moves produced by the toolpath
+engine (utils.toolpath_engine) together with their modal feed/spindle state.
+
+Time model:
+- Feed moves (G01/G02/G03): G99 length / (F * RPM), G98 length / F
+- Spindle speed: G97 S is RPM; G96 S is surface feet/min, converted to RPM
+  along the move from the current diameter and clamped by G50 S and the
+  lathe's max RPM (LatheConfig)
+- Rapid moves: each axis travels at its own rapid rate, the slower axis
+  sets the time
+- Tool changes: fixed per-lathe overhead (G53 home move, turret index,
+  spindle restart) - G53 moves themselves are not part of the toolpath
+
+Air cutting: feed moves that stay entirely above the part face or outside
+the stock diameter are flagged - they cost time without removing material.
+
+Batch estimates for the whole repository run in a process pool
+(estimate_cycle_times).
+"""
+
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from utils.toolpath_engine import GCodeToolpathParser, MOTION_RAPID
+
+try:
+    from gcode_generator.rules.lathe_config import LatheConfig
+except ImportError:
+    LatheConfig = None
+
+logger = logging.getLogger(__name__)
+
+
+# Lathe used when a program has no lathe assignment and its round size is
+# not tied to a single lathe
+DEFAULT_LATHE = 'L2'
+
+# Machine limits used when LatheConfig is unavailable
+DEFAULT_MAX_RPM = 3500
+DEFAULT_MAX_CSS = 3000
+DEFAULT_RAPID_RATE = 945.0  # inches/min
+DEFAULT_TOOL_CHANGE_TIME = 6.0  # seconds
+
+# Points sampled along each feed move to integrate G96 spindle speed
+CSS_SAMPLES = 8
+
+# A feed move this far above Z0 or outside the stock diameter is air
+AIR_CUT_CLEARANCE = 0.02
+
+# Programs handed to each worker process at a time
+BATCH_CHUNK_SIZE = 64
+
+
+@dataclass
+class CycleTimeEstimate:
+    """Estimated cycle time for one program (all times in seconds)"""
+    total_seconds: float
+    cutting_seconds: float
+    rapid_seconds: float
+    tool_change_seconds: float
+    air_cut_seconds: float
+    tool_changes: int
+    lathe: str
+    air_cut_lines: List[int] = field(default_factory=list)  # Lines with air-cutting feed moves
+    warnings: List[str] = field(default_factory=list)
+
+
+def format_cycle_time(seconds: Optional[float]) -> str:
+    """Format seconds as M:SS (or H:MM:SS), '-' for unknown"""
+    if seconds is None:
+        return '-'
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def resolve_lathe(lathe: Optional[str], stock_diameter: Optional[float] = None) -> str:
+    """
+    Pick the lathe whose limits apply to a program.
+
+    Args:
+        lathe: Lathe assignment from the database ('L1', 'L2', 'L3', 'L2/L3')
+        stock_diameter: Round size, used when no lathe is assigned
+
+    Returns:
+        'L1', 'L2' or 'L3' (shared assignments use the first lathe listed)
+    """
+    if lathe:
+        for name in lathe.upper().replace(' ', '').split('/'):
+            if name in ('L1', 'L2', 'L3'):
+                return name
+    if stock_diameter and LatheConfig is not None:
+        lathes = LatheConfig.get_available_lathes_for_size(stock_diameter)
+        if lathes:
+            return lathes[0]
+    return DEFAULT_LATHE
+
+
+def _machine_limits(lathe: str) -> Tuple[float, float, float, float, float]:
+    """Return (max_rpm, max_css, rapid_x, rapid_z, tool_change_time) for a lathe"""
+    if LatheConfig is not None and lathe in LatheConfig.LATHE_SPECS:
+        specs = LatheConfig.get_lathe_specs(lathe)
+        return (float(specs.max_rpm), float(specs.max_css), specs.rapid_x,
+                specs.rapid_z, specs.tool_change_time)
+    return (float(DEFAULT_MAX_RPM), float(DEFAULT_MAX_CSS), DEFAULT_RAPID_RATE,
+            DEFAULT_RAPID_RATE, DEFAULT_TOOL_CHANGE_TIME)
+
+
+def estimate_toolpath(toolpath: Dict, lathe: Optional[str] = None,
+                      stock_diameter: Optional[float] = None) -> CycleTimeEstimate:
+    """
+    Estimate cycle time from a parsed toolpath.
+
+    Args:
+        toolpath: Result of GCodeToolpathParser.parse() / parse_lines()
+        lathe: Lathe assignment (see resolve_lathe)
+        stock_diameter: Round size in inches, enables the outside-stock
+            air-cut check
+
+    Returns:
+        CycleTimeEstimate
+    """
+    lathe = resolve_lathe(lathe, stock_diameter)
+    max_rpm, max_css, rapid_x, rapid_z, tool_change_time = _machine_limits(lathe)
+    warnings = []
+
+    segments = toolpath['segments']
+    x1, z1, x2, z2 = (segments[:, i] for i in range(4))
+    radial = np.abs(x2 - x1) / 2.0  # X is programmed as diameter
+    axial = np.abs(z2 - z1)
+    rapid = toolpath['motion'] == MOTION_RAPID
+
+    # Rapids: axes move independently, the slower one decides
+    rapid_seconds = float(np.maximum(radial[rapid] / rapid_x,
+                                     axial[rapid] / rapid_z).sum() * 60.0)
+
+    # Feed moves: sample the diameter along each move for G96
+    feed_mask = ~rapid
+    length = np.hypot(radial[feed_mask], axial[feed_mask])
+    feed = toolpath['feed'][feed_mask]
+    per_rev = toolpath['feed_per_rev'][feed_mask]
+    css = toolpath['css'][feed_mask]
+    spindle = toolpath['spindle'][feed_mask]
+    clamp = toolpath['max_rpm'][feed_mask]
+    clamp = np.where(clamp > 0, np.minimum(clamp, max_rpm), max_rpm)
+
+    t = (np.arange(CSS_SAMPLES) + 0.5) / CSS_SAMPLES
+    fx1 = x1[feed_mask][:, None]
+    diameters = np.abs(fx1 + (x2[feed_mask][:, None] - fx1) * t)
+    surface_speed = np.minimum(spindle, max_css)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rpm = np.where(css[:, None],
+                       surface_speed * 12.0 / (np.pi * np.maximum(diameters, 1e-6)),
+                       spindle[:, None])
+        rpm = np.minimum(rpm, clamp[:, None])
+        # Inches per minute at each sample point
+        rate = np.where(per_rev[:, None], feed[:, None] * rpm, feed[:, None])
+        minutes = np.where(rate > 0, (length / CSS_SAMPLES)[:, None] / rate, 0.0).sum(axis=1)
+
+    untimed = int(np.count_nonzero((rate <= 0).any(axis=1) & (length > 0)))
+    if untimed:
+        warnings.append(f"{untimed} feed moves without a usable feed rate/spindle speed (not timed)")
+    feed_seconds = minutes * 60.0
+    cutting_seconds = float(feed_seconds.sum())
+
+    # Air cutting: above the face, or outside the stock
+    air = np.minimum(z1[feed_mask], z2[feed_mask]) > AIR_CUT_CLEARANCE
+    if stock_diameter:
+        outside = np.minimum(np.abs(x1[feed_mask]), np.abs(x2[feed_mask]))
+        air |= outside > stock_diameter + AIR_CUT_CLEARANCE
+    air_cut_seconds = float(feed_seconds[air].sum())
+    air_cut_lines = sorted(set(toolpath['lines'][feed_mask][air].tolist()))
+
+    tool_changes = len(toolpath['tool_changes'])
+    tool_change_seconds = tool_changes * tool_change_time
+
+    return CycleTimeEstimate(
+        total_seconds=cutting_seconds + rapid_seconds + tool_change_seconds,
+        cutting_seconds=cutting_seconds,
+        rapid_seconds=rapid_seconds,
+        tool_change_seconds=tool_change_seconds,
+        air_cut_seconds=air_cut_seconds,
+        tool_changes=tool_changes,
+        lathe=lathe,
+        air_cut_lines=air_cut_lines,
+        warnings=warnings
+    )
+
+
+def estimate_file(file_path: str, lathe: Optional[str] = None,
+                  stock_diameter: Optional[float] = None) -> CycleTimeEstimate:
+    """Estimate cycle time for a G-code file (toolpath cached by content hash)"""
+    toolpath = GCodeToolpathParser(file_path).parse()
+    return estimate_toolpath(toolpath, lathe, stock_diameter)
+
+
+def _estimate_job(job: tuple) -> tuple:
+    """
+    Worker for estimate_cycle_times (module level so it can be pickled).
+
+    Returns:
+        (program_number, content_hash, CycleTimeEstimate or None, error or None)
+        - estimate is None with no error when the file is unchanged
+    """
+    program_number, file_path, lathe, stock_diameter, known_hash = job
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return (program_number, None, None, str(e))
+
+    content_hash = hashlib.sha256(data).hexdigest()
+    if content_hash == known_hash:
+        return (program_number, content_hash, None, None)
+
+    try:
+        lines = io.StringIO(data.decode('utf-8', errors='ignore'), newline=None).readlines()
+        toolpath = GCodeToolpathParser(file_path).parse_lines(lines)
+        return (program_number, content_hash,
+                estimate_toolpath(toolpath, lathe, stock_diameter), None)
+    except Exception as e:
+        return (program_number, content_hash, None, str(e))
+
+
+def _estimate_chunk(jobs: List[tuple]) -> List[tuple]:
+    """Run a chunk of jobs in one worker call"""
+    return [_estimate_job(job) for job in jobs]
+
+
+def estimate_cycle_times(jobs: Sequence[tuple], max_workers: Optional[int] = None,
+                         cancel_event=None) -> Iterator[tuple]:
+    """
+    Estimate many programs in parallel, yielding results as they finish.
+
+    Args:
+        jobs: (program_number, file_path, lathe, stock_diameter, known_hash)
+            tuples - known_hash is the content hash the stored estimate was
+            computed from (files still matching it are skipped)
+        max_workers: Worker processes (default: CPU count - 1)
+        cancel_event: Optional threading.Event; pending work is dropped
+            once it is set
+
+    Yields:
+        (program_number, content_hash, CycleTimeEstimate or None, error or None)
+    """
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 2) - 1)
+
+    chunks = [list(jobs[i:i + BATCH_CHUNK_SIZE])
+              for i in range(0, len(jobs), BATCH_CHUNK_SIZE)]
+
+    if max_workers <= 1 or len(chunks) <= 1:
+        for job in jobs:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            yield _estimate_job(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_estimate_chunk, chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"Cycle time worker failed: {e}")
+                    continue
+                for result in results:
+                    yield result
+        finally:
+            for future in futures:
+                future.cancel()
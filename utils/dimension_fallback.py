@@ -0,0 +1,159 @@
+"""
+Dimension Fallback
+Batched secondary (ML) fallback for dimensions the parser could not find.
+
+Rescans used to call the model once per missing dimension per program with
+a one-row feature vector, and reloaded or retrained every model before each
+scan. Here the fallback is a separate stage after parsing:
+
+- parse results missing OD, thickness or CB are collected during the scan
+- one feature matrix is built per dimension and predicted in a single call
+- trained models are cached next to the database, keyed by a fingerprint
+  of the training data, and retrained only when that data changes
+
+The extractor is analysis_tools.ml_dimension_extractor.MLDimensionExtractor
+(optional: pandas, scikit-learn, numpy).
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+from typing import Callable, Dict, List, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Predicted in this order - thickness and CB use a predicted OD as a feature
+FALLBACK_DIMENSIONS = ('outer_diameter', 'thickness', 'center_bore')
+
+# Columns the models learn from; any change to them means retraining
+TRAINING_COLUMNS = ('program_number', 'title', 'outer_diameter', 'thickness', 'center_bore',
+                    'hub_diameter', 'hub_height', 'cb_from_gcode', 'ob_from_gcode')
+
+MODEL_CACHE_NAME = 'ml_dimension_models.cache.pkl'
+
+_NOTE_FORMATS = {
+    'outer_diameter': 'OD from secondary: {:.2f}"',
+    'thickness': 'Thickness from secondary: {:.3f}"',
+    'center_bore': 'CB from secondary: {:.1f}mm',
+}
+
+
+def training_fingerprint(db_path: str) -> str:
+    """SHA256 over the training columns of every active program"""
+    digest = hashlib.sha256()
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        cursor = conn.execute(f"""
+            SELECT {', '.join(TRAINING_COLUMNS)} FROM programs
+            WHERE (is_deleted IS NULL OR is_deleted = 0)
+            ORDER BY program_number
+        """)
+        for row in cursor:
+            digest.update(repr(row).encode('utf-8'))
+    finally:
+        conn.close()
+    return digest.hexdigest()
+
+
+def load_fallback_extractor(db_path: str, log: Optional[Callable[[str], None]] = None):
+    """
+    MLDimensionExtractor with models for the current training data.
+
+    Models come from the fingerprint-keyed cache when the training data is
+    unchanged; otherwise they are retrained and the cache is rewritten.
+
+    Raises:
+        ImportError if the ML libraries (or the extractor) are not installed
+    """
+    from analysis_tools.ml_dimension_extractor import MLDimensionExtractor
+
+    log = log or logger.info
+    extractor = MLDimensionExtractor(db_path)
+    fingerprint = training_fingerprint(db_path)
+    cache_path = os.path.join(os.path.dirname(os.path.abspath(db_path)), MODEL_CACHE_NAME)
+
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('fingerprint') == fingerprint:
+            extractor.models = cached['models']
+            extractor.feature_names = cached['feature_names']
+            log("[Secondary Fallback] Training data unchanged - using cached models")
+            return extractor
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError):
+        pass
+
+    log("[Secondary Fallback] Training data changed - training models...")
+    extractor.load_data()
+    extractor.train_all_models()
+    extractor.save_models()
+    try:
+        with open(cache_path, 'wb') as f:
+            pickle.dump({'fingerprint': fingerprint, 'models': extractor.models,
+                         'feature_names': extractor.feature_names}, f)
+    except OSError as e:
+        logger.warning(f"Could not write model cache {cache_path}: {e}")
+    log("[Secondary Fallback] Models trained successfully")
+    return extractor
+
+
+def fallback_features(extractor, parse_result, dimension: str) -> List[float]:
+    """Feature row for predicting one dimension of one parse result"""
+    features = extractor.extract_title_features(parse_result.title or "")
+
+    # G-code features
+    features['cb_from_gcode'] = parse_result.cb_from_gcode or 0
+    features['ob_from_gcode'] = parse_result.ob_from_gcode or 0
+
+    # Known dimensions for cross-prediction
+    features['known_od'] = (parse_result.outer_diameter or 0) if dimension != 'outer_diameter' else 0
+    features['known_cb'] = (parse_result.center_bore or 0) if dimension != 'center_bore' else 0
+    features['known_thickness'] = (parse_result.thickness or 0) if dimension != 'thickness' else 0
+
+    return [features.get(name, 0) for name in extractor.feature_names]
+
+
+def needs_fallback(parse_result) -> bool:
+    return any(not getattr(parse_result, dimension) for dimension in FALLBACK_DIMENSIONS)
+
+
+def predict_missing_dimensions(extractor, parse_results: Sequence) -> Dict[str, int]:
+    """
+    Fill missing OD / thickness / CB on parse results, one model call per
+    dimension.
+
+    Predicted values are written to the parse results, which are marked
+    'SECONDARY_FALLBACK' with a detection note per predicted dimension.
+
+    Returns:
+        dimension -> number of values predicted
+    """
+    import numpy as np
+
+    predicted = {}
+    for dimension in FALLBACK_DIMENSIONS:
+        predicted[dimension] = 0
+        model = extractor.models.get(dimension)
+        targets = [r for r in parse_results if not getattr(r, dimension)]
+        if not model or not targets:
+            continue
+        try:
+            matrix = np.array([fallback_features(extractor, r, dimension) for r in targets], dtype=float)
+            values = model.predict(matrix)
+        except Exception as e:
+            logger.warning(f"Secondary fallback failed for {dimension}: {e}")
+            continue
+
+        note = _NOTE_FORMATS[dimension]
+        for parse_result, value in zip(targets, values):
+            if not value:
+                continue
+            value = float(value)
+            setattr(parse_result, dimension, value)
+            parse_result.detection_confidence = 'SECONDARY_FALLBACK'
+            parse_result.detection_notes.append(note.format(value))
+            predicted[dimension] += 1
+    return predicted
@@ -0,0 +1,958 @@
+"""
+Streaming Excel/CSV Export
+Writes program exports row by row as the cursor yields them, into openpyxl
+write-only worksheets (or a flat CSV file), so an export never holds the
+result set or a grid of cell objects in memory.
+
+- Cell styles are registered once per workbook as named styles and shared
+  by every cell that uses them
+- Column widths and frozen header rows are set before the first row is
+  written (write-only sheets cannot be autosized afterwards)
+- One pass over a cursor can fill several sheets at once ("All Programs"
+  plus one sheet per round size)
+- LPN tracker / available number sheets are computed from the sorted list
+  of used program numbers (interval arithmetic), not by walking every
+  number in every range
+
+Export functions take an open sqlite3 connection and run fine in a
+background thread; progress(message) is called periodically and setting
+cancel_event aborts the export before anything is saved.
+"""
+
+import bisect
+import csv
+import json
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.datavalidation import DataValidation
+    HAS_OPENPYXL = True
+except ImportError:
+    openpyxl = None
+    HAS_OPENPYXL = False
+
+logger = logging.getLogger(__name__)
+
+
+# Rows between progress callbacks / cancellation checks
+PROGRESS_INTERVAL = 2000
+
+# Widest column written (characters)
+MAX_COLUMN_WIDTH = 50
+
+# Named styles: name -> spec (font kwargs, fill colour, alignment kwargs,
+# thin border, number format)
+STYLES: Dict[str, Dict] = {
+    'header': {'font': {'bold': True, 'color': 'FFFFFF'}, 'fill': '366092',
+               'alignment': {'horizontal': 'center', 'vertical': 'center'}},
+    'header_green': {'font': {'bold': True, 'color': 'FFFFFF'}, 'fill': '34A853',
+                     'alignment': {'horizontal': 'center', 'vertical': 'center'}},
+    'header_blue': {'font': {'bold': True, 'color': 'FFFFFF'}, 'fill': '4472C4',
+                    'alignment': {'horizontal': 'center', 'vertical': 'center'}},
+    'header_blue_border': {'font': {'bold': True, 'color': 'FFFFFF'}, 'fill': '4472C4',
+                           'alignment': {'horizontal': 'center', 'vertical': 'center'},
+                           'border': True},
+    'report_title': {'font': {'bold': True, 'size': 14, 'color': 'FFFFFF'}, 'fill': '1976D2'},
+    'bold': {'font': {'bold': True}},
+    'border': {'border': True},
+    # Alternating rows (Google Sheets export, LPN tracker)
+    'green_light': {'fill': 'E8F5E9'},
+    'green_medium': {'fill': 'C8E6C9'},
+    'available_light': {'fill': 'F5F5F5', 'font': {'color': '808080'}},
+    'available_medium': {'fill': 'E0E0E0', 'font': {'color': '808080'}},
+    'blue_light': {'fill': 'E3F2FD',
+                   'alignment': {'horizontal': 'left', 'vertical': 'top', 'wrap_text': True}},
+    'blue_medium': {'fill': 'BBDEFB',
+                    'alignment': {'horizontal': 'left', 'vertical': 'top', 'wrap_text': True}},
+    # Unused program numbers
+    'available': {'fill': 'C6EFCE', 'font': {'color': '006100'}},
+}
+
+# Row colours by validation status (filtered view export)
+STATUS_FILLS = {
+    'CRITICAL': 'FF6B6B',
+    'TOOL_HOME_CRITICAL': 'FF3333',
+    'BORE_WARNING': 'FFA500',
+    'TOOL_HOME_WARNING': 'FFBB44',
+    'DIMENSIONAL': 'DA77F2',
+    'WARNING': 'FFD43B',
+    'PASS': '69DB7C',
+}
+for _status, _color in STATUS_FILLS.items():
+    STYLES[f'status_{_status}'] = {'fill': _color, 'border': True}
+
+# Status column display text (Google Sheets export)
+STATUS_DISPLAY = {
+    'OK': 'OK',
+    'WARNING': 'Warning',
+    'TOOL_HOME_WARNING': 'Tool Home Warning',
+    'TOOL_HOME_CRITICAL': 'Tool Home Critical',
+    'CB_OB_WARNING': 'CB/OB Warning',
+    'MISMATCH': 'Mismatch',
+    'ERROR': 'Error',
+}
+
+# Standard round sizes with their own sheet: (sheet name, value)
+OD_SHEETS = (
+    ('5.75"', 5.75), ('6.00"', 6.00), ('6.25"', 6.25), ('6.50"', 6.50),
+    ('7.00"', 7.00), ('7.50"', 7.50), ('8.00"', 8.00), ('9.00"', 9.00),
+    ('9.50"', 9.50), ('10.00"', 10.00), ('13.00"', 13.00),
+)
+ROUND_SIZE_SHEETS = (
+    ('5.75"', 5.75), ('6.00"', 6.00), ('6.25"', 6.25), ('6.50"', 6.50),
+    ('7.00"', 7.00), ('7.50"', 7.50), ('8.00"', 8.00), ('8.50"', 8.50),
+    ('9.50"', 9.50), ('10.25"', 10.25), ('10.50"', 10.50), ('13.00"', 13.00),
+)
+OTHER_SIZES_SHEET = "Other Sizes"
+
+# Export by round size (export_csv): (column, header, width)
+PROGRAM_COLUMNS = (
+    ('program_number', 'Program #', 12),
+    ('title', 'Title', 50),
+    ('outer_diameter', 'OD (in)', 9),
+    ('spacer_type', 'Type', 14),
+    ('center_bore', 'CB (mm)', 9),
+    ('thickness', 'Thickness (in)', 15),
+    ('hub_diameter', 'Hub (mm)', 10),
+    ('hub_height', 'Hub Height (in)', 16),
+    ('counter_bore_diameter', 'Counterbore (mm)', 18),
+    ('counter_bore_depth', 'CB Depth (in)', 14),
+    ('material', 'Material', 12),
+    ('lathe', 'Lathe', 8),
+    ('validation_status', 'Status', 20),
+    ('detection_confidence', 'Confidence', 12),
+    ('last_modified', 'Last Modified', 22),
+)
+
+PROGRAM_ORDER_BY = """
+    CASE WHEN outer_diameter IS NULL THEN 1 ELSE 0 END,
+    outer_diameter,
+    spacer_type,
+    CASE WHEN center_bore IS NULL THEN 1 ELSE 0 END,
+    center_bore,
+    CASE WHEN thickness IS NULL THEN 1 ELSE 0 END,
+    thickness
+"""
+
+# Google Sheets export: (select expression, header, width)
+GOOGLE_COLUMNS = (
+    ('program_number', 'Program #', 12),
+    ('round_size', 'Round Size', 12),
+    ('thickness_display', 'Thickness', 11),
+    ('center_bore', 'CB (mm)', 10),
+    ('hub_diameter', 'OB (mm)', 10),
+    ('hub_height', 'Hub Height', 12),
+    ('hub_diameter AS hub_d_mm', 'Hub D (mm)', 12),
+    ('counter_bore_diameter', 'CB Diam (mm)', 14),
+    # CB depth in mm when the title gives the depth in mm
+    ("""CASE
+            WHEN counter_bore_depth IS NOT NULL AND (title LIKE '%MM B/C%' OR title LIKE '%MM DEEP%' OR title LIKE '%MM STEP%')
+            THEN ROUND(counter_bore_depth * 25.4, 1)
+            ELSE counter_bore_depth
+        END AS cb_depth_display""", 'CB Depth (in)', 14),
+    ('spacer_type', 'Type', 14),
+    ('title', 'Title', 50),
+    ('validation_status', 'Status', 18),
+    ("COALESCE(tool_home_issues, '') || COALESCE(bore_warnings, '') || "
+     "COALESCE(dimensional_issues, '') || COALESCE(validation_issues, '')", 'Warning Details', 50),
+)
+GOOGLE_STATUS_COL = 11
+GOOGLE_WARNINGS_COL = 12
+
+GOOGLE_ORDER_BY = """
+    CASE WHEN round_size IS NULL THEN 1 ELSE 0 END,
+    round_size,
+    CASE WHEN spacer_type IS NULL THEN 99 ELSE
+        CASE
+            WHEN LOWER(spacer_type) = 'standard' THEN 1
+            WHEN LOWER(spacer_type) = 'hub_centric' THEN 2
+            WHEN LOWER(spacer_type) = 'step' THEN 3
+            WHEN LOWER(spacer_type) LIKE '%steel%' THEN 4
+            WHEN LOWER(spacer_type) LIKE '%2pc%' THEN 5
+            ELSE 6
+        END
+    END,
+    CASE WHEN center_bore IS NULL THEN 1 ELSE 0 END,
+    center_bore,
+    CASE WHEN thickness IS NULL THEN 1 ELSE 0 END,
+    thickness
+"""
+
+LPN_HEADERS = ("Program #", "Round Size", "Title", "Type", "OD", "Thick",
+               "CB", "OB", "Status", "Last Modified")
+LPN_WIDTHS = (12, 12, 50, 14, 8, 8, 8, 8, 14, 22)
+
+# LPN tracker: numbers shown at each end of a range, around each gap, and
+# the largest gap shown in full
+LPN_RANGE_EDGE = 20
+LPN_GAP_EDGE = 10
+LPN_FULL_GAP = 20
+
+_PROGRAM_NUMBER_RE = re.compile(r'[oO]?(\d+)')
+_JSON_ARRAY_RE = re.compile(r'\[.*?\]')
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled before it was saved"""
+
+
+def require_openpyxl():
+    """Raise ImportError with install instructions when openpyxl is missing"""
+    if not HAS_OPENPYXL:
+        raise ImportError("openpyxl is required for Excel export (pip install openpyxl)")
+
+
+def program_number_value(program_number) -> Optional[int]:
+    """Numeric part of a program number ('o62500' -> 62500), None if there is none"""
+    match = _PROGRAM_NUMBER_RE.search(str(program_number))
+    return int(match.group(1)) if match else None
+
+
+def excel_value(value):
+    """None -> '', floats rounded to 2 places, everything else as text"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return round(value, 2)
+    return str(value)
+
+
+def warning_summary(raw) -> str:
+    """First three distinct messages from concatenated JSON issue arrays"""
+    raw = str(raw)
+    if not raw.startswith('['):
+        return ""
+    details = []
+    for array in _JSON_ARRAY_RE.findall(raw):
+        try:
+            items = json.loads(array)
+        except ValueError:
+            continue
+        if isinstance(items, list):
+            details.extend(items)
+    cleaned = []
+    for detail in details:
+        detail = str(detail).replace('WARNING: ', '').replace('CRITICAL: ', '').replace('REVIEW: ', '')
+        if detail and detail not in cleaned:
+            cleaned.append(detail)
+    return '; '.join(cleaned[:3])
+
+
+def format_number_ranges(intervals: Sequence[Tuple[int, int]], limit: int = 10) -> str:
+    """Format (start, end) intervals as 'o10000-o10004, o10007', at most `limit` shown"""
+    if not intervals:
+        return "None"
+    shown = [f"o{start:05d}" if start == end else f"o{start:05d}-o{end:05d}"
+             for start, end in intervals[:limit]]
+    if len(intervals) > limit:
+        return ", ".join(shown) + f" ... ({len(intervals) - limit} more)"
+    return ", ".join(shown)
+
+
+def free_intervals(used: Sequence[int], start: int, end: int) -> List[Tuple[int, int]]:
+    """Unused (start, end) intervals of [start, end] given sorted used numbers"""
+    intervals = []
+    lo = bisect.bisect_left(used, start)
+    hi = bisect.bisect_right(used, end)
+    previous = start - 1
+    for num in used[lo:hi]:
+        if num > previous + 1:
+            intervals.append((previous + 1, num - 1))
+        previous = num
+    if previous < end:
+        intervals.append((previous + 1, end))
+    return intervals
+
+
+def merge_intervals(intervals: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping/adjacent (start, end) intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def lpn_intervals(used: Sequence[int], ranges: Dict) -> List[Tuple[int, int]]:
+    """
+    Program numbers shown on the LPN tracker, as merged intervals.
+
+    Every used number, the first/last LPN_RANGE_EDGE numbers of each range,
+    and each gap between used numbers (in full up to LPN_FULL_GAP numbers,
+    otherwise LPN_GAP_EDGE numbers at each end).
+
+    Args:
+        used: Sorted, distinct used program numbers
+        ranges: get_round_size_ranges() mapping
+    """
+    intervals = [(num, num) for num in used]
+    for start, end, _ in ranges.values():
+        intervals.append((start, min(start + LPN_RANGE_EDGE - 1, end)))
+        intervals.append((max(end - LPN_RANGE_EDGE + 1, start), end))
+    for current, following in zip(used, used[1:]):
+        gap = following - current - 1
+        if gap <= 0:
+            continue
+        if gap <= LPN_FULL_GAP:
+            intervals.append((current + 1, following - 1))
+        else:
+            intervals.append((current + 1, current + LPN_GAP_EDGE))
+            intervals.append((following - LPN_GAP_EDGE, following - 1))
+    return merge_intervals(intervals)
+
+
+def restrict_to_programs(conn, program_numbers: Optional[Sequence[str]]) -> str:
+    """
+    Load program numbers into a temporary table for "current view" exports.
+
+    Returns:
+        SQL condition selecting only those programs ('' when program_numbers is None)
+    """
+    if program_numbers is None:
+        return ""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS export_view (program_number TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.export_view")
+    conn.executemany("INSERT OR IGNORE INTO temp.export_view VALUES (?)",
+                     ((p,) for p in program_numbers))
+    return "program_number IN (SELECT program_number FROM temp.export_view)"
+
+
+def _join_where(*conditions: str) -> str:
+    conditions = [c for c in conditions if c]
+    return f"WHERE {' AND '.join(f'({c})' for c in conditions)}" if conditions else ""
+
+
+class StreamingSheet:
+    """Write-only worksheet (or CSV file) that rows are appended to in order"""
+
+    def __init__(self, book, ws, float_format: Optional[str] = None):
+        self.book = book
+        self.ws = ws
+        self.float_format = float_format
+        self.rows = 0  # Rows appended, including the header
+
+    @property
+    def next_row(self) -> int:
+        """1-based row number the next append() writes"""
+        return self.rows + 1
+
+    def append(self, values: Sequence, style: Optional[str] = None):
+        """
+        Append one row.
+
+        Args:
+            values: Cell values
+            style: Named style applied to every cell (None = unstyled)
+        """
+        if style is None and self.float_format is None:
+            self.ws.append(values)
+        else:
+            cells = []
+            for value in values:
+                cell_style = style
+                if self.float_format and isinstance(value, float):
+                    cell_style = self.book.style(style, self.float_format)
+                cells.append(self.book.cell(self.ws, value, cell_style))
+            self.ws.append(cells)
+        self.rows += 1
+
+    def append_cells(self, values: Sequence, styles: Sequence[Optional[str]]):
+        """Append one row with a named style (or None) per cell"""
+        self.ws.append([self.book.cell(self.ws, value, style)
+                        for value, style in zip(values, styles)])
+        self.rows += 1
+
+
+class StreamingWorkbook:
+    """openpyxl write-only workbook with shared named styles"""
+
+    def __init__(self):
+        require_openpyxl()
+        self.wb = openpyxl.Workbook(write_only=True)
+        self._registered = set()
+        self._style_arrays = {}  # style name -> StyleArray shared by its cells
+
+    def style(self, name: Optional[str], number_format: Optional[str] = None) -> Optional[str]:
+        """
+        Register a named style on first use and return its name.
+
+        Args:
+            name: Key in STYLES (None = no style)
+            number_format: Optional number format combined with the style
+        """
+        if name is None and number_format is None:
+            return None
+        style_name = name or 'plain'
+        if number_format:
+            style_name = f"{style_name} {number_format}"
+        if style_name not in self._registered:
+            spec = dict(STYLES.get(name, {})) if name else {}
+            if number_format:
+                spec['number_format'] = number_format
+            self.wb.add_named_style(_named_style(style_name, spec))
+            self._registered.add(style_name)
+        return style_name
+
+    def cell(self, ws, value, style: Optional[str] = None):
+        """Value or styled WriteOnlyCell for ws.append()"""
+        if style is None:
+            return value
+        cell = WriteOnlyCell(ws, value=value)
+        style_array = self._style_arrays.get(style)
+        if style_array is None:
+            # Resolving a named style by name is the slow part of a styled
+            # cell - do it once per style and share the result
+            cell.style = self.style(style) if style in STYLES else style
+            self._style_arrays[style] = cell._style
+        else:
+            cell._style = style_array
+        return cell
+
+    def add_sheet(self, title: str, headers: Sequence[str] = None, widths: Sequence[float] = None,
+                  header_style: Optional[str] = 'header', freeze: Optional[str] = 'A2',
+                  float_format: Optional[str] = None) -> StreamingSheet:
+        """
+        Create a sheet (sheets appear in creation order).
+
+        Args:
+            title: Sheet name
+            headers: Header row (written immediately)
+            widths: Column widths in characters
+            header_style: Named style for the header row
+            freeze: Top-left unfrozen cell (None = no frozen panes)
+            float_format: Number format applied to float cells
+        """
+        ws = self.wb.create_sheet(title=title)
+        for col, width in enumerate(widths or (), start=1):
+            ws.column_dimensions[get_column_letter(col)].width = min(width, MAX_COLUMN_WIDTH)
+        if freeze:
+            ws.freeze_panes = freeze
+        sheet = StreamingSheet(self, ws, float_format)
+        if headers:
+            sheet.append(headers, self.style(header_style))
+        return sheet
+
+    @property
+    def sheet_count(self) -> int:
+        return len(self.wb.worksheets)
+
+    def save(self, path: str):
+        self.wb.save(path)
+
+
+class CsvSheet:
+    """CSV file with the StreamingSheet append() interface (styles ignored)"""
+
+    def __init__(self, f, headers: Sequence[str] = None):
+        self.writer = csv.writer(f)
+        self.rows = 0
+        if headers:
+            self.append(headers)
+
+    @property
+    def next_row(self) -> int:
+        return self.rows + 1
+
+    def append(self, values: Sequence, style: Optional[str] = None):
+        self.writer.writerow(values)
+        self.rows += 1
+
+    def append_cells(self, values: Sequence, styles: Sequence[Optional[str]]):
+        self.append(values)
+
+
+def _named_style(name: str, spec: Dict) -> 'NamedStyle':
+    style = NamedStyle(name=name)
+    if 'font' in spec:
+        style.font = Font(**spec['font'])
+    if 'fill' in spec:
+        style.fill = PatternFill(start_color=spec['fill'], end_color=spec['fill'], fill_type='solid')
+    if 'alignment' in spec:
+        style.alignment = Alignment(**spec['alignment'])
+    if spec.get('border'):
+        thin = Side(style='thin')
+        style.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    if 'number_format' in spec:
+        style.number_format = spec['number_format']
+    return style
+
+
+class _Progress:
+    """Rate-limited progress reporting and cancellation checks"""
+
+    def __init__(self, label: str, total: int = 0, progress: Callable = None, cancel_event=None):
+        self.label = label
+        self.total = total
+        self.count = 0
+        self.progress = progress
+        self.cancel_event = cancel_event
+
+    def step(self, n: int = 1):
+        self.count += n
+        if self.count % PROGRESS_INTERVAL < n:
+            self.check()
+            if self.progress:
+                total = f"/{self.total:,}" if self.total else ""
+                self.progress(f"{self.label}... {self.count:,}{total} rows")
+
+    def check(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ExportCancelled()
+
+
+def _size_groups(cursor, column: str, sheets: Sequence[Tuple[str, float]], where: str,
+                 params: Sequence) -> Tuple[List[str], Dict, int]:
+    """
+    Decide which sheets a grouped export needs before any row is written.
+
+    Returns:
+        (sheet names in order, {column value: sheet name}, total rows)
+    """
+    cursor.execute(f"SELECT {column}, COUNT(*) FROM programs {where} GROUP BY {column}", params)
+    counts = dict(cursor.fetchall())
+    standard = {value: name for name, value in sheets}
+    names = [name for name, value in sheets if value in counts]
+    sheet_for = {value: standard.get(value, OTHER_SIZES_SHEET) for value in counts}
+    if any(value not in standard for value in counts):
+        names.append(OTHER_SIZES_SHEET)
+    return names, sheet_for, sum(counts.values())
+
+
+def export_programs_by_od(conn, path: str, where: str = "", params: Sequence = (),
+                          program_numbers: Optional[Sequence[str]] = None,
+                          progress: Callable = None, cancel_event=None) -> Tuple[int, int]:
+    """
+    Export programs sorted by OD, type, CB and thickness.
+
+    .xlsx files get one sheet per standard OD plus "Other Sizes"; any other
+    extension is written as a single CSV file.
+
+    Args:
+        conn: sqlite3 connection
+        path: Output file
+        where: Optional SQL condition on programs
+        params: Parameters for where
+        program_numbers: Export only these programs (the current view)
+        progress: Optional callable(message)
+        cancel_event: Optional threading.Event
+
+    Returns:
+        (rows exported, sheets written)
+    """
+    cursor = conn.cursor()
+    where_sql = _join_where(where, restrict_to_programs(conn, program_numbers))
+    columns = ', '.join(column for column, _, _ in PROGRAM_COLUMNS)
+    headers = [header for _, header, _ in PROGRAM_COLUMNS]
+    widths = [width for _, _, width in PROGRAM_COLUMNS]
+    query = f"SELECT {columns} FROM programs {where_sql} ORDER BY {PROGRAM_ORDER_BY}"
+
+    if not path.lower().endswith('.xlsx'):
+        tracker = _Progress("Exporting", progress=progress, cancel_event=cancel_event)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            sheet = CsvSheet(f, headers)
+            for row in cursor.execute(query, params):
+                sheet.append(["" if value is None else value for value in row])
+                tracker.step()
+        return tracker.count, 1
+
+    names, sheet_for, total = _size_groups(cursor, 'outer_diameter', OD_SHEETS, where_sql, params)
+    tracker = _Progress("Exporting", total, progress, cancel_event)
+    book = StreamingWorkbook()
+    sheets = {name: book.add_sheet(name, headers, widths, float_format='0.00') for name in names}
+    if not sheets:
+        book.add_sheet("Programs", headers, widths)
+
+    for row in cursor.execute(query, params):
+        sheets[sheet_for[row[2]]].append([excel_value(value) for value in row])
+        tracker.step()
+
+    tracker.check()
+    if progress:
+        progress(f"Saving {tracker.count:,} rows...")
+    book.save(path)
+    return tracker.count, book.sheet_count
+
+
+def _google_row(row) -> List:
+    values = [excel_value(value) for value in row]
+    status = row[GOOGLE_STATUS_COL]
+    if status:
+        values[GOOGLE_STATUS_COL] = STATUS_DISPLAY.get(str(status), str(status))
+    warnings = row[GOOGLE_WARNINGS_COL]
+    values[GOOGLE_WARNINGS_COL] = warning_summary(warnings) if warnings else ""
+    return values
+
+
+def _alternate(sheet, light: str, medium: str) -> str:
+    return light if sheet.next_row % 2 == 0 else medium
+
+
+def export_google_workbook(conn, path: str, active_where: str, ranges: Dict, where: str = "",
+                           params: Sequence = (), program_numbers: Optional[Sequence[str]] = None,
+                           progress: Callable = None, cancel_event=None) -> Tuple[int, int]:
+    """
+    Export the Google Sheets workbook.
+
+    Sheets: All Programs, LPN Tracker, Available Numbers, one sheet per
+    standard round size, Other Sizes. The LPN tracker and available number
+    sheets always cover every active program, even for filtered exports.
+
+    Args:
+        conn: sqlite3 connection
+        path: Output .xlsx file
+        active_where: SQL condition selecting active (not deleted) programs
+        ranges: get_round_size_ranges() mapping
+        where: SQL condition for the program sheets (defaults to active_where)
+        params: Parameters for where
+        program_numbers: Export only these programs (the current view)
+        progress: Optional callable(message)
+        cancel_event: Optional threading.Event
+
+    Returns:
+        (rows exported, sheets written)
+    """
+    cursor = conn.cursor()
+    where_sql = _join_where(where or active_where, restrict_to_programs(conn, program_numbers))
+    names, sheet_for, total = _size_groups(cursor, 'round_size', ROUND_SIZE_SHEETS, where_sql, params)
+    headers = [header for _, header, _ in GOOGLE_COLUMNS]
+    widths = [width for _, _, width in GOOGLE_COLUMNS]
+
+    book = StreamingWorkbook()
+    all_sheet = book.add_sheet("All Programs", headers, widths, 'header_green', float_format='0.00')
+
+    # The summary sheets go second and third, so they are written first
+    used = used_program_numbers(conn, active_where)
+    write_lpn_tracker_sheet(book, conn, used, ranges, active_where, progress, cancel_event)
+    write_available_numbers_sheet(book, used, ranges)
+
+    sheets = {name: book.add_sheet(name, headers, widths, 'header_green', float_format='0.00')
+              for name in names}
+    tracker = _Progress("Exporting", total, progress, cancel_event)
+    columns = ', '.join(column for column, _, _ in GOOGLE_COLUMNS)
+    for row in cursor.execute(f"SELECT {columns} FROM programs {where_sql} ORDER BY {GOOGLE_ORDER_BY}",
+                              params):
+        values = _google_row(row)
+        all_sheet.append(values, _alternate(all_sheet, 'green_light', 'green_medium'))
+        sheet = sheets[sheet_for[row[1]]]
+        sheet.append(values, _alternate(sheet, 'green_light', 'green_medium'))
+        tracker.step()
+
+    tracker.check()
+    if progress:
+        progress(f"Saving {tracker.count:,} rows...")
+    book.save(path)
+    return tracker.count, book.sheet_count
+
+
+def used_program_numbers(conn, active_where: str) -> List[int]:
+    """Sorted, distinct numeric program numbers of active programs"""
+    used = set()
+    for (program_number,) in conn.execute(f"SELECT program_number FROM programs WHERE {active_where}"):
+        num = program_number_value(program_number)
+        if num is not None:
+            used.add(num)
+    return sorted(used)
+
+
+def _range_round_size(ranges: Dict) -> Callable[[int], Optional[float]]:
+    """Lookup number -> round size of the range containing it (0 for free ranges)"""
+    bounds = sorted((start, end, max(round_size, 0)) for round_size, (start, end, _) in ranges.items())
+    starts = [start for start, _, _ in bounds]
+
+    def round_size_for(num: int) -> Optional[float]:
+        i = bisect.bisect_right(starts, num) - 1
+        if i >= 0 and num <= bounds[i][1]:
+            return bounds[i][2]
+        return None
+
+    return round_size_for
+
+
+def write_lpn_tracker_sheet(book: StreamingWorkbook, conn, used: Sequence[int], ranges: Dict,
+                            active_where: str, progress: Callable = None, cancel_event=None) -> int:
+    """
+    Write the LPN (Lot Program Number) tracker sheet.
+
+    Existing programs with their details, plus available numbers at range
+    boundaries and around gaps (see lpn_intervals) in gray.
+
+    Program details are merged in from a cursor sorted like the numbers, so
+    only one row is held at a time.
+
+    Returns:
+        Rows written
+    """
+    sheet = book.add_sheet("LPN Tracker", LPN_HEADERS, LPN_WIDTHS, 'header_green', freeze=None)
+    round_size_for = _range_round_size(ranges)
+    tracker = _Progress("LPN tracker", progress=progress, cancel_event=cancel_event)
+
+    # Canonical 'oNNNNN' numbers sort numerically by (length, text)
+    details = conn.execute(f"""
+        SELECT program_number, round_size, title, spacer_type,
+               outer_diameter, thickness, center_bore, hub_diameter,
+               validation_status, last_modified
+        FROM programs
+        WHERE {active_where} AND program_number LIKE 'o%'
+        ORDER BY LENGTH(program_number), program_number
+    """)
+
+    def canonical_rows():
+        for row in details:
+            num = program_number_value(row[0])
+            if num is not None and row[0] == f"o{num:05d}":
+                yield num, row
+
+    rows = canonical_rows()
+    pending = next(rows, None)
+
+    for start, end in lpn_intervals(used, ranges):
+        for num in range(start, end + 1):
+            while pending is not None and pending[0] < num:
+                pending = next(rows, None)
+
+            if pending is not None and pending[0] == num:
+                row = pending[1]
+                values = [
+                    row[0],
+                    f"{row[1]:.2f}\"" if row[1] else "",
+                    row[2],
+                    row[3],
+                    f"{row[4]:.2f}" if row[4] else "",
+                    f"{row[5]:.3f}" if row[5] else "",
+                    f"{row[6]:.1f}" if row[6] else "",
+                    f"{row[7]:.1f}" if row[7] else "",
+                    row[8] or "OK",
+                    row[9] or "",
+                ]
+                style = _alternate(sheet, 'green_light', 'green_medium')
+            else:
+                round_size = round_size_for(num)
+                values = [f"o{num:05d}",
+                          f"{round_size:.2f}\"" if round_size and round_size > 0 else "",
+                          "—", "—", "", "", "", "", "AVAILABLE", ""]
+                style = _alternate(sheet, 'available_light', 'available_medium')
+            sheet.append(values, style)
+            tracker.step()
+
+    return sheet.rows - 1
+
+
+def write_available_numbers_sheet(book: StreamingWorkbook, used: Sequence[int], ranges: Dict) -> int:
+    """
+    Write the available numbers report: used/available counts and compact
+    available ranges per round size range.
+
+    Args:
+        book: Workbook to add the sheet to
+        used: Sorted, distinct used program numbers
+        ranges: get_round_size_ranges() mapping
+
+    Returns:
+        Ranges written
+    """
+    sheet = book.add_sheet("Available Numbers", widths=(15, 25, 15, 18, 60), freeze=None)
+    ws = sheet.ws
+    sheet.append_cells(["AVAILABLE PROGRAM NUMBERS REPORT"], ['report_title'])
+    ws.merged_cells.add('A1:E1')
+    sheet.append([])
+    sheet.append(["Round Size", "Range", "Used Count", "Available Count", "Available Ranges"],
+                 book.style('header_green'))
+
+    for round_size, (start, end, _) in sorted(ranges.items()):
+        lo = bisect.bisect_left(used, start)
+        hi = bisect.bisect_right(used, end)
+        used_count = hi - lo
+        total_count = end - start + 1
+
+        if round_size > 0:
+            round_size_display = f"{round_size:.2f}\""
+        elif round_size == 0:
+            round_size_display = "FREE 1"
+        else:
+            round_size_display = "FREE 2"
+
+        ws.row_dimensions[sheet.next_row].height = 30
+        sheet.append([
+            round_size_display,
+            f"o{start:05d} - o{end:05d}",
+            f"{used_count} / {total_count}",
+            total_count - used_count,
+            format_number_ranges(free_intervals(used, start, end)),
+        ], _alternate(sheet, 'blue_light', 'blue_medium'))
+
+    # Totals: every used number, available within the defined ranges
+    total_in_ranges = sum(end - start + 1 for start, end, _ in ranges.values())
+    sheet.append([])
+    sheet.append_cells(["TOTAL:", None, f"{len(used)}", f"{total_in_ranges - len(used)}"],
+                       ['bold', None, 'bold', 'bold'])
+    return len(ranges)
+
+
+def _piece_type(spacer_type: Optional[str]) -> str:
+    if spacer_type:
+        upper = spacer_type.upper()
+        if '2PC' in upper:
+            return '2PC'
+        if 'STEEL' in upper:
+            return 'STEEL'
+        if 'STEP' in upper:
+            return 'STEP'
+    return 'STD'
+
+
+def program_number_details(conn) -> Dict[int, Tuple]:
+    """
+    Number -> (program_number, od, thickness, cb, ob, hub/step depth, piece type)
+    for every program, including deleted ones.
+    """
+    existing = {}
+    for prog_num, od, thickness, thickness_display, cb, ob, hub_h, cb_depth, stype in conn.execute("""
+        SELECT program_number, outer_diameter, thickness, thickness_display,
+               center_bore, hub_diameter, hub_height, counter_bore_depth, spacer_type
+        FROM programs
+    """):
+        num = program_number_value(prog_num)
+        if num is None:
+            continue
+        # Hub/Step depth (hub_height for HC, counter_bore_depth for STEP)
+        hub_step = hub_h if hub_h else cb_depth if cb_depth else ''
+        thick_val = thickness_display if thickness_display else (thickness if thickness else '')
+        existing[num] = (prog_num, od, thick_val, cb, ob, hub_step, _piece_type(stype))
+    return existing
+
+
+def _range_label(round_size: float) -> object:
+    if round_size > 0:
+        return round_size
+    return "FREE" if round_size == 0 else "FREE2"
+
+
+def export_program_numbers(conn, path: str, ranges: Dict, progress: Callable = None,
+                           cancel_event=None) -> int:
+    """
+    Export every number of every round size range, existing or available.
+
+    .xlsx: "All Programs" (available numbers in green) and "Unused Numbers"
+    (with a Status dropdown), both written in one pass. Other extensions:
+    a single CSV of all numbers.
+
+    Returns:
+        Number of available program numbers
+    """
+    existing = program_number_details(conn)
+    ordered = sorted(ranges.items(), key=lambda item: item[1][0])
+    total = sum(end - start + 1 for _, (start, end, _) in ordered)
+    tracker = _Progress("Exporting", total, progress, cancel_event)
+    headers = ["Program #", "Round Size", "Thickness", "CB", "OB", "Hub/Step Depth", "Type"]
+    available_total = 0
+
+    def program_rows():
+        """(number, range label, range name, row for sheet 1 or None when available)"""
+        for round_size, (start, end, _) in ordered:
+            label = _range_label(round_size)
+            range_name = f"o{start:05d}-o{end:05d}"
+            for num in range(start, end + 1):
+                details = existing.get(num)
+                if details is None:
+                    yield num, label, range_name, None
+                else:
+                    prog_num, od, thick_val, cb, ob, hub_step, piece_type = details
+                    yield num, label, range_name, [
+                        prog_num,
+                        od if od else label,
+                        thick_val if thick_val else '',
+                        round(cb, 1) if cb else '',
+                        round(ob, 1) if ob else '',
+                        hub_step if hub_step else '',
+                        piece_type,
+                    ]
+                tracker.step()
+
+    if not path.lower().endswith('.xlsx'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            sheet = CsvSheet(f, headers)
+            for num, _, _, row in program_rows():
+                if row is None:
+                    sheet.append([f"o{num:05d}"] + ["AVAILABLE"] * 6)
+                    available_total += 1
+                else:
+                    sheet.append(row)
+        return available_total
+
+    book = StreamingWorkbook()
+    all_sheet = book.add_sheet("All Programs", headers, [15] * 7, 'header_blue', freeze=None)
+    unused_sheet = book.add_sheet("Unused Numbers",
+                                  ["Program #", "Round Size", "Range", "Date Added", "Status", "Notes"],
+                                  [12, 12, 18, 12, 12, 30], 'header_blue', freeze=None)
+    available_styles = [None] + ['available'] * 6
+
+    for num, label, range_name, row in program_rows():
+        if row is None:
+            prog_str = f"o{num:05d}"
+            all_sheet.append_cells([prog_str] + ["AVAILABLE"] * 6, available_styles)
+            unused_sheet.append([prog_str, label, range_name, '', 'Unused', ''])
+            available_total += 1
+        else:
+            all_sheet.append(row)
+
+    # One dropdown for the whole Status column
+    if available_total:
+        status_dropdown = DataValidation(type="list", formula1='"Unused,Created,Added,Issue"',
+                                         allow_blank=True)
+        status_dropdown.error = "Please select from the list"
+        status_dropdown.errorTitle = "Invalid Status"
+        status_dropdown.add(f"E2:E{available_total + 1}")
+        unused_sheet.ws.data_validations.append(status_dropdown)
+
+    tracker.check()
+    if progress:
+        progress("Saving...")
+    book.save(path)
+    return available_total
+
+
+def export_rows(path: str, title: str, headers: Sequence[str], rows: Sequence[Sequence],
+                status_column: Optional[int] = None, progress: Callable = None,
+                cancel_event=None) -> int:
+    """
+    Export rows already in memory (e.g. the results table) to one bordered
+    sheet, rows coloured by validation status.
+
+    Args:
+        path: Output .xlsx file
+        title: Sheet name
+        headers: Column headers
+        rows: Row values ('-' is written as an empty cell)
+        status_column: Index of the status column used for row colours
+
+    Returns:
+        Rows written
+    """
+    widths = [len(str(header)) for header in headers]
+    for row in rows:
+        for col, value in enumerate(row[:len(widths)]):
+            length = len(str(value))
+            if length > widths[col]:
+                widths[col] = length
+
+    book = StreamingWorkbook()
+    sheet = book.add_sheet(title, headers, [w + 2 for w in widths], 'header_blue_border')
+    tracker = _Progress("Exporting", len(rows), progress, cancel_event)
+    for row in rows:
+        status = row[status_column] if status_column is not None else None
+        style = f'status_{status}' if status in STATUS_FILLS else 'border'
+        sheet.append([value if value != "-" else "" for value in row], style)
+        tracker.step()
+
+    tracker.check()
+    book.save(path)
+    return len(rows)
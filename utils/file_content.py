@@ -0,0 +1,100 @@
+"""
+File Content
+Read-once access to program files for bulk operations.
+
+Import, duplicate scans and audits used to open the same file three or
+four times - once to hash it, once to parse it (text mode readlines), once
+for the M30 check and once for the internal O-number. FileContent reads
+the file once as bytes; the SHA256 hash, the decoded text and the lines
+are derived from that buffer on first use, so callers that need several
+of them pass the FileContent around instead of the path.
+
+Decoding matches how the parser has always read files (UTF-8, undecodable
+bytes dropped, universal newlines), so lines are identical to
+open(path, 'r', encoding='utf-8', errors='ignore').readlines().
+"""
+
+import hashlib
+import io
+import re
+from functools import cached_property
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Internal O-number: first matching line within the header
+INTERNAL_NUMBER_PATTERN = re.compile(r'^[oO](\d{4,})')
+INTERNAL_NUMBER_LINES = 10
+
+# Program end (M30, or M02) must appear in the last characters of the file
+PROGRAM_END_WINDOW = 500
+
+
+def internal_program_number(lines: List[str]) -> Optional[str]:
+    """Internal O-number from the first lines ('o96002'), or None"""
+    for line in lines[:INTERNAL_NUMBER_LINES]:
+        match = INTERNAL_NUMBER_PATTERN.match(line.strip())
+        if match:
+            return f"o{match.group(1)}"
+    return None
+
+
+def missing_program_end(text: str) -> bool:
+    """True if neither M30 nor M02 appears near the end of the program"""
+    tail = text[-PROGRAM_END_WINDOW:].upper()
+    return 'M30' not in tail and 'M02' not in tail
+
+
+class FileContent:
+    """One read of a program file; hash, text and lines come from the same bytes"""
+
+    def __init__(self, path: str, data: bytes):
+        self.path = path
+        self.data = data
+
+    @classmethod
+    def read(cls, path: str) -> 'FileContent':
+        """Read the whole file (raises OSError)"""
+        with open(path, 'rb') as f:
+            return cls(path, f.read())
+
+    @cached_property
+    def sha256(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+    @cached_property
+    def text(self) -> str:
+        """Decoded text with newlines normalized to \\n"""
+        text = self.data.decode('utf-8', errors='ignore')
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+    @cached_property
+    def lines(self) -> List[str]:
+        return io.StringIO(self.text, newline=None).readlines()
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def internal_program_number(self) -> Optional[str]:
+        return internal_program_number(self.lines)
+
+    def missing_program_end(self) -> bool:
+        return missing_program_end(self.text)
+
+
+def read_file_content(path: str) -> Optional[FileContent]:
+    """FileContent for path, or None (logged) if it cannot be read"""
+    try:
+        return FileContent.read(path)
+    except OSError as e:
+        logger.warning(f"File read error for {path}: {e}")
+        return None
+
+
+def file_sha256(path: str) -> Optional[str]:
+    """SHA256 hex digest of a file, or None if it cannot be read"""
+    content = read_file_content(path)
+    return content.sha256 if content else None
@@ -2,50 +2,340 @@
 G-Code Diff Engine
 Provides advanced comparison and highlighting for G-code files.
 
+Lines are normalized (whitespace, optionally N-numbers and comments) and
+interned to integer IDs, then aligned with a patience diff: lines that
+occur once in both files anchor the alignment, and the gaps between
+anchors are diffed with Myers' O(ND) algorithm. The result uses the same
+opcode format as difflib.SequenceMatcher, and the highlighting inserts
+each side in one call and applies every tag as one batch of ranges.
+
 Part of Phase 3: Version History & Archive Improvements
 """
 
-import difflib
+import re
 import tkinter as tk
-from typing import List, Tuple, Dict, Optional
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Gaps without unique anchor lines are Myers-diffed up to this many edits;
+# larger gaps are reported as one replaced block
+MAX_GAP_EDITS = 500
+
+_N_NUMBER = re.compile(r'^\s*N\d+', re.IGNORECASE)
+_COMMENT = re.compile(r'\([^)]*\)?|;.*$')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@dataclass(frozen=True)
+class DiffOptions:
+    """What counts as a difference"""
+    ignore_whitespace: bool = True      # "G01 X1.0" == "G01X1.0 "
+    ignore_line_numbers: bool = False   # N-number (block number) changes
+    ignore_comments: bool = False       # (comment) / ; comment changes
+
+
+DEFAULT_OPTIONS = DiffOptions()
+
+
+def normalize_line(line: str, options: DiffOptions = DEFAULT_OPTIONS) -> str:
+    """Comparison key for one G-code line"""
+    if options.ignore_line_numbers:
+        line = _N_NUMBER.sub('', line, count=1)
+    if options.ignore_comments:
+        line = _COMMENT.sub('', line)
+    if options.ignore_whitespace:
+        line = _WHITESPACE.sub('', line)
+    else:
+        line = line.rstrip('\r\n')
+    return line
+
+
+class LineInterner:
+    """Maps normalized lines to integer IDs; share one across related diffs"""
+
+    def __init__(self, options: DiffOptions = DEFAULT_OPTIONS):
+        self.options = options
+        self.ids: Dict[str, int] = {}
+
+    def encode(self, lines: Sequence[str]) -> List[int]:
+        ids = self.ids
+        encoded = []
+        for line in lines:
+            key = normalize_line(line, self.options)
+            line_id = ids.get(key)
+            if line_id is None:
+                line_id = ids[key] = len(ids)
+            encoded.append(line_id)
+        return encoded
+
+
+def _myers_matches(a: Sequence[int], b: Sequence[int], max_edits: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Matched (i, j) pairs of a shortest edit script (Myers), or None if more
+    than max_edits edits are needed.
+    """
+    n, m = len(a), len(b)
+    max_edits = min(max_edits, n + m)
+    offset = max_edits + 1
+    v = [0] * (2 * offset + 1)
+    trace = []
+    for d in range(max_edits + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                trace.append(v[offset - d - 1:offset + d + 2])
+                return _myers_backtrack(trace, n, m)
+        # Diagonals -(d+1)..d+1, indexed from 0
+        trace.append(v[offset - d - 1:offset + d + 2])
+    return None
+
+
+def _myers_backtrack(trace: List[List[int]], n: int, m: int) -> List[Tuple[int, int]]:
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, 0, -1):
+        previous = trace[d - 1]  # diagonals -d..d
+        k = x - y
+        if k == -d or (k != d and previous[k - 1 + d] < previous[k + 1 + d]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = previous[prev_k + d]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        matches.append((x, y))
+    matches.reverse()
+    return matches
+
+
+def _unique_anchors(a: Sequence[int], b: Sequence[int], alo: int, ahi: int,
+                    blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """Longest increasing run of lines that occur exactly once in both ranges"""
+    counts_a = Counter(a[alo:ahi])
+    counts_b = Counter(b[blo:bhi])
+    position_b = {b[j]: j for j in range(blo, bhi) if counts_b[b[j]] == 1}
+    candidates = [(i, position_b[a[i]]) for i in range(alo, ahi)
+                  if counts_a[a[i]] == 1 and a[i] in position_b]
+    if not candidates:
+        return []
+
+    # Patience sorting: longest subsequence increasing in b
+    tails: List[int] = []        # smallest b position ending a run of each length
+    tail_index: List[int] = []   # candidate index of that tail
+    previous = [-1] * len(candidates)
+    for index, (_, j) in enumerate(candidates):
+        length = bisect_left(tails, j)
+        if length == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[length] = j
+            tail_index[length] = index
+        previous[index] = tail_index[length - 1] if length else -1
+
+    anchors = []
+    index = tail_index[-1]
+    while index >= 0:
+        anchors.append(candidates[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def matching_pairs(a: Sequence[int], b: Sequence[int],
+                   max_gap_edits: int = MAX_GAP_EDITS) -> List[Tuple[int, int]]:
+    """Aligned (i, j) index pairs of equal lines, increasing in both"""
+    pairs = []
+    pending = [(0, len(a), 0, len(b))]
+    while pending:
+        alo, ahi, blo, bhi = pending.pop()
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            pairs.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            pairs.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                pending.append((alo, i, blo, j))
+                pairs.append((i, j))
+                alo, blo = i + 1, j + 1
+            pending.append((alo, ahi, blo, bhi))
+        else:
+            matches = _myers_matches(a[alo:ahi], b[blo:bhi], max_gap_edits)
+            if matches:
+                pairs.extend((alo + i, blo + j) for i, j in matches)
+    pairs.sort()
+    return pairs
+
+
+def opcodes_from_pairs(pairs: Sequence[Tuple[int, int]], n: int, m: int) -> List[Tuple]:
+    """difflib-style (tag, i1, i2, j1, j2) opcodes from aligned pairs"""
+    opcodes = []
+    i = j = 0
+    for ai, bj in list(pairs) + [(n, m)]:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, j))
+        elif j < bj:
+            opcodes.append(('insert', i, i, j, bj))
+        if ai == n and bj == m:
+            break
+        if opcodes and opcodes[-1][0] == 'equal' and opcodes[-1][2] == ai and opcodes[-1][4] == bj:
+            tag, i1, _, j1, _ = opcodes[-1]
+            opcodes[-1] = (tag, i1, ai + 1, j1, bj + 1)
+        else:
+            opcodes.append(('equal', ai, ai + 1, bj, bj + 1))
+        i, j = ai + 1, bj + 1
+    return opcodes
+
+
+def diff_sequences(lines1: Sequence[str], lines2: Sequence[str],
+                   options: DiffOptions = DEFAULT_OPTIONS,
+                   interner: Optional[LineInterner] = None) -> List[Tuple]:
+    """Opcodes for two line lists"""
+    interner = interner or LineInterner(options)
+    a = interner.encode(lines1)
+    b = interner.encode(lines2)
+    return opcodes_from_pairs(matching_pairs(a, b), len(a), len(b))
+
+
+@lru_cache(maxsize=32)
+def _cached_opcodes(content1: str, content2: str, options: DiffOptions) -> Tuple[Tuple, ...]:
+    # Comparison windows diff the same pair for several tabs
+    return tuple(diff_sequences(content1.splitlines(), content2.splitlines(), options))
+
+
+def stats_from_opcodes(opcodes: Sequence[Tuple]) -> Dict[str, int]:
+    """additions / deletions / changes / equal line counts"""
+    stats = {
+        'additions': 0,
+        'deletions': 0,
+        'changes': 0,
+        'equal': 0
+    }
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            stats['equal'] += (i2 - i1)
+        elif tag == 'replace':
+            stats['changes'] += max(i2 - i1, j2 - j1)
+        elif tag == 'delete':
+            stats['deletions'] += (i2 - i1)
+        elif tag == 'insert':
+            stats['additions'] += (j2 - j1)
+    return stats
+
+
+def line_ranges(line_spans: Sequence[Tuple[int, int]], first_line: int = 1,
+                whole_lines: bool = True) -> List[str]:
+    """
+    Flat Tk index list for tag_add(tag, *ranges).
+
+    Args:
+        line_spans: (start, end) 0-based line spans, end exclusive
+        first_line: Text widget line number of line 0
+        whole_lines: Include each line's newline (full-width background);
+            otherwise every line is tagged from .0 to .end
+    """
+    ranges = []
+    for start, end in line_spans:
+        if end <= start:
+            continue
+        if whole_lines:
+            ranges.extend((f"{start + first_line}.0", f"{end + first_line}.0"))
+        else:
+            for line in range(start + first_line, end + first_line):
+                ranges.extend((f"{line}.0", f"{line}.end"))
+    return ranges
 
 
 class GCodeDiffEngine:
     """Engine for comparing G-code files and highlighting differences"""
 
     @staticmethod
-    def diff_lines(content1: str, content2: str) -> List[Tuple]:
+    def diff_lines(content1: str, content2: str,
+                   options: DiffOptions = DEFAULT_OPTIONS) -> List[Tuple]:
         """
-        Perform line-by-line diff using Python's difflib.
+        Perform line-by-line diff.
 
         Args:
             content1: First file content as string
             content2: Second file content as string
+            options: Normalization (whitespace, N-numbers, comments)
 
         Returns:
-            List of opcodes from SequenceMatcher:
+            List of opcodes in SequenceMatcher format:
             Each tuple is (tag, i1, i2, j1, j2) where:
             - tag: 'replace', 'delete', 'insert', or 'equal'
             - i1, i2: Range in first sequence
             - j1, j2: Range in second sequence
         """
-        lines1 = content1.splitlines(keepends=True)
-        lines2 = content2.splitlines(keepends=True)
+        return list(_cached_opcodes(content1, content2, options))
 
-        matcher = difflib.SequenceMatcher(None, lines1, lines2)
-        return matcher.get_opcodes()
+    @staticmethod
+    def diff_hunks(content1: str, content2: str,
+                   options: DiffOptions = DEFAULT_OPTIONS) -> List[Tuple]:
+        """Only the changed ranges (non-'equal' opcodes)"""
+        return [op for op in _cached_opcodes(content1, content2, options) if op[0] != 'equal']
+
+    @staticmethod
+    def diff_versions(content: str, versions: Sequence[str],
+                      options: DiffOptions = DEFAULT_OPTIONS) -> List[Dict[str, int]]:
+        """
+        Statistics for one program against each of its versions; the
+        program's lines are normalized and interned once for all of them.
+        """
+        interner = LineInterner(options)
+        base = interner.encode(content.splitlines())
+        results = []
+        for version in versions:
+            other = interner.encode(version.splitlines())
+            opcodes = opcodes_from_pairs(matching_pairs(other, base), len(other), len(base))
+            results.append(stats_from_opcodes(opcodes))
+        return results
 
     @staticmethod
     def highlight_changes(text_widget1: tk.Text, text_widget2: tk.Text,
-                         content1: str, content2: str) -> Dict[str, int]:
+                         content1: str, content2: str,
+                         options: DiffOptions = DEFAULT_OPTIONS) -> Dict[str, int]:
         """
         Apply color highlighting to differences in two text widgets.
 
+        Both sides are padded with blank lines so that matching lines stay
+        on the same row.
+
         Args:
             text_widget1: First text widget (left/old version)
             text_widget2: Second text widget (right/new version)
             content1: Content for first widget
             content2: Content for second widget
+            options: Normalization (whitespace, N-numbers, comments)
 
         Returns:
             Dictionary with statistics:
@@ -55,103 +345,74 @@ class GCodeDiffEngine:
             - equal: Number of unchanged lines
         """
         # Configure tags for highlighting
-        text_widget1.tag_configure("added", background="#1b5e20", foreground="#a5d6a7")
-        text_widget1.tag_configure("deleted", background="#7f0000", foreground="#ef9a9a")
-        text_widget1.tag_configure("changed", background="#5a3a00", foreground="#ffcc80")
-        text_widget1.tag_configure("equal", background="#2b2b2b", foreground="#ffffff")
-
-        text_widget2.tag_configure("added", background="#1b5e20", foreground="#a5d6a7")
-        text_widget2.tag_configure("deleted", background="#7f0000", foreground="#ef9a9a")
-        text_widget2.tag_configure("changed", background="#5a3a00", foreground="#ffcc80")
-        text_widget2.tag_configure("equal", background="#2b2b2b", foreground="#ffffff")
+        for widget in (text_widget1, text_widget2):
+            widget.tag_configure("added", background="#1b5e20", foreground="#a5d6a7")
+            widget.tag_configure("deleted", background="#7f0000", foreground="#ef9a9a")
+            widget.tag_configure("changed", background="#5a3a00", foreground="#ffcc80")
+            widget.tag_configure("equal", background="#2b2b2b", foreground="#ffffff")
 
         # Clear widgets
         text_widget1.delete('1.0', tk.END)
         text_widget2.delete('1.0', tk.END)
 
-        # Get opcodes
-        opcodes = GCodeDiffEngine.diff_lines(content1, content2)
-        lines1 = content1.splitlines(keepends=True)
-        lines2 = content2.splitlines(keepends=True)
-
-        # Statistics
-        stats = {
-            'additions': 0,
-            'deletions': 0,
-            'changes': 0,
-            'equal': 0
-        }
+        opcodes = GCodeDiffEngine.diff_lines(content1, content2, options)
+        lines1 = content1.splitlines()
+        lines2 = content2.splitlines()
+
+        # Build both sides as line lists plus tagged row spans, then insert once
+        out1: List[str] = []
+        out2: List[str] = []
+        spans = {side: {'added': [], 'deleted': [], 'changed': [], 'equal': []} for side in (1, 2)}
+
+        def emit(out, side, lines, tag, rows):
+            start = len(out)
+            out.extend(lines)
+            out.extend([''] * (rows - len(lines)))
+            if lines:
+                spans[side][tag].append((start, start + len(lines)))
+            if rows > len(lines):
+                spans[side]['equal'].append((start + len(lines), start + rows))
 
-        # Process each opcode
         for tag, i1, i2, j1, j2 in opcodes:
+            rows = max(i2 - i1, j2 - j1)
             if tag == 'equal':
-                # Lines are the same
-                for line in lines1[i1:i2]:
-                    text_widget1.insert(tk.END, line, "equal")
-                for line in lines2[j1:j2]:
-                    text_widget2.insert(tk.END, line, "equal")
-                stats['equal'] += (i2 - i1)
-
+                emit(out1, 1, lines1[i1:i2], 'equal', rows)
+                emit(out2, 2, lines2[j1:j2], 'equal', rows)
             elif tag == 'replace':
-                # Lines were changed
-                for line in lines1[i1:i2]:
-                    text_widget1.insert(tk.END, line, "changed")
-                for line in lines2[j1:j2]:
-                    text_widget2.insert(tk.END, line, "changed")
-                stats['changes'] += max(i2 - i1, j2 - j1)
-
+                emit(out1, 1, lines1[i1:i2], 'changed', rows)
+                emit(out2, 2, lines2[j1:j2], 'changed', rows)
             elif tag == 'delete':
-                # Lines were deleted
-                for line in lines1[i1:i2]:
-                    text_widget1.insert(tk.END, line, "deleted")
-                # Add blank lines to widget2 for alignment
-                for _ in range(i2 - i1):
-                    text_widget2.insert(tk.END, "\n", "equal")
-                stats['deletions'] += (i2 - i1)
-
+                emit(out1, 1, lines1[i1:i2], 'deleted', rows)
+                emit(out2, 2, [], 'equal', rows)
             elif tag == 'insert':
-                # Lines were added
-                # Add blank lines to widget1 for alignment
-                for _ in range(j2 - j1):
-                    text_widget1.insert(tk.END, "\n", "equal")
-                for line in lines2[j1:j2]:
-                    text_widget2.insert(tk.END, line, "added")
-                stats['additions'] += (j2 - j1)
+                emit(out1, 1, [], 'equal', rows)
+                emit(out2, 2, lines2[j1:j2], 'added', rows)
 
-        return stats
+        for widget, out, side in ((text_widget1, out1, 1), (text_widget2, out2, 2)):
+            if out:
+                widget.insert('1.0', '\n'.join(out) + '\n')
+            for tag, tag_spans in spans[side].items():
+                ranges = line_ranges(tag_spans)
+                if ranges:
+                    widget.tag_add(tag, *ranges)
+
+        return stats_from_opcodes(opcodes)
 
     @staticmethod
-    def get_diff_stats(content1: str, content2: str) -> Dict[str, int]:
+    def get_diff_stats(content1: str, content2: str,
+                       options: DiffOptions = DEFAULT_OPTIONS) -> Dict[str, int]:
         """
         Get statistics about differences without rendering.
 
         Args:
             content1: First file content
             content2: Second file content
+            options: Normalization (whitespace, N-numbers, comments)
 
         Returns:
             Dictionary with additions, deletions, changes, equal counts
         """
-        opcodes = GCodeDiffEngine.diff_lines(content1, content2)
-
-        stats = {
-            'additions': 0,
-            'deletions': 0,
-            'changes': 0,
-            'equal': 0
-        }
-
-        for tag, i1, i2, j1, j2 in opcodes:
-            if tag == 'equal':
-                stats['equal'] += (i2 - i1)
-            elif tag == 'replace':
-                stats['changes'] += max(i2 - i1, j2 - j1)
-            elif tag == 'delete':
-                stats['deletions'] += (i2 - i1)
-            elif tag == 'insert':
-                stats['additions'] += (j2 - j1)
-
-        return stats
+        return stats_from_opcodes(GCodeDiffEngine.diff_lines(content1, content2, options))
 
 
 class DimensionExtractor:
@@ -3,10 +3,45 @@ G-Code File Scanner Module
 Scans G-code files for issues without importing to database
 
 Extracted from test_phase1/file_scanner_test.py for integration into main application
+
+Folder scans (scan_files) run on a process pool and yield each file's
+results as soon as it is scanned. Files are read a chunk at a time and each
+chunk goes to the pool as soon as it is read, so parsing starts while later
+files are still being read. Files whose content matches a program already
+in the database are answered from that program's stored parse results
+without being parsed again; they come out as soon as their chunk is read.
 """
 
-from typing import Dict
+import json
+import os
+import sqlite3
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from typing import Dict, Iterator, List, Optional, Sequence
+import logging
+
 from improved_gcode_parser import ImprovedGCodeParser
+from utils.analysis_runner import STORED_ISSUE_FIELDS, default_workers, stored_parse_result
+from utils.file_content import FileContent
+
+logger = logging.getLogger(__name__)
+
+
+# Files per worker call - small, so the first results arrive quickly
+SCAN_CHUNK_SIZE = 8
+
+# Chunks read ahead of the pool, per worker (bounds the file data in memory)
+SCAN_CHUNKS_AHEAD = 2
+
+# Severity order of scan results (scan_severity)
+SEVERITY_CRASH = 0
+SEVERITY_ERROR = 1
+SEVERITY_WARNING = 2
+SEVERITY_PASS = 3
+
+# programs columns a stored scan result is rebuilt from (besides the issue lists)
+STORED_SCAN_COLUMNS = ('program_number', 'title', 'spacer_type', 'material', 'outer_diameter',
+                       'thickness', 'thickness_display', 'center_bore', 'hub_diameter', 'hub_height',
+                       'counter_bore_diameter', 'counter_bore_depth', 'tool_home_issues', 'tools_used')
 
 
 class FileScanner:
@@ -49,12 +84,14 @@ class FileScanner:
     def __init__(self):
         self.parser = ImprovedGCodeParser()
 
-    def scan_file_for_issues(self, file_path: str) -> Dict:
+    def scan_file_for_issues(self, file_path: str, parse_result=None, content=None) -> Dict:
         """
         Scan a G-code file for issues without importing
 
         Args:
             file_path: Path to G-code file
+            parse_result: Parse result already produced for file_path (skips re-parsing)
+            content: FileContent already read for file_path (optional)
 
         Returns:
             dict with keys:
@@ -83,8 +120,9 @@ class FileScanner:
         }
 
         try:
-            # Parse file
-            parse_result = self.parser.parse_file(file_path)
+            # Parse file (unless the caller already did)
+            if parse_result is None:
+                parse_result = self.parser.parse_file(file_path, content=content)
             results['raw_data'] = parse_result
             results['success'] = True
 
@@ -257,3 +295,220 @@ class FileScanner:
             })
 
         return results
+
+
+def scan_severity(results: Dict) -> tuple:
+    """
+    Sort key putting the most serious results first: crash risks, other
+    errors, warnings, then passes (more issues first, then by file name).
+    """
+    errors = results.get('errors') or []
+    warnings = results.get('warnings') or []
+    if any(e.get('category') == 'Crash Prevention' for e in errors):
+        rank = SEVERITY_CRASH
+    elif errors:
+        rank = SEVERITY_ERROR
+    elif warnings:
+        rank = SEVERITY_WARNING
+    else:
+        rank = SEVERITY_PASS
+    return (rank, -len(errors), -len(warnings), os.path.basename(results.get('file_path', '')).lower())
+
+
+def failed_scan_result(file_path: str, message: str) -> Dict:
+    """Results for a file that could not be scanned"""
+    return {
+        'file_path': file_path,
+        'success': False,
+        'program_number': '',
+        'round_size': None,
+        'errors': [{'category': 'scan_error', 'message': message}],
+        'warnings': [],
+        'suggestions': [],
+    }
+
+
+def _json_list(raw) -> list:
+    try:
+        value = json.loads(raw) if raw else []
+    except (TypeError, ValueError):
+        return []
+    return value if isinstance(value, list) else []
+
+
+def _stored_rows(conn: sqlite3.Connection, hashes: Sequence[str]) -> Dict[str, Dict]:
+    """content_hash -> stored programs row, for programs that have been parsed"""
+    columns = STORED_SCAN_COLUMNS + STORED_ISSUE_FIELDS
+    rows = {}
+    hashes = list(hashes)
+    for i in range(0, len(hashes), 500):
+        batch = hashes[i:i + 500]
+        query = f"""
+            SELECT content_hash, {', '.join(columns)} FROM programs
+            WHERE content_hash IN ({', '.join('?' * len(batch))})
+              AND validation_status IS NOT NULL
+              AND (is_deleted IS NULL OR is_deleted = 0)
+        """
+        for row in conn.execute(query, batch):
+            rows.setdefault(row[0], dict(zip(columns, row[1:])))
+    return rows
+
+
+def _stored_parse_result(stored: Dict):
+    """Parse-result stand-in for scan_file_for_issues built from a programs row"""
+    parse_result = stored_parse_result(stored)
+    for column in STORED_SCAN_COLUMNS:
+        setattr(parse_result, column, stored.get(column))
+    parse_result.tool_home_issues = _json_list(stored.get('tool_home_issues'))
+    parse_result.tools_used = _json_list(stored.get('tools_used'))
+    parse_result.pcodes_found = []
+    return parse_result
+
+
+_worker_scanner = None
+
+
+def _scan_job(scanner: 'FileScanner', file_path: str, data: bytes) -> Dict:
+    try:
+        results = scanner.scan_file_for_issues(file_path, content=FileContent(file_path, data))
+    except Exception as e:
+        return failed_scan_result(file_path, str(e))
+    results['file_path'] = file_path
+    results['raw_data'] = None  # Not needed by the results dialog; keeps worker results small
+    return results
+
+
+def _scan_chunk(jobs: List[tuple]) -> List[Dict]:
+    """Worker: scan a chunk of (file_path, data) jobs (module level so it can be pickled)"""
+    global _worker_scanner
+    if _worker_scanner is None:
+        _worker_scanner = FileScanner()
+    return [_scan_job(_worker_scanner, file_path, data) for file_path, data in jobs]
+
+
+def scan_files(file_paths: Sequence[str], db_path: Optional[str] = None,
+               max_workers: Optional[int] = None, cancel_event=None) -> Iterator[Dict]:
+    """
+    Scan many files for issues, yielding each file's results as it finishes.
+
+    Files are read SCAN_CHUNK_SIZE at a time; each file is read once here and
+    its bytes go to the workers, so it is not opened again for parsing. Each
+    chunk's stored results are looked up and yielded, and the rest of the
+    chunk is submitted to the pool, before the next chunk is read. Results
+    come out in completion order - sort them with scan_severity.
+
+    Args:
+        file_paths: Files to scan
+        db_path: Database whose stored parse results are reused for files
+            with a matching content hash (None parses every file)
+        max_workers: Worker processes (default: CPU count - 1); 1 scans
+            in this process
+        cancel_event: Optional threading.Event; pending files are dropped
+            once it is set
+
+    Yields:
+        scan_file_for_issues results with 'file_path' set; results reused
+        from the database also carry 'stored_program' (the matching
+        program number)
+    """
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    conn = None
+    if db_path:
+        try:
+            conn = sqlite3.connect(db_path, timeout=10.0)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read stored scan results, parsing every file: {e}")
+
+    scanner = FileScanner()
+
+    def read_chunks():
+        """(results ready now, (file_path, data) jobs to parse) per chunk of files"""
+        nonlocal conn
+        for i in range(0, len(file_paths), SCAN_CHUNK_SIZE):
+            ready = []
+            contents = []
+            for file_path in file_paths[i:i + SCAN_CHUNK_SIZE]:
+                if cancelled():
+                    return
+                try:
+                    contents.append((file_path, FileContent.read(file_path)))
+                except OSError as e:
+                    ready.append(failed_scan_result(file_path, str(e)))
+
+            stored = {}
+            if conn is not None and contents:
+                try:
+                    stored = _stored_rows(conn, {content.sha256 for _, content in contents})
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not read stored scan results, parsing every file: {e}")
+                    conn.close()
+                    conn = None
+
+            jobs = []
+            for file_path, content in contents:
+                row = stored.get(content.sha256)
+                if row is None:
+                    jobs.append((file_path, content.data))
+                    continue
+                results = scanner.scan_file_for_issues(file_path, parse_result=_stored_parse_result(row))
+                results['file_path'] = file_path
+                results['raw_data'] = None
+                results['stored_program'] = row['program_number']
+                ready.append(results)
+            yield ready, jobs
+
+    if max_workers is None:
+        max_workers = default_workers()
+
+    try:
+        if max_workers <= 1 or len(file_paths) <= SCAN_CHUNK_SIZE:
+            for ready, jobs in read_chunks():
+                for results in ready + [_scan_job(scanner, file_path, data) for file_path, data in jobs]:
+                    if cancelled():
+                        return
+                    yield results
+            return
+
+        pending = {}
+
+        def chunk_results(future):
+            jobs = pending.pop(future)
+            try:
+                return future.result()
+            except Exception as e:
+                logger.error(f"Scan worker failed: {e}")
+                return [failed_scan_result(file_path, str(e)) for file_path, _ in jobs]
+
+        chunks = -(-len(file_paths) // SCAN_CHUNK_SIZE)
+        with ProcessPoolExecutor(max_workers=min(max_workers, chunks)) as executor:
+            try:
+                for ready, jobs in read_chunks():
+                    if jobs:
+                        pending[executor.submit(_scan_chunk, jobs)] = jobs
+
+                    # Hand back what the pool has finished; wait for it when
+                    # reading has got too far ahead
+                    done = [future for future in pending if future.done()]
+                    if not done and len(pending) >= max_workers * SCAN_CHUNKS_AHEAD:
+                        done = wait(pending, return_when=FIRST_COMPLETED).done
+                    for future in done:
+                        ready.extend(chunk_results(future))
+
+                    for results in ready:
+                        if cancelled():
+                            return
+                        yield results
+
+                for future in as_completed(list(pending)):
+                    for results in chunk_results(future):
+                        if cancelled():
+                            return
+                        yield results
+            finally:
+                for future in pending:
+                    future.cancel()
+    finally:
+        if conn is not None:
+            conn.close()
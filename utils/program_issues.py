@@ -0,0 +1,309 @@
+"""
+Program Issues
+Structured, indexed validation issues for the programs table.
+
+The parser and validators report issues as message strings grouped by
+severity (validation_issues, crash_warnings, ...), and the programs table
+stores those lists as text. This module turns each message into a
+structured issue - stable issue code, severity, line number and source
+validator - and keeps them in the indexed program_issues table, so
+filtering by issue type is an index lookup and per-type counts are a
+single GROUP BY instead of LIKE scans over seven text columns.
+
+The table is kept current two ways:
+- Import/rescan paths that have a parse result call store_program_issues()
+  with the parser's structured issues (exact source validator)
+- Triggers on programs queue every other insert/update/rename/delete in
+  program_issues_pending; sync_program_issues() re-derives those rows from
+  the stored text columns
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Issue list fields (GCodeParseResult attribute == programs column) and the
+# severity they carry, in the same priority order as validation_status
+ISSUE_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ('crash_issues', 'CRASH_RISK'),
+    ('validation_issues', 'CRITICAL'),
+    ('tool_home_issues', 'TOOL_HOME_WARNING'),  # CRITICAL: prefix -> TOOL_HOME_CRITICAL
+    ('crash_warnings', 'CRASH_WARNING'),
+    ('bore_warnings', 'BORE_WARNING'),
+    ('dimensional_issues', 'DIMENSIONAL'),
+    ('validation_warnings', 'WARNING'),
+)
+
+# (issue code, filter label, default source validator, pattern)
+# First match wins, so specific patterns come before general ones.
+ISSUE_CODES: Tuple[Tuple[str, str, str, str], ...] = (
+    # --- Crash / Safety ---
+    ('RAPID_TO_NEGATIVE_Z', "G00 rapid to negative Z", 'crash_prevention', r'CRASH RISK - (?!Diagonal).*rapid to Z|G00 rapid to Z'),
+    ('DIAGONAL_RAPID', "Diagonal rapid", 'crash_prevention', r'diagonal'),
+    ('TOOL_HOME_NEGATIVE_Z', "Z before G53 tool home", 'crash_prevention', r'G53 tool home with Z|Z before G53|negative Z before tool home'),
+    ('WORK_OFFSET_LOW_Z', "Work offset approach below Z1", 'crash_prevention', r'Work offset approach'),
+    ('JAW_CLEARANCE_CRITICAL', "Jaw clearance critical", 'crash_prevention', r'JAW CLEARANCE CRITICAL'),
+    ('JAW_CLEARANCE_CAUTION', "Jaw clearance caution", 'crash_prevention', r'JAW CLEARANCE'),
+    ('BORE_CHAMFER_CRASH', "Bore chamfer crash risk", 'bore_chamfer_safety', r'BORE CHAMFER CRASH|Bore chamfer setup approaching OD'),
+    ('CRASH_RISK', "Other crash risk", 'crash_prevention', r'CRASH RISK'),
+    # --- Not verified / validator errors ---
+    ('NOT_VERIFIED', "Could not verify", 'parser', r'Cannot validate|not detected|unable to verify|No lathe assigned|thickness unknown|No standards defined'),
+    ('VALIDATOR_ERROR', "Validator error", 'parser', r'^Error in |validation error'),
+    # --- Turning / OD ---
+    ('HUB_BREAKTHROUGH', "Hub break-through", 'hub_breakthrough', r'HUB BREAK-?THROUGH'),
+    ('HUB_FACE_PLUNGE', "Hub face plunge", 'turning_depth', r'Hub face plunge'),
+    ('APPROACHING_HUB_LIMIT', "Approaching hub limit", 'hub_breakthrough', r'Approaching hub limit'),
+    ('TURNING_DEPTH', "Turning depth exceeds standard", 'turning_depth', r'exceeds standard depth'),
+    ('OD_TURNDOWN', "OD turn-down out of practice", 'od_turndown', r'OUT OF COMMON PRACTICE|OD turn-?down'),
+    ('NO_WORK_OFFSET', "No work offset", 'g154_presence', r'no work offset'),
+    # --- Bore ---
+    ('BORE_PASS_STEP', "Bore pass step too large", 'bore_pass_steps', r'Bore pass step'),
+    ('BORE_FIRST_PASS', "First bore pass too aggressive", 'bore_pass_steps', r'First bore pass'),
+    ('CB_TOO_LARGE', "CB too large", 'consistency', r'CB TOO LARGE'),
+    ('CB_TOO_SMALL', "CB too small", 'consistency', r'CB TOO SMALL'),
+    ('OB_TOO_LARGE', "OB too large", 'consistency', r'OB TOO LARGE'),
+    ('OB_TOO_SMALL', "OB too small", 'consistency', r'OB TOO SMALL'),
+    ('CB_TOLERANCE_LIMIT', "CB at tolerance limit", 'consistency', r'CB at tolerance limit'),
+    ('OB_TOLERANCE_LIMIT', "OB at tolerance limit", 'consistency', r'OB at tolerance limit'),
+    ('OD_MISMATCH', "OD mismatch", 'consistency', r'OD MISMATCH'),
+    # --- Dimensional / Title ---
+    ('THICKNESS_ERROR', "Thickness error", 'consistency', r'THICKNESS ERROR'),
+    ('THICKNESS_MISMATCH', "Thickness mismatch", 'consistency', r'Thickness mismatch'),
+    ('TITLE_MISLABELED', "Title mislabeled", 'consistency', r'TITLE MISLABELED'),
+    ('PCODE_MISMATCH', "P-code mismatch", 'consistency', r'P-CODE MISMATCH|MULTIPLE P-CODES'),
+    ('PCODE_PAIRING', "P-code pairing", 'consistency', r'P-CODE PAIRING'),
+    ('FILENAME_MISMATCH', "Filename mismatch", 'consistency', r'FILENAME MISMATCH'),
+    # --- Counterbore / 2PC / Steel ring ---
+    ('COUNTERBORE_BREAKTHROUGH', "Counterbore breaks through", 'counterbore_depth', r'Counterbore depth .*exceeds total thickness'),
+    ('COUNTERBORE_DEPTH', "Counterbore depth", 'counterbore_depth', r'Counterbore'),
+    ('TWOPC_RING_SIZE', "2PC ring size", '2pc_ring_size', r'2PC ring size'),
+    ('TWOPC_LUG_RECESS', "2PC LUG recess", 'consistency', r'2PC LUG recess'),
+    ('STEEL_RING_RECESS', "Steel ring recess", 'steel_ring_recess', r'Steel ring'),
+    # --- Tool home (G53) ---
+    ('TOOL_HOME_POSITION', "G53 tool home Z", 'tool_home', r'^(?:CRITICAL|WARNING|REVIEW): Line \d+ has Z'),
+    # --- Haas G-code patterns ---
+    ('G00_G01_SAME_LINE', "G00 and G01 on same line", 'haas_patterns', r'G00 and G01 on same line'),
+    ('G01_NO_FEEDRATE', "G01 without feedrate", 'haas_patterns', r'G01 without feedrate'),
+    ('G96_WITHOUT_G50', "G96 without G50", 'haas_patterns', r'G96 \(CSS\) without prior G50'),
+    ('COOLANT_SEQUENCE', "Coolant/spindle sequence", 'haas_patterns', r'M08 \(coolant on\) before|M05 \(spindle stop\) while coolant'),
+    ('MISSING_DECIMAL', "Missing decimal point", 'haas_patterns', r'missing decimal point'),
+    ('MISSING_PROGRAM_END', "Missing M30/M02", 'haas_patterns', r'Missing program end'),
+    ('OTHER', "Other", 'parser', r''),
+)
+
+_COMPILED_CODES = [(code, source, re.compile(pattern, re.IGNORECASE))
+                   for code, _label, source, pattern in ISSUE_CODES]
+
+ISSUE_LABELS: Dict[str, str] = {code: label for code, label, _source, _pattern in ISSUE_CODES}
+_CODES_BY_LABEL: Dict[str, str] = {label.lower(): code for code, label in ISSUE_LABELS.items()}
+
+_LINE_PATTERN = re.compile(r'\bLine (\d+)')
+
+# Programs column holding each list (same names as GCodeParseResult)
+_COLUMN_NAMES = [name for name, _severity in ISSUE_FIELDS]
+
+
+@dataclass
+class ProgramIssue:
+    """One structured validation issue"""
+    code: str
+    severity: str
+    line_number: Optional[int]
+    source: str
+    message: str
+
+
+def classify_issue(message: str) -> Tuple[str, str]:
+    """Return (issue code, default source validator) for an issue message"""
+    for code, source, pattern in _COMPILED_CODES:
+        if pattern.search(message):
+            return code, source
+    return 'OTHER', 'parser'
+
+
+def code_for_label(label: str) -> Optional[str]:
+    """Map a filter label (or an issue code) back to its issue code"""
+    label = label.strip()
+    if label.upper() in ISSUE_LABELS:
+        return label.upper()
+    return _CODES_BY_LABEL.get(label.lower())
+
+
+def build_issues(issue_lists: Dict[str, Optional[Sequence[str]]],
+                 sources: Optional[Dict[str, str]] = None) -> List[ProgramIssue]:
+    """
+    Turn per-severity message lists into structured issues.
+
+    Args:
+        issue_lists: {field name: [message, ...]} for the ISSUE_FIELDS
+        sources: Optional {message: validator name} recorded by the parser;
+            messages not in it get the issue code's default source
+
+    Returns:
+        List of ProgramIssue
+    """
+    issues = []
+    for field_name, severity in ISSUE_FIELDS:
+        for message in issue_lists.get(field_name) or []:
+            if not message:
+                continue
+            code, source = classify_issue(message)
+            if sources and message in sources:
+                source = sources[message]
+            field_severity = severity
+            if field_name == 'tool_home_issues' and message.startswith('CRITICAL'):
+                field_severity = 'TOOL_HOME_CRITICAL'
+            match = _LINE_PATTERN.search(message)
+            issues.append(ProgramIssue(
+                code=code,
+                severity=field_severity,
+                line_number=int(match.group(1)) if match else None,
+                source=source,
+                message=message
+            ))
+    return issues
+
+
+def _split_column(value: Optional[str]) -> List[str]:
+    """Decode a stored issue column (JSON list or '|'-joined text)"""
+    if not value or value in ('null', '[]'):
+        return []
+    if value.startswith('['):
+        try:
+            decoded = json.loads(value)
+            if isinstance(decoded, list):
+                return [str(item) for item in decoded]
+        except ValueError:
+            pass
+    return [part for part in value.split('|') if part.strip()]
+
+
+def create_issue_tables(cursor) -> bool:
+    """
+    Create program_issues, its pending queue and the maintenance triggers.
+
+    Returns:
+        True if the table was newly created (caller should backfill)
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'program_issues'")
+    created = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS program_issues (
+            issue_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            program_number TEXT NOT NULL,
+            issue_code TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            line_number INTEGER,
+            source TEXT,
+            message TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_program_issues_program ON program_issues(program_number)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_program_issues_code ON program_issues(issue_code, program_number)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_program_issues_severity ON program_issues(severity, program_number)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS program_issues_pending (
+            program_number TEXT PRIMARY KEY
+        )
+    ''')
+
+    columns = ', '.join(_COLUMN_NAMES)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_program_issues_insert AFTER INSERT ON programs
+        BEGIN
+            INSERT OR IGNORE INTO program_issues_pending (program_number) VALUES (NEW.program_number);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_program_issues_update AFTER UPDATE OF {columns} ON programs
+        BEGIN
+            INSERT OR IGNORE INTO program_issues_pending (program_number) VALUES (NEW.program_number);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_program_issues_rename AFTER UPDATE OF program_number ON programs
+        WHEN OLD.program_number != NEW.program_number
+        BEGIN
+            UPDATE program_issues SET program_number = NEW.program_number
+            WHERE program_number = OLD.program_number;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_program_issues_delete AFTER DELETE ON programs
+        BEGIN
+            DELETE FROM program_issues WHERE program_number = OLD.program_number;
+            DELETE FROM program_issues_pending WHERE program_number = OLD.program_number;
+        END
+    ''')
+
+    if created:
+        cursor.execute("INSERT OR IGNORE INTO program_issues_pending (program_number) SELECT program_number FROM programs")
+    return created
+
+
+def store_program_issues(cursor, program_number: str, issues: Iterable[ProgramIssue]):
+    """Replace a program's issues (call after writing its programs row)"""
+    cursor.execute("DELETE FROM program_issues WHERE program_number = ?", (program_number,))
+    cursor.executemany('''
+        INSERT INTO program_issues (program_number, issue_code, severity, line_number, source, message)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(program_number, issue.code, issue.severity, issue.line_number, issue.source, issue.message)
+          for issue in issues])
+    cursor.execute("DELETE FROM program_issues_pending WHERE program_number = ?", (program_number,))
+
+
+def sync_program_issues(conn, batch_size: int = 500) -> int:
+    """
+    Rebuild issues for programs queued by the triggers.
+
+    Args:
+        conn: Open sqlite3 connection (committed on return)
+        batch_size: Programs processed per batch
+
+    Returns:
+        Number of programs re-synced
+    """
+    cursor = conn.cursor()
+    synced = 0
+    while True:
+        cursor.execute("SELECT program_number FROM program_issues_pending LIMIT ?", (batch_size,))
+        pending = [row[0] for row in cursor.fetchall()]
+        if not pending:
+            break
+
+        placeholders = ', '.join('?' * len(pending))
+        cursor.execute(f'''
+            SELECT program_number, {', '.join(_COLUMN_NAMES)}
+            FROM programs
+            WHERE program_number IN ({placeholders})
+        ''', pending)
+        for row in cursor.fetchall():
+            issue_lists = {name: _split_column(value) for name, value in zip(_COLUMN_NAMES, row[1:])}
+            store_program_issues(cursor, row[0], build_issues(issue_lists))
+
+        # Programs that no longer exist just leave the queue
+        cursor.executemany("DELETE FROM program_issues_pending WHERE program_number = ?",
+                           [(program_number,) for program_number in pending])
+        conn.commit()
+        synced += len(pending)
+
+    if synced:
+        logger.info(f"Synced structured issues for {synced} programs")
+    return synced
+
+
+def issue_counts(cursor) -> Dict[str, int]:
+    """Return {issue code: number of programs with that issue}"""
+    cursor.execute('''
+        SELECT issue_code, COUNT(DISTINCT program_number)
+        FROM program_issues
+        GROUP BY issue_code
+    ''')
+    return dict(cursor.fetchall())
@@ -0,0 +1,156 @@
+"""
+Program Splitter
+Streaming split of multi-program memory dumps (Haas ALL.nc / .cnc backups).
+
+The split scripts read a whole dump into memory (readlines() / read()),
+collected every program in lists before writing it, and the split folder
+then had to be imported with a separate folder scan - which read every
+file again. iter_programs() reads the dump line by line and yields each
+program as soon as it ends, with its SHA256 computed while the lines
+stream past; only the program being assembled is held in memory.
+
+A program starts at a line beginning with O<digits> and ends at its M30
+line (inclusive), at a '%' line, at the next program start or at the end
+of the dump. Lines outside programs (the leading '%', blank lines) are
+dropped. Program bytes are kept exactly as they are in the dump, so the
+hash matches the file a program is saved to.
+
+Programs can be written to a folder (write_programs()) or imported
+directly: SplitProgram.content() is a FileContent for the import pipeline
+(GCodeDatabaseGUI.process_new_file(..., content=...)).
+"""
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List
+import logging
+
+from utils.file_content import FileContent
+
+logger = logging.getLogger(__name__)
+
+
+PROGRAM_START = re.compile(r'^[oO](\d+)\s*(\([^)]*\))?')
+PROGRAM_END = re.compile(r'^M30\b', re.IGNORECASE)
+DUMP_DELIMITER = '%'
+
+
+@dataclass
+class SplitProgram:
+    """One program cut from a dump"""
+    number: str          # 'o06069'
+    title: str           # '(9.5IN DIA 154.2MM 1.75 STEEL S-1 )' or ''
+    data: bytes
+    sha256: str
+    line_count: int
+    start_line: int      # 1-based line of the O-number in the dump
+    complete: bool       # Ended with M30
+
+    @property
+    def filename(self) -> str:
+        return f"{self.number}.nc"
+
+    def content(self, path: str) -> FileContent:
+        """FileContent named path (the program is not written there)"""
+        content = FileContent(path, self.data)
+        content.__dict__['sha256'] = self.sha256  # Already hashed while streaming
+        return content
+
+
+class _Builder:
+    def __init__(self, number, title, line, line_number):
+        self.number = number
+        self.title = title
+        self.start_line = line_number
+        self.lines = [line]
+        self.hash = hashlib.sha256(line)
+
+    def add(self, line):
+        self.lines.append(line)
+        self.hash.update(line)
+
+    def finish(self, complete) -> SplitProgram:
+        return SplitProgram(self.number, self.title, b''.join(self.lines), self.hash.hexdigest(),
+                            len(self.lines), self.start_line, complete)
+
+
+def iter_programs(dump_path: str) -> Iterator[SplitProgram]:
+    """
+    Yield the programs of a dump in order, each as soon as it is complete.
+
+    Raises:
+        OSError if the dump cannot be read
+    """
+    current = None
+    with open(dump_path, 'rb') as f:
+        for line_number, line in enumerate(f, 1):
+            stripped = line.decode('utf-8', errors='ignore').strip()
+
+            start = PROGRAM_START.match(stripped)
+            if start:
+                if current:
+                    yield current.finish(complete=False)
+                current = _Builder(f"o{start.group(1)}", start.group(2) or '', line, line_number)
+                continue
+
+            if current is None:
+                continue
+            if stripped == DUMP_DELIMITER:
+                yield current.finish(complete=False)
+                current = None
+                continue
+
+            current.add(line)
+            if PROGRAM_END.match(stripped):
+                yield current.finish(complete=True)
+                current = None
+
+    if current:
+        yield current.finish(complete=False)
+
+
+@dataclass
+class SplitStats:
+    programs: int = 0
+    saved: int = 0
+    skipped: int = 0                 # Already existed (overwrite=False)
+    incomplete: List[str] = field(default_factory=list)  # Programs without M30
+    saved_paths: Dict[str, str] = field(default_factory=dict)
+
+
+def write_programs(dump_path: str, output_folder: str, overwrite: bool = False,
+                   log=None) -> SplitStats:
+    """
+    Split a dump into <output_folder>/<o-number>.nc files.
+
+    Args:
+        overwrite: Replace existing files (otherwise they are kept and the
+            program is counted as skipped)
+        log: Optional function(message) for per-program output
+
+    Returns:
+        SplitStats
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    stats = SplitStats()
+    for program in iter_programs(dump_path):
+        stats.programs += 1
+        if not program.complete:
+            stats.incomplete.append(program.number)
+
+        path = os.path.join(output_folder, program.filename)
+        if not overwrite and (os.path.exists(path) or program.number in stats.saved_paths):
+            stats.skipped += 1
+            if log:
+                log(f"  Skipping {program.filename} - already exists")
+            continue
+
+        with open(path, 'wb') as f:
+            f.write(program.data)
+        stats.saved += 1
+        stats.saved_paths[program.number] = path
+        if log:
+            log(f"  Saved: {program.filename} - {program.title[:50] if program.title else '(no title)'}")
+    return stats
@@ -0,0 +1,410 @@
+"""
+Program Statistics
+Materialized aggregates behind the statistics windows.
+
+Each summary table ("stats cube") holds one row per distinct combination of
+a few dimensions of a source table - round size, spacer type, lathe,
+validation status, ... - with the number of rows in that combination.
+Triggers on the source table keep the counts current on every insert,
+INSERT OR REPLACE, update and delete, so a statistics window reads a few
+hundred summary rows instead of running dozens of COUNT queries over every
+program.
+
+When a filter is active, cube_rows() produces the same row shape with one
+grouped query over the filtered source rows, so windows use a single code
+path for filtered and unfiltered views.
+
+Tool usage (program_tool_stats, tool_summary_stats) is counted from the
+tools_used/tool_sequence JSON columns and needs SQLite's JSON functions;
+without them the tool tables are not created (see json_available()).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Outer diameter buckets used by the statistics windows: (min, max, label),
+# min inclusive, max exclusive
+OD_RANGES: Tuple[Tuple[float, float, str], ...] = (
+    (5.50, 6.00, '5.75"'),
+    (6.00, 6.25, '6.00"'),
+    (6.25, 6.50, '6.25"'),
+    (6.50, 7.00, '6.50"'),
+    (7.00, 7.50, '7.00"'),
+    (7.50, 8.00, '7.50"'),
+    (8.00, 8.50, '8.00"'),
+    (8.50, 9.00, '8.50"'),
+    (9.00, 10.00, '9.50"'),
+    (10.00, 10.50, '10.25"'),
+    (10.50, 11.00, '10.50"'),
+    (11.00, 12.00, '11.00"'),
+    (12.00, 13.50, '13.00"'),
+)
+
+
+def od_range_sql(column: str) -> str:
+    """SQL expression mapping an outer diameter column to its OD_RANGES label"""
+    cases = ' '.join(f"WHEN {column} >= {low} AND {column} < {high} THEN '{label}'"
+                     for low, high, label in OD_RANGES)
+    return f"CASE {cases} END"
+
+
+def _json_list(expr: str) -> str:
+    """SQL expression: expr if it is valid JSON, else an empty list"""
+    return f"CASE WHEN json_valid({expr}) THEN {expr} ELSE '[]' END"
+
+
+def _json_not_empty(expr: str) -> str:
+    """SQL expression: 1 if expr is a non-empty JSON list, else 0"""
+    return f"CASE WHEN json_valid({expr}) THEN json_array_length({expr}) > 0 ELSE 0 END"
+
+
+@dataclass(frozen=True)
+class StatsCube:
+    """A summary table of row counts grouped by dimensions of a source table"""
+    name: str
+    source: str
+    key: str  # Source primary key (used to undo INSERT OR REPLACE)
+    dimensions: Tuple[Tuple[str, str], ...]  # (column, SQL expression; {row} = row prefix)
+    needs_json: bool = False
+
+    @property
+    def columns(self) -> List[str]:
+        return [column for column, _expr in self.dimensions]
+
+    def expressions(self, row: str = '') -> List[str]:
+        """Dimension expressions over a source row prefix ('NEW.', 'OLD.', 'p.', '')"""
+        return [expr.format(row=row) for _column, expr in self.dimensions]
+
+
+# Programs by OD bucket, spacer type, material, lathe and validation status
+PROGRAM_STATS = StatsCube('program_stats', 'programs', 'program_number', (
+    ('od_range', od_range_sql('{row}outer_diameter')),
+    ('spacer_type', '{row}spacer_type'),
+    ('material', '{row}material'),
+    ('lathe', '{row}lathe'),
+    ('validation_status', '{row}validation_status'),
+    ('is_deleted', 'COALESCE({row}is_deleted, 0)'),
+))
+
+# Programs by detected round size, detection source and repository state
+ROUND_SIZE_STATS = StatsCube('round_size_stats', 'programs', 'program_number', (
+    ('round_size', '{row}round_size'),
+    ('round_size_source', '{row}round_size_source'),
+    ('in_correct_range', '{row}in_correct_range'),
+    ('is_managed', 'COALESCE({row}is_managed, 0)'),
+    ('has_file', '({row}file_path IS NOT NULL)'),
+    ('is_deleted', 'COALESCE({row}is_deleted, 0)'),
+))
+
+# Programs by tool sequence and tool/safety validation outcome
+TOOL_SUMMARY_STATS = StatsCube('tool_summary_stats', 'programs', 'program_number', (
+    ('spacer_type', '{row}spacer_type'),
+    ('has_tools', "({row}tools_used IS NOT NULL AND {row}tools_used != 'null')"),
+    ('tool_sequence', "CASE WHEN {row}tools_used IS NOT NULL AND {row}tools_used != 'null' "
+                      "THEN {row}tool_sequence END"),
+    ('has_tool_issues', _json_not_empty('{row}tool_validation_issues')),
+    ('has_safety_issues', _json_not_empty('{row}safety_blocks_issues')),
+    ('is_deleted', 'COALESCE({row}is_deleted, 0)'),
+), needs_json=True)
+
+# Program number registry by round size range, status and duplicates
+REGISTRY_STATS = StatsCube('registry_stats', 'program_number_registry', 'program_number', (
+    ('round_size', '{row}round_size'),
+    ('status', '{row}status'),
+    ('has_duplicates', '(COALESCE({row}duplicate_count, 0) > 0)'),
+))
+
+STATS_CUBES: Tuple[StatsCube, ...] = (PROGRAM_STATS, ROUND_SIZE_STATS, TOOL_SUMMARY_STATS, REGISTRY_STATS)
+
+TOOL_STATS_TABLE = 'program_tool_stats'
+
+
+def json_available(cursor) -> bool:
+    """True if this SQLite build has the JSON functions"""
+    try:
+        cursor.execute("SELECT json_valid('[]')")
+        return True
+    except Exception:
+        return False
+
+
+def _match_sql(cube: StatsCube, row: str, alias: str = '') -> str:
+    """WHERE clause matching the cube row for a source row (NULL-safe)"""
+    return ' AND '.join(f"{alias}{column} IS {expr}"
+                        for column, expr in zip(cube.columns, cube.expressions(row)))
+
+
+def _bump_sql(cube: StatsCube, row: str, delta: int) -> str:
+    """Trigger statements adding delta to the cube row for a source row"""
+    match = _match_sql(cube, row)
+    sql = ''
+    if delta > 0:
+        sql += (f"INSERT INTO {cube.name} ({', '.join(cube.columns)}, row_count) "
+                f"SELECT {', '.join(cube.expressions(row))}, 0 "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {cube.name} WHERE {match});\n")
+    sql += f"UPDATE {cube.name} SET row_count = row_count + ({delta}) WHERE {match};\n"
+    return sql
+
+
+def _create_cube(cursor, cube: StatsCube) -> bool:
+    """Create a cube table and its triggers; returns True if newly created"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (cube.name,))
+    created = cursor.fetchone() is None
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {cube.name} (
+            {', '.join(cube.columns)},
+            row_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{cube.name}_dims ON {cube.name}({', '.join(cube.columns)})")
+
+    source, key = cube.source, cube.key
+    unchanged = ' AND '.join(f"{old} IS {new}" for old, new in
+                             zip(cube.expressions('OLD.'), cube.expressions('NEW.')))
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {cube.name}_insert AFTER INSERT ON {source}
+        BEGIN
+            {_bump_sql(cube, 'NEW.', 1)}
+        END
+    ''')
+    # INSERT OR REPLACE deletes the old row without firing delete triggers
+    # (recursive_triggers is off) - take it out of the counts first
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {cube.name}_replace BEFORE INSERT ON {source}
+        WHEN EXISTS (SELECT 1 FROM {source} WHERE {key} = NEW.{key})
+        BEGIN
+            UPDATE {cube.name} SET row_count = row_count - 1
+            WHERE rowid = (SELECT s.rowid FROM {cube.name} s, {source} p
+                           WHERE p.{key} = NEW.{key} AND {_match_sql(cube, 'p.', 's.')});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {cube.name}_update AFTER UPDATE ON {source}
+        WHEN NOT ({unchanged})
+        BEGIN
+            {_bump_sql(cube, 'OLD.', -1)}
+            {_bump_sql(cube, 'NEW.', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {cube.name}_delete AFTER DELETE ON {source}
+        BEGIN
+            {_bump_sql(cube, 'OLD.', -1)}
+        END
+    ''')
+    return created
+
+
+def _tools_sql(row: str) -> str:
+    """Distinct tools in a source row's tools_used list"""
+    return (f"SELECT DISTINCT value FROM json_each({_json_list(row + 'tools_used')}) "
+            f"WHERE type IN ('text', 'integer', 'real')")
+
+
+def _create_tool_stats(cursor) -> bool:
+    """Create program_tool_stats (programs per tool and spacer type) and its triggers"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TOOL_STATS_TABLE,))
+    created = cursor.fetchone() is None
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {TOOL_STATS_TABLE} (
+            tool TEXT,
+            spacer_type TEXT,
+            is_deleted INTEGER,
+            row_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{TOOL_STATS_TABLE}_dims "
+                   f"ON {TOOL_STATS_TABLE}(tool, spacer_type, is_deleted)")
+
+    def bump(row, delta):
+        deleted = f"COALESCE({row}is_deleted, 0)"
+        match = f"spacer_type IS {row}spacer_type AND is_deleted IS {deleted}"
+        sql = ''
+        if delta > 0:
+            sql += (f"INSERT INTO {TOOL_STATS_TABLE} (tool, spacer_type, is_deleted, row_count) "
+                    f"SELECT t.value, {row}spacer_type, {deleted}, 0 FROM ({_tools_sql(row)}) t "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM {TOOL_STATS_TABLE} "
+                    f"WHERE tool IS t.value AND {match});\n")
+        sql += (f"UPDATE {TOOL_STATS_TABLE} SET row_count = row_count + ({delta}) "
+                f"WHERE {match} AND tool IN ({_tools_sql(row)});\n")
+        return sql
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {TOOL_STATS_TABLE}_insert AFTER INSERT ON programs
+        BEGIN
+            {bump('NEW.', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {TOOL_STATS_TABLE}_replace BEFORE INSERT ON programs
+        WHEN EXISTS (SELECT 1 FROM programs WHERE program_number = NEW.program_number)
+        BEGIN
+            UPDATE {TOOL_STATS_TABLE} SET row_count = row_count - 1
+            WHERE rowid IN (SELECT s.rowid FROM {TOOL_STATS_TABLE} s, programs p,
+                                json_each({_json_list('p.tools_used')}) j
+                            WHERE p.program_number = NEW.program_number
+                              AND j.type IN ('text', 'integer', 'real')
+                              AND s.tool = j.value AND s.spacer_type IS p.spacer_type
+                              AND s.is_deleted IS COALESCE(p.is_deleted, 0));
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {TOOL_STATS_TABLE}_update AFTER UPDATE ON programs
+        WHEN OLD.tools_used IS NOT NEW.tools_used OR OLD.spacer_type IS NOT NEW.spacer_type
+             OR COALESCE(OLD.is_deleted, 0) IS NOT COALESCE(NEW.is_deleted, 0)
+        BEGIN
+            {bump('OLD.', -1)}
+            {bump('NEW.', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {TOOL_STATS_TABLE}_delete AFTER DELETE ON programs
+        BEGIN
+            {bump('OLD.', -1)}
+        END
+    ''')
+    return created
+
+
+def rebuild_cube(cursor, cube: StatsCube):
+    """Recompute a cube from its source table"""
+    cursor.execute(f"DELETE FROM {cube.name}")
+    expressions = cube.expressions()
+    cursor.execute(f'''
+        INSERT INTO {cube.name} ({', '.join(cube.columns)}, row_count)
+        SELECT {', '.join(expressions)}, COUNT(*) FROM {cube.source}
+        GROUP BY {', '.join(str(i + 1) for i in range(len(expressions)))}
+    ''')
+
+
+def rebuild_tool_stats(cursor):
+    """Recompute program_tool_stats from programs"""
+    cursor.execute(f"DELETE FROM {TOOL_STATS_TABLE}")
+    cursor.execute(f'''
+        INSERT INTO {TOOL_STATS_TABLE} (tool, spacer_type, is_deleted, row_count)
+        SELECT t.value, p.spacer_type, COALESCE(p.is_deleted, 0), COUNT(DISTINCT p.program_number)
+        FROM programs p, json_each({_json_list('p.tools_used')}) t
+        WHERE t.type IN ('text', 'integer', 'real')
+        GROUP BY 1, 2, 3
+    ''')
+
+
+def create_stats_tables(cursor):
+    """
+    Create the summary tables and their triggers, filling new tables from
+    the current data. Tool tables are skipped when SQLite has no JSON
+    functions (a trigger calling a missing function would fail every write).
+    """
+    has_json = json_available(cursor)
+    if not has_json:
+        logger.warning("SQLite JSON functions unavailable - tool statistics computed on demand")
+
+    for cube in STATS_CUBES:
+        if cube.needs_json and not has_json:
+            continue
+        if _create_cube(cursor, cube):
+            rebuild_cube(cursor, cube)
+
+    if has_json and _create_tool_stats(cursor):
+        rebuild_tool_stats(cursor)
+
+
+def rebuild_stats_tables(cursor):
+    """Recompute every existing summary table from its source"""
+    for cube in STATS_CUBES:
+        if _table_exists(cursor, cube.name):
+            rebuild_cube(cursor, cube)
+    if _table_exists(cursor, TOOL_STATS_TABLE):
+        rebuild_tool_stats(cursor)
+
+
+def _table_exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def cube_rows(cursor, cube: StatsCube, where: Optional[str] = None,
+              params: Sequence = ()) -> List[Dict]:
+    """
+    Read a cube as dicts of its dimensions plus 'count'.
+
+    Args:
+        cursor: SQLite cursor
+        cube: Cube to read
+        where: Optional filter over the source table (no leading WHERE) -
+            the counts are then grouped from the matching source rows
+        params: Parameters for where
+
+    Returns:
+        List of {dimension: value, ..., 'count': n} with count > 0
+    """
+    columns = cube.columns
+    if where is None and _table_exists(cursor, cube.name):
+        cursor.execute(f"SELECT {', '.join(columns)}, row_count FROM {cube.name} WHERE row_count > 0")
+    else:
+        expressions = cube.expressions()
+        cursor.execute(f'''
+            SELECT {', '.join(expressions)}, COUNT(*) FROM {cube.source}
+            WHERE {where or '1=1'}
+            GROUP BY {', '.join(str(i + 1) for i in range(len(expressions)))}
+        ''', list(params))
+    return [dict(zip(columns + ['count'], row)) for row in cursor.fetchall()]
+
+
+def rollup(rows: Sequence[Dict], *dimensions: str, **match) -> Dict:
+    """
+    Sum cube row counts by one or more dimensions.
+
+    Args:
+        rows: Result of cube_rows()
+        *dimensions: Dimensions to group by - keys are plain values for one
+            dimension, tuples for several
+        **match: Only include rows whose dimension equals the given value
+
+    Returns:
+        {key: count}
+    """
+    totals = {}
+    for row in rows:
+        if any(row[name] != value for name, value in match.items()):
+            continue
+        if len(dimensions) == 1:
+            key = row[dimensions[0]]
+        else:
+            key = tuple(row[name] for name in dimensions)
+        totals[key] = totals.get(key, 0) + row['count']
+    return totals
+
+
+def tool_rows(cursor, where: Optional[str] = None, params: Sequence = ()) -> List[Dict]:
+    """
+    Programs per (tool, spacer_type) as dicts with 'tool', 'spacer_type', 'count'.
+
+    Reads program_tool_stats (active programs only) when unfiltered, else
+    groups the filtered programs directly. Needs SQLite's JSON functions.
+    """
+    if where is None and _table_exists(cursor, TOOL_STATS_TABLE):
+        cursor.execute(f'''
+            SELECT tool, spacer_type, SUM(row_count) FROM {TOOL_STATS_TABLE}
+            WHERE is_deleted = 0 AND row_count > 0
+            GROUP BY tool, spacer_type
+        ''')
+        return [{'tool': tool, 'spacer_type': spacer_type, 'count': count}
+                for tool, spacer_type, count in cursor.fetchall()]
+
+    where = where or '(is_deleted IS NULL OR is_deleted = 0)'
+    cursor.execute(f'''
+        SELECT t.value, p.spacer_type, COUNT(DISTINCT p.program_number)
+        FROM (SELECT program_number, spacer_type, tools_used FROM programs WHERE {where}) p,
+             json_each({_json_list('p.tools_used')}) t
+        WHERE t.type IN ('text', 'integer', 'real')
+        GROUP BY 1, 2
+    ''', list(params))
+    return [{'tool': tool, 'spacer_type': spacer_type, 'count': count}
+            for tool, spacer_type, count in cursor.fetchall()]
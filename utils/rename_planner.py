@@ -0,0 +1,606 @@
+"""
+Rename Planner
+Set-based renumbering of suffix placeholders and out-of-range programs.
+
+Programs used to be renamed one at a time: every rename called
+find_next_available_number() (which re-read the whole programs table and
+the registry), the preview re-queried the registry number by number to
+avoid handing out the same number twice, and every rename wrote its file
+and committed its own transaction. Here renumbering is split in two:
+
+- RenamePlanner reads one snapshot (programs plus the AVAILABLE registry
+  numbers) and hands numbers out of an in-memory FreeNumbers pool, so a
+  plan never assigns a number twice, never assigns a number in use and
+  never targets a file that already exists. The plan is what the preview
+  shows.
+- execute_rename_plan() journals the plan next to the database, writes the
+  renamed files, applies every database change in one transaction and only
+  then removes the old files. recover_rename_journal() finishes an
+  interrupted batch on the next start: before the commit the batch is run
+  again (the old files are still there), after it the old files are
+  cleaned up.
+
+Plan items are plain dicts (they are shown in the preview and stored in
+the journal):
+    kind, old_number, new_number, round_size, title, current_range,
+    correct_range, old_file_path, new_file_path, status, error
+"""
+
+import json
+import os
+import re
+import socket
+import sqlite3
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import logging
+
+from utils.file_content import internal_program_number
+
+logger = logging.getLogger(__name__)
+
+
+KIND_SUFFIX = 'SUFFIX'
+KIND_OUT_OF_RANGE = 'OUT_OF_RANGE'
+
+STATUS_READY = 'Ready'
+STATUS_SKIPPED = 'Skipped: already in correct range'
+
+JOURNAL_NAME = 'rename_journal.json'
+
+# Temporary placeholders: o80001(1), o80001_2
+SUFFIX_PATTERN = re.compile(r'^(o\d+)([(_]\d+[)]?)$', re.IGNORECASE)
+
+SNAPSHOT_COLUMNS = ('program_number', 'title', 'file_path', 'outer_diameter', 'round_size',
+                    'in_correct_range')
+
+# SQLite host-parameter limit is 999 on older builds
+_IN_CHUNK = 500
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+def program_int(program_number) -> Optional[int]:
+    """Numeric part of a program number ('o62500(1)' -> 62500), or None"""
+    plain = str(program_number).replace('o', '').replace('O', '').strip()
+    plain = re.sub(r'[(_]\d+\)?$', '', plain)
+    try:
+        return int(plain)
+    except ValueError:
+        return None
+
+
+def format_program_number(number: int) -> str:
+    return f"o{number:05d}"
+
+
+class FreeNumbers:
+    """Program numbers neither in use nor assigned yet, handed out lowest first"""
+
+    def __init__(self, available: Iterable[int], used: Set[int]):
+        self._free = sorted(set(available) - used)
+
+    def take(self, range_start: int, range_end: int,
+             rejected: Optional[Callable[[int], bool]] = None) -> Optional[int]:
+        """
+        Remove and return the lowest free number in [range_start, range_end].
+
+        Args:
+            rejected: Optional test for numbers that cannot be used by this
+                caller (they stay in the pool for others)
+        """
+        i = bisect_left(self._free, range_start)
+        while i < len(self._free) and self._free[i] <= range_end:
+            number = self._free[i]
+            if rejected is None or not rejected(number):
+                del self._free[i]
+                return number
+            i += 1
+        return None
+
+
+def load_snapshot(db_path: str) -> Tuple[List[Dict], FreeNumbers]:
+    """
+    Programs (SNAPSHOT_COLUMNS dicts) and the free-number pool, read in one
+    transaction.
+
+    A number is free if the registry marks it AVAILABLE and no program uses
+    it (the registry can lag behind the programs table).
+    """
+    conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        programs = [dict(zip(SNAPSHOT_COLUMNS, row)) for row in conn.execute(
+            f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM programs WHERE program_number IS NOT NULL")]
+        available = [program_int(row[0]) for row in conn.execute(
+            "SELECT program_number FROM program_number_registry WHERE status = 'AVAILABLE'")]
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    used = {program_int(p['program_number']) for p in programs}
+    return programs, FreeNumbers((n for n in available if n is not None), used)
+
+
+class RenamePlanner:
+    """Builds collision-free rename plans from one snapshot of the database"""
+
+    def __init__(self, db_path: str, ranges: Dict[float, Tuple[int, int, str]],
+                 range_for: Callable[[float], Optional[Tuple[int, int]]],
+                 round_size_from_file: Optional[Callable[[str], Optional[float]]] = None):
+        """
+        Args:
+            ranges: round size -> (range_start, range_end, name)
+                (get_round_size_ranges())
+            range_for: round size -> (range_start, range_end) or None
+                (get_range_for_round_size())
+            round_size_from_file: Fallback for suffix programs without a
+                round size or OD (parses the file)
+        """
+        self.db_path = db_path
+        self.ranges = ranges
+        self.range_for = range_for
+        self.round_size_from_file = round_size_from_file
+        self.programs, self.free = load_snapshot(db_path)
+
+    def range_label(self, program_number) -> str:
+        number = program_int(program_number)
+        if number is None:
+            return "Invalid"
+        for start, end, name in self.ranges.values():
+            if start <= number <= end:
+                return f"o{start}-o{end} ({name})"
+        return "Unknown"
+
+    def _item(self, kind: str, program: Dict, round_size) -> Dict:
+        correct = self.range_for(round_size) if round_size else None
+        return {
+            'kind': kind,
+            'old_number': program['program_number'],
+            'new_number': None,
+            'round_size': round_size,
+            'title': program['title'],
+            'current_range': self.range_label(program['program_number']),
+            'correct_range': f"o{correct[0]}-o{correct[1]}" if correct else "No range defined",
+            'old_file_path': program['file_path'],
+            'new_file_path': None,
+            'status': STATUS_READY,
+            'error': None,
+        }
+
+    @staticmethod
+    def _fail(item: Dict, error: str, status: Optional[str] = None) -> Dict:
+        item['error'] = error
+        item['status'] = status or f"Error: {error}"
+        return item
+
+    def _assign(self, item: Dict, round_size, require_file: bool) -> Dict:
+        """Give the item the lowest free number in its range (and its new file path)"""
+        range_info = self.range_for(round_size)
+        if not range_info:
+            return self._fail(item, f"No range defined for round size {round_size}")
+
+        file_path = item['old_file_path']
+        has_file = bool(file_path) and os.path.exists(file_path)
+        if require_file and not has_file:
+            return self._fail(item, f"File not found: {file_path}")
+
+        directory = os.path.dirname(file_path) if has_file else None
+
+        def target(number):
+            return os.path.join(directory, f"{format_program_number(number)}.nc")
+
+        number = self.free.take(*range_info,
+                                rejected=(lambda n: os.path.exists(target(n))) if directory else None)
+        if number is None:
+            return self._fail(item, f"No available numbers in range for round size {round_size}",
+                              "Error: No available numbers")
+
+        item['new_number'] = format_program_number(number)
+        item['new_file_path'] = target(number) if directory else None
+        return item
+
+    def plan_suffix_renames(self) -> List[Dict]:
+        """Plan for every program with a suffix placeholder (find_suffix_programs())"""
+        plan = []
+        for program in self.programs:
+            if not program['file_path'] or not SUFFIX_PATTERN.match(program['program_number']):
+                continue
+            round_size = program['round_size'] or program['outer_diameter']
+            if not round_size and self.round_size_from_file and os.path.exists(program['file_path']):
+                round_size = self.round_size_from_file(program['file_path'])
+
+            item = self._item(KIND_SUFFIX, program, round_size)
+            if not round_size:
+                plan.append(self._fail(item, f"Cannot determine round size for {program['program_number']}"))
+            else:
+                plan.append(self._assign(item, round_size, require_file=False))
+        return plan
+
+    def plan_out_of_range(self, program_numbers: Optional[Sequence[str]] = None,
+                          limit: Optional[int] = None) -> List[Dict]:
+        """
+        Plan moving programs into the range for their round size.
+
+        Args:
+            program_numbers: Programs to move (in this order), or None for
+                every program flagged in_correct_range = 0
+            limit: Plan at most this many programs
+        """
+        by_number = {p['program_number']: p for p in self.programs}
+        if program_numbers is None:
+            programs = sorted((p for p in self.programs
+                               if p['in_correct_range'] == 0 and p['round_size'] is not None),
+                              key=lambda p: (p['round_size'], p['program_number']))
+        else:
+            programs = [by_number.get(number) or {'program_number': number, 'title': None,
+                                                  'file_path': None, 'round_size': None}
+                        for number in program_numbers]
+        if limit:
+            programs = programs[:limit]
+
+        plan = []
+        for program in programs:
+            round_size = program['round_size']
+            item = self._item(KIND_OUT_OF_RANGE, program, round_size)
+            if program['program_number'] not in by_number:
+                plan.append(self._fail(item, f"Program {program['program_number']} not found"))
+            elif not round_size:
+                plan.append(self._fail(item, f"Program {program['program_number']} has no detected round size"))
+            elif self._in_range(program['program_number'], round_size):
+                plan.append(self._fail(item, f"Program {program['program_number']} is already in correct range",
+                                       STATUS_SKIPPED))
+            else:
+                plan.append(self._assign(item, round_size, require_file=True))
+        return plan
+
+    def _in_range(self, program_number, round_size) -> bool:
+        number = program_int(program_number)
+        range_info = self.range_for(round_size)
+        return number is not None and bool(range_info) and range_info[0] <= number <= range_info[1]
+
+
+# ----------------------------------------------------------------------
+# File content
+# ----------------------------------------------------------------------
+
+def rewrite_suffix_content(content: str, old_number: str, new_number: str) -> str:
+    """Replace the internal O-number of a suffix program (o80001(1) has O80001 inside)"""
+    match = re.match(r'^(o?)(\d+)([(_]\d+[)]?)$', old_number, re.IGNORECASE)
+    old_base = match.group(2) if match else old_number.replace('o', '').replace('O', '')
+    new_plain = new_number.replace('o', '').replace('O', '')
+
+    internal = internal_program_number(content.splitlines(True))
+    internal_plain = internal[1:] if internal else old_base
+
+    updated = re.sub(rf'^[oO]{internal_plain}\b', f'O{new_plain}', content, flags=re.MULTILINE)
+    if internal_plain != old_base:
+        updated = re.sub(rf'^[oO]{old_base}\b', f'O{new_plain}', updated, flags=re.MULTILINE)
+    return updated
+
+
+def rewrite_out_of_range_content(content: str, old_number: str, new_number: str, when: datetime) -> str:
+    """Replace the O-number and add a RENAMED FROM comment after the first line"""
+    old_base = re.sub(r'[(_]\d+[\)]?$', '', old_number.replace('o', '').replace('O', ''))
+    updated = re.sub(rf'^[oO]{old_base}\b', new_number.upper(), content, flags=re.MULTILINE)
+    updated = re.sub(rf'\b[oO]{old_base}\b', new_number.upper(), updated)
+
+    lines = updated.split('\n')
+    lines.insert(1, f"(RENAMED FROM {old_number.upper()} ON {when.strftime('%Y-%m-%d')} - OUT OF RANGE)")
+    return '\n'.join(lines)
+
+
+def _write_renamed_file(item: Dict, when: datetime):
+    """Write the renamed copy of item's file to its new path (atomically)"""
+    with open(item['old_file_path'], 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+    if item['kind'] == KIND_SUFFIX:
+        content = rewrite_suffix_content(content, item['old_number'], item['new_number'])
+    else:
+        content = rewrite_out_of_range_content(content, item['old_number'], item['new_number'], when)
+
+    temp_path = item['new_file_path'] + '.renaming'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, item['new_file_path'])
+
+
+def _same_path(a: str, b: str) -> bool:
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+# ----------------------------------------------------------------------
+# Journal
+# ----------------------------------------------------------------------
+
+def journal_path(db_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), JOURNAL_NAME)
+
+
+def _save_journal(path: str, journal: Dict):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+    os.replace(temp_path, path)
+
+
+def _load_journal(path: str) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.error(f"Unreadable rename journal {path}: {e}")
+        return None
+
+
+# ----------------------------------------------------------------------
+# Execution
+# ----------------------------------------------------------------------
+
+def _select_in(conn, query: str, values: Sequence[str]) -> List[tuple]:
+    """Run query (with one '{}' for the IN list) over values in chunks"""
+    rows = []
+    for i in range(0, len(values), _IN_CHUNK):
+        chunk = values[i:i + _IN_CHUNK]
+        rows.extend(conn.execute(query.format(', '.join('?' * len(chunk))), chunk).fetchall())
+    return rows
+
+
+def _apply_database_changes(conn, items: List[Dict], when: datetime) -> List[Dict]:
+    """
+    Apply the programs / registry / resolution-log changes for items in the
+    current transaction.
+
+    Items whose old number is gone, or whose new number was taken by a
+    program or is no longer AVAILABLE in the registry (reserved or claimed
+    since the plan was made), are left out (and marked failed).
+
+    Returns:
+        The items that were applied
+    """
+    legacy = dict(_select_in(conn, "SELECT program_number, legacy_names FROM programs WHERE program_number IN ({})",
+                             [item['old_number'] for item in items]))
+    taken = {row[0] for row in _select_in(conn, "SELECT program_number FROM programs WHERE program_number IN ({})",
+                                          [item['new_number'] for item in items])}
+    registry = dict(_select_in(conn, "SELECT program_number, status FROM program_number_registry "
+                                     "WHERE program_number IN ({})",
+                               [item['new_number'] for item in items]))
+    applied = []
+    for item in items:
+        if (item['old_number'] not in legacy or item['new_number'] in taken
+                or registry.get(item['new_number']) != 'AVAILABLE'):
+            item['error'] = "Changed by another user since the plan was made"
+            item['status'] = f"Error: {item['error']}"
+        else:
+            applied.append(item)
+
+    now = when.isoformat()
+    suffix = [item for item in applied if item['kind'] == KIND_SUFFIX]
+    out_of_range = [item for item in applied if item['kind'] == KIND_OUT_OF_RANGE]
+
+    conn.executemany("""
+        UPDATE programs SET program_number = ?, file_path = ?, last_modified = ?
+        WHERE program_number = ?
+    """, [(item['new_number'], item['new_file_path'] or item['old_file_path'], now, item['old_number'])
+          for item in suffix])
+
+    rows = []
+    for item in out_of_range:
+        try:
+            legacy_list = json.loads(legacy[item['old_number']]) if legacy[item['old_number']] else []
+        except ValueError:
+            legacy_list = []
+        legacy_list.append({
+            'old_number': item['old_number'],
+            'renamed_date': now,
+            'reason': 'Out of range - moved to correct range'
+        })
+        rows.append((item['new_number'], item['new_file_path'], json.dumps(legacy_list), now, item['old_number']))
+    conn.executemany("""
+        UPDATE programs
+        SET program_number = ?,
+            file_path = ?,
+            legacy_names = ?,
+            last_renamed_date = ?,
+            rename_reason = 'Out of range correction',
+            in_correct_range = 1
+        WHERE program_number = ?
+    """, rows)
+
+    # Registry: free the old numbers, then claim the new ones
+    conn.executemany("""
+        UPDATE program_number_registry SET status = 'AVAILABLE', file_path = NULL, last_checked = ?
+        WHERE program_number = ?
+    """, [(now, item['old_number']) for item in applied])
+    conn.executemany("""
+        UPDATE program_number_registry SET status = 'IN_USE', file_path = ?, last_checked = ?
+        WHERE program_number = ?
+    """, [(item['new_file_path'] or item['old_file_path'], now, item['new_number']) for item in applied])
+
+    conn.executemany("""
+        INSERT INTO duplicate_resolutions
+        (resolution_date, duplicate_type, program_numbers, action_taken,
+         files_affected, old_values, new_values, notes)
+        VALUES (?, 'TYPE_1_OUT_OF_RANGE', ?, 'RENAME', ?, ?, ?, ?)
+    """, [(
+        now,
+        json.dumps([item['old_number'], item['new_number']]),
+        json.dumps([{'old': item['old_file_path'], 'new': item['new_file_path']}]),
+        json.dumps({'program_number': item['old_number'], 'round_size': item['round_size'],
+                    'old_file': item['old_file_path']}),
+        json.dumps({'program_number': item['new_number'], 'round_size': item['round_size'],
+                    'new_file': item['new_file_path']}),
+        f"Renamed from {item['old_number']} to {item['new_number']} - file renamed from "
+        f"{os.path.basename(item['old_file_path'])} to {os.path.basename(item['new_file_path'])}"
+    ) for item in out_of_range])
+
+    return applied
+
+
+def _cleanup_files(items: List[Dict], applied_numbers: Set[str]):
+    """
+    Remove old files of applied renames and new files of renames that were
+    not applied (only while the other copy exists, so a file is never lost).
+    """
+    for item in items:
+        old_path, new_path = item['old_file_path'], item.get('new_file_path')
+        if not old_path or not new_path or _same_path(old_path, new_path):
+            continue
+        if item['old_number'] in applied_numbers:
+            remove, keep = old_path, new_path
+        else:
+            remove, keep = new_path, old_path
+        try:
+            if os.path.exists(remove) and os.path.exists(keep):
+                os.remove(remove)
+            if os.path.exists(new_path + '.renaming'):
+                os.remove(new_path + '.renaming')
+        except OSError as e:
+            logger.warning(f"Could not remove {remove} after rename: {e}")
+
+
+def _mark_failed(item: Dict, error: str):
+    item['error'] = error
+    item['status'] = f"Error: {error}"
+    item['write_failed'] = True
+
+
+def _owned(items: List[Dict]) -> List[Dict]:
+    """Items whose new path (if it exists) was written by this batch"""
+    return [item for item in items if not item.get('write_failed')]
+
+
+def _run_journal(db_path: str, path: str, journal: Dict,
+                 progress_callback: Optional[ProgressCallback] = None) -> Dict:
+    items = journal['items']
+    when = datetime.fromisoformat(journal['created'])
+    resuming = journal['state'] != 'new'
+    total = len(items)
+
+    if not resuming:
+        # Destinations were free when the plan was made; anything there now is
+        # someone else's file. Checked before the journal is written, so on a
+        # resume every destination that exists is our own partial copy.
+        for item in items:
+            if item['new_file_path'] and os.path.exists(item['new_file_path']):
+                _mark_failed(item, f"Destination file already exists: {item['new_file_path']}")
+
+    # Phase 1: write the renamed copies (old files stay until after the commit)
+    journal['state'] = 'files'
+    _save_journal(path, journal)
+    written = []
+    for i, item in enumerate(items, 1):
+        if item.get('write_failed'):
+            continue
+        if progress_callback:
+            progress_callback(i, total, f"{item['old_number']} -> {item['new_number']}")
+        if not item['new_file_path']:
+            written.append(item)
+            continue
+        try:
+            if not os.path.exists(item['old_file_path']):
+                raise OSError(f"File not found: {item['old_file_path']}")
+            _write_renamed_file(item, when)
+            written.append(item)
+        except OSError as e:
+            _mark_failed(item, str(e))
+
+    # Phase 2: every database change in one transaction
+    journal['state'] = 'commit'
+    _save_journal(path, journal)
+    applied = []
+    if written:
+        conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            applied = _apply_database_changes(conn, written, when)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # Nothing was committed - drop the new copies and the batch
+            _cleanup_files(_owned(items), set())
+            os.remove(path)
+            raise
+        finally:
+            conn.close()
+
+    # Phase 3: the database points at the new files - remove the old ones
+    journal['state'] = 'cleanup'
+    _save_journal(path, journal)
+    _cleanup_files(_owned(items), {item['old_number'] for item in applied})
+    os.remove(path)
+
+    applied_ids = {id(item) for item in applied}
+    return {'renamed': applied, 'failed': [item for item in items if id(item) not in applied_ids]}
+
+
+def execute_rename_plan(db_path: str, plan: Sequence[Dict],
+                        progress_callback: Optional[ProgressCallback] = None) -> Dict:
+    """
+    Execute the Ready items of a plan as one journaled batch.
+
+    Returns:
+        {'renamed': [items], 'failed': [items with 'error']}
+
+    Raises:
+        RuntimeError if an unfinished batch is still journaled
+        sqlite3.Error if the transaction failed (nothing was renamed)
+    """
+    path = journal_path(db_path)
+    if os.path.exists(path):
+        raise RuntimeError(f"An interrupted rename batch must be recovered first ({path})")
+
+    items = [dict(item) for item in plan if item['status'] == STATUS_READY]
+    if not items:
+        return {'renamed': [], 'failed': []}
+    journal = {'created': datetime.now().isoformat(), 'state': 'new',
+               'host': os.environ.get('COMPUTERNAME') or socket.gethostname(),
+               'items': items}
+    start = time.perf_counter()
+    result = _run_journal(db_path, path, journal, progress_callback)
+    logger.info(f"Rename batch: {len(result['renamed'])} renamed, {len(result['failed'])} failed "
+                f"in {time.perf_counter() - start:.1f}s")
+    return result
+
+
+def recover_rename_journal(db_path: str) -> Optional[Dict]:
+    """
+    Finish a batch interrupted by a crash or power loss.
+
+    If the transaction had not committed, the batch is run again from the
+    journaled plan (the old files are untouched until the commit); if it had,
+    only the old files are cleaned up.
+
+    Returns:
+        execute_rename_plan()-style result, or None if no batch was pending
+    """
+    path = journal_path(db_path)
+    journal = _load_journal(path)
+    if journal is None:
+        return None
+
+    items = journal['items']
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        present = {row[0] for row in _select_in(
+            conn, "SELECT program_number FROM programs WHERE program_number IN ({})",
+            [item['old_number'] for item in items] + [item['new_number'] for item in items])}
+    finally:
+        conn.close()
+    applied = [item for item in items
+               if item['new_number'] in present and item['old_number'] not in present]
+
+    if not applied and journal['state'] in ('new', 'files', 'commit'):
+        logger.info(f"Resuming interrupted rename batch ({len(items)} programs)")
+        return _run_journal(db_path, path, journal)
+
+    logger.info(f"Cleaning up committed rename batch ({len(applied)} programs)")
+    _cleanup_files(_owned(items), {item['old_number'] for item in applied})
+    os.remove(path)
+    applied_ids = {id(item) for item in applied}
+    return {'renamed': applied, 'failed': [item for item in items if id(item) not in applied_ids]}
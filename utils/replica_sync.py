@@ -0,0 +1,460 @@
+"""
+Replica Sync
+Local replica database with row-level changeset exchange for multi-computer use.
+
+Each workstation works against its own local copy of the database and
+exchanges changesets through a shared sync folder (the Google Drive folder,
+or any local stand-in folder for testing), instead of several computers
+opening one SQLite file through a sync client.
+
+- Triggers on the replicated tables log changed primary keys to
+  replica_changes
+- export_changes() writes one changeset file per batch to
+  <sync folder>/<node id>/<batch>.json with the full row (or a delete),
+  stamped with a per-row version vector
+- import_changes() applies other nodes' changesets in order; version vectors
+  decide whether an incoming row is newer, older or concurrent. Concurrent
+  edits are resolved deterministically (later change time, then higher node
+  id wins) so every node converges on the same row, and the losing version
+  is kept in replica_conflicts for review
+
+Only tables keyed by a natural primary key are replicated; derived tables
+(program_issues, the summary statistics) are maintained locally by their
+own triggers when replicated rows are applied.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Replicated table -> primary key column
+REPLICATED_TABLES = {
+    'programs': 'program_number',
+    'program_number_registry': 'program_number',
+}
+
+CHANGESET_FORMAT = 1
+CHANGESET_SUFFIX = '.json'
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+
+def _row_hash(values: Optional[Dict]) -> Optional[str]:
+    if values is None:
+        return None
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def compare_vectors(a: Dict[str, int], b: Dict[str, int]) -> str:
+    """
+    Compare two version vectors.
+
+    Returns:
+        'equal', 'newer' (a dominates b), 'older' (b dominates a) or 'concurrent'
+    """
+    a_ahead = any(count > b.get(node, 0) for node, count in a.items())
+    b_ahead = any(count > a.get(node, 0) for node, count in b.items())
+    if a_ahead and b_ahead:
+        return 'concurrent'
+    if a_ahead:
+        return 'newer'
+    if b_ahead:
+        return 'older'
+    return 'equal'
+
+
+def merge_vectors(a: Dict[str, int], b: Dict[str, int]) -> Dict[str, int]:
+    merged = dict(a)
+    for node, count in b.items():
+        merged[node] = max(count, merged.get(node, 0))
+    return merged
+
+
+def create_replica(source_db: str, replica_db: str) -> None:
+    """Seed a local replica from an existing database (SQLite online backup)"""
+    os.makedirs(os.path.dirname(os.path.abspath(replica_db)), exist_ok=True)
+    source = sqlite3.connect(source_db, timeout=30.0)
+    try:
+        target = sqlite3.connect(replica_db)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+    logger.info(f"Created local replica {replica_db} from {source_db}")
+
+
+class ReplicaSync:
+    """Changeset export/import between a local replica and a shared sync folder"""
+
+    def __init__(self, db_path: str, sync_folder: str, node_id: Optional[str] = None):
+        """
+        Args:
+            db_path: Local replica database
+            sync_folder: Shared folder holding one subfolder of changesets per node
+            node_id: This workstation's id (default: stored in the replica,
+                created from the host name on first use)
+        """
+        self.db_path = db_path
+        self.sync_folder = sync_folder
+        self.node_id = node_id
+        self.ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+
+    def ensure_schema(self) -> None:
+        """Create the sync tables and change-capture triggers (idempotent)"""
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS replica_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                CREATE TABLE IF NOT EXISTS replica_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tbl TEXT NOT NULL,
+                    pk TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS replica_versions (
+                    tbl TEXT NOT NULL,
+                    pk TEXT NOT NULL,
+                    vector TEXT NOT NULL,
+                    origin TEXT,
+                    changed_at TEXT,
+                    row_hash TEXT,
+                    PRIMARY KEY (tbl, pk)
+                );
+                CREATE TABLE IF NOT EXISTS replica_peers (
+                    node_id TEXT PRIMARY KEY,
+                    last_batch INTEGER NOT NULL DEFAULT 0,
+                    last_sync TEXT
+                );
+                CREATE TABLE IF NOT EXISTS replica_conflicts (
+                    conflict_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tbl TEXT NOT NULL,
+                    pk TEXT NOT NULL,
+                    winner_node TEXT,
+                    loser_node TEXT,
+                    loser_values TEXT,
+                    detected_at TEXT
+                );
+            """)
+            for table, pk in REPLICATED_TABLES.items():
+                if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                                    (table,)).fetchone():
+                    continue
+                conn.executescript(f"""
+                    CREATE TRIGGER IF NOT EXISTS replica_{table}_insert AFTER INSERT ON {table}
+                    BEGIN
+                        INSERT INTO replica_changes (tbl, pk) VALUES ('{table}', NEW.{pk});
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS replica_{table}_update AFTER UPDATE ON {table}
+                    BEGIN
+                        INSERT INTO replica_changes (tbl, pk) VALUES ('{table}', NEW.{pk});
+                        INSERT INTO replica_changes (tbl, pk)
+                            SELECT '{table}', OLD.{pk} WHERE OLD.{pk} IS NOT NEW.{pk};
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS replica_{table}_delete AFTER DELETE ON {table}
+                    BEGIN
+                        INSERT INTO replica_changes (tbl, pk) VALUES ('{table}', OLD.{pk});
+                    END;
+                """)
+
+            row = conn.execute("SELECT value FROM replica_meta WHERE key = 'node_id'").fetchone()
+            if self.node_id is None:
+                if row:
+                    self.node_id = row[0]
+                else:
+                    self.node_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+            if not row or row[0] != self.node_id:
+                conn.execute("INSERT OR REPLACE INTO replica_meta (key, value) VALUES ('node_id', ?)",
+                             (self.node_id,))
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection, key: str, default: str = '0') -> str:
+        row = conn.execute("SELECT value FROM replica_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, key: str, value) -> None:
+        conn.execute("INSERT OR REPLACE INTO replica_meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @staticmethod
+    def _read_row(conn: sqlite3.Connection, table: str, pk_value: str) -> Optional[Dict]:
+        cursor = conn.execute(f"SELECT * FROM {table} WHERE {REPLICATED_TABLES[table]} = ?", (pk_value,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {description[0]: value for description, value in zip(cursor.description, row)}
+
+    @staticmethod
+    def _version(conn: sqlite3.Connection, table: str, pk_value: str) -> Optional[Tuple[Dict, str, str, str]]:
+        """(vector, origin, changed_at, row_hash) or None"""
+        row = conn.execute("SELECT vector, origin, changed_at, row_hash FROM replica_versions WHERE tbl = ? AND pk = ?",
+                           (table, pk_value)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2], row[3]
+
+    @staticmethod
+    def _set_version(conn, table, pk_value, vector, origin, changed_at, row_hash) -> None:
+        conn.execute("""
+            INSERT OR REPLACE INTO replica_versions (tbl, pk, vector, origin, changed_at, row_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (table, pk_value, json.dumps(vector, sort_keys=True), origin, changed_at, row_hash))
+
+    def _node_folder(self, node_id: str) -> str:
+        return os.path.join(self.sync_folder, node_id)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def export_changes(self) -> int:
+        """
+        Write local changes since the last export as one changeset file.
+
+        Rows whose values are unchanged since they were last exported or
+        applied are skipped (e.g. a rescan that rewrote identical values).
+
+        Returns:
+            Number of rows exported
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            exported = self._export_pending(conn)
+            conn.execute("COMMIT")
+            return exported
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _export_pending(self, conn: sqlite3.Connection) -> int:
+        """Export inside the caller's write transaction (see export_changes)"""
+        max_seq = conn.execute("SELECT MAX(seq) FROM replica_changes").fetchone()[0]
+        if max_seq is None:
+            return 0
+
+        pending = conn.execute("""
+            SELECT tbl, pk, MAX(seq) FROM replica_changes WHERE seq <= ?
+            GROUP BY tbl, pk ORDER BY MAX(seq)
+        """, (max_seq,)).fetchall()
+
+        changed_at = _now()
+        changes = []
+        for table, pk_value, _ in pending:
+            if table not in REPLICATED_TABLES:
+                continue
+            values = self._read_row(conn, table, pk_value)
+            row_hash = _row_hash(values)
+            version = self._version(conn, table, pk_value)
+            if version is not None and version[3] == row_hash:
+                continue  # Same values as the last version everyone has
+
+            vector = version[0] if version else {}
+            vector[self.node_id] = vector.get(self.node_id, 0) + 1
+            self._set_version(conn, table, pk_value, vector, self.node_id, changed_at, row_hash)
+            changes.append({
+                'table': table,
+                'pk': pk_value,
+                'vector': vector,
+                'origin': self.node_id,
+                'changed_at': changed_at,
+                'values': values,
+            })
+
+        conn.execute("DELETE FROM replica_changes WHERE seq <= ?", (max_seq,))
+        if changes:
+            batch = int(self._meta(conn, 'last_batch')) + 1
+            self._write_changeset(batch, changes)
+            self._set_meta(conn, 'last_batch', batch)
+            logger.info(f"Replica sync: exported {len(changes)} row(s) as batch {batch}")
+        return len(changes)
+
+    def _write_changeset(self, batch: int, changes: List[Dict]) -> str:
+        folder = self._node_folder(self.node_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{batch:08d}{CHANGESET_SUFFIX}")
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': CHANGESET_FORMAT,
+                'node': self.node_id,
+                'batch': batch,
+                'created_at': _now(),
+                'changes': changes,
+            }, f, default=str)
+        # Atomic rename so a sync client never uploads half a changeset
+        os.replace(temp_path, path)
+        return path
+
+    # ------------------------------------------------------------------
+    # Import
+    # ------------------------------------------------------------------
+
+    def _pending_changesets(self, conn: sqlite3.Connection) -> List[Tuple[str, int, str]]:
+        """(node, batch, path) of unapplied changesets from other nodes, in batch order"""
+        if not os.path.isdir(self.sync_folder):
+            return []
+        applied = dict(conn.execute("SELECT node_id, last_batch FROM replica_peers").fetchall())
+        pending = []
+        for node in sorted(os.listdir(self.sync_folder)):
+            folder = self._node_folder(node)
+            if node == self.node_id or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                stem, suffix = os.path.splitext(name)
+                if suffix != CHANGESET_SUFFIX or not stem.isdigit():
+                    continue
+                batch = int(stem)
+                if batch > applied.get(node, 0):
+                    pending.append((node, batch, os.path.join(folder, name)))
+        return sorted(pending)
+
+    def _apply_row(self, conn: sqlite3.Connection, table: str, pk_value: str,
+                   values: Optional[Dict]) -> None:
+        pk = REPLICATED_TABLES[table]
+        if values is None:
+            conn.execute(f"DELETE FROM {table} WHERE {pk} = ?", (pk_value,))
+            return
+        # Only columns this replica has (peers may be on another schema version)
+        local_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        columns = [c for c in local_columns if c in values]
+        placeholders = ', '.join('?' * len(columns))
+        conn.execute(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                     [values[c] for c in columns])
+
+    def _apply_change(self, conn: sqlite3.Connection, change: Dict) -> str:
+        """
+        Apply one incoming row version.
+
+        Returns:
+            'applied', 'skipped' or 'conflict' (concurrent edit; resolved)
+        """
+        table, pk_value = change['table'], change['pk']
+        if table not in REPLICATED_TABLES:
+            return 'skipped'
+        incoming = change['vector']
+        local = self._version(conn, table, pk_value)
+        local_vector = local[0] if local else {}
+        relation = compare_vectors(incoming, local_vector)
+        if relation in ('equal', 'older'):
+            return 'skipped'
+
+        outcome = 'applied'
+        incoming_wins = True
+        if relation == 'concurrent':
+            # Deterministic: later change, then higher node id - same answer on every node
+            local_key = (local[2] or '', local[1] or '')
+            incoming_key = (change['changed_at'] or '', change['origin'] or '')
+            incoming_wins = incoming_key > local_key
+            loser_node, loser_values = ((local[1], self._read_row(conn, table, pk_value)) if incoming_wins
+                                        else (change['origin'], change['values']))
+            conn.execute("""
+                INSERT INTO replica_conflicts (tbl, pk, winner_node, loser_node, loser_values, detected_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (table, pk_value, change['origin'] if incoming_wins else local[1], loser_node,
+                  json.dumps(loser_values, default=str), _now()))
+            outcome = 'conflict'
+
+        vector = merge_vectors(incoming, local_vector)
+        if incoming_wins:
+            self._apply_row(conn, table, pk_value, change['values'])
+            self._set_version(conn, table, pk_value, vector, change['origin'], change['changed_at'],
+                              _row_hash(change['values']))
+        else:
+            self._set_version(conn, table, pk_value, vector, local[1], local[2], local[3])
+        return outcome
+
+    def import_changes(self) -> Dict[str, int]:
+        """
+        Apply unapplied changesets from other nodes, one transaction per file.
+
+        Returns:
+            Counts: files, applied, skipped, conflicts
+        """
+        stats = {'files': 0, 'applied': 0, 'skipped': 0, 'conflicts': 0}
+        conn = self._connect()
+        try:
+            for node, batch, path in self._pending_changesets(conn):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        changeset = json.load(f)
+                except (OSError, ValueError) as e:
+                    # Still being written/synced - retry on the next pass
+                    logger.warning(f"Replica sync: cannot read {path}: {e}")
+                    break
+
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Version local edits first, so an incoming row can't silently
+                    # overwrite an edit that was never exported
+                    stats['exported'] = stats.get('exported', 0) + self._export_pending(conn)
+                    before_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM replica_changes").fetchone()[0]
+                    for change in changeset.get('changes', []):
+                        outcome = self._apply_change(conn, change)
+                        stats['conflicts' if outcome == 'conflict' else outcome] += 1
+                        if outcome == 'conflict':
+                            stats['applied'] += 1
+                    # Rows written by the merge are not local edits - don't echo them back
+                    conn.execute("DELETE FROM replica_changes WHERE seq > ?", (before_seq,))
+                    conn.execute("""
+                        INSERT OR REPLACE INTO replica_peers (node_id, last_batch, last_sync)
+                        VALUES (?, ?, ?)
+                    """, (node, batch, _now()))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                stats['files'] += 1
+        finally:
+            conn.close()
+        if stats['files']:
+            logger.info(f"Replica sync: applied {stats['files']} changeset(s) - {stats}")
+        return stats
+
+    def sync(self) -> Dict[str, int]:
+        """Export local changes, then merge changes from other nodes"""
+        exported = self.export_changes()
+        stats = self.import_changes()
+        stats['exported'] = stats.get('exported', 0) + exported
+        return stats
+
+    def status(self) -> Dict:
+        """Node id, pending local changes, peers and unresolved conflicts"""
+        conn = self._connect()
+        try:
+            return {
+                'node_id': self.node_id,
+                'pending_changes': conn.execute("SELECT COUNT(DISTINCT tbl || pk) FROM replica_changes").fetchone()[0],
+                'last_batch': int(self._meta(conn, 'last_batch')),
+                'peers': conn.execute("SELECT node_id, last_batch, last_sync FROM replica_peers ORDER BY node_id").fetchall(),
+                'conflicts': conn.execute("SELECT COUNT(*) FROM replica_conflicts").fetchone()[0],
+            }
+        finally:
+            conn.close()
@@ -0,0 +1,473 @@
+"""
+Repository Audit
+One filesystem pass behind the repository integrity features.
+
+Orphan and duplicate detection, the integrity check and each part of the
+extended integrity check (missing M30, internal O-numbers, stale records,
+zero-byte files) used to list the repository or stat/read every tracked
+file on their own - the extended check touched every file six times.
+RepositoryAudit.run() does it once:
+
+- lists the repository with os.scandir (sizes and mtimes come with it)
+- reads each file at most once (FileContent) for its SHA256, internal
+  O-number and program-end check. Files with the size and mtime cached in
+  repository_audit_files are not read again, so a repeat audit only reads
+  what changed.
+- reads programs and the registry once
+- replaces the findings in repository_audit in one transaction
+
+The individual features call findings(kind), which reuses the latest audit
+while it is younger than max_age, the repository folder is unchanged and
+no programs / registry row it depends on has changed since. Database
+changes are counted by triggers in repository_audit_state (generation),
+so writers need no explicit invalidation. Paths that fix or delete
+something based on the findings call run() first instead of reusing them.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import logging
+
+from utils.file_content import FileContent, missing_program_end
+
+logger = logging.getLogger(__name__)
+
+
+# Finding kinds
+UNTRACKED_FILE = 'untracked_file'          # O-number file in the repository with no managed record
+ORPHAN_FILE = 'orphan_file'                # Repository file whose name no record points at
+MISSING_FILE = 'missing_file'              # Managed record whose file is gone
+REGISTRY_STALE = 'registry_stale'          # IN_USE registry entry whose file is gone
+STALE_RECORD = 'stale_record'              # File modified after the record
+ZERO_BYTE = 'zero_byte'                    # Empty repository file
+MISSING_M30 = 'missing_m30'                # Managed program without M30/M02 at the end
+INTERNAL_MISMATCH = 'internal_mismatch'    # Internal O-number differs from the program number
+INTERNAL_DUPLICATE = 'internal_duplicate'  # Internal O-number shared by several files
+NAME_DUPLICATE = 'name_duplicate'          # Repository files with the same name but extension/case
+EXACT_DUPLICATE = 'exact_duplicate'        # Repository files with identical content
+
+# Findings of an audit are reused this long (seconds)
+AUDIT_MAX_AGE = 60.0
+
+# Repository files that look like programs (untracked check)
+PROGRAM_FILE_PATTERN = re.compile(r'^[oO]\d{4,}')
+
+
+def create_audit_tables(cursor):
+    """Findings, run log and per-file cache of the repository audit"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS repository_audit (
+            finding_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            program_number TEXT,
+            file_path TEXT,
+            detail TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_repository_audit_kind ON repository_audit(kind)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS repository_audit_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repository_path TEXT,
+            folder_mtime REAL,
+            audited_at REAL,
+            files INTEGER,
+            files_read INTEGER,
+            seconds REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS repository_audit_files (
+            file_path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            sha256 TEXT,
+            internal_number TEXT,
+            missing_program_end INTEGER
+        )
+    ''')
+
+
+# Columns the audit reads - changes to them make stored findings stale
+AUDITED_PROGRAM_COLUMNS = ('program_number', 'title', 'file_path', 'last_modified', 'is_managed')
+AUDITED_REGISTRY_COLUMNS = ('program_number', 'status', 'file_path')
+
+
+def create_audit_change_tracking(cursor):
+    """
+    Change counter for the tables the audit reads, and the run column that
+    records which generation an audit saw.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS repository_audit_state (
+            state_id INTEGER PRIMARY KEY CHECK (state_id = 1),
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO repository_audit_state (state_id, generation) VALUES (1, 0)")
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(repository_audit_runs)")}
+    if 'db_generation' not in existing:
+        cursor.execute("ALTER TABLE repository_audit_runs ADD COLUMN db_generation INTEGER")
+
+    bump = "UPDATE repository_audit_state SET generation = generation + 1 WHERE state_id = 1;"
+    for table, columns in (('programs', AUDITED_PROGRAM_COLUMNS),
+                           ('program_number_registry', AUDITED_REGISTRY_COLUMNS)):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_audit_insert AFTER INSERT ON {table}
+            BEGIN {bump} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_audit_update AFTER UPDATE OF {', '.join(columns)} ON {table}
+            BEGIN {bump} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_audit_delete AFTER DELETE ON {table}
+            BEGIN {bump} END
+        ''')
+
+
+def _key(path: str) -> str:
+    """Case-insensitive path key (the repository lives on Windows shares)"""
+    return os.path.normpath(path).lower()
+
+
+class _FileInfo:
+    """Stat and (once read) content facts for one file"""
+    __slots__ = ('path', 'size', 'mtime', 'sha256', 'internal_number', 'missing_program_end', 'read')
+
+    def __init__(self, path, size, mtime):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.sha256 = None
+        self.internal_number = None
+        self.missing_program_end = None
+        self.read = False
+
+
+class RepositoryAudit:
+    """Single-pass repository audit and the findings of the latest run"""
+
+    def __init__(self, db_path: str, repository_path: str, max_age: float = AUDIT_MAX_AGE):
+        self.db_path = db_path
+        self.repository_path = str(repository_path)
+        self.max_age = max_age
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30.0)
+
+    @staticmethod
+    def _generation(conn) -> Optional[int]:
+        """Current change generation of programs / registry (None if not tracked)"""
+        try:
+            row = conn.execute("SELECT generation FROM repository_audit_state WHERE state_id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def _folder_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.repository_path).st_mtime
+        except OSError:
+            return None
+
+    # ------------------------------------------------------------------
+    # Audit pass
+    # ------------------------------------------------------------------
+
+    def _scan_folder(self) -> Dict[str, _FileInfo]:
+        files = {}
+        try:
+            with os.scandir(self.repository_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            st = entry.stat()
+                            files[_key(entry.path)] = _FileInfo(entry.path, st.st_size, st.st_mtime)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Cannot list repository {self.repository_path}: {e}")
+        return files
+
+    @staticmethod
+    def _stat(path: str) -> Optional[_FileInfo]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return _FileInfo(path, st.st_size, st.st_mtime)
+
+    @staticmethod
+    def _load(info: _FileInfo, cache: Dict[str, tuple]) -> bool:
+        """Fill content facts from the cache or one read; True if the file was read"""
+        if info.sha256 is not None or info.read:
+            return False
+        if info.size == 0:
+            info.missing_program_end = missing_program_end('')
+            return False
+        cached = cache.get(info.path)
+        if cached and cached[0] == info.size and cached[1] == info.mtime:
+            info.sha256, info.internal_number, info.missing_program_end = cached[2], cached[3], bool(cached[4])
+            return False
+        info.read = True
+        try:
+            content = FileContent.read(info.path)
+        except OSError as e:
+            logger.warning(f"File read error auditing {info.path}: {e}")
+            return False
+        info.sha256 = content.sha256
+        info.internal_number = content.internal_program_number()
+        info.missing_program_end = content.missing_program_end()
+        return True
+
+    def run(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, List[Dict]]:
+        """
+        Audit the repository and replace the stored findings.
+
+        Args:
+            progress_callback: Optional function(files_done, files_total)
+
+        Returns:
+            kind -> list of findings ({'program_number', 'file_path', ...detail})
+        """
+        start = time.perf_counter()
+        folder_mtime = self._folder_mtime()
+        files = self._scan_folder()
+
+        conn = self._connect()
+        try:
+            # Read before the rows: a change made meanwhile leaves the run stale
+            generation = self._generation(conn)
+            programs = conn.execute("""
+                SELECT program_number, title, file_path, last_modified, is_managed FROM programs
+            """).fetchall()
+            registry = conn.execute("""
+                SELECT program_number, file_path FROM program_number_registry
+                WHERE status = 'IN_USE' AND file_path IS NOT NULL
+            """).fetchall()
+            cache = {row[0]: row[1:] for row in conn.execute("""
+                SELECT file_path, size, mtime, sha256, internal_number, missing_program_end
+                FROM repository_audit_files
+            """)}
+        finally:
+            conn.close()
+
+        def lookup(path):
+            """File info for a path, from the folder listing or its own stat"""
+            key = _key(path)
+            if key not in files:
+                files[key] = self._stat(path)
+            return files[key]
+
+        findings = defaultdict(list)
+
+        def add(kind, program_number, file_path, **detail):
+            findings[kind].append(dict(program_number=program_number, file_path=file_path, **detail))
+
+        # Records
+        tracked_names = set()
+        managed_paths = set()
+        program_numbers = set()
+        managed = []
+        for prog_num, title, file_path, last_modified, is_managed in programs:
+            if prog_num:
+                program_numbers.add(prog_num.lower())
+            if not file_path:
+                continue
+            tracked_names.add(os.path.basename(file_path).lower())
+            if is_managed == 1:
+                managed_paths.add(_key(file_path))
+                managed.append((prog_num, title, file_path, last_modified))
+
+        files_read = 0
+        internal_numbers = defaultdict(list)
+        for i, (prog_num, title, file_path, last_modified) in enumerate(managed, 1):
+            if progress_callback and i % 200 == 0:
+                progress_callback(i, len(managed))
+            info = lookup(file_path)
+            if info is None:
+                add(MISSING_FILE, prog_num, file_path)
+                continue
+
+            # Stale: file newer than the record by more than a second
+            if last_modified:
+                try:
+                    db_time = datetime.fromisoformat(last_modified.replace('Z', '+00:00').split('+')[0])
+                    file_time = datetime.fromtimestamp(info.mtime)
+                    if file_time > db_time + timedelta(seconds=1):
+                        add(STALE_RECORD, prog_num, file_path, db_modified=last_modified,
+                            file_modified=file_time.isoformat())
+                except (ValueError, OSError):
+                    pass
+
+            files_read += self._load(info, cache)
+            if info.missing_program_end:
+                add(MISSING_M30, prog_num, file_path, title=title)
+            if info.internal_number and prog_num:
+                internal = info.internal_number.lower()
+                if internal != prog_num.lower():
+                    add(INTERNAL_MISMATCH, prog_num, file_path, internal_number=info.internal_number)
+                internal_numbers[internal].append((prog_num, file_path))
+
+        for internal, entries in internal_numbers.items():
+            if len(entries) > 1:
+                for prog_num, file_path in entries:
+                    add(INTERNAL_DUPLICATE, prog_num, file_path, internal_number=internal)
+
+        # Repository files
+        repo_dir = _key(self.repository_path)
+        by_stem = defaultdict(list)
+        by_hash = defaultdict(list)
+        repo_files = [info for key, info in files.items()
+                      if info is not None and os.path.dirname(key) == repo_dir]
+        for info in repo_files:
+            name = os.path.basename(info.path)
+            stem = os.path.splitext(name)[0].lower()
+            by_stem[stem].append(info.path)
+            if name.lower() not in tracked_names:
+                add(ORPHAN_FILE, stem, info.path)
+            if _key(info.path) not in managed_paths and PROGRAM_FILE_PATTERN.match(name):
+                add(UNTRACKED_FILE, stem, info.path)
+            if info.size == 0:
+                add(ZERO_BYTE, stem, info.path, in_database=stem in program_numbers)
+                continue
+            files_read += self._load(info, cache)
+            if info.sha256:
+                by_hash[info.sha256].append(info.path)
+
+        for stem, paths in by_stem.items():
+            if len(paths) > 1:
+                for path in paths:
+                    add(NAME_DUPLICATE, stem, path)
+        for sha256, paths in by_hash.items():
+            if len(paths) > 1:
+                for path in paths:
+                    add(EXACT_DUPLICATE, os.path.splitext(os.path.basename(path))[0].lower(), path,
+                        sha256=sha256)
+
+        # Registry entries pointing at missing files
+        for prog_num, file_path in registry:
+            if lookup(file_path) is None:
+                add(REGISTRY_STALE, prog_num, file_path)
+
+        seconds = time.perf_counter() - start
+        self._store(findings, files, folder_mtime, generation, files_read, seconds)
+        logger.info(f"Repository audit: {len(repo_files)} files, {files_read} read, "
+                    f"{sum(len(v) for v in findings.values())} findings in {seconds:.2f}s")
+        return dict(findings)
+
+    def _store(self, findings, files, folder_mtime, generation, files_read, seconds):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM repository_audit")
+                conn.executemany("""
+                    INSERT INTO repository_audit (kind, program_number, file_path, detail)
+                    VALUES (?, ?, ?, ?)
+                """, [(kind, f['program_number'], f['file_path'],
+                       json.dumps({k: v for k, v in f.items() if k not in ('program_number', 'file_path')}))
+                      for kind, rows in findings.items() for f in rows])
+                conn.execute("DELETE FROM repository_audit_files")
+                conn.executemany("""
+                    INSERT OR REPLACE INTO repository_audit_files
+                        (file_path, size, mtime, sha256, internal_number, missing_program_end)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [(info.path, info.size, info.mtime, info.sha256, info.internal_number,
+                       int(bool(info.missing_program_end)))
+                      for info in files.values() if info is not None and info.sha256])
+                conn.execute("""
+                    INSERT INTO repository_audit_runs
+                        (repository_path, folder_mtime, db_generation, audited_at, files, files_read, seconds)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (self.repository_path, folder_mtime, generation, time.time(),
+                      sum(1 for info in files.values() if info is not None), files_read, seconds))
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def latest_run(self) -> Optional[Dict]:
+        """Latest audit run, plus 'current_generation' (the database's generation now)"""
+        columns = ('repository_path', 'folder_mtime', 'db_generation', 'audited_at', 'files', 'files_read', 'seconds')
+        conn = self._connect()
+        try:
+            row = conn.execute(f"""
+                SELECT {', '.join(columns)}
+                FROM repository_audit_runs ORDER BY run_id DESC LIMIT 1
+            """).fetchone()
+            generation = self._generation(conn)
+        finally:
+            conn.close()
+        if not row:
+            return None
+        run = dict(zip(columns, row))
+        run['current_generation'] = generation
+        return run
+
+    def is_fresh(self) -> bool:
+        """
+        True if the latest audit is of this repository, recent, and neither the
+        folder nor the programs / registry rows it read have changed since
+        """
+        run = self.latest_run()
+        return bool(run and run['repository_path'] == self.repository_path
+                    and time.time() - run['audited_at'] < self.max_age
+                    and run['folder_mtime'] == self._folder_mtime()
+                    and run['db_generation'] is not None
+                    and run['db_generation'] == run['current_generation'])
+
+    def ensure_fresh(self):
+        if not self.is_fresh():
+            self.run()
+
+    def findings(self, kind: str, refresh: bool = True) -> List[Dict]:
+        """
+        Findings of one kind from the latest audit (run first unless fresh).
+
+        Returns:
+            List of dicts: program_number, file_path and the kind's detail keys
+        """
+        if refresh:
+            self.ensure_fresh()
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT program_number, file_path, detail FROM repository_audit
+                WHERE kind = ? ORDER BY finding_id
+            """, (kind,)).fetchall()
+        finally:
+            conn.close()
+        result = []
+        for prog_num, file_path, detail in rows:
+            finding = {'program_number': prog_num, 'file_path': file_path}
+            if detail:
+                finding.update(json.loads(detail))
+            result.append(finding)
+        return result
+
+    def cached_sha256(self, path: str) -> Optional[str]:
+        """SHA256 from the audit cache if the file is unchanged since, else None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT size, mtime, sha256 FROM repository_audit_files WHERE file_path = ?",
+                               (str(path),)).fetchone()
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime:
+            return row[2]
+        return None
@@ -0,0 +1,520 @@
+"""
+G-Code Toolpath Engine
+Modal lathe toolpath interpreter shared by the toolpath plotter and
+anything else that needs to walk a program's moves.
+
+Handles:
+- G00/G01 linear moves and G02/G03 arcs (R or I/K, XZ plane)
+- G81/G83 drilling cycles (expanded into rapid/feed moves, cancelled by G80
+  or any motion G-code)
+- G53 machine-coordinate moves (not drawn - they break the path until the
+  next positioning move in work coordinates)
+- Work offsets (G54-G59, G154 Pn, G155 Pn), U/W incremental moves, G20/G21
+- Modal feed/spindle state per move (F, G98/G99, S, G96/G97, G50 S clamp)
+
+X values are kept as programmed (diameter); arcs are computed in radius
+space so their geometry is correct.
+
+Parsed toolpaths are cached in memory keyed by the SHA256 of the file
+content, so reopening (or re-plotting) an unchanged program is instant.
+"""
+
+import hashlib
+import io
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Motion types stored per move in the 'motion' array
+MOTION_RAPID = 0
+MOTION_FEED = 1
+MOTION_ARC = 2
+
+# Maximum chord deviation (inches) when approximating arcs with segments
+ARC_TOLERANCE = 0.0005
+
+# Number of parsed programs kept in the in-memory cache
+TOOLPATH_CACHE_SIZE = 64
+
+# Address letter followed by a number, e.g. "X-1.25", "G154", "P23", "F.008"
+_WORD_PATTERN = re.compile(r'([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+
+# Parenthesised comment (an unclosed comment runs to end of line)
+_COMMENT_PATTERN = re.compile(r'\([^)]*(?:\)|$)')
+
+# Columns of the per-move table built while walking the program
+_COLUMNS = ('x1', 'z1', 'x2', 'z2', 'motion', 'line', 'feed', 'feed_per_rev',
+            'spindle', 'css', 'max_rpm', 'tool')
+
+_TOOLPATH_CACHE: "OrderedDict[str, Dict]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def clear_toolpath_cache():
+    """Drop all cached toolpaths (e.g. after a bulk file rewrite)"""
+    with _CACHE_LOCK:
+        _TOOLPATH_CACHE.clear()
+
+
+def arc_points(x0: float, z0: float, x1: float, z1: float, clockwise: bool,
+               r: Optional[float] = None, i: Optional[float] = None,
+               k: Optional[float] = None) -> Optional[List[Tuple[float, float]]]:
+    """
+    Approximate a G02/G03 arc in the XZ plane with straight segments.
+
+    Args:
+        x0, z0: Start point (X as diameter)
+        x1, z1: End point (X as diameter)
+        clockwise: True for G02, False for G03 (viewed with Z right, X up)
+        r: Arc radius (negative for arcs over 180 degrees)
+        i, k: Centre offset from the start point (I in radius, K in Z)
+
+    Returns:
+        List of (x, z) points after the start point, ending exactly at the
+        end point, or None if the arc cannot be constructed.
+    """
+    # Work in (u, v) = (z, radius) so the geometry is true-scale
+    u0, v0, u1, v1 = z0, x0 / 2.0, z1, x1 / 2.0
+
+    if i is not None or k is not None:
+        cu = u0 + (k or 0.0)
+        cv = v0 + (i or 0.0)
+    elif r is not None:
+        du, dv = u1 - u0, v1 - v0
+        chord = math.hypot(du, dv)
+        if chord == 0 or abs(r) < chord / 2.0 - 1e-6:
+            return None
+        h = math.sqrt(max(r * r - (chord / 2.0) ** 2, 0.0))
+        # Centre lies left of the chord for a counter-clockwise minor arc
+        side = -1.0 if clockwise else 1.0
+        if r < 0:
+            side = -side
+        cu = (u0 + u1) / 2.0 + side * h * (-dv / chord)
+        cv = (v0 + v1) / 2.0 + side * h * (du / chord)
+    else:
+        return None
+
+    radius = math.hypot(u0 - cu, v0 - cv)
+    if radius < 1e-9:
+        return None
+
+    a0 = math.atan2(v0 - cv, u0 - cu)
+    a1 = math.atan2(v1 - cv, u1 - cu)
+    if clockwise:
+        sweep = -((a0 - a1) % (2 * math.pi))
+    else:
+        sweep = (a1 - a0) % (2 * math.pi)
+    if abs(sweep) < 1e-9:
+        sweep = -2 * math.pi if clockwise else 2 * math.pi  # Full circle
+
+    if radius <= ARC_TOLERANCE:
+        steps = 1
+    else:
+        max_step = 2 * math.acos(1 - ARC_TOLERANCE / radius)
+        steps = min(max(int(math.ceil(abs(sweep) / max_step)), 1), 720)
+
+    points = []
+    for step in range(1, steps):
+        angle = a0 + sweep * step / steps
+        points.append(((cv + radius * math.sin(angle)) * 2.0,
+                       cu + radius * math.cos(angle)))
+    points.append((x1, z1))
+    return points
+
+
+class GCodeToolpathParser:
+    """Parse G-code file and extract toolpath coordinates"""
+
+    def __init__(self, file_path: str):
+        """
+        Initialize parser.
+
+        Args:
+            file_path: Path to G-code file
+        """
+        self.file_path = file_path
+
+    def parse(self) -> Dict:
+        """
+        Parse G-code and extract toolpath data (cached by content hash).
+
+        The returned dict is shared with the cache and must be treated as
+        read-only.
+
+        Returns:
+            {
+                'segments': ndarray (N, 4) of (x1, z1, x2, z2),  # Every move, arcs as chords
+                'motion': ndarray (N,) MOTION_RAPID / MOTION_FEED / MOTION_ARC,
+                'lines': ndarray (N,) G-code line number of each segment,
+                'feed', 'feed_per_rev', 'spindle', 'css', 'max_rpm', 'tool':
+                    ndarrays (N,) with the modal state active for each segment,
+                'rapid_moves': ndarray (R, 4), 'rapid_lines': ndarray (R,),
+                'feed_moves': ndarray (F, 4), 'feed_lines': ndarray (F,),
+                'tool_changes': [(x, z, tool), ...],     # Tool positions
+                'tool_change_lines': [line_num, ...],    # Line of each tool change
+                'work_offsets': [(line_num, 'G154 P23'), ...],  # Work offset changes
+                'move_count': int,  # Programmed moves (an arc counts once)
+                'arc_count': int,
+                'bounds': {'x_min': ..., 'x_max': ..., 'z_min': ..., 'z_max': ...},
+                'line_coordinates': {line_num: (x, z), ...},  # Line number to coordinate mapping
+                'gcode_lines': [...],  # Original G-code lines for display
+                'flip_line': None,  # Line number where flip comment occurs
+                'side1_deepest_z': None,  # Deepest (most negative) Z from Side 1
+                'content_hash': str  # SHA256 of the file content
+            }
+        """
+        try:
+            with open(self.file_path, 'rb') as f:
+                data = f.read()
+        except Exception as e:
+            logger.error(f"Failed to load file: {e}")
+            return self._empty_result()
+
+        content_hash = hashlib.sha256(data).hexdigest()
+        with _CACHE_LOCK:
+            cached = _TOOLPATH_CACHE.get(content_hash)
+            if cached is not None:
+                _TOOLPATH_CACHE.move_to_end(content_hash)
+                return cached
+
+        text = data.decode('utf-8', errors='ignore')
+        result = self.parse_lines(io.StringIO(text, newline=None).readlines())
+        result['content_hash'] = content_hash
+
+        with _CACHE_LOCK:
+            _TOOLPATH_CACHE[content_hash] = result
+            while len(_TOOLPATH_CACHE) > TOOLPATH_CACHE_SIZE:
+                _TOOLPATH_CACHE.popitem(last=False)
+
+        return result
+
+    def parse_lines(self, gcode_lines: List[str]) -> Dict:
+        """
+        Walk already-loaded G-code lines (no caching).
+
+        Args:
+            gcode_lines: Program lines (with or without line endings)
+
+        Returns:
+            Toolpath dict as described in parse()
+        """
+        rows = []  # One tuple per segment, see _COLUMNS
+        tool_changes = []
+        tool_change_lines = []
+        work_offsets = []
+        line_coordinates = {}  # Map line number to ending coordinate
+        flip_line = None
+        side1_deepest_z = 0.0
+        move_count = 0
+        arc_count = 0
+
+        # Modal state - start position is unknown (tool at machine home)
+        x = z = 0.0
+        position_known = False
+        motion = 0  # G00
+        units = 1.0  # 1/25.4 after G21
+        feed = 0.0
+        feed_per_rev = 1.0  # G99 (feed per revolution) is the lathe default
+        spindle = 0.0
+        css = 0.0
+        max_rpm = 0.0
+        tool = ''
+        tool_num = 0.0
+        work_offset = None
+        cycle = None  # Active drilling cycle parameters
+
+        for line_num, original_line in enumerate(gcode_lines, 1):
+            line = original_line.upper()
+
+            # Check for flip comment, then remove comments
+            if '(' in line:
+                if flip_line is None and 'FLIP' in line[line.index('('):]:
+                    flip_line = line_num
+                line = _COMMENT_PATTERN.sub(' ', line)
+
+            line = line.strip()
+            if not line or line.startswith('%'):
+                continue
+
+            words = _WORD_PATTERN.findall(line)
+            if not words:
+                continue
+
+            g_codes = set()
+            values = {}
+            for letter, value in words:
+                if letter == 'G':
+                    g_codes.add(float(value))
+                else:
+                    values[letter] = value
+
+            # Units and feed mode
+            if 20.0 in g_codes:
+                units = 1.0
+            elif 21.0 in g_codes:
+                units = 1 / 25.4
+            if 98.0 in g_codes:
+                feed_per_rev = 0.0
+            elif 99.0 in g_codes:
+                feed_per_rev = 1.0
+
+            # Spindle mode (G96 constant surface speed / G97 direct RPM)
+            if 96.0 in g_codes:
+                css = 1.0
+            elif 97.0 in g_codes:
+                css = 0.0
+
+            if 'F' in values:
+                feed = float(values['F']) * units
+            if 50.0 in g_codes:
+                # Haas lathe G50 S = spindle speed clamp; G50 X/Z = coordinate preset
+                if 'S' in values:
+                    max_rpm = float(values['S'])
+                if 'X' in values or 'Z' in values:
+                    x = float(values['X']) * units if 'X' in values else x
+                    z = float(values['Z']) * units if 'Z' in values else z
+                    position_known = True
+                continue
+            if 'S' in values:
+                spindle = float(values['S'])
+
+            # Tool change (T followed by digits)
+            if 'T' in values:
+                tool = values['T']
+                tool_num = float(int(float(tool)))
+                tool_changes.append((x, z, tool))
+                tool_change_lines.append(line_num)
+                line_coordinates[line_num] = (x, z)
+
+            # Work offsets
+            offset = None
+            for code in (54.0, 55.0, 56.0, 57.0, 58.0, 59.0):
+                if code in g_codes:
+                    offset = f"G{int(code)}"
+            if 154.0 in g_codes or 155.0 in g_codes:
+                offset = f"G{154 if 154.0 in g_codes else 155}"
+                if 'P' in values:
+                    offset += f" P{int(float(values['P']))}"
+            if offset and offset != work_offset:
+                work_offset = offset
+                work_offsets.append((line_num, offset))
+
+            # Motion group (any motion code cancels a drilling cycle)
+            for code in (0.0, 1.0, 2.0, 3.0):
+                if code in g_codes:
+                    motion = int(code)
+                    cycle = None
+            if 80.0 in g_codes:
+                cycle = None
+            if 81.0 in g_codes or 83.0 in g_codes:
+                cycle = {'code': 83 if 83.0 in g_codes else 81,
+                         'depth': None, 'r': None, 'q': None}
+
+            # Non-modal commands that do not produce work-coordinate moves
+            if 53.0 in g_codes or 28.0 in g_codes:
+                position_known = False  # Machine coordinates / reference return
+                continue
+            if 4.0 in g_codes:
+                continue  # Dwell (P/X/U is a time, not a position)
+
+            has_axis = any(axis in values for axis in ('X', 'Z', 'U', 'W'))
+            new_x = x
+            new_z = z
+            if 'X' in values:
+                new_x = float(values['X']) * units
+            elif 'U' in values:
+                new_x = x + float(values['U']) * units
+            if 'Z' in values:
+                new_z = float(values['Z']) * units
+            elif 'W' in values:
+                new_z = z + float(values['W']) * units
+
+            tool_is_drill = tool.startswith('1')  # T1xx drilling/boring tools
+            state = (feed, feed_per_rev, spindle, css, max_rpm, tool_num)
+
+            if cycle is not None:
+                # Z on the cycle line (or a repeat line) is the hole depth;
+                # the tool's Z stays at the initial point
+                if 'Z' in values or 'W' in values:
+                    cycle['depth'] = new_z
+                if 'R' in values:
+                    cycle['r'] = float(values['R']) * units
+                if 'Q' in values:
+                    cycle['q'] = abs(float(values['Q'])) * units
+                is_cycle_line = 81.0 in g_codes or 83.0 in g_codes
+                if not (is_cycle_line or has_axis) or cycle['depth'] is None:
+                    continue
+                if not position_known:
+                    x, position_known = new_x, True
+                self._expand_drill_cycle(rows, cycle, x, z, new_x, line_num, state)
+                move_count += 1
+                x = new_x
+                line_coordinates[line_num] = (x, z)
+                if (flip_line is None or line_num < flip_line) and tool_is_drill:
+                    side1_deepest_z = min(side1_deepest_z, cycle['depth'])
+                continue
+
+            if not has_axis:
+                continue
+
+            if not position_known:
+                # First move after machine home: start point unknown, nothing to draw
+                x, z = new_x, new_z
+                position_known = True
+                line_coordinates[line_num] = (x, z)
+                continue
+
+            if new_x == x and new_z == z:
+                continue
+
+            move_count += 1
+            if motion in (2, 3):
+                points = arc_points(
+                    x, z, new_x, new_z, clockwise=(motion == 2),
+                    r=float(values['R']) * units if 'R' in values else None,
+                    i=float(values['I']) * units if 'I' in values else None,
+                    k=float(values['K']) * units if 'K' in values else None)
+            else:
+                points = None
+
+            if points:
+                arc_count += 1
+                px, pz = x, z
+                for ax, az in points:
+                    rows.append((px, pz, ax, az, MOTION_ARC, line_num) + state)
+                    px, pz = ax, az
+            else:
+                # G00/G01, or an arc without usable R/I/K drawn as a straight feed
+                rows.append((x, z, new_x, new_z,
+                             MOTION_RAPID if motion == 0 else MOTION_FEED,
+                             line_num) + state)
+
+            # Map this line number to the destination coordinate
+            line_coordinates[line_num] = (new_x, new_z)
+
+            # Track deepest Z from T1xx drilling operations before flip
+            if (flip_line is None or line_num < flip_line) and tool_is_drill:
+                side1_deepest_z = min(side1_deepest_z, new_z)
+
+            # Update current position
+            x, z = new_x, new_z
+
+        if not rows:
+            empty = self._empty_result()
+            empty['gcode_lines'] = gcode_lines
+            empty['flip_line'] = flip_line
+            return empty
+
+        table = np.array(rows, dtype=float)
+        columns = dict(zip(_COLUMNS, table.T))
+        segments = table[:, :4]
+        motion_arr = columns['motion'].astype(np.int8)
+        lines_arr = columns['line'].astype(np.int32)
+        rapid = motion_arr == MOTION_RAPID
+
+        mins = segments.min(axis=0)
+        maxs = segments.max(axis=0)
+        bounds = {
+            'x_min': float(min(mins[0], mins[2])),
+            'x_max': float(max(maxs[0], maxs[2])),
+            'z_min': float(min(mins[1], mins[3])),
+            'z_max': float(max(maxs[1], maxs[3]))
+        }
+
+        return {
+            'segments': segments,
+            'motion': motion_arr,
+            'lines': lines_arr,
+            'feed': columns['feed'],
+            'feed_per_rev': columns['feed_per_rev'].astype(bool),
+            'spindle': columns['spindle'],
+            'css': columns['css'].astype(bool),
+            'max_rpm': columns['max_rpm'],
+            'tool': columns['tool'].astype(np.int32),
+            'rapid_moves': segments[rapid],
+            'rapid_lines': lines_arr[rapid],
+            'feed_moves': segments[~rapid],
+            'feed_lines': lines_arr[~rapid],
+            'tool_changes': tool_changes,
+            'tool_change_lines': tool_change_lines,
+            'work_offsets': work_offsets,
+            'move_count': move_count,
+            'arc_count': arc_count,
+            'bounds': bounds,
+            'line_coordinates': line_coordinates,
+            'gcode_lines': gcode_lines,
+            'flip_line': flip_line,
+            'side1_deepest_z': side1_deepest_z
+        }
+
+    @staticmethod
+    def _expand_drill_cycle(rows: list, cycle: Dict, x: float, z: float,
+                            new_x: float, line_num: int, state: tuple):
+        """
+        Append the rapid/feed moves of one G81/G83 drilling cycle.
+
+        The tool starts at (x, z), positions to new_x, rapids to the R plane
+        (initial Z if no R), drills to depth (pecking by Q for G83) and
+        rapids back to the initial Z.
+        """
+        depth = cycle['depth']
+        r_plane = cycle['r'] if cycle['r'] is not None else z
+
+        if new_x != x:
+            rows.append((x, z, new_x, z, MOTION_RAPID, line_num) + state)
+        if r_plane != z:
+            rows.append((new_x, z, new_x, r_plane, MOTION_RAPID, line_num) + state)
+
+        peck = cycle['q'] if cycle['code'] == 83 and cycle['q'] else None
+        current = r_plane
+        pecks = 0
+        while current > depth and pecks < 500:
+            target = max(current - peck, depth) if peck else depth
+            rows.append((new_x, current, new_x, target, MOTION_FEED, line_num) + state)
+            if target > depth:
+                # Peck: retract to R plane, rapid back down to the last depth
+                rows.append((new_x, target, new_x, r_plane, MOTION_RAPID, line_num) + state)
+                rows.append((new_x, r_plane, new_x, target, MOTION_RAPID, line_num) + state)
+            current = target
+            pecks += 1
+
+        rows.append((new_x, min(current, depth), new_x, z, MOTION_RAPID, line_num) + state)
+
+    def _empty_result(self) -> Dict:
+        """Return empty result structure"""
+        empty_segments = np.empty((0, 4))
+        empty_values = np.empty(0)
+        empty_lines = np.empty(0, dtype=np.int32)
+        return {
+            'segments': empty_segments,
+            'motion': np.empty(0, dtype=np.int8),
+            'lines': empty_lines,
+            'feed': empty_values,
+            'feed_per_rev': np.empty(0, dtype=bool),
+            'spindle': empty_values,
+            'css': np.empty(0, dtype=bool),
+            'max_rpm': empty_values,
+            'tool': np.empty(0, dtype=np.int32),
+            'rapid_moves': empty_segments,
+            'rapid_lines': empty_lines,
+            'feed_moves': empty_segments,
+            'feed_lines': empty_lines,
+            'tool_changes': [],
+            'tool_change_lines': [],
+            'work_offsets': [],
+            'move_count': 0,
+            'arc_count': 0,
+            'bounds': {'x_min': 0, 'x_max': 0, 'z_min': 0, 'z_max': 0},
+            'line_coordinates': {},
+            'gcode_lines': [],
+            'flip_line': None,
+            'side1_deepest_z': None
+        }
@@ -0,0 +1,384 @@
+"""
+2PC Matching
+STUD/LUG compatibility matching over the 2PC catalog.
+
+Matching used to load every 2PC row into dicts on each request and run the
+full compatibility check for every STUD x LUG pair. Here:
+
+- TwoPCCatalog loads the 2PC rows once and keeps them until the database
+  changes (PRAGMA data_version on a long-lived read connection)
+- LUGs with a mating recess are bucketed by round size (OD, at the OD
+  match tolerance) and sorted by recess (step) diameter
+- each STUD looks only at the neighbouring round size buckets and
+  bisects to the LUGs whose recess clears its hub, so only pairs that
+  can fit reach check_2pc_compatibility()
+
+An all-pairs report is therefore bounded by the number of fitting pairs
+instead of STUDs x LUGs.
+"""
+
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+PART_COLUMNS = ('program_number', 'title', 'outer_diameter', 'center_bore',
+                'thickness', 'hub_height', 'hub_diameter', 'counter_bore_depth',
+                'counter_bore_diameter', 'spacer_type', 'file_path',
+                'validation_status', 'is_deleted')
+
+# Round size (OD) match tolerance - also the round size bucket width
+OD_TOLERANCE_MM = 1.0
+
+# STUD hub must clear the LUG recess by at least this much (0.001")
+MIN_HUB_CLEARANCE_MM = 0.025
+
+# STUD hub height must clear the LUG recess depth by at least this much
+MIN_DEPTH_CLEARANCE_IN = 0.02
+
+# 2PC mating features: small STUD hub and the LUG recess that receives it
+MATING_HUB_HEIGHT_IN = (0.20, 0.30)
+LARGE_HUB_HEIGHT_IN = (0.45, 0.60)
+RECESS_DEPTH_IN = (0.25, 0.40)
+
+# Slack on bisect bounds so float rounding never drops a boundary pair;
+# every candidate is re-checked exactly
+_BOUND_SLACK_MM = 1e-6
+
+
+def check_2pc_compatibility(stud: Dict, lug: Dict) -> Dict:
+    """
+    Check if a STUD and LUG are compatible.
+
+    Returns:
+        dict: {'compatible': bool, 'score': int (0-100), 'notes': list,
+               'clearance_mm': float (once the hub fit is known)}
+    """
+    result = {'compatible': False, 'score': 0, 'notes': []}
+
+    # Rule 0: CRITICAL - Verify proper 2PC mating features
+    # 2PC mating uses:
+    #   - Small hub (~0.25" / 0.20-0.30") for mating
+    #   - Recess (~0.3-0.35" / 0.25-0.40" deep) for receiving the small hub
+    # Non-2PC features (ignore these):
+    #   - Large hub (~0.50" / 0.45-0.60") for mounting/handling (not for 2PC mating)
+
+    stud_hub_dia = stud.get('hub_diameter')
+    stud_hub_height = stud.get('hub_height')
+    lug_step_dia = lug.get('counter_bore_diameter')
+    lug_step_depth = lug.get('counter_bore_depth')
+
+    # Check STUD has a small hub for 2PC mating (0.20-0.30")
+    if not stud_hub_dia or not stud_hub_height:
+        result['notes'].append('❌ STUD missing hub dimensions')
+        return result
+    if stud_hub_dia <= 0 or stud_hub_height <= 0:
+        result['notes'].append('❌ STUD has invalid hub dimensions')
+        return result
+
+    # Identify if this is a 2PC mating hub (small ~0.25") or other hub (large ~0.50")
+    is_stud_small_hub = MATING_HUB_HEIGHT_IN[0] <= stud_hub_height <= MATING_HUB_HEIGHT_IN[1]
+    is_stud_large_hub = LARGE_HUB_HEIGHT_IN[0] <= stud_hub_height <= LARGE_HUB_HEIGHT_IN[1]
+
+    if not is_stud_small_hub:
+        if is_stud_large_hub:
+            result['notes'].append('❌ STUD has large hub (0.50" - not for 2PC mating)')
+        else:
+            result['notes'].append(f'❌ STUD hub height {stud_hub_height:.2f}" is not a 2PC mating hub (expected 0.20-0.30")')
+        return result
+
+    # Check LUG dimensions
+    lug_hub_dia = lug.get('hub_diameter')
+    lug_hub_height = lug.get('hub_height')
+
+    # Identify LUG features
+    has_lug_recess = lug_step_dia and lug_step_depth and lug_step_dia > 0 and lug_step_depth > 0
+    has_lug_small_hub = (lug_hub_dia and lug_hub_height and lug_hub_dia > 0
+                         and MATING_HUB_HEIGHT_IN[0] <= lug_hub_height <= MATING_HUB_HEIGHT_IN[1])
+    has_lug_large_hub = lug_hub_height and LARGE_HUB_HEIGHT_IN[0] <= lug_hub_height <= LARGE_HUB_HEIGHT_IN[1]
+
+    # LUG must have a proper 2PC recess (0.25-0.40" deep) to receive the STUD's small hub
+    is_lug_proper_recess = has_lug_recess and RECESS_DEPTH_IN[0] <= lug_step_depth <= RECESS_DEPTH_IN[1]
+
+    # REJECT: Both parts have only small hubs (0.25") - can't mate together
+    if has_lug_small_hub and not is_lug_proper_recess:
+        result['notes'].append('❌ Both parts have 0.25" hubs - cannot mate (no recess)')
+        return result
+
+    # REJECT: LUG has no proper recess for 2PC mating
+    if not is_lug_proper_recess:
+        if has_lug_large_hub:
+            result['notes'].append('❌ LUG has only large hub (0.50") - no recess for 2PC mating')
+        else:
+            result['notes'].append('❌ LUG missing proper recess (expected 0.25-0.40" deep)')
+        return result
+
+    # ALLOW: LUG has proper recess + optional large hub (0.50" hub is for other purposes)
+    # This is valid - the 0.50" hub on LUG is not for 2PC mating with this STUD
+
+    # Rule 1: Round size (OD) must match within tolerance
+    stud_od = stud.get('outer_diameter')
+    lug_od = lug.get('outer_diameter')
+
+    if not stud_od or not lug_od:
+        result['notes'].append('Missing OD data')
+        return result
+
+    od_diff_inches = abs(stud_od - lug_od)
+    od_diff_mm = od_diff_inches * 25.4
+
+    # Tolerance: ±1mm (0.04") for OD match
+    if od_diff_mm > OD_TOLERANCE_MM:
+        result['notes'].append(f'OD mismatch: {od_diff_mm:.1f}mm difference')
+        return result
+
+    # OD matches - good start
+    result['score'] += 40
+    result['notes'].append(f'✓ OD match: {stud_od:.2f}" (Δ={od_diff_mm:.1f}mm)')
+
+    # Rule 2: Hub diameter must fit inside step diameter
+    clearance_mm = lug_step_dia - stud_hub_dia
+
+    # Minimum clearance: 0.001" = 0.0254mm (parts must have positive clearance)
+    if clearance_mm < MIN_HUB_CLEARANCE_MM:
+        result['notes'].append(f'❌ Hub too large: {stud_hub_dia:.1f}mm hub vs {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm)')
+        return result
+
+    # Score based on tightness of fit (tighter = better)
+    # 0.025-0.5mm clearance = excellent fit (30 points)
+    # 0.5-2.0mm clearance = good fit (25 points)
+    # 2.0-5.0mm clearance = acceptable fit (20 points)
+    # >5.0mm clearance = loose fit (10 points)
+    if clearance_mm <= 0.5:
+        result['score'] += 30
+        result['notes'].append(f'✓ Hub fit: {stud_hub_dia:.1f}mm hub → {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm - TIGHT FIT)')
+    elif clearance_mm <= 2.0:
+        result['score'] += 25
+        result['notes'].append(f'✓ Hub fit: {stud_hub_dia:.1f}mm hub → {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm)')
+    elif clearance_mm <= 5.0:
+        result['score'] += 20
+        result['notes'].append(f'✓ Hub fit: {stud_hub_dia:.1f}mm hub → {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm)')
+    else:
+        result['score'] += 10
+        result['notes'].append(f'⚠ Hub fit: {stud_hub_dia:.1f}mm hub → {lug_step_dia:.1f}mm recess (clearance: {clearance_mm:.2f}mm - LOOSE FIT)')
+
+    # Store clearance for sorting
+    result['clearance_mm'] = clearance_mm
+
+    # Rule 3: Hub height must fit inside step depth
+    depth_clearance = lug_step_depth - stud_hub_height
+
+    # Need at least 0.02" clearance
+    if depth_clearance < MIN_DEPTH_CLEARANCE_IN:
+        result['notes'].append(f'❌ Hub too tall: {stud_hub_height:.2f}" hub vs {lug_step_depth:.2f}" recess depth (clearance: {depth_clearance:.3f}")')
+        return result
+
+    # Good depth clearance
+    result['score'] += 20
+    result['notes'].append(f'✓ Hub depth: {stud_hub_height:.2f}" hub → {lug_step_depth:.2f}" recess (clearance: {depth_clearance:.3f}")')
+
+    # Rule 4: CB match is a bonus (not required)
+    stud_cb = stud.get('center_bore')
+    lug_cb = lug.get('center_bore')
+
+    if stud_cb and lug_cb:
+        cb_diff_mm = abs(stud_cb - lug_cb)
+        if cb_diff_mm < 1.0:
+            result['score'] += 10
+            result['notes'].append(f'CB match: {stud_cb:.1f}mm (bonus!)')
+        else:
+            result['notes'].append(f'CB different: STUD={stud_cb:.1f}mm, LUG={lug_cb:.1f}mm (OK - not required)')
+
+    # Compatible if we got here
+    result['compatible'] = True
+
+    return result
+
+
+def is_mating_stud(part: Dict) -> bool:
+    """STUD with a 2PC mating hub and a round size (can match some LUG)"""
+    hub_dia = part.get('hub_diameter')
+    hub_height = part.get('hub_height')
+    return bool(part.get('outer_diameter') and hub_dia and hub_dia > 0 and hub_height
+                and MATING_HUB_HEIGHT_IN[0] <= hub_height <= MATING_HUB_HEIGHT_IN[1])
+
+
+def is_mating_lug(part: Dict) -> bool:
+    """LUG with a 2PC mating recess and a round size (can match some STUD)"""
+    step_dia = part.get('counter_bore_diameter')
+    step_depth = part.get('counter_bore_depth')
+    return bool(part.get('outer_diameter') and step_dia and step_dia > 0 and step_depth
+                and RECESS_DEPTH_IN[0] <= step_depth <= RECESS_DEPTH_IN[1])
+
+
+def _round_size_bucket(outer_diameter: float) -> int:
+    return int(outer_diameter * 25.4 // OD_TOLERANCE_MM)
+
+
+class _LugIndex:
+    """Mating LUGs bucketed by round size, each bucket sorted by recess diameter"""
+
+    def __init__(self, lugs: Iterable[Dict]):
+        buckets = defaultdict(list)
+        for position, lug in enumerate(lugs):
+            if is_mating_lug(lug):
+                buckets[_round_size_bucket(lug['outer_diameter'])].append((lug['counter_bore_diameter'], position, lug))
+        self.buckets = {}
+        for bucket, entries in buckets.items():
+            entries.sort(key=lambda entry: entry[:2])
+            self.buckets[bucket] = ([entry[0] for entry in entries], entries)
+
+    def candidates(self, stud: Dict, max_clearance_mm: Optional[float] = None):
+        """(position, lug) for LUGs of a neighbouring round size whose recess clears the stud hub"""
+        hub = stud['hub_diameter']
+        low = hub + MIN_HUB_CLEARANCE_MM - _BOUND_SLACK_MM
+        high = None if max_clearance_mm is None else hub + max_clearance_mm + _BOUND_SLACK_MM
+        bucket = _round_size_bucket(stud['outer_diameter'])
+        for neighbour in (bucket - 1, bucket, bucket + 1):
+            indexed = self.buckets.get(neighbour)
+            if not indexed:
+                continue
+            diameters, entries = indexed
+            start = bisect_left(diameters, low)
+            end = len(diameters) if high is None else bisect_right(diameters, high)
+            for _, position, lug in entries[start:end]:
+                yield position, lug
+
+
+def match_pairs(studs: Sequence[Dict], lugs: Sequence[Dict],
+                max_clearance_mm: Optional[float] = None,
+                check: Callable[[Dict, Dict], Dict] = check_2pc_compatibility) -> List[Dict]:
+    """
+    Compatible STUD/LUG pairs, ranked.
+
+    Args:
+        studs: STUD part dicts (PART_COLUMNS keys)
+        lugs: LUG part dicts
+        max_clearance_mm: Optional upper bound on hub clearance; None keeps
+            loose fits
+        check: Compatibility check run on each candidate pair
+
+    Returns:
+        list of {'stud', 'lug', 'score', 'notes', 'clearance_mm'}, tightest
+        fit first, then highest score (ties keep the input order)
+    """
+    index = _LugIndex(lugs)
+    ranked = []
+    for stud_position, stud in enumerate(studs):
+        if not is_mating_stud(stud):
+            continue
+        for lug_position, lug in index.candidates(stud, max_clearance_mm):
+            match_result = check(stud, lug)
+            if not match_result['compatible']:
+                continue
+            clearance_mm = match_result.get('clearance_mm', 999)
+            ranked.append(((clearance_mm, -match_result['score'], stud_position, lug_position), {
+                'stud': stud,
+                'lug': lug,
+                'score': match_result['score'],
+                'notes': match_result['notes'],
+                'clearance_mm': clearance_mm
+            }))
+    ranked.sort(key=lambda entry: entry[0])
+    return [match for _, match in ranked]
+
+
+def filter_parts(parts: Iterable[Dict], thickness_min=None, thickness_max=None,
+                 cb_min=None, cb_max=None, od_min=None, od_max=None) -> List[Dict]:
+    """
+    Parts within the given thickness (inches), CB (mm) and OD (inches)
+    ranges; parts missing a filtered dimension are excluded.
+    """
+    filtered = []
+    for part in parts:
+        if thickness_min is not None or thickness_max is not None:
+            thickness = part.get('thickness')
+            if thickness is None:
+                continue
+            if thickness_min is not None and thickness < thickness_min:
+                continue
+            if thickness_max is not None and thickness > thickness_max:
+                continue
+        if cb_min is not None or cb_max is not None:
+            cb = part.get('center_bore')
+            if not cb or (cb_min is not None and cb < cb_min) or (cb_max is not None and cb > cb_max):
+                continue
+        if od_min is not None or od_max is not None:
+            od = part.get('outer_diameter')
+            if not od or (od_min is not None and od < od_min) or (od_max is not None and od > od_max):
+                continue
+        filtered.append(part)
+    return filtered
+
+
+class TwoPCCatalog:
+    """
+    2PC part rows cached between matching calls.
+
+    Rows are reloaded only when another connection has committed to the
+    database since the last load (PRAGMA data_version). Values derived from
+    a part (ring fit grading, ...) can be cached with derived() and are
+    dropped on reload.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._data_version = None
+        self._parts: List[Dict] = []
+        self._by_number: Dict[str, Dict] = {}
+        self._derived: Dict[tuple, object] = {}
+        self._lock = threading.RLock()
+
+    def _refresh(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        cursor = self._conn.execute(f"""
+            SELECT {', '.join(PART_COLUMNS)}
+            FROM programs
+            WHERE spacer_type LIKE '%2PC%'
+            ORDER BY outer_diameter, program_number
+        """)
+        self._parts = [dict(zip(PART_COLUMNS, row)) for row in cursor]
+        self._by_number = {part['program_number']: part for part in self._parts}
+        self._derived = {}
+        self._data_version = data_version
+        logger.debug(f"Loaded {len(self._parts)} 2PC parts")
+
+    def parts(self) -> List[Dict]:
+        """Every 2PC part, ordered by OD then program number (do not modify)"""
+        with self._lock:
+            self._refresh()
+            return self._parts
+
+    def part(self, program_number: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            return self._by_number.get(program_number)
+
+    def of_type(self, spacer_type: str) -> List[Dict]:
+        """Parts whose spacer_type contains '2PC STUD' / '2PC LUG'"""
+        return [part for part in self.parts() if spacer_type in part['spacer_type']]
+
+    def derived(self, name: str, part: Dict, compute: Callable[[Dict], object]):
+        """compute(part), cached until the catalog reloads"""
+        key = (name, part['program_number'])
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = compute(part)
+            return self._derived[key]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._data_version = None
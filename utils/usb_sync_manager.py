@@ -20,7 +20,6 @@ Status Values:
 """
 
 import sqlite3
-import hashlib
 import shutil
 import os
 import json
@@ -29,6 +28,8 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import getpass
 
+from utils.file_content import FileContent
+
 
 class USBSyncManager:
     """Core USB sync manager for hash-based file synchronization"""
@@ -63,9 +64,7 @@ class USBSyncManager:
             return None
 
         try:
-            with open(file_path, 'rb') as f:
-                file_hash = hashlib.sha256(f.read()).hexdigest()
-            return file_hash
+            return FileContent.read(file_path).sha256
         except Exception as e:
             print(f"Error calculating hash for {file_path}: {e}")
             return None
@@ -0,0 +1,314 @@
+"""
+Write Lease
+Database-resident coordination between workstations writing to a shared
+database.
+
+The old safety checker rewrote a metadata JSON file next to the database
+on every access and every write, and guessed at conflicts from file
+modification times. Here the coordination state lives in the database:
+
+- db_write_lease: one row naming the current writer (holder, host, user,
+  operation) with a heartbeat and an expiry. A writer takes the lease in a
+  BEGIN IMMEDIATE transaction; an expired lease is free, so a crashed
+  writer blocks others for at most LEASE_DURATION seconds.
+- edit_locks: per-program locks (the existing table, plus holder and
+  expiry columns).
+
+A batch operation wraps its writes in hold(): the lease is taken once and
+a heartbeat thread renews it until the batch ends. Single writes acquire()
+and release() around the write; acquire() by the current holder only
+renews, and only when the heartbeat is getting old.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds a lease stays valid without a heartbeat
+LEASE_DURATION = 30.0
+
+# Holders renew once the heartbeat is this old
+RENEW_INTERVAL = 10.0
+
+# Seconds a per-program edit lock stays valid without being refreshed
+PROGRAM_LOCK_DURATION = 15 * 60.0
+
+LEASE_COLUMNS = ('holder', 'host', 'username', 'operation', 'acquired_at', 'heartbeat_at', 'expires_at')
+
+
+def create_lease_tables(cursor):
+    """Writer lease table and lease columns on edit_locks"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS db_write_lease (
+            lease_id INTEGER PRIMARY KEY CHECK (lease_id = 1),
+            holder TEXT NOT NULL,
+            host TEXT,
+            username TEXT,
+            operation TEXT,
+            acquired_at REAL,
+            heartbeat_at REAL,
+            expires_at REAL
+        )
+    ''')
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(edit_locks)")}
+    if 'holder' not in existing:
+        cursor.execute("ALTER TABLE edit_locks ADD COLUMN holder TEXT")
+    if 'expires_at' not in existing:
+        cursor.execute("ALTER TABLE edit_locks ADD COLUMN expires_at REAL")
+
+
+def describe_lease(lease: Dict) -> str:
+    """'bob on SHOP-PC (import_file, 12s ago)'"""
+    who = lease.get('username') or 'Another user'
+    since = time.time() - (lease.get('heartbeat_at') or time.time())
+    return f"{who} on {lease.get('host') or 'unknown host'} ({lease.get('operation') or 'write'}, {since:.0f}s ago)"
+
+
+class WriteLease:
+    """Writer lease and per-program edit locks for one database"""
+
+    def __init__(self, db_path: str, username: Optional[str] = None,
+                 duration: float = LEASE_DURATION, renew_interval: float = RENEW_INTERVAL):
+        self.db_path = db_path
+        self.username = username
+        self.duration = duration
+        self.renew_interval = renew_interval
+        self.host = os.environ.get('COMPUTERNAME') or socket.gethostname()
+        self.holder = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._held = False
+        self._renewed_at = 0.0
+        self._depth = 0
+        self._lock = threading.RLock()
+        self._heartbeat_stop = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+        return conn
+
+    def _read(self, conn) -> Optional[Dict]:
+        row = conn.execute(f"SELECT {', '.join(LEASE_COLUMNS)} FROM db_write_lease WHERE lease_id = 1").fetchone()
+        return dict(zip(LEASE_COLUMNS, row)) if row else None
+
+    # ------------------------------------------------------------------
+    # Writer lease
+    # ------------------------------------------------------------------
+
+    def current(self) -> Optional[Dict]:
+        """The unexpired lease (anyone's), or None"""
+        conn = self._connect()
+        try:
+            lease = self._read(conn)
+        finally:
+            conn.close()
+        if lease and lease['expires_at'] and lease['expires_at'] > time.time():
+            return lease
+        return None
+
+    def other_writer(self) -> Optional[Dict]:
+        """The lease if someone else is writing right now, else None"""
+        lease = self.current()
+        return lease if lease and lease['holder'] != self.holder else None
+
+    def acquire(self, operation: str = "write") -> bool:
+        """
+        Take (or renew) the lease.
+
+        Returns:
+            True if this instance holds the lease; False if another holder's
+            lease has not expired
+        """
+        with self._lock:
+            now = time.time()
+            if self._held and now - self._renewed_at < self.renew_interval:
+                return True
+
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                lease = self._read(conn)
+                if lease and lease['holder'] != self.holder and (lease['expires_at'] or 0) > now:
+                    conn.execute("ROLLBACK")
+                    self._held = False
+                    return False
+                if lease and lease['holder'] == self.holder:
+                    conn.execute("""
+                        UPDATE db_write_lease SET operation = ?, heartbeat_at = ?, expires_at = ?
+                        WHERE lease_id = 1
+                    """, (operation, now, now + self.duration))
+                else:
+                    conn.execute("""
+                        INSERT OR REPLACE INTO db_write_lease
+                            (lease_id, holder, host, username, operation, acquired_at, heartbeat_at, expires_at)
+                        VALUES (1, ?, ?, ?, ?, ?, ?, ?)
+                    """, (self.holder, self.host, self.username, operation, now, now, now + self.duration))
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+            self._held = True
+            self._renewed_at = now
+            return True
+
+    def renew(self) -> bool:
+        """
+        Extend the lease; False if it was lost (expired and taken by someone
+        else).
+        """
+        with self._lock:
+            if not self._held:
+                return False
+            now = time.time()
+            conn = self._connect()
+            try:
+                updated = conn.execute("""
+                    UPDATE db_write_lease SET heartbeat_at = ?, expires_at = ?
+                    WHERE lease_id = 1 AND holder = ?
+                """, (now, now + self.duration, self.holder)).rowcount
+            finally:
+                conn.close()
+            self._held = updated == 1
+            if self._held:
+                self._renewed_at = now
+            else:
+                logger.warning("Database write lease was lost")
+            return self._held
+
+    def release(self, force: bool = False):
+        """Give up the lease (no-op inside hold() unless force)"""
+        with self._lock:
+            if not self._held or (self._depth and not force):
+                return
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute("DELETE FROM db_write_lease WHERE lease_id = 1 AND holder = ?", (self.holder,))
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not release write lease (expires on its own): {e}")
+            self._held = False
+
+    @contextmanager
+    def hold(self, operation: str = "batch"):
+        """
+        Hold the lease for a batch of writes, renewing it in the background.
+
+        Yields:
+            True if the lease is held, False if another writer holds it (the
+            caller decides whether to proceed)
+        """
+        with self._lock:
+            acquired = self.acquire(operation)
+            self._depth += 1
+            if acquired and self._depth == 1:
+                self._heartbeat_stop = threading.Event()
+                threading.Thread(target=self._heartbeat, args=(self._heartbeat_stop,),
+                                 name="write-lease", daemon=True).start()
+        try:
+            yield acquired
+        finally:
+            with self._lock:
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._heartbeat_stop:
+                        self._heartbeat_stop.set()
+                        self._heartbeat_stop = None
+                    self.release()
+
+    def _heartbeat(self, stop: threading.Event):
+        while not stop.wait(self.renew_interval):
+            try:
+                if not self.renew():
+                    return
+            except sqlite3.Error as e:
+                logger.warning(f"Write lease heartbeat failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Per-program edit locks (edit_locks)
+    # ------------------------------------------------------------------
+
+    def lock_program(self, program_number: str, user_id: Optional[int] = None,
+                     duration: float = PROGRAM_LOCK_DURATION) -> bool:
+        """
+        Lock one program for editing (or refresh our lock).
+
+        Returns:
+            False if someone else holds an unexpired lock on it
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT holder, expires_at FROM edit_locks WHERE program_number = ?",
+                               (program_number,)).fetchone()
+            if row and row[0] and row[0] != self.holder and (row[1] or 0) > now:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("""
+                INSERT OR REPLACE INTO edit_locks
+                    (program_number, locked_by, locked_by_username, locked_at, holder, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (program_number, user_id, self.username, datetime.now().isoformat(),
+                  self.holder, now + duration))
+            conn.execute("COMMIT")
+            return True
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def unlock_program(self, program_number: str):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM edit_locks WHERE program_number = ? AND holder = ?",
+                         (program_number, self.holder))
+        finally:
+            conn.close()
+
+    def program_lock(self, program_number: str) -> Optional[Dict]:
+        """Unexpired lock on a program: {'username', 'holder', 'locked_at', 'expires_at', 'mine'}"""
+        conn = self._connect()
+        try:
+            row = conn.execute("""
+                SELECT locked_by_username, holder, locked_at, expires_at FROM edit_locks
+                WHERE program_number = ?
+            """, (program_number,)).fetchone()
+        finally:
+            conn.close()
+        if not row or (row[3] or 0) <= time.time():
+            return None
+        return {'username': row[0], 'holder': row[1], 'locked_at': row[2],
+                'expires_at': row[3], 'mine': row[1] == self.holder}
+
+    def close(self):
+        """Release the lease and this instance's edit locks"""
+        with self._lock:
+            if self._heartbeat_stop:
+                self._heartbeat_stop.set()
+                self._heartbeat_stop = None
+            self._depth = 0
+            self.release(force=True)
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM edit_locks WHERE holder = ?", (self.holder,))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not clear edit locks: {e}")